@@ -0,0 +1,9 @@
+# benchmarks/__init__.py
+"""
+Замеры производительности магазина.
+
+Запуск из корня проекта, например:
+    python -m benchmarks.catalog_refresh
+По умолчанию используется встроенный бэкенд SQLite во временном файле,
+поэтому сервер MSSQL не нужен; --backend mssql – замер на рабочей базе.
+"""
@@ -0,0 +1,93 @@
+# benchmarks/admin_bulk.py
+"""
+Массовые операции админ-панели: прежний путь (по записи на подтверждение –
+set_order_status / UPDATE для каждой) против services.bulk_apply (один
+оператор на все записи по фильтру или на каждые BULK_ID_BATCH выбранных).
+
+Считаются обращения к серверу и время для смены статуса заказов и
+изменения цены товаров.
+
+    python -m benchmarks.admin_bulk --rows 1000 5000
+"""
+import time
+
+import db
+import services
+from benchmarks.admin_grid import fill_orders
+from benchmarks.common import RoundTripCounter, base_parser, benchmark_database
+
+
+def old_set_statuses(order_ids, status):
+    for order_id in order_ids:
+        services.set_order_status(order_id, status)
+
+
+def old_change_prices(product_ids, percent):
+    for product_id in product_ids:
+        with db.connection() as conn:
+            conn.cursor().execute(
+                "UPDATE Товар SET Цена = ROUND(Цена * (100 + ?) / 100, 2) WHERE Номер_товара = ?",
+                (percent, product_id),
+            )
+
+
+def add_products(count):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        cursor.executemany("INSERT INTO Товар (Название, Цена, Количество) VALUES (?, ?, ?)",
+                           [(f"Массовый товар {i}", 100 + i % 50, 10) for i in range(count)])
+
+
+def ids_of(sql):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def measure(counter, func):
+    counter.reset()
+    start = time.perf_counter()
+    func()
+    return counter.count, (time.perf_counter() - start) * 1000
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 5000])
+    args = parser.parse_args(argv)
+    if args.backend != "sqlite":
+        parser.error("замер меняет заказы и товары – только на временной базе SQLite")
+
+    counter = RoundTripCounter()
+    print(f"{'записей':>8}  {'операция':<22}{'было обращений':>16}{'стало':>7}"
+          f"{'было, мс':>10}{'стало, мс':>11}")
+    for rows in args.rows:
+        with benchmark_database(args, counter):
+            fill_orders(rows)
+            add_products(rows)
+            orders = ids_of("SELECT ID_заказа FROM Заказ ORDER BY ID_заказа")
+            products = ids_of("SELECT Номер_товара FROM Товар ORDER BY Номер_товара")
+
+            cases = [
+                ("статус заказов",
+                 lambda: old_set_statuses(orders, "в обработке"),
+                 lambda: services.bulk_apply("Заказ", "status", "доставлен", ids=orders)),
+                ("цена товаров (+5%)",
+                 lambda: old_change_prices(products, 5),
+                 lambda: services.bulk_apply("Товар", "price", "5", ids=products)),
+                ("статус по фильтру",
+                 lambda: old_set_statuses(orders, "отменен"),
+                 lambda: services.bulk_apply("Заказ", "status", "создан",
+                                             filters={"Статус": "отменен"})),
+            ]
+            for name, old, new in cases:
+                old_trips, old_ms = measure(counter, old)
+                new_trips, new_ms = measure(counter, new)
+                print(f"{rows:>8}  {name:<22}{old_trips:>16}{new_trips:>7}"
+                      f"{old_ms:>10.1f}{new_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# benchmarks/admin_export.py
+"""
+Выгрузка таблицы «Заказ» (export.export_admin_table) в CSV и XLSX:
+скорость в строках в секунду, размер файла и пик памяти Python
+(tracemalloc) – он не должен расти вместе с числом строк.
+
+    python -m benchmarks.admin_export --orders 50000 200000
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+import export
+from benchmarks.admin_grid import fill_orders
+from benchmarks.common import base_parser, benchmark_database
+
+
+def measure(path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = export.export_admin_table("Заказ", path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, elapsed, peak / 2 ** 20
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--orders", type=int, nargs="+", default=[50_000, 200_000])
+    args = parser.parse_args(argv)
+
+    print(f"{'строк':>8}  {'формат':<6}{'строк/с':>10}{'файл, МБ':>10}{'пик, МБ':>9}")
+    for count in args.orders:
+        with benchmark_database(args), tempfile.TemporaryDirectory() as folder:
+            if args.backend == "sqlite":
+                fill_orders(count)
+            for ext in ("csv", "xlsx"):
+                path = os.path.join(folder, f"Заказ.{ext}")
+                rows, elapsed, peak = measure(path)
+                size = os.path.getsize(path) / 2 ** 20
+                print(f"{rows:>8}  {ext:<6}{rows / elapsed:>10.0f}{size:>10.1f}{peak:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/admin_grid.py
+"""
+Открытие таблицы «Заказ» в админ-панели: прежняя загрузка всей таблицы
+(fetchall, форматирование каждой строки, копия в table_data) против
+постраничного источника services.admin_table_query (первая страница
+и форматирование только видимых строк).
+
+Замеряются время до первых строк на экране и пик памяти Python (tracemalloc),
+затем – первая страница с серверной сортировкой и фильтрами.
+
+    python -m benchmarks.admin_grid --orders 200000
+"""
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import db
+import services
+from benchmarks.checkout import create_buyer
+from benchmarks.common import base_parser, benchmark_database, summarize, timed
+from virtual_tree import PAGE_SIZE
+
+VISIBLE_ROWS = 25
+
+# (сортировка, фильтры) – как после щелчка по заголовку и ввода фильтра
+FILTERED_VIEWS = [
+    (None, {"Дата_заказа": "2024-03-01"}),
+    (("Дата_заказа", True), {"Дата_заказа": ">=2024-12-01"}),
+    (("Количество", False), {"Количество": "3"}),
+    (None, {"Статус": "создан", "Количество": ">4"}),
+]
+
+
+def fill_orders(count, batch=5000):
+    payment_id = create_buyer("bench_admin")
+    product_id = services.add_product("Товар админки", 100, 10)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        for start in range(0, count, batch):
+            cursor.executemany(
+                "INSERT INTO Заказ (ID_данные, Номер_товара, Количество_заказанного_товара, "
+                "Статус, Дата_заказа) VALUES (?, ?, ?, N'создан', ?)",
+                [(payment_id, product_id, 1 + i % 5, date(2024, 1, 1) + timedelta(days=i % 365))
+                 for i in range(min(batch, count - start))],
+            )
+
+
+def _format(value):
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return "[BINARY DATA]"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+
+def old_open():
+    """Как было: вся таблица одним fetchall и отформатированная копия."""
+    table = services.ADMIN_TABLES["Заказ"]
+    columns = ", ".join(column.expr for column in table.columns)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {columns} FROM {table.from_clause} ORDER BY z.ID_заказа DESC")
+        rows = cursor.fetchall()
+    table_data = [[_format(v) for v in row] for row in rows]
+    return table_data[:VISIBLE_ROWS]
+
+
+def paged_open():
+    """Как VirtualTree: подсчёт, окно строк, форматирование видимых."""
+    query = services.admin_table_query("Заказ")
+    total = query.count()
+    rows = query.page(0, VISIBLE_ROWS + PAGE_SIZE)
+    return total, [[_format(v) for v in row] for _, row in rows[:VISIBLE_ROWS]]
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 2 ** 20
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--orders", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    with benchmark_database(args):
+        if args.backend == "sqlite":
+            fill_orders(args.orders)
+        print(f"Заказов: {services.admin_table_query('Заказ').count()}")
+        for name, func in (("вся таблица", old_open), ("постранично", paged_open)):
+            elapsed, peak = measure(func)
+            print(f"{name:<14} до первых строк {elapsed:>8.1f} мс, пик памяти {peak:>7.1f} МБ")
+
+        for sort, filters in FILTERED_VIEWS:
+            query = services.admin_table_query("Заказ", sort, filters)
+            times, total = timed(lambda: (query.count(), query.page(0, VISIBLE_ROWS + PAGE_SIZE)),
+                                 args.repeat)
+            print(f"сортировка {sort}, фильтры {filters}: {total[0]} строк, "
+                  f"первая страница {summarize(times)['median_ms']:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/catalog_refresh.py
+"""
+Обновление каталога клиента: старый запрос со столбцом Изображение
+против services.list_products() без него.
+
+    python -m benchmarks.catalog_refresh --products 3000 --image-size 160
+"""
+import random
+
+import db
+import services
+from benchmarks.common import (
+    base_parser, benchmark_database, fmt_bytes, random_png, rows_bytes, summarize, timed,
+)
+
+# Запрос каталога до разделения списка и изображений
+OLD_CATALOG_SQL = """
+    SELECT Номер_товара, Название, Цена, Количество, Изображение
+    FROM Товар
+    WHERE Количество > 0
+"""
+
+
+def fill_catalog(products, image_size, seed=1):
+    rng = random.Random(seed)
+    # несколько десятков разных картинок на весь каталог – объём как у настоящих фото
+    images = [random_png(image_size, image_size * 3 // 4, rng) for _ in range(32)]
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        cursor.executemany(
+            "INSERT INTO Товар (Название, Цена, Количество, Изображение) VALUES (?, ?, ?, ?)",
+            [
+                (f"Товар {i}", round(rng.uniform(10, 5000), 2), rng.randint(1, 100),
+                 images[i % len(images)])
+                for i in range(products)
+            ],
+        )
+    return sum(len(images[i % len(images)]) for i in range(products))
+
+
+def old_refresh():
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(OLD_CATALOG_SQL)
+        return cursor.fetchall()
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--products", type=int, default=3000)
+    parser.add_argument("--image-size", type=int, default=160, help="ширина картинки, px")
+    args = parser.parse_args(argv)
+
+    with benchmark_database(args):
+        if args.backend == "sqlite":
+            total = fill_catalog(args.products, args.image_size)
+            print(f"Каталог: {args.products} товаров, изображения {fmt_bytes(total)}")
+
+        results = {}
+        for name, func in (("с изображениями", old_refresh), ("без изображений", services.list_products)):
+            func()  # прогрев
+            times, rows = timed(func, args.repeat)
+            results[name] = (summarize(times), rows_bytes(rows), len(rows))
+
+        print(f"{'запрос':<18}{'строк':>8}{'объём':>12}{'медиана, мс':>14}{'мин, мс':>10}")
+        for name, (stats, size, count) in results.items():
+            print(f"{name:<18}{count:>8}{fmt_bytes(size):>12}"
+                  f"{stats['median_ms']:>14.1f}{stats['min_ms']:>10.1f}")
+
+        (old_stats, old_size, _), (new_stats, new_size, _) = results.values()
+        print(f"Объём меньше в {old_size / max(new_size, 1):.0f} раз, "
+              f"время – в {old_stats['median_ms'] / max(new_stats['median_ms'], 1e-6):.1f} раз")
+
+
+if __name__ == "__main__":
+    main()
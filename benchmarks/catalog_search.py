@@ -0,0 +1,105 @@
+# benchmarks/catalog_search.py
+"""
+Поиск по каталогу: индекс триграмм (services.search_products_query)
+против сканирования названий через LIKE '%...%'.
+
+Замеряется то, что делает окно каталога на каждый запрос: подсчёт
+найденного и первая страница результатов.
+
+    python -m benchmarks.catalog_search --products 100000
+"""
+import random
+import time
+
+import db
+import services
+from benchmarks.common import base_parser, benchmark_database, summarize, timed
+from virtual_tree import PAGE_SIZE
+
+ADJECTIVES = ["Свежий", "Домашний", "Фермерский", "Отборный", "Классический", "Лёгкий",
+              "Молочный", "Ёлочный", "Нежный", "Хрустящий", "Сладкий", "Острый"]
+NOUNS = ["йогурт", "сыр", "хлеб", "шоколад", "чай", "кофе", "сок", "творог", "кефир",
+         "печенье", "мёд", "молоко", "батон", "паштет", "соус", "орех", "ёрш"]
+BRANDS = ["Простоквашино", "Агуша", "Вкусвилл", "Бабаевский", "Ёлкин", "Красный Октябрь",
+          "Домик в деревне", "Любятово", "Черноголовка", "Савушкин"]
+
+# запросы в том виде, в каком их набирает пользователь
+QUERIES = ["мо", "мол", "молоко", "елоч", "ЁЛКИН", "шокол", "сыр савуш", "красный окт",
+           "печ", "кефир 2"]
+
+# то же без индекса: регистр и «ё» приходится нормализовать у каждой строки
+SCAN_WHERE = """
+    WHERE Количество > 0
+      AND REPLACE(LOWER(Название), N'ё', N'е') LIKE ?
+"""
+
+
+def product_name(rng):
+    return (f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {rng.choice(BRANDS)} "
+            f"{rng.choice((0.5, 1, 1.5, 2, 2.5, 3.2))} {rng.randint(1, 999)}")
+
+
+def fill_catalog(products, seed=1, batch=5000):
+    rng = random.Random(seed)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        for start in range(0, products, batch):
+            cursor.executemany(
+                "INSERT INTO Товар (Название, Цена, Количество) VALUES (?, ?, ?)",
+                [(product_name(rng), round(rng.uniform(10, 5000), 2), rng.randint(0, 50))
+                 for _ in range(min(batch, products - start))],
+            )
+
+
+def indexed_search(text):
+    query = services.search_products_query(text)
+    return query.count(), query.page(0, PAGE_SIZE)
+
+
+def scan_search(text):
+    pattern = "%" + "%".join(text.lower().replace("ё", "е").split()) + "%"
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Товар" + SCAN_WHERE, (pattern,))
+        count = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT Номер_товара, Название, Цена, Количество FROM Товар" + SCAN_WHERE
+            + "ORDER BY Номер_товара OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY",
+            (pattern, PAGE_SIZE),
+        )
+        return count, cursor.fetchall()
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--products", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    with benchmark_database(args):
+        if args.backend == "sqlite":
+            fill_catalog(args.products)
+            print(f"Каталог: {args.products} товаров")
+
+        start = time.perf_counter()
+        indexed = services.refresh_search_index()
+        print(f"Индекс построен для {indexed} товаров за {time.perf_counter() - start:.1f} с")
+
+        print(f"{'запрос':<14}{'найдено':>9}{'индекс, мс':>12}{'скан, мс':>10}{'скан нашёл':>12}")
+        index_times, scan_times = [], []
+        for text in QUERIES:
+            indexed_search(text)  # прогрев
+            times, (count, _) = timed(lambda: indexed_search(text), args.repeat)
+            scan, (scan_count, _) = timed(lambda: scan_search(text), args.repeat)
+            index_times += times
+            scan_times += scan
+            print(f"{text:<14}{count:>9}{summarize(times)['median_ms']:>12.1f}"
+                  f"{summarize(scan)['median_ms']:>10.1f}{scan_count:>12}")
+
+        for name, times in (("индекс", index_times), ("скан", scan_times)):
+            stats = summarize(times)
+            print(f"{name}: медиана {stats['median_ms']:.1f} мс, максимум {stats['max_ms']:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/checkout.py
+"""
+Оформление корзины: прежний цикл «проверка – названия – INSERT –
+SCOPE_IDENTITY – UPDATE» по каждой позиции против services.create_orders
+(одно списание остатков и один INSERT на всю корзину).
+
+Считаются обращения к серверу на одно оформление и время; затем несколько
+потоков одновременно раскупают ограниченный остаток – проверка, что
+товар не продан сверх наличия.
+
+    python -m benchmarks.checkout --cart-sizes 1 5 20 --buyers 16
+"""
+import threading
+from datetime import datetime
+
+import db
+import services
+from benchmarks.common import (
+    RoundTripCounter, base_parser, benchmark_database, summarize, timed,
+)
+
+
+def old_create_orders(payment_id, cart):
+    """Оформление в том виде, как оно было до пакетной версии."""
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        for prod_id, qty in cart:
+            cursor.execute("SELECT Количество, Название FROM Товар WHERE Номер_товара = ?",
+                           (prod_id,))
+            available_qty, prod_name = cursor.fetchone()
+            if available_qty < qty:
+                raise services.ConflictError(f"Товара '{prod_name}' недостаточно в наличии")
+        names = []
+        for prod_id, qty in cart:
+            cursor.execute("SELECT Название FROM Товар WHERE Номер_товара = ?", (prod_id,))
+            names.append(cursor.fetchone()[0])
+        created = []
+        for (prod_id, qty), name in zip(cart, names):
+            cursor.execute("""
+                           INSERT INTO Заказ (ID_данные, Номер_товара,
+                                              Количество_заказанного_товара, Статус, Дата_заказа)
+                           VALUES (?, ?, ?, N'создан', ?)
+                           """, (payment_id, prod_id, qty, current_date))
+            cursor.execute("SELECT SCOPE_IDENTITY()")
+            created.append(services.CreatedOrder(int(cursor.fetchone()[0]), name))
+            cursor.execute("UPDATE Товар SET Количество = Количество - ? WHERE Номер_товара = ?",
+                           (qty, prod_id))
+    return created
+
+
+def create_buyer(login):
+    """Клиент с картой; возвращает ID платёжных данных."""
+    services.register_user(login, b"x", None, "client", client={
+        "last_name": "Покупатель", "first_name": login, "middle_name": None,
+        "passport_series": "0000", "passport_number": "000000",
+        "city": "Город", "street": "Улица", "house": "1", "flat": None,
+    })
+    client_id = services.get_user_by_login(login).client_id
+    services.add_payment_card(client_id, "4000000000000000", "2030-12-31", "123")
+    return services.list_payment_cards(client_id)[0].id
+
+
+def add_products(count, quantity):
+    return [services.add_product(f"Товар {i}", 100, quantity) for i in range(count)]
+
+
+def measure_round_trips(counter, args, payment_id):
+    print(f"{'позиций':>8}{'было обращений':>16}{'стало':>8}{'было, мс':>10}{'стало, мс':>11}")
+    for size in args.cart_sizes:
+        products = add_products(size, 10 ** 6)
+        cart = [(prod_id, 1) for prod_id in products]
+        row = []
+        for func in (old_create_orders, services.create_orders):
+            func(payment_id, cart)  # прогрев
+            counter.reset()
+            func(payment_id, cart)
+            trips = counter.count
+            times, _ = timed(lambda: func(payment_id, cart), args.repeat)
+            row.append((trips, summarize(times)["median_ms"]))
+        (old_trips, old_ms), (new_trips, new_ms) = row
+        print(f"{size:>8}{old_trips:>16}{new_trips:>8}{old_ms:>10.1f}{new_ms:>11.1f}")
+
+
+def check_oversell(args, payment_id):
+    """buyers потоков раскупают stock штук одного товара по одной."""
+    stock = args.stock
+    product_id = services.add_product("Дефицитный товар", 100, stock)
+    sold, rejected = [], []
+    lock = threading.Lock()
+
+    def buyer():
+        while True:
+            try:
+                created = services.create_orders(payment_id, [(product_id, 1)])
+            except services.ConflictError:
+                with lock:
+                    rejected.append(1)
+                return
+            with lock:
+                sold.extend(created)
+
+    threads = [threading.Thread(target=buyer) for _ in range(args.buyers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    left = services.get_product(product_id, with_image=False).quantity
+    print(f"Параллельно {args.buyers} покупателей: продано {len(sold)} из {stock}, "
+          f"остаток {left}, отказов {len(rejected)}")
+    assert len(sold) == stock and left == 0, "продано больше или меньше, чем было"
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--cart-sizes", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--buyers", type=int, default=16)
+    parser.add_argument("--stock", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    counter = RoundTripCounter()
+    with benchmark_database(args, counter=counter):
+        payment_id = create_buyer("bench_checkout")
+        measure_round_trips(counter, args, payment_id)
+        check_oversell(args, payment_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# benchmarks/common.py
+"""Общие помощники замеров: временная база, объём строк, статистика времени."""
+import argparse
+import io
+import math
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+import db
+
+
+def base_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--backend", choices=("sqlite", "mssql"), default="sqlite",
+                        help="бэкенд БД (по умолчанию временная база SQLite)")
+    parser.add_argument("--db-path", default=None,
+                        help="файл SQLite; по умолчанию создаётся временный")
+    parser.add_argument("--repeat", type=int, default=5, help="число повторов замера")
+    return parser
+
+
+class RoundTripCounter:
+    """Число обращений к серверу БД: execute, executemany, commit, rollback."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def add(self, n=1):
+        with self._lock:
+            self.count += n
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+
+
+class _CountingCursor:
+    def __init__(self, raw, counter):
+        self._raw = raw
+        self._counter = counter
+
+    def execute(self, sql, *params):
+        self._counter.add()
+        return self._raw.execute(sql, *params)
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        # pyodbc с fast_executemany отправляет массив параметров одним пакетом
+        fast = getattr(self._raw, "fast_executemany", False)
+        self._counter.add(1 if fast else len(seq_of_params))
+        return self._raw.executemany(sql, seq_of_params)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        if name in ("_raw", "_counter"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw, name, value)
+
+
+class _CountingConnection:
+    def __init__(self, raw, counter):
+        self._raw = raw
+        self._counter = counter
+
+    def cursor(self):
+        return _CountingCursor(self._raw.cursor(), self._counter)
+
+    def commit(self):
+        self._counter.add()
+        self._raw.commit()
+
+    def rollback(self):
+        self._counter.add()
+        self._raw.rollback()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class CountingBackend(db.Backend):
+    """Обёртка бэкенда, считающая обращения к серверу во всех соединениях пула."""
+
+    def __init__(self, inner, counter):
+        self.inner = inner
+        self.counter = counter
+        self.name = inner.name
+
+    def connect(self):
+        return _CountingConnection(self.inner.connect(), self.counter)
+
+    def ping(self, raw):
+        self.inner.ping(raw._raw)
+
+    def close(self):
+        self.inner.close()
+
+
+@contextmanager
+def benchmark_database(args, counter=None, instrument=None):
+    """
+    Настроить db на бэкенд замера; временный файл SQLite удаляется по выходу.
+    counter – RoundTripCounter, если нужно считать обращения к серверу.
+    instrument – замерять ли запросы (см. db.configure).
+    """
+    tmp_dir = None
+    if args.backend == "sqlite":
+        path = args.db_path
+        if path is None:
+            tmp_dir = tempfile.TemporaryDirectory(prefix="shop_bench_")
+            path = os.path.join(tmp_dir.name, "bench.sqlite3")
+        backend = db.create_backend("sqlite", path=path)
+    else:
+        backend = db.create_backend("mssql")
+    if counter is not None:
+        backend = CountingBackend(backend, counter)
+    db.configure(backend, instrument=instrument)
+    try:
+        yield db.get_backend()
+    finally:
+        db.get_pool().close()
+        db.get_backend().close()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+
+def value_bytes(value):
+    """Примерный объём значения «на проводе»."""
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        # NVARCHAR передаётся в UTF-16
+        return len(value) * 2
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 8
+    if isinstance(value, (Decimal, datetime, date)):
+        return 8
+    return len(str(value))
+
+
+def rows_bytes(rows):
+    return sum(value_bytes(v) for row in rows for v in row)
+
+
+def timed(func, repeat):
+    """Выполнить func repeat раз; вернуть (список секунд, результат последнего вызова)."""
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def summarize(times):
+    ordered = sorted(times)
+    return {
+        "min_ms": ordered[0] * 1000,
+        "median_ms": statistics.median(ordered) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def percentiles(times, qs=(50, 95, 99)):
+    """Перцентили времени в мс по ближайшему рангу: {"p50_ms": ..., ...}."""
+    ordered = sorted(times)
+    return {
+        f"p{q}_ms": ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)] * 1000
+        for q in qs
+    }
+
+
+def fmt_bytes(n):
+    for unit in ("Б", "КБ", "МБ", "ГБ"):
+        if n < 1024 or unit == "ГБ":
+            return f"{n:.1f} {unit}" if unit != "Б" else f"{n} {unit}"
+        n /= 1024
+
+
+def random_png(width, height, rng=random):
+    """Шумное изображение (плохо сжимается – похоже на фотографию по объёму)."""
+    from PIL import Image
+    image = Image.frombytes("RGB", (width, height), rng.randbytes(width * height * 3))
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
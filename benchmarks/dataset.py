@@ -0,0 +1,512 @@
+# benchmarks/dataset.py
+"""
+Синтетическая база магазина заданного масштаба: пользователи, клиенты,
+курьеры, товары с изображениями, платёжные данные и заказы.
+
+Масштаб задаётся числом заказов (SCALE_FACTORS: 1k ... 10m), остальные
+таблицы растут вместе с ним (scale_for). Распределения похожи на живой
+магазин:
+- популярность товаров и активность клиентов – по Ципфу: немногие
+  товары и покупатели дают большую часть заказов;
+- даты заказов – за HISTORY_YEARS лет с ростом к сегодняшнему дню и
+  всплеском в выходные; номера заказов идут в порядке дат;
+- статус зависит от возраста заказа: свежие ещё создаются и везутся,
+  старые доставлены или отменены; курьер назначен взятым заказам;
+- изображения – нескольких размеров (до MAX_IMAGE_SIDE, как после
+  импорта), часть товаров без изображения; миниатюры готовы сразу.
+
+Строки вставляются пачками по BATCH через executemany (fast_executemany
+для pyodbc), пачка – одна транзакция. Ключи новых строк читаются обратно
+по уникальным полям (логин, номер пользователя, артикул в названии).
+После заказов строятся поисковый индекс и сводки продаж.
+
+У всех пользователей пароль DATASET_PASSWORD, логины – gen-c0000001
+(клиенты) и gen-k00001 (курьеры).
+
+    python -m benchmarks.dataset --scale 100k --db-path shop_100k.sqlite3
+    python -m benchmarks.dataset --scale 1m --backend mssql
+"""
+import io
+import math
+import random
+import time
+from bisect import bisect
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from typing import NamedTuple
+
+import db
+import image_cache
+import services
+from benchmarks.common import base_parser, benchmark_database, fmt_bytes
+from product_import import MAX_IMAGE_SIDE
+from security import hash_password
+
+SCALE_FACTORS = {
+    "1k": 1_000,
+    "10k": 10_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+BATCH = 10_000        # строк в одном executemany и одной транзакции
+IMAGE_BATCH = 200     # товаров с изображениями в пачке – строки по сотням КБ
+DATASET_PASSWORD = "password"
+LOGIN_PREFIX = "gen-"
+
+# распределения
+HISTORY_YEARS = 3
+YEARLY_GROWTH = 0.5     # через год заказов в день на столько больше
+WEEKEND_BOOST = 1.3
+ZIPF_PRODUCTS = 1.1
+ZIPF_CLIENTS = 0.8
+ZIPF_COURIERS = 0.5
+ZIPF_CITIES = 1.0
+QUANTITIES = ((1, 60), (2, 22), (3, 10), (4, 5), (5, 3))
+CARDS_PER_CLIENT = ((1, 70), (2, 25), (3, 5))
+NO_IMAGE_SHARE = 0.1
+IMAGE_SIDES = ((240, 25), (480, 35), (960, 28), (MAX_IMAGE_SIDE, 12))  # (длинная сторона, вес)
+IMAGE_VARIANTS = 6      # разных изображений каждого размера; товары их разделяют
+
+# статусы по возрасту заказа: (возраст до, дней; ((статус, вес), ...))
+STATUS_BY_AGE = (
+    (1, (("создан", 50), ("в обработке", 30), ("у курьера", 15), ("отменен", 5))),
+    (7, (("создан", 10), ("в обработке", 15), ("у курьера", 30), ("доставлен", 40),
+         ("отменен", 5))),
+    (None, (("доставлен", 92), ("отменен", 8))),
+)
+WITH_COURIER = ("у курьера", "доставлен")
+
+LAST_NAMES = ("Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов",
+              "Михайлов", "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев",
+              "Семёнов", "Егоров", "Павлов", "Козлов", "Степанов", "Николаев")
+FIRST_NAMES = ("Александр", "Дмитрий", "Максим", "Сергей", "Андрей", "Алексей", "Иван",
+               "Анна", "Мария", "Елена", "Ольга", "Наталья", "Татьяна", "Ирина", "Екатерина")
+MIDDLE_NAMES = ("Александрович", "Дмитриевич", "Сергеевич", "Андреевич", "Иванович",
+                "Петрович", "Николаевич", "Михайлович", None)
+CITIES = ("Москва", "Санкт-Петербург", "Новосибирск", "Екатеринбург", "Казань",
+          "Нижний Новгород", "Челябинск", "Самара", "Омск", "Ростов-на-Дону", "Уфа",
+          "Красноярск", "Воронеж", "Пермь", "Волгоград")
+STREETS = ("Ленина", "Советская", "Мира", "Садовая", "Молодёжная", "Школьная", "Лесная",
+           "Центральная", "Новая", "Набережная", "Гагарина", "Пушкина")
+PRODUCT_NOUNS = ("Кружка", "Футболка", "Рюкзак", "Блокнот", "Лампа", "Подушка", "Плед",
+                 "Чайник", "Зонт", "Термос", "Кеды", "Шарф", "Сумка", "Часы", "Наушники",
+                 "Колонка", "Ваза", "Свеча", "Полотенце", "Сковорода", "Кошелёк", "Очки",
+                 "Перчатки", "Ежедневник", "Коврик")
+PRODUCT_ADJECTIVES = ("классическая", "большая", "компактная", "детская", "дорожная",
+                      "керамическая", "хлопковая", "кожаная", "складная", "праздничная",
+                      "спортивная", "винтажная", "эко", "премиум", "базовая")
+PRODUCT_COLORS = ("белая", "чёрная", "синяя", "красная", "зелёная", "серая", "бежевая",
+                  "розовая", "жёлтая", "фиолетовая")
+
+
+class Scale(NamedTuple):
+    orders: int
+    clients: int
+    couriers: int
+    products: int
+
+
+class Dataset(NamedTuple):
+    """Ключи сгенерированных строк – для замеров поверх базы."""
+    scale: Scale
+    client_ids: list    # по убыванию активности (ранг Ципфа)
+    courier_ids: list
+    product_ids: list   # по убыванию популярности
+    card_ids: dict      # ID клиента -> [ID платёжных данных]
+    client_logins: list  # в том же порядке, что client_ids
+    courier_logins: list
+    timings: dict       # таблица -> секунд
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+def scale_for(orders, **overrides):
+    """Размеры остальных таблиц для orders заказов; overrides – явные значения."""
+    return Scale(
+        orders=orders,
+        clients=_clamp(orders // 20, 20, 500_000),
+        couriers=_clamp(orders // 2000, 5, 5_000),
+        products=_clamp(orders // 500, 50, 20_000),
+    )._replace(**overrides)
+
+
+def parse_scale(text):
+    """'100k', '1m' или число заказов."""
+    return SCALE_FACTORS.get(text.lower()) or int(text.replace("_", ""))
+
+
+# ---------- распределения ----------
+
+def _zipf_weights(n, exponent):
+    """Накопленные веса рангов 1..n по закону Ципфа – для rng.choices(cum_weights=...)."""
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def _cum(pairs):
+    values = [value for value, _ in pairs]
+    return values, list(accumulate(weight for _, weight in pairs))
+
+
+def _pick(rng, table):
+    values, cum = table
+    return values[bisect(cum, rng.random() * cum[-1])]
+
+
+def _orders_per_day(orders, days, today):
+    """Число заказов по дням (старые первыми): рост со временем и выходные; в сумме orders."""
+    weights = []
+    for i in range(days):
+        day = today - timedelta(days=days - 1 - i)
+        weight = 1 + YEARLY_GROWTH * i / 365
+        if day.weekday() >= 5:
+            weight *= WEEKEND_BOOST
+        weights.append(weight)
+    total = sum(weights)
+    exact = [orders * w / total for w in weights]
+    counts = [int(x) for x in exact]
+    # остаток – дням с наибольшей дробной частью
+    for i in sorted(range(days), key=lambda i: counts[i] - exact[i])[:orders - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def _status_table(age):
+    for max_age, mix in STATUS_BY_AGE:
+        if max_age is None or age <= max_age:
+            return _cum(mix)
+
+
+# ---------- изображения ----------
+
+def _product_image(rng, side):
+    """JPEG «фотографии» товара: фон, несколько фигур и крупное зерно – сжимается как снимок."""
+    from PIL import Image, ImageDraw
+
+    ratio = rng.choice((0.75, 1.0, 1.25))
+    width, height = (side, int(side * ratio)) if ratio <= 1 else (int(side / ratio), side)
+    image = Image.new("RGB", (width, height), tuple(rng.randrange(150, 256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randrange(3, 9)):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(side // 10, side // 3)
+        shape = draw.ellipse if rng.random() < 0.5 else draw.rectangle
+        shape((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    grain = Image.frombytes("L", (max(1, width // 3), max(1, height // 3)),
+                            rng.randbytes(max(1, width // 3) * max(1, height // 3)))
+    grain = grain.resize((width, height), Image.Resampling.BICUBIC).convert("RGB")
+    image = Image.blend(image, grain, 0.12)
+    buf = io.BytesIO()
+    image.save(buf, format="JPEG", quality=image_cache.JPEG_QUALITY, optimize=True)
+    return buf.getvalue()
+
+
+def _image_pool(rng):
+    """[(байты, миниатюры)] и накопленные веса размеров – изображения на весь каталог."""
+    pool, weights = [], []
+    for side, weight in IMAGE_SIDES:
+        for _ in range(IMAGE_VARIANTS):
+            data = _product_image(rng, side)
+            pool.append((data, image_cache.encode_thumbnails(data)))
+            weights.append(weight)
+    return pool, list(accumulate(weights))
+
+
+# ---------- вставка ----------
+
+def _insert(sql, rows, batch=BATCH):
+    """Вставить rows пачками; каждая пачка – отдельная транзакция."""
+    rows = iter(rows)
+    count = 0
+    while True:
+        chunk = [row for _, row in zip(range(batch), rows)]
+        if not chunk:
+            return count
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.fast_executemany = True
+            cursor.executemany(sql, chunk)
+        count += len(chunk)
+
+
+def _select(sql, *params):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, *params)
+        return cursor.fetchall()
+
+
+def _max_id(table, column):
+    return int(_select(f"SELECT ISNULL(MAX({column}), 0) FROM {table}")[0][0])
+
+
+class _Timer:
+    def __init__(self, progress):
+        self.progress = progress
+        self.timings = {}
+
+    def run(self, name, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+        self.timings[name] = seconds
+        if isinstance(result, int):
+            rows = result
+        elif isinstance(result, dict):  # ключ -> [строки]
+            rows = sum(map(len, result.values()))
+        else:
+            rows = len(result)
+        if self.progress:
+            self.progress(f"{name:<28}{rows:>12}{seconds:>10.1f} с{rows / max(seconds, 1e-9):>12.0f} строк/с")
+        return result
+
+
+# ---------- таблицы ----------
+
+def _users(rng, role, logins, history_start, days):
+    password_hash = hash_password(DATASET_PASSWORD)  # один хеш на всех – пароль общий
+    _insert(
+        """
+        INSERT INTO Пользователь (Логин, Хеш_пароля, Email, Роль, Дата_регистрации, Активен)
+        VALUES (?, ?, ?, ?, ?, 1)
+        """,
+        ((login, password_hash, f"{login}@example.com", role,
+          history_start + timedelta(days=rng.randrange(days)))
+         for login in logins),
+    )
+    return logins
+
+
+def _user_ids(logins, since):
+    """Логин -> ID пользователя для строк, добавленных после since."""
+    wanted = set(logins)
+    rows = _select("SELECT ID_пользователя, Логин FROM Пользователь WHERE ID_пользователя > ?",
+                   (since,))
+    return {login: int(user_id) for user_id, login in rows if login in wanted}
+
+
+def _person(rng):
+    return rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES), rng.choice(MIDDLE_NAMES)
+
+
+def _clients(rng, user_ids):
+    cities = (CITIES, _zipf_weights(len(CITIES), ZIPF_CITIES))
+    since = _max_id("Клиент", "ID_Клиент")
+
+    def rows():
+        for user_id in user_ids:
+            last, first, middle = _person(rng)
+            yield (user_id, last, first, middle,
+                   f"{rng.randrange(10000):04d}", f"{rng.randrange(10 ** 6):06d}",
+                   _pick(rng, cities), rng.choice(STREETS), str(rng.randrange(1, 120)),
+                   str(rng.randrange(1, 300)) if rng.random() < 0.8 else None)
+
+    _insert(
+        """
+        INSERT INTO Клиент (ID_пользователя, Фамилия, Имя, Отчество, Серия_паcпорта,
+                            Номер_паcпорта, Город, Улица, Дом, Квартира)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows(),
+    )
+    by_user = {int(user_id): int(client_id) for client_id, user_id in _select(
+        "SELECT ID_Клиент, ID_пользователя FROM Клиент WHERE ID_Клиент > ?", (since,))}
+    return [by_user[user_id] for user_id in user_ids]
+
+
+def _couriers(rng, user_ids):
+    since = _max_id("Курьер", "ID_курьера")
+    _insert(
+        """
+        INSERT INTO Курьер (ID_пользователя, Фамилия, Имя, Отчество, Номер_телефона)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        ((user_id, *_person(rng), f"+79{rng.randrange(10 ** 9):09d}") for user_id in user_ids),
+    )
+    by_user = {int(user_id): int(courier_id) for courier_id, user_id in _select(
+        "SELECT ID_курьера, ID_пользователя FROM Курьер WHERE ID_курьера > ?", (since,))}
+    return [by_user[user_id] for user_id in user_ids]
+
+
+def _cards(rng, client_ids, today):
+    counts = _cum(CARDS_PER_CLIENT)
+    since = _max_id("Платежные_данные", "ID_данных")
+    _insert(
+        """
+        INSERT INTO Платежные_данные (ID_Клиента, Номер_карты, Срок_действия, CVV_код)
+        VALUES (?, ?, ?, ?)
+        """,
+        ((client_id, f"4{rng.randrange(10 ** 15):015d}",
+          date(today.year + rng.randrange(1, 6), rng.randrange(1, 13), 1),
+          f"{rng.randrange(1000):03d}")
+         for client_id in client_ids for _ in range(_pick(rng, counts))),
+    )
+    cards = {}
+    for card_id, client_id in _select(
+            "SELECT ID_данных, ID_Клиента FROM Платежные_данные WHERE ID_данных > ?", (since,)):
+        cards.setdefault(int(client_id), []).append(int(card_id))
+    return cards
+
+
+def _product_name(rng, article):
+    return (f"{rng.choice(PRODUCT_NOUNS)} {rng.choice(PRODUCT_ADJECTIVES)} "
+            f"{rng.choice(PRODUCT_COLORS)}, арт. {article}")
+
+
+def _products(rng, count, with_images):
+    """Товары пачками вместе с миниатюрами; возвращает номера в порядке вставки."""
+    pool, pool_weights = _image_pool(rng) if with_images else ([], None)
+    since = _max_id("Товар", "Номер_товара")
+    first_article = since + 1  # артикул делает название уникальным – по нему читаем номер
+    product_ids = []
+    for start in range(0, count, IMAGE_BATCH):
+        products = []
+        for article in range(first_article + start, first_article + min(count, start + IMAGE_BATCH)):
+            image = None
+            if pool and rng.random() >= NO_IMAGE_SHARE:
+                image = rng.choices(pool, cum_weights=pool_weights)[0]
+            price = Decimal(max(50, round(math.exp(rng.gauss(math.log(1500), 0.9)), -1))) - Decimal("0.10")
+            products.append((_product_name(rng, f"{article:07d}"), price, rng.randrange(0, 500), image))
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.fast_executemany = True
+            cursor.executemany(
+                "INSERT INTO Товар (Название, Цена, Количество, Изображение) VALUES (?, ?, ?, ?)",
+                [(name, price, quantity, image[0] if image else None)
+                 for name, price, quantity, image in products],
+            )
+            cursor.execute("SELECT Номер_товара, Название FROM Товар WHERE Номер_товара > ?",
+                           (product_ids[-1] if product_ids else since,))
+            ids = {name: int(product_id) for product_id, name in cursor.fetchall()}
+            batch_ids = [ids[name] for name, *_ in products]
+            thumbnails = [(product_id, t.size, t.format, t.digest, t.data)
+                          for product_id, (*_, image) in zip(batch_ids, products) if image
+                          for t in image[1]]
+            if thumbnails:
+                cursor.executemany(
+                    """
+                    INSERT INTO Миниатюра_товара (Номер_товара, Размер, Формат, Хеш, Данные)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    thumbnails,
+                )
+        product_ids.extend(batch_ids)
+    return product_ids
+
+
+def _orders(rng, scale, client_ids, cards, courier_ids, product_ids, today):
+    """Заказы день за днём от старых к новым – номера заказов растут вместе с датой."""
+    days = HISTORY_YEARS * 365
+    per_day = _orders_per_day(scale.orders, days, today)
+    client_weights = _zipf_weights(len(client_ids), ZIPF_CLIENTS)
+    product_weights = _zipf_weights(len(product_ids), ZIPF_PRODUCTS)
+    courier_weights = _zipf_weights(len(courier_ids), ZIPF_COURIERS)
+    quantities = _cum(QUANTITIES)
+    client_cards = [cards[client_id] for client_id in client_ids]
+
+    def rows():
+        for i, count in enumerate(per_day):
+            if not count:
+                continue
+            age = days - 1 - i
+            day = today - timedelta(days=age)
+            statuses = _status_table(age)
+            clients = rng.choices(client_cards, cum_weights=client_weights, k=count)
+            products = rng.choices(product_ids, cum_weights=product_weights, k=count)
+            couriers = rng.choices(courier_ids, cum_weights=courier_weights, k=count)
+            for client, product_id, courier_id in zip(clients, products, couriers):
+                status = _pick(rng, statuses)
+                yield (client[0] if len(client) == 1 else rng.choice(client), product_id,
+                       _pick(rng, quantities), status, day,
+                       courier_id if status in WITH_COURIER else None)
+
+    return _insert(
+        """
+        INSERT INTO Заказ (ID_данные, Номер_товара, Количество_заказанного_товара,
+                           Статус, Дата_заказа, ID_курьера)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        rows(),
+    )
+
+
+def _rebuild_sales_rollups():
+    # заказы вставлены мимо ленты событий – сводки строятся заново по всей истории
+    with db.connection() as conn:
+        conn.cursor().execute("UPDATE Отметка_сводки SET ID_события = ? WHERE Сводка = ?",
+                              (services.ROLLUP_NOT_BUILT, services.SALES_ROLLUP))
+    services.refresh_sales_rollups()
+    return _select("SELECT COUNT(*) FROM Учёт_заказа")[0][0]
+
+
+def generate(scale, seed=1, images=True, progress=print):
+    """
+    Заполнить текущую базу (db.configure) данными масштаба scale.
+    Возвращает Dataset; ValueError – если сгенерированные данные в базе уже есть.
+    """
+    if services.get_user_by_login(f"{LOGIN_PREFIX}c{1:07d}") is not None:
+        raise ValueError("В базе уже есть сгенерированные данные – нужна пустая база")
+    rng = random.Random(seed)
+    today = date.today()
+    days = HISTORY_YEARS * 365
+    history_start = today - timedelta(days=days)
+    timer = _Timer(progress)
+
+    client_logins = [f"{LOGIN_PREFIX}c{i:07d}" for i in range(1, scale.clients + 1)]
+    courier_logins = [f"{LOGIN_PREFIX}k{i:05d}" for i in range(1, scale.couriers + 1)]
+    since = _max_id("Пользователь", "ID_пользователя")
+    timer.run("Пользователь", lambda: _users(rng, "Клиент", client_logins, history_start, days)
+              + _users(rng, "Курьер", courier_logins, history_start, days))
+    user_ids = _user_ids(client_logins + courier_logins, since)
+
+    client_ids = timer.run("Клиент", _clients, rng, [user_ids[login] for login in client_logins])
+    courier_ids = timer.run("Курьер", _couriers, rng, [user_ids[login] for login in courier_logins])
+    cards = timer.run("Платежные_данные", _cards, rng, client_ids, today)
+    product_ids = timer.run("Товар", _products, rng, scale.products, images)
+    # ранги Ципфа не должны совпадать с порядком вставки
+    rng.shuffle(product_ids)
+    ranked = list(range(len(client_ids)))
+    rng.shuffle(ranked)
+    client_ids = [client_ids[i] for i in ranked]
+    client_logins = [client_logins[i] for i in ranked]
+
+    timer.run("Заказ", _orders, rng, scale, client_ids, cards, courier_ids, product_ids, today)
+    timer.run("Поисковый индекс", services.refresh_search_index)
+    timer.run("Сводки продаж", _rebuild_sales_rollups)
+    return Dataset(scale, client_ids, courier_ids, product_ids, cards,
+                   client_logins, courier_logins, timer.timings)
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--scale", default="1k",
+                        help=f"число заказов или {', '.join(SCALE_FACTORS)} (по умолчанию 1k)")
+    parser.add_argument("--clients", type=int, default=None)
+    parser.add_argument("--couriers", type=int, default=None)
+    parser.add_argument("--products", type=int, default=None)
+    parser.add_argument("--no-images", action="store_true", help="товары без изображений")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    if args.backend == "sqlite" and args.db_path is None:
+        parser.error("укажите --db-path: временная база удалится сразу после заполнения")
+
+    overrides = {name: getattr(args, name) for name in ("clients", "couriers", "products")
+                 if getattr(args, name) is not None}
+    scale = scale_for(parse_scale(args.scale), **overrides)
+    print(f"Заказов {scale.orders}, клиентов {scale.clients}, курьеров {scale.couriers}, "
+          f"товаров {scale.products}")
+    start = time.perf_counter()
+    with benchmark_database(args, instrument=False):
+        try:
+            generate(scale, seed=args.seed, images=not args.no_images)
+        except ValueError as e:
+            parser.error(str(e))
+        sizes = _select("SELECT ISNULL(SUM(DATALENGTH(Изображение)), 0) FROM Товар")[0][0]
+    print(f"Готово за {time.perf_counter() - start:.1f} с; изображения товаров – {fmt_bytes(int(sizes))}")
+
+
+if __name__ == "__main__":
+    main()
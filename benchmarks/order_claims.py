@@ -0,0 +1,111 @@
+# benchmarks/order_claims.py
+"""
+Нагрузочная проверка захвата заказов курьерами (services.take_order).
+
+Несколько курьеров одновременно пытаются взять одни и те же свободные
+заказы – как в обеденный час, когда все обновляют список. Проверяется,
+что каждый заказ достался ровно одному курьеру и что победитель по
+ответам take_order совпадает с записью в базе.
+
+    python -m benchmarks.order_claims --orders 200 --couriers 8 --threads 32
+"""
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import services
+from benchmarks.checkout import create_buyer
+from benchmarks.common import RoundTripCounter, base_parser, benchmark_database
+
+
+def create_courier(login):
+    services.register_user(login, b"x", None, "courier", courier={
+        "last_name": "Курьер", "first_name": login, "middle_name": None, "phone": "+70000000000",
+    })
+    return services.get_user_by_login(login).courier_id
+
+
+def create_free_orders(count):
+    payment_id = create_buyer("bench_claims")
+    product_id = services.add_product("Заказываемый товар", 100, count)
+    return [order.id for order in services.create_orders(payment_id, [(product_id, 1)] * count)]
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--couriers", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    counter = RoundTripCounter()
+    with benchmark_database(args, counter=counter):
+        # соединений столько же, сколько потоков, – иначе они ждали бы пул, а не друг друга
+        db.configure(db.get_backend(), max_size=args.threads)
+
+        couriers = [create_courier(f"bench_courier_{i}") for i in range(args.couriers)]
+        orders = create_free_orders(args.orders)
+
+        # каждый курьер пытается взять каждый заказ, попытки перемешаны
+        attempts = [(order_id, courier_id) for order_id in orders for courier_id in couriers]
+        random.Random(1).shuffle(attempts)
+
+        wins = defaultdict(list)
+        outcomes = Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(args.threads)
+
+        def claim(order_id, courier_id):
+            try:
+                services.take_order(order_id, courier_id)
+            except services.ConflictError:
+                result = "отказ"
+            else:
+                result = "взят"
+                with lock:
+                    wins[order_id].append(courier_id)
+            with lock:
+                outcomes[result] += 1
+
+        def worker(chunk):
+            barrier.wait()  # все потоки стартуют одновременно
+            for order_id, courier_id in chunk:
+                claim(order_id, courier_id)
+
+        chunks = [attempts[i::args.threads] for i in range(args.threads)]
+        counter.reset()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            for future in [pool.submit(worker, chunk) for chunk in chunks]:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT ID_заказа, ID_курьера, Статус FROM Заказ "
+                f"WHERE ID_заказа IN ({', '.join('?' * len(orders))})",
+                orders,
+            )
+            stored = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+        print(f"Попыток: {len(attempts)} ({args.couriers} курьеров × {args.orders} заказов, "
+              f"{args.threads} потоков) за {elapsed:.2f} с")
+        print(f"Взято: {outcomes['взят']}, отказов: {outcomes['отказ']}, "
+              f"обращений к БД на попытку: {counter.count / len(attempts):.2f}")
+
+        double = {order_id: w for order_id, w in wins.items() if len(w) > 1}
+        lost = [order_id for order_id in orders if order_id not in wins]
+        mismatch = [order_id for order_id, w in wins.items()
+                    if stored[order_id] != (w[0], "у курьера")]
+        assert not double, f"заказы взяты дважды: {double}"
+        assert not lost, f"заказы никому не достались: {lost}"
+        assert not mismatch, f"победитель не совпадает с базой: {mismatch}"
+        print("Каждый заказ достался ровно одному курьеру")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/order_feed.py
+"""
+Список свободных заказов у многих курьеров: перечитывание выборки
+(как кнопка «Обновить») против опроса ленты изменений
+(services.available_order_changes).
+
+Окна опрашивают ленту параллельно, пока курьеры разбирают заказы; в конце
+проверяется, что у каждого окна список совпал с базой.
+
+    python -m benchmarks.order_feed --orders 20000 --windows 32
+"""
+import threading
+import time
+
+import db
+import services
+from benchmarks.checkout import create_buyer
+from benchmarks.common import RoundTripCounter, base_parser, benchmark_database, summarize, timed
+from benchmarks.order_claims import create_courier
+from virtual_tree import PAGE_SIZE
+
+
+def full_reload():
+    query = services.available_orders_query()
+    return query.count(), query.page(0, PAGE_SIZE)
+
+
+class Board:
+    """Список свободных заказов одного окна: {ID_заказа: строка}."""
+
+    def __init__(self, version, orders):
+        self.version = version
+        self.orders = orders
+        self.polls = 0
+
+    def poll(self):
+        while True:
+            feed = services.available_order_changes(self.version)
+            self.polls += 1
+            self.version = feed.version
+            for (order_id,), row in feed.changes:
+                if row is None:
+                    self.orders.pop(order_id, None)
+                else:
+                    self.orders[order_id] = row
+            if not feed.more:
+                return
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--windows", type=int, default=32)
+    parser.add_argument("--claims", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    counter = RoundTripCounter()
+    with benchmark_database(args, counter=counter):
+        db.configure(db.get_backend(), max_size=args.windows + 1)
+        # события должны «устояться» сразу, иначе проверка в конце ждала бы
+        services.ORDER_FEED_SETTLE_SECONDS = 0
+
+        payment_id = create_buyer("bench_feed")
+        product_id = services.add_product("Товар ленты", 100, args.orders * 2)
+        services.create_orders(payment_id, [(product_id, 1)] * args.orders)
+        courier_id = create_courier("bench_feed_courier")
+
+        reload_times, _ = timed(full_reload, args.repeat)
+        version = services.order_feed_version()
+        empty_times, _ = timed(lambda: services.available_order_changes(version), args.repeat)
+        print(f"Свободных заказов: {args.orders}")
+        print(f"перечитывание: медиана {summarize(reload_times)['median_ms']:.1f} мс")
+        print(f"пустой опрос ленты: медиана {summarize(empty_times)['median_ms']:.2f} мс")
+
+        everything = {row.id: row for row in services.list_available_orders()}
+        boards = [Board(version, dict(everything)) for _ in range(args.windows)]
+
+        stop = threading.Event()
+
+        def watch(board):
+            while not stop.is_set():
+                board.poll()
+
+        threads = [threading.Thread(target=watch, args=(board,)) for board in boards]
+        for thread in threads:
+            thread.start()
+        counter.reset()
+        start = time.perf_counter()
+        for order_id in sorted(everything)[:args.claims]:
+            services.take_order(order_id, courier_id)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for board in boards:
+            board.poll()  # хвост после последнего захвата
+
+        polls = sum(board.polls for board in boards)
+        print(f"{args.claims} захватов за {elapsed:.2f} с при {args.windows} окнах: "
+              f"{polls} опросов, обращений к БД на опрос: {counter.count / polls:.2f}")
+
+        expected = {row.id for row in services.list_available_orders()}
+        stale = [i for i, board in enumerate(boards) if set(board.orders) != expected]
+        assert not stale, f"окна разошлись с базой: {stale}"
+        print("Все окна совпали с базой")
+
+
+if __name__ == "__main__":
+    main()
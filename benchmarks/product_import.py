@@ -0,0 +1,102 @@
+# benchmarks/product_import.py
+"""
+Загрузка каталога поставщика: прежний путь (как AddProductDialog –
+миниатюры и один add_product на товар) против product_import
+(проверка строк, изображения в пуле процессов, пачки в одной транзакции).
+
+Данные синтетические: CSV на --rows товаров, каждый --image-every-й
+ссылается на одно из --images изображений. Прежний путь замеряется на
+первых --baseline-rows строках – целиком он идёт слишком долго.
+
+    python -m benchmarks.product_import --rows 20000 --workers 1 4
+"""
+import csv
+import os
+import random
+import tempfile
+import time
+
+import db
+import image_cache
+import product_import
+import services
+from benchmarks.common import base_parser, benchmark_database, random_png
+
+
+def make_dataset(folder, rows, images, image_every, rng):
+    names = []
+    for i in range(images):
+        name = f"img_{i}.png"
+        with open(os.path.join(folder, name), "wb") as f:
+            f.write(random_png(rng.randint(600, 1200), rng.randint(600, 1200), rng))
+        names.append(name)
+    path = os.path.join(folder, "catalog.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["Название", "Цена", "Количество", "Изображение"])
+        for i in range(rows):
+            image = names[i // image_every % images] if images and i % image_every == 0 else ""
+            writer.writerow([f"Товар поставщика {i}", f"{rng.randint(100, 99999) / 100:.2f}",
+                             rng.randint(0, 500), image])
+    return path
+
+
+def old_import(path, folder, limit):
+    """Как было: товар за товаром через форму добавления."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f, delimiter=";")
+        for i, row in enumerate(reader):
+            if i == limit:
+                return i
+            image = None
+            if row["Изображение"]:
+                with open(os.path.join(folder, row["Изображение"]), "rb") as img:
+                    image = img.read()
+            thumbnails = image_cache.encode_thumbnails(image) if image else None
+            services.add_product(row["Название"], float(row["Цена"]),
+                                 int(row["Количество"]), image, thumbnails)
+    return i + 1
+
+
+def clear_products():
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        for table in ("Триграмма_товара", "Поиск_товара", "Миниатюра_товара",
+                      "Импорт_товаров", "Товар"):
+            cursor.execute(f"DELETE FROM {table}")
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--image-every", type=int, default=10)
+    parser.add_argument("--baseline-rows", type=int, default=2_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args(argv)
+    if args.backend != "sqlite":
+        parser.error("замер удаляет все товары – только на временной базе SQLite")
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory(prefix="shop_import_") as folder, \
+            benchmark_database(args):
+        start = time.perf_counter()
+        path = make_dataset(folder, args.rows, args.images, args.image_every, rng)
+        print(f"Данные: {args.rows} строк, {args.images} изображений "
+              f"({time.perf_counter() - start:.1f} с)")
+
+        start = time.perf_counter()
+        done = old_import(path, folder, args.baseline_rows)
+        elapsed = time.perf_counter() - start
+        print(f"{'по одному':<22}{done:>8} строк {elapsed:>8.1f} с {done / elapsed:>9.0f} строк/с")
+
+        for workers in dict.fromkeys(args.workers):
+            clear_products()
+            result = product_import.import_products(path, folder, workers=workers)
+            label = f"пакетами, {workers} проц."
+            print(f"{label:<22}{result.imported:>8} строк {result.seconds:>8.1f} с "
+                  f"{result.rows_per_second:>9.0f} строк/с")
+
+
+if __name__ == "__main__":
+    main()
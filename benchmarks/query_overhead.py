@@ -0,0 +1,82 @@
+# benchmarks/query_overhead.py
+"""
+Цена замеров query_log: одни и те же запросы с обёрткой соединений и без.
+
+Наборы – самый короткий запрос (SELECT 1 с fetchone, худший случай для
+доли накладных расходов) и смесь запросов окон: страница каталога,
+карточка товара, заказы клиента, страница админ-панели.
+
+    python -m benchmarks.query_overhead --orders 20000 --iterations 300
+"""
+import db
+import query_log
+import services
+from benchmarks.admin_grid import fill_orders
+from benchmarks.checkout import create_buyer
+from benchmarks.common import base_parser, benchmark_database, summarize, timed
+from virtual_tree import PAGE_SIZE
+
+CLIENT_ORDERS = 20
+
+
+def select_one(iterations):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        for _ in range(iterations):
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    return iterations
+
+
+def create_client(orders):
+    """Клиент с несколькими заказами – как у обычного покупателя."""
+    payment_id = create_buyer("bench_overhead")
+    product_id = services.add_product("Товар замера", 100, orders)
+    services.create_orders(payment_id, [(product_id, 1)] * orders)
+    return services.get_user_by_login("bench_overhead").client_id, product_id
+
+
+def window_mix(iterations, product_id, client_id):
+    catalog = services.catalog_query()
+    orders = services.admin_table_query("Заказ")
+    for i in range(iterations):
+        catalog.page(0, PAGE_SIZE)
+        services.get_product(product_id, with_image=False)
+        services.list_client_orders(client_id)
+        orders.page(i % 50 * PAGE_SIZE, PAGE_SIZE)
+    return iterations * 4
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args(argv)
+    if args.backend != "sqlite":
+        parser.error("замер создаёт заказы – только на временной базе SQLite")
+    # журнал медленных запросов в памяти ведётся, файл не нужен
+    query_log.get_log().log_path = ""
+
+    print(f"{'набор':<16}{'без замеров, мс':>17}{'с замерами, мс':>16}{'на запрос, мкс':>16}{'доля':>8}")
+    results = {}
+    for instrument in (False, True):
+        with benchmark_database(args, instrument=instrument):
+            fill_orders(args.orders)
+            client_id, product_id = create_client(CLIENT_ORDERS)
+            for name, func in (
+                ("SELECT 1", lambda: select_one(args.iterations * 10)),
+                ("запросы окон", lambda: window_mix(args.iterations, product_id, client_id)),
+            ):
+                times, statements = timed(func, args.repeat)
+                results[name, instrument] = (summarize(times)["median_ms"], statements)
+
+    for name in ("SELECT 1", "запросы окон"):
+        plain, statements = results[name, False]
+        measured, _ = results[name, True]
+        per_statement = (measured - plain) * 1000 / statements
+        print(f"{name:<16}{plain:>17.1f}{measured:>16.1f}{per_statement:>16.1f}"
+              f"{(measured - plain) / plain:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/sales_dashboard.py
+"""
+Отчёт о продажах: агрегаты прямо по заказам (Заказ ⋈ Товар, GROUP BY при
+каждом открытии) против чтения дневных сводок (services.sales_dashboard).
+
+Для каждого объёма замеряются первое построение сводок, открытие отчёта
+за 30 и 365 дней обоими способами и догон сводок после изменения части
+заказов.
+
+    python -m benchmarks.sales_dashboard --orders 10000 100000
+"""
+import random
+import time
+from datetime import date, timedelta
+
+import db
+import services
+from benchmarks.checkout import create_buyer
+from benchmarks.common import base_parser, benchmark_database, summarize, timed
+
+PRODUCTS = 200
+PERIODS = (30, 365)
+CHANGED_SHARE = 0.01  # доля заказов, меняющих статус между открытиями отчёта
+
+
+def fill_orders(count, batch=5000):
+    payment_id = create_buyer("bench_sales")
+    rnd = random.Random(count)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        cursor.executemany("INSERT INTO Товар (Название, Цена, Количество) VALUES (?, ?, ?)",
+                           [(f"Товар отчёта {i}", 50 + i % 100, 1000) for i in range(PRODUCTS)])
+        cursor.execute("SELECT Номер_товара FROM Товар")
+        products = [row[0] for row in cursor.fetchall()]
+        today = date.today()
+        for start in range(0, count, batch):
+            cursor.executemany(
+                "INSERT INTO Заказ (ID_данные, Номер_товара, Количество_заказанного_товара, "
+                "Статус, Дата_заказа) VALUES (?, ?, ?, ?, ?)",
+                [(payment_id, rnd.choice(products), rnd.randint(1, 5),
+                  rnd.choice(services.ORDER_STATUSES), today - timedelta(days=rnd.randrange(365)))
+                 for _ in range(min(batch, count - start))],
+            )
+
+
+def live_dashboard(days):
+    """Как без сводок: те же разрезы агрегатами по всем заказам периода."""
+    date_from = date.today() - timedelta(days=days - 1)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT CAST(Z.Дата_заказа AS DATE), COUNT(*), SUM(Z.Количество_заказанного_товара),
+                   SUM(Z.Количество_заказанного_товара * T.Цена)
+            FROM Заказ Z JOIN Товар T ON T.Номер_товара = Z.Номер_товара
+            WHERE Z.Дата_заказа >= ? AND Z.Статус <> ?
+            GROUP BY CAST(Z.Дата_заказа AS DATE)
+            """,
+            (date_from, services.CANCELLED_STATUS),
+        )
+        cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT Z.Статус, COUNT(*), SUM(Z.Количество_заказанного_товара),
+                   SUM(Z.Количество_заказанного_товара * T.Цена)
+            FROM Заказ Z JOIN Товар T ON T.Номер_товара = Z.Номер_товара
+            WHERE Z.Дата_заказа >= ?
+            GROUP BY Z.Статус
+            """,
+            (date_from,),
+        )
+        cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT T.Номер_товара, T.Название, COUNT(*), SUM(Z.Количество_заказанного_товара),
+                   SUM(Z.Количество_заказанного_товара * T.Цена)
+            FROM Заказ Z JOIN Товар T ON T.Номер_товара = Z.Номер_товара
+            WHERE Z.Дата_заказа >= ? AND Z.Статус <> ?
+            GROUP BY T.Номер_товара, T.Название
+            ORDER BY 5 DESC
+            OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+            """,
+            (date_from, services.CANCELLED_STATUS, services.SALES_TOP_PRODUCTS),
+        )
+        cursor.fetchall()
+
+
+def change_orders(share):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT ID_заказа FROM Заказ")
+        orders = [row[0] for row in cursor.fetchall()]
+    changed = random.Random(len(orders)).sample(orders, max(1, int(len(orders) * share)))
+    services.bulk_apply("Заказ", "status", "доставлен", ids=changed)
+    return len(changed)
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--orders", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args(argv)
+    if args.backend != "sqlite":
+        parser.error("замер создаёт и меняет заказы – только на временной базе SQLite")
+
+    # события ленты учитываются сразу, без ожидания «успокоения»
+    services.ORDER_FEED_SETTLE_SECONDS = 0
+
+    for orders in args.orders:
+        with benchmark_database(args):
+            fill_orders(orders)
+            start = time.perf_counter()
+            services.refresh_sales_rollups()
+            built = (time.perf_counter() - start) * 1000
+            print(f"Заказов: {orders}, первое построение сводок {built:.0f} мс")
+
+            for days in PERIODS:
+                live, _ = timed(lambda: live_dashboard(days), args.repeat)
+                rollup, _ = timed(lambda: services.sales_dashboard(days, refresh=False), args.repeat)
+                print(f"  отчёт за {days:>3} дн.: по заказам {summarize(live)['median_ms']:>8.1f} мс, "
+                      f"по сводкам {summarize(rollup)['median_ms']:>7.1f} мс")
+
+            changed = change_orders(CHANGED_SHARE)
+            time.sleep(1)  # события должны стать старше текущей секунды
+            start = time.perf_counter()
+            recounted = services.refresh_sales_rollups()
+            refresh = (time.perf_counter() - start) * 1000
+            print(f"  догон после изменения {changed} заказов: {recounted} переучтено за {refresh:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/startup.py
+"""
+Холодный запуск: что импортируется до появления окна входа.
+
+Каждый набор модулей импортируется в отдельном процессе с -X importtime;
+печатаются медиана общего времени импорта и самые тяжёлые модули.
+«было» – прежний main.py (все окна ролей и Pillow сразу), «окно входа» –
+нынешний main.py, остальные наборы – то, что догружается после входа
+(или заранее в фоне, пока вводится пароль).
+
+Отдельно замеряется первое соединение с БД вместе с create_default_admin –
+раньше оно шло до создания окна, теперь выполняется в фоне.
+
+    python -m benchmarks.startup --repeat 5
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import services
+from benchmarks.common import base_parser, benchmark_database
+from security import hash_password
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SETS = [
+    ("было: все модули сразу",
+     ["customtkinter", "services", "security", "ui_admin", "ui_client", "ui_courier",
+      "ui_login", "theme", "workers"]),
+    ("окно входа", ["main"]),
+    ("+ клиент", ["main", "ui_client"]),
+    ("+ курьер", ["main", "ui_courier"]),
+    ("+ администратор", ["main", "ui_admin"]),
+    ("Pillow", ["PIL.Image", "PIL.ImageTk"]),
+]
+TOP_MODULES = 8
+
+
+def import_profile(modules):
+    """(общее время импорта, мкс; {модуль верхнего уровня: мкс}) в новом процессе."""
+    code = "; ".join(f"import {name}" for name in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        # модули верхнего уровня записаны без отступа
+        if not name.startswith("  "):
+            cumulative[name.strip()] = int(cum)
+    return sum(cumulative.values()), cumulative
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    args = parser.parse_args(argv)
+
+    print(f"{'набор':<26}{'импорт, мс':>12}  самые тяжёлые модули")
+    for title, modules in STARTUP_SETS:
+        try:
+            profiles = [import_profile(modules) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{title:<26}{'–':>12}  не импортируется: {e}")
+            continue
+        total = statistics.median(total for total, _ in profiles) / 1000
+        heaviest = sorted(profiles[-1][1].items(), key=lambda item: -item[1])[:TOP_MODULES]
+        print(f"{title:<26}{total:>12.1f}  "
+              + ", ".join(f"{name} {us / 1000:.0f}" for name, us in heaviest))
+
+    with benchmark_database(args):
+        start = time.perf_counter()
+        services.create_default_admin(hash_password("admin123"))
+        print(f"первое соединение и create_default_admin: "
+              f"{(time.perf_counter() - start) * 1000:.1f} мс (теперь в фоне)")
+
+
+if __name__ == "__main__":
+    main()
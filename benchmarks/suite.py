@@ -0,0 +1,276 @@
+# benchmarks/suite.py
+"""
+Сквозной замер горячих путей приложения без окон: те же вызовы services,
+что окна выполняют в рабочих потоках, на синтетической базе
+(benchmarks.dataset) нескольких масштабов во временном файле SQLite.
+
+Операции: вход (get_user_by_login + verify_password), открытие каталога,
+выбор товара с миниатюрой (кэш изображений пуст – как при первом щелчке),
+добавление в корзину, оформление заказа, списки курьера (свободные и свои
+заказы), взятие заказа, смена статуса и все таблицы админ-панели
+(AdminApp.load_*). Списки открываются как в VirtualTree: подсчёт строк
+и первое окно.
+
+По каждой операции – задержка p50/p95/p99, обращения к серверу на одну
+операцию (execute, executemany, commit, rollback) и объём полученных строк
+(query_log). Входные данные выбираются случайно и равномерно по всей базе,
+готовятся вне замера; первые --warmup повторов не учитываются.
+
+Результаты пишутся в JSON (--output); --baseline печатает сравнение
+с файлом прежнего прогона.
+
+    python -m benchmarks.suite --scales 1k 100k --iterations 50
+    python -m benchmarks.suite --scales 100k --baseline bench_suite.json
+"""
+import json
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import time
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional
+
+import db
+import image_cache
+import query_log
+import services
+from benchmarks.common import (
+    RoundTripCounter, base_parser, benchmark_database, fmt_bytes, percentiles,
+)
+from benchmarks.dataset import DATASET_PASSWORD, generate, parse_scale, scale_for
+from security import verify_password
+from virtual_tree import PAGE_SIZE, PREFETCH_PAGES
+
+VISIBLE_ROWS = 25  # строк в видимой части списка
+THUMBNAIL_SIZE = (280, 280)  # как карточка товара в окне клиента
+DEFAULT_OUTPUT = "bench_suite.json"
+
+# метод AdminApp -> таблица
+ADMIN_LOADS = (
+    ("load_users", "Пользователь"),
+    ("load_clients", "Клиент"),
+    ("load_couriers", "Курьер"),
+    ("load_products", "Товар"),
+    ("load_orders", "Заказ"),
+    ("load_payments", "Платежные_данные"),
+)
+
+
+class Operation(NamedTuple):
+    name: str
+    run: Callable                     # run(*args) – одна операция, она и замеряется
+    inputs: Callable = None           # inputs(count) -> [args, ...]; готовятся до замера
+    before: Optional[Callable] = None  # перед каждым повтором, вне замера
+
+
+def _window(query):
+    """Открытие списка, как в VirtualTree: число строк и первое окно."""
+    return query.count(), query.page(0, VISIBLE_ROWS + PAGE_SIZE * PREFETCH_PAGES)
+
+
+def _execute(sql, params):
+    with db.connection() as conn:
+        conn.cursor().execute(sql, params)
+
+
+# ---------- операции ----------
+
+def _login(login):
+    user = services.get_user_by_login(login)
+    if user is None or not verify_password(DATASET_PASSWORD, user.password_hash):
+        raise AssertionError(f"Не удалось войти как {login}")
+
+
+def _select_product(product_id):
+    """Как _fetch_product_card окна клиента."""
+    product = services.get_product(product_id, with_image=False)
+    image = image_cache.load_thumbnail(product_id, THUMBNAIL_SIZE)
+    return product, image
+
+
+def _add_to_cart(product_id):
+    product = services.get_product(product_id, with_image=False)
+    if product is None or product.quantity < 1:
+        raise AssertionError(f"Товара {product_id} нет в наличии")
+
+
+def operations(dataset, rng):
+    """Операции в порядке выполнения: взятие заказа – после оформления, смена статуса – после взятия."""
+    claimed = []  # (заказ, курьер) – взятые в замере, их статус меняется следующей операцией
+
+    def clients(count):
+        return [rng.choice(dataset.client_ids) for _ in range(count)]
+
+    def products(count):
+        return [(rng.choice(dataset.product_ids),) for _ in range(count)]
+
+    def carts(count):
+        result = []
+        for client_id in clients(count):
+            cart = [(product_id, rng.randint(1, 2))
+                    for product_id in rng.sample(dataset.product_ids, rng.randint(1, 3))]
+            result.append((dataset.card_ids[client_id][0], cart))
+        # остаток не должен кончиться посреди замера
+        ids = sorted({product_id for _, cart in result for product_id, _ in cart})
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            _execute(f"UPDATE Товар SET Количество = Количество + 1000 "
+                     f"WHERE Номер_товара IN ({', '.join('?' for _ in chunk)})", chunk)
+        return result
+
+    def available(count):
+        orders = [key[0] for key, _ in services.available_orders_query().page(0, count)]
+        if len(orders) < count:
+            raise AssertionError(f"Свободных заказов {len(orders)}, нужно {count}")
+        return [(order_id, rng.choice(dataset.courier_ids)) for order_id in orders]
+
+    def take(order_id, courier_id):
+        services.take_order(order_id, courier_id)
+        claimed.append((order_id, courier_id))
+
+    def statuses(count):
+        if len(claimed) < count:
+            raise AssertionError(f"Взятых заказов {len(claimed)}, нужно {count}")
+        return [(order_id, courier_id, "доставлен") for order_id, courier_id in claimed[:count]]
+
+    ops = [
+        Operation("login", _login, lambda n: [(rng.choice(dataset.client_logins),) for _ in range(n)]),
+        Operation("catalog", lambda: _window(services.catalog_query())),
+        Operation("product_select", _select_product, products,
+                  before=lambda: image_cache.get_cache().clear()),
+        Operation("add_to_cart", _add_to_cart, products),
+        Operation("checkout", services.create_orders, carts),
+        Operation("courier_available", lambda: _window(services.available_orders_query())),
+        Operation("courier_my_orders", lambda courier_id: _window(services.courier_orders_query(courier_id)),
+                  lambda n: [(rng.choice(dataset.courier_ids),) for _ in range(n)]),
+        Operation("claim", take, available),
+        Operation("status_change", services.change_courier_order_status, statuses),
+    ]
+    ops.extend(
+        Operation(f"admin.{method}", lambda table=table: _window(services.admin_table_query(table)))
+        for method, table in ADMIN_LOADS
+    )
+    return ops
+
+
+# ---------- замер ----------
+
+def measure(op, iterations, warmup, counter):
+    inputs = op.inputs(iterations + warmup) if op.inputs else [()] * (iterations + warmup)
+    log = query_log.get_log()
+    times, round_trips, statements, sizes = [], [], [], []
+    for i, args in enumerate(inputs):
+        if op.before is not None:
+            op.before()
+        counter.reset()
+        log.reset()
+        start = time.perf_counter()
+        op.run(*args)
+        elapsed = time.perf_counter() - start
+        if i < warmup:
+            continue
+        stats = log.snapshot()
+        times.append(elapsed)
+        round_trips.append(counter.count)
+        statements.append(sum(s.count for s in stats))
+        sizes.append(sum(s.bytes for s in stats))
+    return {
+        "samples": len(times),
+        **percentiles(times),
+        "mean_ms": statistics.fmean(times) * 1000,
+        "max_ms": max(times) * 1000,
+        "round_trips": statistics.fmean(round_trips),
+        "statements": statistics.fmean(statements),
+        "bytes": statistics.fmean(sizes),
+    }
+
+
+def run_scale(args, label, rng_seed):
+    counter = RoundTripCounter()
+    scale = scale_for(parse_scale(label))
+    with benchmark_database(args, counter=counter, instrument=True):
+        start = time.perf_counter()
+        dataset = generate(scale, seed=args.seed, images=not args.no_images, progress=None)
+        generated = time.perf_counter() - start
+        print(f"\nМасштаб {label}: заказов {scale.orders}, клиентов {scale.clients}, "
+              f"товаров {scale.products} – база за {generated:.1f} с")
+
+        results = {}
+        for op in operations(dataset, random.Random(rng_seed)):
+            if args.only and op.name not in args.only:
+                continue
+            results[op.name] = measure(op, args.iterations, args.warmup, counter)
+    return {"scale": label, **scale._asdict(), "generate_s": generated, "operations": results}
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_scale(result, baseline):
+    old = baseline.get(result["scale"], {})
+    header = f"{'операция':<26}{'p50, мс':>9}{'p95, мс':>9}{'p99, мс':>9}{'обращений':>11}{'объём':>11}"
+    if old:
+        header += f"{'p50 было':>10}{'изм.':>8}"
+    print(header)
+    for name, r in result["operations"].items():
+        line = (f"{name:<26}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                f"{r['round_trips']:>11.1f}{fmt_bytes(round(r['bytes'])):>11}")
+        before = old.get(name)
+        if before:
+            line += f"{before['p50_ms']:>10.2f}{r['p50_ms'] / before['p50_ms'] - 1:>+8.0%}"
+        print(line)
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    parser.add_argument("--scales", nargs="+", default=["1k", "100k"],
+                        help="масштабы базы (число заказов или 1k, 100k, 1m, ...)")
+    parser.add_argument("--iterations", type=int, default=50, help="повторов каждой операции")
+    parser.add_argument("--warmup", type=int, default=3, help="неучитываемых повторов")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-images", action="store_true", help="товары без изображений")
+    parser.add_argument("--only", nargs="+", default=None, help="только эти операции")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="файл результатов JSON")
+    parser.add_argument("--baseline", default=None, help="JSON прежнего прогона для сравнения")
+    args = parser.parse_args(argv)
+    if args.backend != "sqlite" or args.db_path is not None:
+        parser.error("база каждого масштаба создаётся заново – только временный файл SQLite")
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {s["scale"]: s["operations"] for s in json.load(f)["scales"]}
+
+    # запросы меряются и так; медленные не нужны в файле журнала
+    query_log.get_log().log_path = ""
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "seed": args.seed,
+        "images": not args.no_images,
+        "scales": [],
+    }
+    for label in args.scales:
+        result = run_scale(args, label, args.seed)
+        report["scales"].append(result)
+        print_scale(result, baseline)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
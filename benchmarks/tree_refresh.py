@@ -0,0 +1,116 @@
+# benchmarks/tree_refresh.py
+"""
+Обновление таблицы Treeview: «удалить всё – вставить всё» против
+tree_diff.KeyedTree (изменения по первичному ключу).
+
+Для каждого размера списка и сценария (ничего не изменилось, изменилась
+часть строк, часть удалена и добавлена, порядок перевёрнут) считаются
+обращения к Treeview и время вместе с перерисовкой (update_idletasks).
+Нужен дисплей: таблица создаётся в скрытом окне Tk.
+
+    python -m benchmarks.tree_refresh --rows 1000 10000 50000
+"""
+import argparse
+import time
+import tkinter as tk
+from tkinter import ttk
+
+from tree_diff import KeyedTree, row_iid
+
+COLUMNS = ("id", "date", "status", "product", "quantity", "total")
+CHANGED_SHARE = 0.01
+
+
+class _CountingTree:
+    """Обёртка Treeview, считающая вызовы, которые меняют или читают строки."""
+
+    COUNTED = ("insert", "delete", "item", "move", "set_children", "get_children")
+
+    def __init__(self, tree):
+        self._tree = tree
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._tree, name)
+        if name not in self.COUNTED:
+            return attr
+
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+def make_rows(count):
+    return [(i, "2025-01-01", "создан" if i % 7 else "доставлен",
+             f"Товар {i}", i % 5 + 1, f"{i * 1.5:.2f} ₽") for i in range(1, count + 1)]
+
+
+def scenarios(count):
+    """(название, исходные строки, новые строки)."""
+    base = make_rows(count)
+    step = max(1, int(1 / CHANGED_SHARE))
+
+    changed = list(base)
+    for i in range(0, count, step):
+        changed[i] = changed[i][:2] + ("в обработке",) + changed[i][3:]
+
+    replaced = [row for i, row in enumerate(base) if i % step]
+    replaced += make_rows(count + count // step)[count:]
+
+    return [
+        ("без изменений", base, base),
+        ("1% изменено", base, changed),
+        ("1% удалено и добавлено", base, replaced),
+        ("порядок обратный", base, base[::-1]),
+    ]
+
+
+def old_refresh(tree, rows):
+    """Как было: очистить таблицу и вставить всё заново."""
+    tree.delete(*tree.get_children())
+    for row in rows:
+        tree.insert("", "end", values=row)
+
+
+def keyed_refresh(rows_view, rows):
+    rows_view.update((row_iid(row[0]), row) for row in rows)
+
+
+def measure(root, tree, refresh, initial, updated):
+    tree.delete(*tree._tree.get_children())
+    refresh(initial)
+    root.update_idletasks()
+    tree.calls = 0
+    start = time.perf_counter()
+    refresh(updated)
+    root.update_idletasks()
+    return tree.calls, (time.perf_counter() - start) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10_000, 50_000])
+    args = parser.parse_args(argv)
+
+    root = tk.Tk()
+    root.withdraw()
+    tree = _CountingTree(ttk.Treeview(root, columns=COLUMNS, show="headings"))
+    tree.pack()
+
+    print(f"{'строк':>7}  {'сценарий':<24}{'было вызовов':>13}{'стало':>8}"
+          f"{'было, мс':>10}{'стало, мс':>11}")
+    for count in args.rows:
+        for name, initial, updated in scenarios(count):
+            old_calls, old_ms = measure(
+                root, tree, lambda rows: old_refresh(tree, rows), initial, updated)
+            rows_view = KeyedTree(tree)
+            new_calls, new_ms = measure(
+                root, tree, lambda rows: keyed_refresh(rows_view, rows), initial, updated)
+            print(f"{count:>7}  {name:<24}{old_calls:>13}{new_calls:>8}"
+                  f"{old_ms:>10.1f}{new_ms:>11.1f}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
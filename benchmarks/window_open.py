@@ -0,0 +1,125 @@
+# benchmarks/window_open.py
+"""
+Время до готовности окон ролей: от вызова конструктора до момента, когда
+окно нарисовано и первые запросы выполнены (очередь TaskRunner пуста).
+
+Для ClientApp дополнительно сравниваются прежнее построение всех разделов
+сразу (ensure_built каждого, как делал конструктор) и построение по
+требованию, а также первое открытие «Моих заказов» без заготовки и после
+построения в простое (ViewManager.prebuild).
+
+Нужен графический дисплей: окна создаются по-настоящему.
+
+    python -m benchmarks.window_open --repeat 5
+"""
+import time
+import tkinter as tk
+
+import customtkinter as ctk
+
+import services
+import ui_admin
+import ui_client
+import ui_courier
+from benchmarks.checkout import create_buyer
+from benchmarks.common import base_parser, benchmark_database, summarize
+from benchmarks.order_claims import create_courier
+
+READY_TIMEOUT = 30  # секунд на загрузку первых данных
+
+
+def stop_prebuild(app):
+    """Заготовка в простое не должна попадать в замер."""
+    views = getattr(app, "views", None)
+    if views is not None:
+        views.cancel_prebuild()
+
+
+def wait_ready(root, app):
+    """Прокручивать главный цикл, пока у окна есть невыполненные запросы."""
+    deadline = time.perf_counter() + READY_TIMEOUT
+    root.update()
+    while app.tasks.is_busy():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("окно не загрузило данные")
+        root.update()
+        time.sleep(0.001)
+
+
+def open_window(root, factory, build_all=False):
+    """(мс до возврата конструктора, мс до готовности)."""
+    start = time.perf_counter()
+    app = factory()
+    stop_prebuild(app)
+    if build_all:
+        for name in ("catalog", "orders", "payment", "profile"):
+            app.views.ensure_built(name)
+    created = time.perf_counter()
+    wait_ready(root, app)
+    ready = time.perf_counter()
+    app.destroy()
+    root.update()
+    return (created - start) * 1000, (ready - start) * 1000
+
+
+def first_orders_switch(root, factory, prebuilt):
+    app = factory()
+    stop_prebuild(app)
+    wait_ready(root, app)
+    if prebuilt:
+        app.views.ensure_built("orders")  # то, что prebuild делает в простое
+        root.update()
+    start = time.perf_counter()
+    app.show_orders()
+    wait_ready(root, app)
+    elapsed = (time.perf_counter() - start) * 1000
+    app.destroy()
+    root.update()
+    return elapsed
+
+
+def median(samples):
+    return summarize([ms / 1000 for ms in samples])["median_ms"]
+
+
+def main(argv=None):
+    parser = base_parser(__doc__)
+    args = parser.parse_args(argv)
+    try:
+        root = ctk.CTk()
+    except tk.TclError as e:
+        parser.error(f"нужен графический дисплей: {e}")
+    root.withdraw()
+
+    with benchmark_database(args):
+        create_buyer("bench_window_client")
+        client = services.get_user_by_login("bench_window_client")
+        courier_id = create_courier("bench_window_courier")
+        courier = services.get_user_by_login("bench_window_courier")
+        services.create_default_admin(b"x")
+        admin = services.get_user_by_login("admin")
+
+        def open_client():
+            return ui_client.ClientApp(root, client.user_id, client.client_id)
+
+        windows = [
+            ("ClientApp, все разделы", open_client, True),
+            ("ClientApp", open_client, False),
+            ("CourierApp", lambda: ui_courier.CourierApp(root, courier.user_id, courier_id), False),
+            ("AdminApp", lambda: ui_admin.AdminApp(root, admin.user_id), False),
+        ]
+        print(f"{'окно':<26}{'конструктор, мс':>17}{'готово, мс':>12}")
+        for title, factory, build_all in windows:
+            samples = [open_window(root, factory, build_all) for _ in range(args.repeat)]
+            print(f"{title:<26}{median([s[0] for s in samples]):>17.1f}"
+                  f"{median([s[1] for s in samples]):>12.1f}")
+
+        for title, prebuilt in (("без заготовки", False), ("после prebuild", True)):
+            samples = [first_orders_switch(root, open_client, prebuilt) for _ in range(args.repeat)]
+            print(f"первое открытие «Мои заказы» {title}: {median(samples):.1f} мс")
+
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
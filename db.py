@@ -1,5 +1,9 @@
 # db.py
-import pyodbc
+import abc
+import os
+import threading
+import time
+from contextlib import contextmanager
 
 CONN_STR = (
     "DRIVER={ODBC Driver 17 for SQL Server};"
@@ -10,40 +14,346 @@ CONN_STR = (
     "TrustServerCertificate=yes;"
 )
 
+# Выбор бэкенда: SHOP_DB_BACKEND=mssql (по умолчанию) или sqlite.
+# Для sqlite путь к файлу базы берётся из SHOP_DB_PATH (":memory:" – база в памяти).
+DEFAULT_BACKEND = "mssql"
+DEFAULT_SQLITE_PATH = "shop.sqlite3"
 
-def get_connection():
-    return pyodbc.connect(CONN_STR)
+# Параметры пула соединений
+POOL_MAX_SIZE = 8          # максимум открытых соединений
+POOL_TIMEOUT = 10.0        # сколько ждать свободное соединение, сек
+POOL_IDLE_TIMEOUT = 300.0  # простаивающие дольше соединения закрываются, сек
+POOL_PING_AFTER = 30.0     # проверять соединение при выдаче, если оно простаивало дольше, сек
+
+
+class PoolError(Exception):
+    """Ошибка пула соединений."""
+
+
+class PoolTimeout(PoolError):
+    """Не удалось получить соединение из пула за отведённое время."""
 
 
-def get_user_by_login(login: str):
+class ConnectionPool:
     """
-    Возвращает:
-    ID_пользователя, Логин, Хеш_пароля, Роль,
-    ID_Клиент (или None), ID_курьера (или None)
+    Ограниченный потокобезопасный пул соединений.
+
+    connect   – фабрика «сырых» соединений (pyodbc.connect, sqlite3.connect, ...)
+    ping      – проверка живости соединения; по умолчанию выполняет SELECT 1
+    max_size  – максимальное число одновременно открытых соединений
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
+
+    def __init__(self, connect, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 idle_timeout=POOL_IDLE_TIMEOUT, ping_after=POOL_PING_AFTER, ping=None):
+        if max_size < 1:
+            raise ValueError("max_size должен быть не меньше 1")
+        self._connect = connect
+        self._ping = ping or _default_ping
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+
+        self._lock = threading.Condition()
+        self._idle = []   # список (raw_conn, время_возврата), последний – самый «свежий»
+        self._size = 0    # всего открытых соединений (выданные + простаивающие)
+        self._closed = False
+
+    # ---------- выдача / возврат ----------
+
+    def acquire(self):
+        """Выдать соединение-обёртку; close() у неё возвращает соединение в пул."""
+        return PooledConnection(self, self._checkout())
+
+    def _checkout(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            raw = None
+            with self._lock:
+                while True:
+                    if self._closed:
+                        raise PoolError("Пул соединений закрыт")
+
+                    self._evict_idle_locked()
+
+                    if self._idle:
+                        raw, returned_at = self._idle.pop()
+                        break
+
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f"Нет свободных соединений (занято {self._size} из {self.max_size})"
+                        )
+                    self._lock.wait(remaining)
+
+            # Проверка и открытие соединения – вне блокировки, это сетевые операции
+            if raw is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+
+            if time.monotonic() - returned_at < self.ping_after or self._is_alive(raw):
+                return raw
+
+            # соединение «умерло» – выбрасываем и пробуем ещё раз
+            with self._lock:
+                self._discard_locked(raw)
+                self._lock.notify()
+
+    def _release(self, raw, broken=False):
+        with self._lock:
+            if broken or self._closed:
+                self._discard_locked(raw)
+            else:
+                self._idle.append((raw, time.monotonic()))
+            self._lock.notify()
+
+    # ---------- обслуживание ----------
+
+    def _is_alive(self, raw):
+        try:
+            self._ping(raw)
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle_locked(self):
+        if not self._idle or self.idle_timeout is None:
+            return
+        border = time.monotonic() - self.idle_timeout
+        # _idle упорядочен по времени возврата: старые соединения в начале списка
+        while self._idle and self._idle[0][1] < border:
+            raw, _ = self._idle.pop(0)
+            self._discard_locked(raw)
+
+    def _discard_locked(self, raw):
+        self._size -= 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Закрыть все простаивающие соединения; выданные закроются при возврате."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                raw, _ = self._idle.pop()
+                self._discard_locked(raw)
+            self._lock.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return {"size": self._size, "idle": len(self._idle), "max_size": self.max_size}
+
+    @contextmanager
+    def connection(self):
+        """
+        with pool.connection() as conn: ...
+        Коммит при успешном выходе, откат при исключении, затем возврат в пул.
         """
-        SELECT U.ID_пользователя,
-               U.Логин,
-               U.Хеш_пароля,
-               U.Роль,
-               C.ID_Клиент,
-               K.ID_курьера
-        FROM Пользователь AS U
-        LEFT JOIN Клиент AS C
-               ON C.ID_пользователя = U.ID_пользователя
-        LEFT JOIN Курьер AS K
-               ON K.ID_пользователя = U.ID_пользователя
-        WHERE U.Логин = ?
-        """,
-        (login,),
-    )
-    row = cursor.fetchone()
-    conn.close()
-    return row
-
-
-def create_default_admin():
-    return
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+class PooledConnection:
+    """
+    Обёртка над «сырым» соединением из пула.
+    Повторяет его интерфейс (cursor, commit, rollback, ...), а close()
+    не закрывает соединение, а возвращает его в пул.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._dirty = False  # был ли cursor() после последнего commit/rollback
+
+    def cursor(self):
+        if self._raw is None:
+            raise PoolError("Соединение уже возвращено в пул")
+        self._dirty = True
+        return self._raw.cursor()
+
+    def commit(self):
+        self._raw.commit()
+        self._dirty = False
+
+    def rollback(self):
+        self._raw.rollback()
+        self._dirty = False
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is None:
+            return
+        broken = False
+        if self._dirty:
+            # незавершённая транзакция не должна достаться следующему владельцу
+            try:
+                raw.rollback()
+            except Exception:
+                broken = True
+        self._pool._release(raw, broken=broken)
+
+    def __getattr__(self, name):
+        raw = self.__dict__.get("_raw")
+        if raw is None:
+            raise AttributeError(name)
+        return getattr(raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Забытое соединение (например, при исключении до close) всё равно вернётся в пул
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _default_ping(raw):
+    cursor = raw.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+# ---------- БЭКЕНДЫ ----------
+
+class Backend(abc.ABC):
+    """
+    Бэкенд базы данных: умеет открывать «сырые» соединения с интерфейсом DB-API
+    (cursor / commit / rollback / close) и проверять их живость.
+    """
+
+    name = ""
+
+    @abc.abstractmethod
+    def connect(self):
+        """Открыть новое «сырое» соединение."""
+
+    def ping(self, raw):
+        _default_ping(raw)
+
+    def close(self):
+        pass
+
+
+class MSSQLBackend(Backend):
+    """SQL Server через pyodbc (рабочая конфигурация магазина)."""
+
+    name = "mssql"
+
+    def __init__(self, conn_str=CONN_STR):
+        self.conn_str = conn_str
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def connect(self):
+        # pyodbc нужен только этому бэкенду – без него можно работать на SQLite
+        import pyodbc
+        raw = pyodbc.connect(self.conn_str)
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    from schema import apply_mssql_migrations
+                    apply_mssql_migrations(raw)
+                    self._schema_ready = True
+        return raw
+
+
+def create_backend(name=None, **options):
+    """
+    Создать бэкенд по имени ("mssql" / "sqlite").
+    Без имени – берётся из переменной окружения SHOP_DB_BACKEND.
+    """
+    name = (name or os.environ.get("SHOP_DB_BACKEND") or DEFAULT_BACKEND).lower()
+    if name == "mssql":
+        return MSSQLBackend(options.get("conn_str", CONN_STR))
+    if name == "sqlite":
+        from db_sqlite import SQLiteBackend
+        path = options.get("path") or os.environ.get("SHOP_DB_PATH") or DEFAULT_SQLITE_PATH
+        return SQLiteBackend(path)
+    raise ValueError(f"Неизвестный бэкенд БД: {name}")
+
+
+_backend = None
+_pool = None
+_pool_lock = threading.Lock()
+_default_lock = threading.Lock()  # бэкенд по умолчанию создаётся один раз, даже из нескольких потоков
+
+
+def configure(backend=None, instrument=None, **pool_options):
+    """
+    Переключить приложение на другой бэкенд (экземпляр Backend или имя).
+    Старый пул закрывается, новый создаётся с pool_options.
+    instrument – замерять запросы (query_log); None – как задано в
+    SHOP_QUERY_LOG (по умолчанию включено).
+    """
+    global _backend, _pool
+    if backend is None or isinstance(backend, str):
+        backend = create_backend(backend)
+    import query_log
+    if instrument is None:
+        instrument = query_log.ENABLED
+    connect, ping = query_log.instrument(backend) if instrument else (backend.connect, backend.ping)
+    with _pool_lock:
+        old_pool, old_backend = _pool, _backend
+        _backend = backend
+        _pool = ConnectionPool(connect, ping=ping, **pool_options)
+    if old_pool is not None:
+        old_pool.close()
+    if old_backend is not None and old_backend is not backend:
+        old_backend.close()
+    return backend
+
+
+def get_backend():
+    if _backend is None:
+        with _default_lock:
+            if _backend is None:
+                configure()
+    return _backend
+
+
+def get_pool():
+    if _pool is None:
+        get_backend()
+    return _pool
+
+
+def get_connection():
+    """Соединение из пула; conn.close() возвращает его обратно в пул."""
+    return get_pool().acquire()
+
+
+@contextmanager
+def connection():
+    """
+    with db.connection() as conn: ...
+    Коммит при успехе, откат при ошибке, возврат соединения в пул.
+    """
+    with get_pool().connection() as conn:
+        yield conn
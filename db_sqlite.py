@@ -0,0 +1,556 @@
+# db_sqlite.py
+"""
+Встраиваемый бэкенд на SQLite – для локального запуска, профилирования
+и нагрузочных тестов без сервера MSSQL.
+
+Запросы приложения написаны на T-SQL, поэтому курсор этого бэкенда
+переводит используемые конструкции в диалект SQLite:
+SYSDATETIME()/GETDATE(), DATEADD, OUTPUT INSERTED, SCOPE_IDENTITY(),
+CONVERT(varchar, ..., 120/104), CAST(... AS DECIMAL(p, s)), ISNULL,
+CONCAT, RIGHT/LEFT/LEN, N'...', конкатенацию строк через «+»,
+OFFSET ... FETCH NEXT ..., TOP n, имена столбцов конструктора
+(VALUES ...) AS t (a, b) и табличные подсказки WITH (NOLOCK ...).
+"""
+import hashlib
+import itertools
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+
+from db import Backend
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Пользователь (
+    ID_пользователя  INTEGER PRIMARY KEY AUTOINCREMENT,
+    Логин            TEXT     NOT NULL UNIQUE,
+    Хеш_пароля       BLOB     NOT NULL,
+    Email            TEXT,
+    Роль             TEXT     NOT NULL,
+    Дата_регистрации DATETIME,
+    Активен          BOOLEAN  NOT NULL DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS Клиент (
+    ID_Клиент       INTEGER PRIMARY KEY AUTOINCREMENT,
+    ID_пользователя INTEGER NOT NULL REFERENCES Пользователь (ID_пользователя),
+    Фамилия         TEXT    NOT NULL,
+    Имя             TEXT    NOT NULL,
+    Отчество        TEXT,
+    Серия_паcпорта  TEXT,
+    Номер_паcпорта  TEXT,
+    Город           TEXT,
+    Улица           TEXT,
+    Дом             TEXT,
+    Квартира        TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Курьер (
+    ID_курьера      INTEGER PRIMARY KEY AUTOINCREMENT,
+    ID_пользователя INTEGER NOT NULL REFERENCES Пользователь (ID_пользователя),
+    Фамилия         TEXT    NOT NULL,
+    Имя             TEXT    NOT NULL,
+    Отчество        TEXT,
+    Номер_телефона  TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Товар (
+    Номер_товара INTEGER PRIMARY KEY AUTOINCREMENT,
+    Название     TEXT           NOT NULL,
+    Цена         DECIMAL(10, 2) NOT NULL,
+    Количество   INTEGER        NOT NULL DEFAULT 0,
+    Изображение  BLOB
+);
+
+CREATE TABLE IF NOT EXISTS Платежные_данные (
+    ID_данных     INTEGER PRIMARY KEY AUTOINCREMENT,
+    ID_Клиента    INTEGER NOT NULL REFERENCES Клиент (ID_Клиент),
+    Номер_карты   TEXT    NOT NULL,
+    Срок_действия DATE,
+    CVV_код       TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Заказ (
+    ID_заказа                     INTEGER PRIMARY KEY AUTOINCREMENT,
+    ID_данные                     INTEGER NOT NULL REFERENCES Платежные_данные (ID_данных),
+    Номер_товара                  INTEGER NOT NULL REFERENCES Товар (Номер_товара),
+    Количество_заказанного_товара INTEGER NOT NULL,
+    Статус                        TEXT    NOT NULL DEFAULT 'создан',
+    Дата_заказа                   DATE,
+    ID_курьера                    INTEGER REFERENCES Курьер (ID_курьера)
+);
+
+CREATE TABLE IF NOT EXISTS Миниатюра_товара (
+    Номер_товара INTEGER NOT NULL REFERENCES Товар (Номер_товара) ON DELETE CASCADE,
+    Размер       INTEGER NOT NULL,
+    Формат       TEXT    NOT NULL,
+    Хеш          BLOB    NOT NULL,
+    Данные       BLOB    NOT NULL,
+    PRIMARY KEY (Номер_товара, Размер)
+);
+
+CREATE TABLE IF NOT EXISTS Поиск_товара (
+    Номер_товара  INTEGER PRIMARY KEY REFERENCES Товар (Номер_товара) ON DELETE CASCADE,
+    Название      TEXT    NOT NULL,
+    Норм_название TEXT    NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Триграмма_товара (
+    Триграмма    TEXT    NOT NULL,
+    Номер_товара INTEGER NOT NULL REFERENCES Товар (Номер_товара) ON DELETE CASCADE,
+    PRIMARY KEY (Триграмма, Номер_товара)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS Событие_заказа (
+    ID_события INTEGER  PRIMARY KEY AUTOINCREMENT,
+    ID_заказа  INTEGER  NOT NULL,
+    Дата       DATETIME NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS Импорт_товаров (
+    Ключ   VARCHAR(64) NOT NULL PRIMARY KEY,
+    Строка INTEGER     NOT NULL,
+    Дата   DATETIME    NOT NULL DEFAULT (datetime('now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS Учёт_заказа (
+    ID_заказа    INTEGER        NOT NULL PRIMARY KEY,
+    День         DATE           NOT NULL,
+    Номер_товара INTEGER        NOT NULL,
+    ID_курьера   INTEGER,
+    Статус       TEXT           NOT NULL,
+    Количество   INTEGER        NOT NULL,
+    Сумма        DECIMAL(12, 2) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Сводка_продаж_день (
+    День    DATE           NOT NULL,
+    Статус  TEXT           NOT NULL,
+    Заказов INTEGER        NOT NULL,
+    Единиц  INTEGER        NOT NULL,
+    Выручка DECIMAL(14, 2) NOT NULL,
+    PRIMARY KEY (День, Статус)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS Сводка_продаж_товар (
+    День         DATE           NOT NULL,
+    Номер_товара INTEGER        NOT NULL,
+    Заказов      INTEGER        NOT NULL,
+    Единиц       INTEGER        NOT NULL,
+    Выручка      DECIMAL(14, 2) NOT NULL,
+    PRIMARY KEY (День, Номер_товара)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS Сводка_продаж_курьер (
+    День       DATE           NOT NULL,
+    ID_курьера INTEGER        NOT NULL,
+    Статус     TEXT           NOT NULL,
+    Заказов    INTEGER        NOT NULL,
+    Единиц     INTEGER        NOT NULL,
+    Выручка    DECIMAL(14, 2) NOT NULL,
+    PRIMARY KEY (День, ID_курьера, Статус)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS Отметка_сводки (
+    Сводка     TEXT    NOT NULL PRIMARY KEY,
+    ID_события INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO Отметка_сводки (Сводка, ID_события) VALUES ('Продажи', -1);
+
+CREATE INDEX IF NOT EXISTS IX_Клиент_Пользователь ON Клиент (ID_пользователя);
+CREATE INDEX IF NOT EXISTS IX_Курьер_Пользователь ON Курьер (ID_пользователя);
+CREATE INDEX IF NOT EXISTS IX_Платежные_данные_Клиент ON Платежные_данные (ID_Клиента);
+CREATE INDEX IF NOT EXISTS IX_Заказ_Данные ON Заказ (ID_данные);
+CREATE INDEX IF NOT EXISTS IX_Заказ_Товар ON Заказ (Номер_товара);
+CREATE INDEX IF NOT EXISTS IX_Заказ_Курьер ON Заказ (ID_курьера);
+CREATE INDEX IF NOT EXISTS IX_Триграмма_товара_Товар ON Триграмма_товара (Номер_товара);
+CREATE INDEX IF NOT EXISTS IX_Заказ_Статус ON Заказ (Статус, ID_заказа);
+CREATE INDEX IF NOT EXISTS IX_Заказ_Дата ON Заказ (Дата_заказа, ID_заказа);
+CREATE INDEX IF NOT EXISTS IX_Товар_Название ON Товар (Название, Номер_товара);
+CREATE INDEX IF NOT EXISTS IX_Клиент_Фамилия ON Клиент (Фамилия, ID_Клиент);
+CREATE INDEX IF NOT EXISTS IX_Курьер_Фамилия ON Курьер (Фамилия, ID_курьера);
+"""
+
+
+# ---------- ТИПЫ ----------
+
+def _convert_datetime(value: bytes):
+    try:
+        return datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+def _convert_date(value: bytes):
+    text = value.decode()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+sqlite3.register_adapter(datetime, lambda v: v.isoformat(" "))
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_converter("DATE", _convert_date)
+sqlite3.register_converter("BOOLEAN", lambda v: v not in (b"0", b""))
+
+
+# ---------- ФУНКЦИИ T-SQL ----------
+
+_HASH_ALGORITHMS = {"MD5": "md5", "SHA1": "sha1", "SHA2_256": "sha256", "SHA2_512": "sha512"}
+
+
+def _hashbytes(algorithm, data):
+    """HASHBYTES('SHA2_256', x) – как в SQL Server, строки хешируются в UTF-16LE."""
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode("utf-16-le")
+    elif not isinstance(data, bytes):
+        data = str(data).encode("utf-16-le")
+    return hashlib.new(_HASH_ALGORITHMS[str(algorithm).upper()], data).digest()
+
+
+def _unicode_case(method):
+    """LOWER/UPPER как в SQL Server – для любых букв, а не только латиницы."""
+    def convert(value):
+        return getattr(value, method)() if isinstance(value, str) else value
+    return convert
+
+
+# ---------- ПЕРЕВОД T-SQL → SQLite ----------
+
+_DATE_STYLES = {
+    # (стиль CONVERT, длина varchar) -> формат strftime
+    (120, 10): "%Y-%m-%d",
+    (120, 16): "%Y-%m-%d %H:%M",
+    (120, 19): "%Y-%m-%d %H:%M:%S",
+    (121, 10): "%Y-%m-%d",
+    (121, 19): "%Y-%m-%d %H:%M:%S",
+    (104, 10): "%d.%m.%Y",
+    (108, 8): "%H:%M:%S",
+}
+
+_NOW = "datetime('now', 'localtime')"
+
+
+def _in_string(sql, pos):
+    """Находится ли позиция внутри строкового литерала '...'."""
+    return sql.count("'", 0, pos) % 2 == 1
+
+
+def _split_args(sql, start):
+    """
+    Разобрать аргументы вызова, начиная сразу после открывающей скобки.
+    Возвращает (список аргументов, индекс после закрывающей скобки).
+    """
+    args, depth, in_str, begin = [], 1, False, start
+    for i in range(start, len(sql)):
+        ch = sql[i]
+        if ch == "'":
+            in_str = not in_str
+        elif in_str:
+            continue
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                args.append(sql[begin:i].strip())
+                return args, i + 1
+        elif ch == "," and depth == 1:
+            args.append(sql[begin:i].strip())
+            begin = i + 1
+    raise ValueError(f"Несбалансированные скобки в запросе: {sql!r}")
+
+
+def _rewrite_calls(sql, name, handler):
+    """Заменить все вызовы функции name(...) на handler(аргументы)."""
+    pattern = re.compile(r"\b" + name + r"\s*\(", re.IGNORECASE)
+    out, pos = [], 0
+    while True:
+        m = pattern.search(sql, pos)
+        if not m:
+            break
+        if _in_string(sql, m.start()):
+            out.append(sql[pos:m.end()])
+            pos = m.end()
+            continue
+        args, end = _split_args(sql, m.end())
+        args = [_rewrite_calls(a, name, handler) for a in args]
+        out.append(sql[pos:m.start()])
+        out.append(handler(args))
+        pos = end
+    out.append(sql[pos:])
+    return "".join(out)
+
+
+def _type_parts(type_sql):
+    """'varchar (10)' -> ('varchar', [10]); 'DECIMAL(10, 2)' -> ('decimal', [10, 2])."""
+    m = re.match(r"\s*(\w+)\s*(?:\(([^)]*)\))?\s*$", type_sql)
+    if not m:
+        return type_sql.strip().lower(), []
+    params = [p.strip() for p in (m.group(2) or "").split(",") if p.strip()]
+    return m.group(1).lower(), [int(p) if p.isdigit() else p for p in params]
+
+
+def _cast(expr, type_sql):
+    kind, params = _type_parts(type_sql)
+    if kind in ("decimal", "numeric", "money"):
+        scale = params[1] if len(params) > 1 else (2 if kind == "money" else 0)
+        return f"printf('%.{scale}f', {expr})"
+    if kind in ("varchar", "nvarchar", "char", "nchar", "text", "ntext"):
+        return f"CAST({expr} AS TEXT)"
+    if kind in ("int", "bigint", "smallint", "tinyint", "bit"):
+        return f"CAST({expr} AS INTEGER)"
+    if kind in ("float", "real"):
+        return f"CAST({expr} AS REAL)"
+    if kind == "date":
+        return f"date({expr})"
+    if kind in ("datetime", "datetime2", "smalldatetime"):
+        return f"datetime({expr})"
+    if kind == "varbinary":
+        return f"CAST({expr} AS BLOB)"
+    return f"CAST({expr} AS {type_sql})"
+
+
+def _convert_call(args):
+    type_sql, expr = args[0], args[1]
+    if len(args) > 2:
+        kind, params = _type_parts(type_sql)
+        length = params[0] if params else 30
+        style = int(args[2])
+        fmt = _DATE_STYLES.get((style, length)) or _DATE_STYLES.get((style, 19)) or "%Y-%m-%d %H:%M:%S"
+        return f"strftime('{fmt}', {expr})"
+    return _cast(expr, type_sql)
+
+
+def _cast_call(args):
+    m = re.match(r"(.*)\s+AS\s+(.+)$", args[0], re.IGNORECASE | re.DOTALL)
+    if not m:
+        return f"CAST({args[0]})"
+    return _cast(m.group(1).strip(), m.group(2).strip())
+
+
+_DATE_UNITS = {"SECOND": "seconds", "MINUTE": "minutes", "HOUR": "hours", "DAY": "days"}
+
+
+def _dateadd_call(args):
+    unit = _DATE_UNITS[args[0].strip().upper()]
+    return f"datetime({args[2]}, ({args[1]}) || ' {unit}')"
+
+
+def _concat_call(args):
+    parts = [a if a.startswith("'") else f"IFNULL({a}, '')" for a in args]
+    return "(" + " || ".join(parts) + ")"
+
+
+def _move_output_clause(sql):
+    """INSERT ... OUTPUT INSERTED.x VALUES (...)  ->  INSERT ... VALUES (...) RETURNING x"""
+    m = re.search(r"\bOUTPUT\s+((?:INSERTED\.\w+|DELETED\.\w+)(?:\s*,\s*(?:INSERTED\.\w+|DELETED\.\w+))*)",
+                  sql, re.IGNORECASE)
+    if not m:
+        return sql
+    columns = re.sub(r"\b(?:INSERTED|DELETED)\.", "", m.group(1), flags=re.IGNORECASE)
+    sql = sql[:m.start()] + sql[m.end():]
+    return sql.rstrip().rstrip(";") + f"\nRETURNING {columns}"
+
+
+def _name_values_columns(sql):
+    """
+    (VALUES (...), ...) AS t (a, b)  ->  (SELECT column1 AS a, column2 AS b FROM (VALUES ...)) AS t
+    (SQLite не умеет называть столбцы производной таблицы в псевдониме).
+    """
+    pattern = re.compile(r"\(\s*VALUES\b", re.IGNORECASE)
+    out, pos = [], 0
+    while True:
+        m = pattern.search(sql, pos)
+        if not m:
+            break
+        _, end = _split_args(sql, m.start() + 1)
+        alias = re.compile(r"\s*AS\s+(\w+)\s*\(([^()]*)\)").match(sql, end)
+        if _in_string(sql, m.start()) or not alias:
+            out.append(sql[pos:end])
+            pos = end
+            continue
+        columns = ", ".join(f"column{i} AS {name.strip()}"
+                            for i, name in enumerate(alias.group(2).split(","), start=1))
+        out.append(sql[pos:m.start()])
+        out.append(f"(SELECT {columns} FROM {sql[m.start():end]}) AS {alias.group(1)}")
+        pos = alias.end()
+    out.append(sql[pos:])
+    return "".join(out)
+
+
+def _move_top_clause(sql):
+    """SELECT TOP (10) ... -> SELECT ... LIMIT 10 (только для числового TOP)."""
+    m = re.search(r"\bSELECT\s+(DISTINCT\s+)?TOP\s*\(?\s*(\d+)\s*\)?", sql, re.IGNORECASE)
+    if not m:
+        return sql
+    sql = sql[:m.start()] + "SELECT " + (m.group(1) or "") + sql[m.end():]
+    return sql.rstrip().rstrip(";") + f"\nLIMIT {m.group(2)}"
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(sql: str) -> str:
+    """Перевести запрос с T-SQL на диалект SQLite (результат кэшируется)."""
+    # Юникодные литералы N'...' в SQLite не нужны
+    sql = re.sub(r"\bN'", "'", sql)
+
+    sql = re.sub(r"\b(?:SYSDATETIME|GETDATE)\s*\(\s*\)", _NOW, sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bSCOPE_IDENTITY\s*\(\s*\)|@@IDENTITY", "last_insert_rowid()", sql, flags=re.IGNORECASE)
+    sql = re.sub(r"\bWITH\s*\(\s*(?:NOLOCK|UPDLOCK|ROWLOCK|READPAST|HOLDLOCK|READCOMMITTED)"
+                 r"(?:\s*,\s*\w+)*\s*\)", "", sql, flags=re.IGNORECASE)
+
+    sql = _rewrite_calls(sql, "CONVERT", _convert_call)
+    sql = _rewrite_calls(sql, "CAST", _cast_call)
+    sql = _rewrite_calls(sql, "DATEADD", _dateadd_call)
+    sql = _rewrite_calls(sql, "CONCAT", _concat_call)
+    sql = _rewrite_calls(sql, "ISNULL", lambda a: f"IFNULL({', '.join(a)})")
+    sql = _rewrite_calls(sql, "RIGHT", lambda a: f"substr({a[0]}, -({a[1]}))")
+    sql = _rewrite_calls(sql, "LEFT", lambda a: f"substr({a[0]}, 1, {a[1]})")
+    sql = _rewrite_calls(sql, "LEN", lambda a: f"length({a[0]})")
+    sql = _rewrite_calls(sql, "DATALENGTH", lambda a: f"length({a[0]})")
+
+    # Конкатенация строк: в T-SQL это «+», в SQLite – «||».
+    # Распознаём по соседству со строковым литералом: C.Фамилия + ' ' + C.Имя
+    sql = re.sub(r"('(?:[^']|'')*')\s*\+", r"\1 ||", sql)
+    sql = re.sub(r"\+\s*('(?:[^']|'')*')", r"|| \1", sql)
+
+    # OFFSET ? ROWS FETCH NEXT ? ROWS ONLY -> LIMIT ?, ? (порядок параметров сохраняется)
+    sql = re.sub(r"\bOFFSET\s+(\?|\d+)\s+ROWS?\s+FETCH\s+(?:NEXT|FIRST)\s+(\?|\d+)\s+ROWS?\s+ONLY",
+                 r"LIMIT \1, \2", sql, flags=re.IGNORECASE)
+
+    sql = _name_values_columns(sql)
+    sql = _move_top_clause(sql)
+    sql = _move_output_clause(sql)
+    return sql
+
+
+# ---------- СОЕДИНЕНИЕ И КУРСОР ----------
+
+class SQLiteCursor:
+    """Курсор с интерфейсом pyodbc, переводящий T-SQL перед выполнением."""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.fast_executemany = False  # совместимость с pyodbc, здесь не нужен
+
+    @staticmethod
+    def _params(params):
+        # pyodbc принимает и execute(sql, (a, b)), и execute(sql, a, b)
+        if len(params) == 1 and isinstance(params[0], (tuple, list)):
+            return tuple(params[0])
+        return params
+
+    def execute(self, sql, *params):
+        self._raw.execute(translate_sql(sql), self._params(params))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._raw.executemany(translate_sql(sql), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._raw.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._raw.fetchmany(size or self._raw.arraysize)
+
+    def fetchall(self):
+        return self._raw.fetchall()
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    def close(self):
+        self._raw.close()
+
+    def __iter__(self):
+        return iter(self._raw)
+
+
+class SQLiteConnection:
+    """Соединение с интерфейсом pyodbc поверх sqlite3."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def cursor(self):
+        return SQLiteCursor(self._raw.cursor())
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+
+_memory_ids = itertools.count(1)
+
+
+class SQLiteBackend(Backend):
+    """
+    Встраиваемая база SQLite со схемой магазина.
+    path=":memory:" – общая для всех соединений пула база в памяти.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._keeper = None
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        if path == ":memory:":
+            # Именованная база в памяти живёт, пока открыто хотя бы одно соединение
+            self._target, self._uri = f"file:shop_mem_{next(_memory_ids)}?mode=memory&cache=shared", True
+            self._keeper = self._open()
+        else:
+            self._target, self._uri = path, False
+
+    def _open(self):
+        raw = sqlite3.connect(
+            self._target,
+            uri=self._uri,
+            timeout=30,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,  # соединения пула переходят между потоками
+        )
+        raw.create_function("HASHBYTES", 2, _hashbytes, deterministic=True)
+        raw.create_function("LOWER", 1, _unicode_case("lower"), deterministic=True)
+        raw.create_function("UPPER", 1, _unicode_case("upper"), deterministic=True)
+        raw.execute("PRAGMA foreign_keys = ON")
+        if not self._uri:
+            raw.execute("PRAGMA journal_mode = WAL")
+            raw.execute("PRAGMA synchronous = NORMAL")
+        return raw
+
+    def connect(self):
+        raw = self._open()
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    raw.executescript(SCHEMA)
+                    self._schema_ready = True
+        return SQLiteConnection(raw)
+
+    def close(self):
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
@@ -0,0 +1,196 @@
+# export.py
+"""
+Выгрузка таблиц админ-панели в CSV и XLSX.
+
+Строки идут прямо из курсора (PagedQuery.iter_batches, fetchmany) в файл
+пачками по EXPORT_BATCH, поэтому память не зависит от размера таблицы.
+Учитываются сортировка и фильтры, выбранные в админ-панели.
+
+XLSX пишется без сторонних библиотек: это zip с несколькими XML-файлами,
+лист с ячейками inlineStr дописывается в архив потоком. Файл сначала
+создаётся рядом с расширением .part и переименовывается в конце – при
+ошибке или отмене недописанный файл не остаётся.
+
+Выгрузка выполняется в рабочем потоке; окно следит за ExportProgress
+и может её отменить:
+
+    progress = export.ExportProgress()
+    self.tasks.submit("export", export.export_admin_table, table, path,
+                      progress=progress, on_done=..., on_error=...)
+"""
+import csv
+import os
+import re
+import threading
+import zipfile
+from contextlib import closing
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+import services
+
+EXPORT_BATCH = 1000
+CSV_DELIMITER = ";"   # так CSV открывается в Excel с русскими настройками
+
+_XML_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class ExportCancelled(Exception):
+    """Выгрузка остановлена пользователем."""
+
+
+class ExportProgress:
+    """Состояние выгрузки: пишет рабочий поток, читает окно (через after)."""
+
+    def __init__(self):
+        self.done = 0
+        self.total = None
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return "[BINARY DATA]"
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+class _CsvWriter:
+    def __init__(self, path, sheet_name):
+        # utf-8-sig: Excel узнаёт кодировку по BOM
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._csv = csv.writer(self._file, delimiter=CSV_DELIMITER)
+
+    def write_rows(self, rows):
+        self._csv.writerows([_text(v) for v in row] for row in rows)
+
+    def close(self):
+        self._file.close()
+
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+
+class _XlsxWriter:
+    def __init__(self, path, sheet_name):
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED)
+        for name, content in _XLSX_STATIC.items():
+            self._zip.writestr(name, content)
+        # имя листа в Excel – до 31 символа, без []:*?/\
+        sheet_name = re.sub(r"[\[\]:*?/\\]", "_", sheet_name)[:31]
+        self._zip.writestr("xl/workbook.xml", _XLSX_WORKBOOK.format(name=escape(sheet_name)))
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self._sheet.write(
+            b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            b'<sheetData>'
+        )
+
+    @staticmethod
+    def _cell(value):
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            return f"<c><v>{value}</v></c>"
+        text = escape(_XML_ILLEGAL.sub("", _text(value)))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+    def write_rows(self, rows):
+        chunk = "".join(
+            "<row>" + "".join(self._cell(v) for v in row) + "</row>" for row in rows
+        )
+        self._sheet.write(chunk.encode("utf-8"))
+
+    def close(self):
+        try:
+            self._sheet.write(b"</sheetData></worksheet>")
+            self._sheet.close()
+        finally:
+            self._zip.close()
+
+
+_WRITERS = {".csv": _CsvWriter, ".xlsx": _XlsxWriter}
+
+
+def export_admin_table(table_name, path, sort=None, filters=None, progress=None) -> int:
+    """
+    Выгрузить таблицу админ-панели в path (.csv или .xlsx).
+    Возвращает число выгруженных строк; progress.cancel() прерывает
+    выгрузку исключением ExportCancelled.
+    """
+    writer_type = _WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer_type is None:
+        raise services.ServiceError("Поддерживается выгрузка в файлы .csv и .xlsx")
+    if progress is None:
+        progress = ExportProgress()
+
+    query = services.admin_table_query(table_name, sort, filters)
+    header = [column.name for column in services.admin_table_columns(table_name)]
+    progress.total = query.count()
+
+    partial = path + ".part"
+    try:
+        writer = writer_type(partial, table_name)
+        try:
+            writer.write_rows([header])
+            with closing(query.iter_batches(EXPORT_BATCH)) as batches:
+                for rows in batches:
+                    if progress.cancelled:
+                        raise ExportCancelled()
+                    writer.write_rows(rows)
+                    progress.done += len(rows)
+        finally:
+            writer.close()
+        os.replace(partial, path)
+    except BaseException:
+        try:
+            os.remove(partial)
+        except OSError:
+            pass
+        raise
+    return progress.done
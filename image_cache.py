@@ -0,0 +1,286 @@
+# image_cache.py
+"""
+Кэш миниатюр товаров для панелей каталога и администратора.
+
+Ключ – (номер товара, SHA-256 изображения, размер). Хеш считает сервер,
+поэтому повторный щелчок по товару стоит одного короткого запроса, а не
+загрузки и декодирования всего Изображение.
+
+Основной источник – готовые миниатюры из таблицы Миниатюра_товара
+(THUMBNAIL_SIZES, создаются при сохранении товара): по сети идёт несколько
+килобайт вместо оригинала. Для товаров без них миниатюра строится из
+оригинала и тут же сохраняется в БД.
+
+Два уровня кэша:
+- память: LRU готовых PIL-миниатюр с ограничением по байтам;
+- диск (необязательно): PNG-миниатюры в каталоге SHOP_THUMB_CACHE_DIR,
+  переживают перезапуск приложения.
+
+PhotoImage здесь не создаётся: он привязан к интерпретатору Tk и должен
+появляться только в главном потоке, а кэш используется из рабочих потоков.
+"""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image, features
+
+import services
+
+MEMORY_BUDGET = 32 * 1024 * 1024   # байт несжатых пикселей в памяти
+DISK_DIR_ENV = "SHOP_THUMB_CACHE_DIR"
+
+# Размеры готовых миниатюр: 280 – панели каталога и администратора,
+# 120 – превью в диалогах товара
+THUMBNAIL_SIZES = (280, 120)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+
+def _image_bytes(image):
+    """Сколько памяти занимают пиксели миниатюры."""
+    return image.width * image.height * len(image.getbands())
+
+
+class ThumbnailCache:
+    """
+    Потокобезопасный LRU-кэш миниатюр.
+
+    max_bytes – бюджет памяти; при превышении вытесняются самые старые записи
+    disk_dir  – каталог дискового уровня (None – только память)
+    """
+
+    def __init__(self, max_bytes=MEMORY_BUDGET, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (product_id, digest, size) -> PIL.Image
+        self._bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ---------- чтение / запись ----------
+
+    def get(self, product_id, digest, size):
+        key = (product_id, digest, tuple(size))
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+
+        image = self._read_disk(key)
+        if image is not None:
+            with self._lock:
+                self.disk_hits += 1
+            self._remember(key, image)
+            return image
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, product_id, digest, size, image):
+        key = (product_id, digest, tuple(size))
+        self._remember(key, image)
+        self._write_disk(key, image)
+
+    def _remember(self, key, image):
+        size = _image_bytes(image)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= _image_bytes(old)
+            self._entries[key] = image
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _image_bytes(evicted)
+
+    # ---------- сброс ----------
+
+    def invalidate(self, product_id):
+        """Забыть все миниатюры товара (изображение изменилось или товар удалён)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == product_id]:
+                self._bytes -= _image_bytes(self._entries.pop(key))
+        if self.disk_dir:
+            prefix = f"{product_id}_"
+            for name in os.listdir(self.disk_dir):
+                if name.startswith(prefix):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    # ---------- дисковый уровень ----------
+
+    def _path(self, key):
+        product_id, digest, (width, height) = key
+        return os.path.join(self.disk_dir, f"{product_id}_{digest}_{width}x{height}.png")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with Image.open(path) as image:
+                image.load()
+                return image.copy()
+        except Exception as e:
+            print(f"Повреждённая миниатюра в кэше {path}: {e}")
+            return None
+
+    def _write_disk(self, key, image):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        tmp = path + ".tmp"
+        try:
+            image.save(tmp, format="PNG", optimize=True)
+            os.replace(tmp, path)
+        except Exception as e:
+            print(f"Не удалось сохранить миниатюру {path}: {e}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Общий кэш приложения; дисковый уровень включается переменной SHOP_THUMB_CACHE_DIR."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ThumbnailCache(disk_dir=os.environ.get(DISK_DIR_ENV) or None)
+        return _cache
+
+
+def make_thumbnail(data, size, original=None):
+    """
+    Декодировать изображение и уменьшить его до size (с сохранением пропорций).
+    original – уже декодированный data: уменьшается его копия.
+    """
+    image = Image.open(io.BytesIO(data)) if original is None else original.copy()
+    image.thumbnail(size, Image.Resampling.LANCZOS)
+    return image
+
+
+def _encode(image):
+    """Компактное представление миниатюры: WebP, если Pillow его умеет, иначе JPEG/PNG."""
+    buf = io.BytesIO()
+    if features.check("webp"):
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        image.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+        return "WEBP", buf.getvalue()
+    if "A" in image.getbands() or image.mode == "P":
+        image.save(buf, format="PNG", optimize=True)
+        return "PNG", buf.getvalue()
+    image.convert("RGB").save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return "JPEG", buf.getvalue()
+
+
+def encode_thumbnails(data, original=None):
+    """
+    Миниатюры всех размеров THUMBNAIL_SIZES для сохранения рядом с оригиналом.
+    original – уже декодированный data, если он есть (чтобы не декодировать дважды).
+    Исключение OSError – если data не декодируется как изображение.
+    """
+    if original is None:
+        with Image.open(io.BytesIO(data)) as original:
+            original.load()
+            return encode_thumbnails(data, original)
+
+    digest = hashlib.sha256(data).digest()
+    result = []
+    for side in THUMBNAIL_SIZES:
+        image = original.copy()
+        image.thumbnail((side, side), Image.Resampling.LANCZOS)
+        fmt, encoded = _encode(image)
+        result.append(services.ProductThumbnail(side, fmt, digest, encoded))
+    return result
+
+
+def _decode(data):
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        return image.copy()
+
+
+def load_thumbnail(product_id, size):
+    """
+    Миниатюра товара размером не больше size или None, если изображения нет.
+    Вызывается из рабочего потока; исключение – если изображение не декодируется.
+    """
+    cache = get_cache()
+    side = max(size)
+
+    if side in THUMBNAIL_SIZES:
+        digest = services.get_product_thumbnail_hash(product_id, side)
+        if digest is not None:
+            image = cache.get(product_id, digest, size)
+            if image is not None:
+                return image
+            thumb = services.get_product_thumbnail(product_id, side)
+            if thumb is not None:
+                image = _decode(thumb.data)
+                cache.put(product_id, thumb.digest.hex(), size, image)
+                return image
+
+    # Готовой миниатюры нет – строим её из оригинала
+    digest = services.get_product_image_hash(product_id)
+    if digest is None:
+        return None
+    image = cache.get(product_id, digest, size)
+    if image is not None:
+        return image
+
+    data = services.get_product_image(product_id)
+    if not data:
+        return None
+    # оригинал декодируется один раз – и для показа, и для сохраняемых миниатюр
+    with Image.open(io.BytesIO(data)) as original:
+        original.load()
+        image = make_thumbnail(data, size, original)
+        # хеш пересчитываем по полученным байтам: изображение могли заменить между запросами
+        cache.put(product_id, hashlib.sha256(data).hexdigest(), size, image)
+
+        if side in THUMBNAIL_SIZES:
+            # заодно сохраняем миниатюры, чтобы следующий просмотр шёл по короткому пути
+            try:
+                services.save_product_thumbnails(product_id, encode_thumbnails(data, original))
+            except Exception as e:
+                print(f"Не удалось сохранить миниатюры товара {product_id}: {e}")
+    return image
+
+
+def invalidate(product_id):
+    get_cache().invalidate(product_id)
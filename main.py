@@ -1,15 +1,61 @@
 # main.py
+"""
+Точка входа: окно входа и окна ролей.
+
+Окно входа должно появиться сразу, поэтому здесь импортируется только то,
+что нужно ему самому. Модули ролей (ui_admin, ui_client, ui_courier) и
+Pillow загружаются после входа – пользователь открывает лишь одно из окон.
+Пока вводятся логин и пароль, они подгружаются в фоновом потоке
+(prewarm_role_modules), и к нажатию «Войти» обычно уже готовы.
+Администратор по умолчанию создаётся тоже в фоне, первой задачей окна.
+
+Сторож главного цикла (stall_monitor) работает всё время работы
+приложения; его отчёт – в окне диагностики администратора.
+"""
+import importlib
+import threading
+
 import customtkinter as ctk
-from db import get_user_by_login, get_connection
-from security import verify_password
-from ui_admin import AdminApp
-from ui_client import ClientApp
-from ui_courier import CourierApp
-from ui_login import RegistrationWindow, AdminManagerWindow
+import services
+from security import hash_password, verify_password
+import stall_monitor
 from theme import *  # Импортируем все цвета из темы
+import workers
 
-# Настройка CustomTkinter
+# Настройка CustomTkinter – до загрузки модулей ролей: они ставят тот же
+# режим, а повторная установка ничего не меняет и не трогает Tk (поэтому
+# их можно импортировать не из главного потока)
 ctk.set_appearance_mode("light")
+ctk.set_default_color_theme("blue")
+
+# роль -> (модуль, класс окна)
+ROLE_WINDOWS = {
+    "Администратор": ("ui_admin", "AdminApp"),
+    "Клиент": ("ui_client", "ClientApp"),
+    "Курьер": ("ui_courier", "CourierApp"),
+}
+# порядок фоновой загрузки: сначала самые частые роли и окно регистрации
+PREWARM_MODULES = ("ui_client", "ui_login", "ui_courier", "ui_admin")
+PREWARM_DELAY_MS = 200  # после первой отрисовки окна входа
+
+
+def prewarm_role_modules():
+    """Загрузить модули ролей в фоновом потоке (импорт потокобезопасен)."""
+    def run():
+        for name in PREWARM_MODULES:
+            try:
+                importlib.import_module(name)
+            except Exception as e:
+                # ошибка повторится и будет показана при входе
+                print(f"Не удалось заранее загрузить {name}: {e}")
+
+    threading.Thread(target=run, name="prewarm", daemon=True).start()
+
+
+def role_window_class(role):
+    """Класс окна роли; модуль импортируется при первом обращении."""
+    module_name, class_name = ROLE_WINDOWS[role]
+    return getattr(importlib.import_module(module_name), class_name)
 
 class LoginWindow(ctk.CTk):
     def __init__(self):
@@ -21,11 +67,19 @@ class LoginWindow(ctk.CTk):
         # Применяем тему к окну
         self.configure(fg_color=BG_MAIN)
 
+        # Запросы к БД выполняются в фоне, результаты приходят через after()
+        self.tasks = workers.TaskRunner(self, max_in_flight=1)
+
         self.setup_ui()
 
         # Скрытая комбинация для окна админов: Ctrl+Shift+A
         self.bind("<Control-Shift-A>", self.open_admin_manager)
 
+        # Первое соединение с БД (и миграции схемы) не задерживают появление
+        # окна; вход ждёт этой задачи – max_in_flight=1
+        self.tasks.submit("default_admin", create_default_admin, replace=False)
+        self.after(PREWARM_DELAY_MS, prewarm_role_modules)
+
     def setup_ui(self):
         # Основная рамка
         container = ctk.CTkFrame(
@@ -139,7 +193,15 @@ class LoginWindow(ctk.CTk):
             self.label_status.configure(text="Введите логин и пароль")
             return
 
-        row = get_user_by_login(login)
+        self.label_status.configure(text="Проверка...")
+        self.tasks.submit(
+            "login", services.get_user_by_login, login,
+            on_done=lambda row: self._finish_login(row, password),
+            on_error=lambda e: self.label_status.configure(text=f"Ошибка подключения к БД: {e}"),
+            replace=False,
+        )
+
+    def _finish_login(self, row, password):
         if row is None:
             self.label_status.configure(text="Пользователь не найден")
             return
@@ -150,16 +212,29 @@ class LoginWindow(ctk.CTk):
             self.label_status.configure(text="Неверный пароль")
             return
 
+        # Модуль роли обычно уже загружен в фоне; если нет – грузим сейчас
+        window_class = None
+        if role in ROLE_WINDOWS:
+            self.label_status.configure(text="Загрузка...")
+            self.update_idletasks()
+            try:
+                window_class = role_window_class(role)
+            except Exception as e:
+                print(f"Ошибка загрузки интерфейса роли {role}: {e}")
+                self.label_status.configure(text=f"Не удалось открыть интерфейс: {e}")
+                return
+
         # Скрываем окно входа
+        self.label_status.configure(text="")
         self.withdraw()
 
         # Открываем интерфейс по роли
         if role == "Администратор":
-            app = AdminApp(self, user_id)
+            app = window_class(self, user_id)
         elif role == "Клиент":
-            app = ClientApp(self, user_id, id_client)
+            app = window_class(self, user_id, id_client)
         elif role == "Курьер":
-            app = CourierApp(self, user_id, id_courier)
+            app = window_class(self, user_id, id_courier)
         else:
             # запасной вариант — простое окно
             app = ctk.CTkToplevel(self)
@@ -174,41 +249,27 @@ class LoginWindow(ctk.CTk):
         self.deiconify()  # Показываем окно входа снова
 
     def open_register(self, event=None):
+        from ui_login import RegistrationWindow
         RegistrationWindow(self)
 
     def open_admin_manager(self, event=None):
+        from ui_login import AdminManagerWindow
         AdminManagerWindow(self)
 
 
 def create_default_admin():
     """Создает администратора по умолчанию, если его нет"""
-    conn = get_connection()
-    cursor = conn.cursor()
-
     try:
-        # Проверяем, есть ли администраторы
-        cursor.execute("SELECT COUNT(*) FROM Пользователь WHERE Роль = N'Администратор'")
-        admin_count = cursor.fetchone()[0]
-
-        if admin_count == 0:
-            from security import hash_password
-            default_pass = hash_password("admin123")
-
-            cursor.execute("""
-                           INSERT INTO Пользователь
-                               (Логин, Хеш_пароля, Email, Роль, Дата_регистрации, Активен)
-                           VALUES (?, ?, ?, N'Администратор', SYSDATETIME(), 1)
-                           """, ("admin", default_pass, "admin@example.com"))
-
-            conn.commit()
+        if services.create_default_admin(hash_password("admin123")):
             print("Создан администратор по умолчанию: admin/admin123")
     except Exception as e:
         print(f"Ошибка при создании администратора по умолчанию: {e}")
-    finally:
-        conn.close()
 
 
 if __name__ == "__main__":
-    create_default_admin()
     app = LoginWindow()
-    app.mainloop()
\ No newline at end of file
+    # окно входа живёт до выхода (скрыто за окнами ролей) – пульс главного цикла на нём
+    stall_monitor.start(app)
+    app.mainloop()
+    stall_monitor.stop()
+    workers.shutdown()
\ No newline at end of file
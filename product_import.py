@@ -0,0 +1,323 @@
+# product_import.py
+"""
+Пакетный импорт товаров: файл CSV и каталог с изображениями.
+
+Формат CSV (кодировка UTF-8, разделитель «;» или «,», первая строка –
+заголовок):
+
+    Название;Цена;Количество;Изображение
+    Чайник;1499,90;12;kettle.jpg
+
+Столбец Изображение необязателен; имя файла ищется в image_dir
+(по умолчанию – рядом с CSV).
+
+Строки проверяются в главном потоке импорта, изображения декодируются,
+уменьшаются и превращаются в миниатюры в пуле процессов (Pillow держит
+GIL, потоки здесь не помогают). Пока пул готовит следующую пачку,
+предыдущая пишется в БД – services.import_products, одна транзакция на
+пачку. Вместе с пачкой в БД отмечается, до какой строки файл обработан,
+поэтому прерванный импорт того же файла продолжается с места остановки.
+
+Отклонённые строки попадают в отчёт <файл>.errors.csv с номером строки
+и причиной.
+"""
+import csv
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple
+
+from PIL import Image, UnidentifiedImageError
+
+import image_cache
+import services
+
+IMPORT_CHUNK = 1000                   # строк CSV в одной транзакции
+IMPORT_CHUNK_BYTES = 32 * 1024 * 1024  # ... и не больше стольких байт изображений
+MAX_IMAGE_SIDE = 1600                 # большие изображения уменьшаются до этого размера
+MAX_PRICE = Decimal("99999999.99")    # DECIMAL(10, 2)
+JPEG_QUALITY = 90
+
+COLUMN_NAME = "Название"
+COLUMN_PRICE = "Цена"
+COLUMN_QUANTITY = "Количество"
+COLUMN_IMAGE = "Изображение"
+
+
+class ImportCancelled(Exception):
+    """Импорт остановлен пользователем; повторный запуск продолжит его."""
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    failed: int
+    skipped: int        # строки, обработанные прошлыми запусками
+    seconds: float
+    report_path: str    # None, если ошибок не было
+
+    @property
+    def rows_per_second(self):
+        return (self.imported + self.failed) / self.seconds if self.seconds else 0.0
+
+
+class ImportProgress:
+    """Состояние импорта: пишет поток импорта, читает окно (через after)."""
+
+    def __init__(self):
+        self.done = 0
+        self.total = None
+        self.failed = 0
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+
+class _Row(NamedTuple):
+    line: int
+    name: str
+    price: Decimal
+    quantity: int
+    image_path: str
+    image_size: int
+
+
+class _Rejected(NamedTuple):
+    line: int
+    name: str
+    reason: str
+
+
+# ---------- изображения (выполняется в пуле процессов) ----------
+
+def _prepare_image(path):
+    """
+    Байты изображения для Товар.Изображение и его миниатюры; изображение
+    больше MAX_IMAGE_SIDE уменьшается, меньшие сохраняются как есть.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        image = Image.open(io.BytesIO(data))
+    except UnidentifiedImageError:
+        raise ValueError("файл не является изображением") from None
+    with image:
+        image.load()
+        if max(image.size) > MAX_IMAGE_SIDE:
+            image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            if "A" in image.getbands() or image.mode == "P":
+                image.save(buf, format="PNG", optimize=True)
+            else:
+                image.convert("RGB").save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+            data = buf.getvalue()
+        return data, image_cache.encode_thumbnails(data, image)
+
+
+# ---------- разбор CSV ----------
+
+def _file_key(path):
+    """Ключ импорта – SHA-256 содержимого: переименованный файл продолжается, изменённый – нет."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _open_csv(path):
+    f = open(path, newline="", encoding="utf-8-sig")
+    header = f.readline()
+    f.seek(0)
+    delimiter = ";" if header.count(";") >= header.count(",") else ","
+    reader = csv.DictReader(f, delimiter=delimiter)
+    missing = {COLUMN_NAME, COLUMN_PRICE, COLUMN_QUANTITY} - set(reader.fieldnames or ())
+    if missing:
+        f.close()
+        raise services.ServiceError(
+            f"В файле нет столбцов: {', '.join(sorted(missing))}")
+    return f, reader
+
+
+def _count_rows(path):
+    f, reader = _open_csv(path)
+    with f:
+        return sum(1 for _ in reader)
+
+
+def _parse_row(line, record, image_dir):
+    """Проверить строку CSV; возвращает _Row, при ошибке – ValueError с причиной."""
+    name = (record.get(COLUMN_NAME) or "").strip()
+    if not name:
+        raise ValueError("Не указано название")
+
+    try:
+        price = Decimal((record.get(COLUMN_PRICE) or "").strip().replace(",", ".").replace(" ", ""))
+    except InvalidOperation:
+        raise ValueError("Некорректная цена") from None
+    if not price.is_finite() or price <= 0 or price > MAX_PRICE:
+        raise ValueError("Некорректная цена")
+
+    try:
+        quantity = int((record.get(COLUMN_QUANTITY) or "").strip())
+    except ValueError:
+        raise ValueError("Некорректное количество") from None
+    if quantity < 0:
+        raise ValueError("Некорректное количество")
+
+    image_path, image_size = None, 0
+    image_name = (record.get(COLUMN_IMAGE) or "").strip()
+    if image_name:
+        image_path = os.path.join(image_dir, image_name)
+        try:
+            image_size = os.path.getsize(image_path)
+        except OSError:
+            raise ValueError(f"Нет файла изображения {image_name}") from None
+
+    return _Row(line, name, price.quantize(Decimal("0.01")), quantity, image_path, image_size)
+
+
+def _chunks(rows, start):
+    """
+    Пачки (строки, позиция): позиция – номер последней строки файла в пачке.
+    Отклонённые строки идут как (номер, запись, причина).
+    """
+    chunk, size, position = [], 0, start
+    for line, record in rows:
+        if line <= start:
+            continue
+        image_size = record.image_size if isinstance(record, _Row) else 0
+        if chunk and (len(chunk) >= IMPORT_CHUNK or size + image_size > IMPORT_CHUNK_BYTES):
+            yield chunk, position
+            chunk, size = [], 0
+        size += image_size
+        chunk.append(record)
+        position = line
+    if chunk:
+        yield chunk, position
+
+
+def _read_rows(reader, image_dir):
+    for line, record in enumerate(reader, start=1):
+        try:
+            yield line, _parse_row(line, record, image_dir)
+        except ValueError as e:
+            yield line, _Rejected(line, (record.get(COLUMN_NAME) or "").strip(), str(e))
+
+
+# ---------- импорт ----------
+
+class _Report:
+    """Отчёт об отклонённых строках; при продолжении импорта дописывается."""
+
+    def __init__(self, path, resume):
+        self.path = path
+        self._file = None
+        self._csv = None
+        if not resume and os.path.exists(path):
+            os.remove(path)  # отчёт прошлого, уже завершённого импорта
+
+    def write(self, rejected):
+        if not rejected:
+            return
+        if self._file is None:
+            append = os.path.exists(self.path)
+            self._file = open(self.path, "a" if append else "w", newline="", encoding="utf-8-sig")
+            self._csv = csv.writer(self._file, delimiter=";")
+            if not append:
+                self._csv.writerow(["Строка", COLUMN_NAME, "Ошибка"])
+        # +1: номер строки в файле вместе с заголовком
+        self._csv.writerows([r.line + 1, r.name, r.reason] for r in rejected)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _write_chunk(chunk, position, images, key, report, progress):
+    products, rejected = [], []
+    for item in chunk:
+        if isinstance(item, _Rejected):
+            rejected.append(item)
+            continue
+        image, thumbnails = None, []
+        if item.image_path:
+            try:
+                image, thumbnails = images[item.image_path].result()
+            except Exception as e:
+                rejected.append(_Rejected(item.line, item.name, f"Изображение не читается: {e}"))
+                continue
+        products.append(services.NewProduct(item.name, item.price, item.quantity,
+                                            image, thumbnails))
+    services.import_products(products, key, position)
+    rejected.sort()
+    report.write(rejected)
+    progress.failed += len(rejected)
+    progress.done = position
+    return len(products), len(rejected)
+
+
+def import_products(csv_path, image_dir=None, progress=None, workers=None) -> ImportResult:
+    """
+    Импортировать товары из csv_path; изображения ищутся в image_dir.
+    workers – число процессов для изображений (None – по числу ядер).
+    progress.cancel() останавливает импорт после текущей пачки
+    (исключение ImportCancelled); уже записанные пачки сохраняются.
+    """
+    if progress is None:
+        progress = ImportProgress()
+    if image_dir is None:
+        image_dir = os.path.dirname(os.path.abspath(csv_path))
+
+    key = _file_key(csv_path)
+    start = services.get_import_position(key)
+    progress.total = _count_rows(csv_path)
+    progress.done = start
+    report = _Report(os.path.splitext(csv_path)[0] + ".errors.csv", resume=start > 0)
+
+    started = time.perf_counter()
+    imported = failed = 0
+    f, reader = _open_csv(csv_path)
+    try:
+        with f, ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = None
+            try:
+                for chunk, position in _chunks(_read_rows(reader, image_dir), start):
+                    if progress.cancelled:
+                        raise ImportCancelled()
+                    # изображения следующей пачки готовятся, пока пишется текущая;
+                    # один файл на несколько товаров обрабатывается один раз
+                    images = {}
+                    for row in chunk:
+                        if isinstance(row, _Row) and row.image_path:
+                            if row.image_path not in images:
+                                images[row.image_path] = pool.submit(_prepare_image, row.image_path)
+                    if pending is not None:
+                        done, rejected = _write_chunk(*pending, key, report, progress)
+                        imported += done
+                        failed += rejected
+                    pending = (chunk, position, images)
+                if pending is not None:
+                    if progress.cancelled:
+                        raise ImportCancelled()
+                    done, rejected = _write_chunk(*pending, key, report, progress)
+                    imported += done
+                    failed += rejected
+            except BaseException:
+                # не ждать изображений, которые уже не понадобятся
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        report.close()
+
+    return ImportResult(imported, failed, start, time.perf_counter() - started,
+                        report.path if os.path.exists(report.path) else None)
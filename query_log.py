@@ -0,0 +1,464 @@
+# query_log.py
+"""
+Замеры запросов к БД: время, число строк и объём данных по каждому
+оператору, действие интерфейса, которое его вызвало, и журнал медленных
+запросов.
+
+Соединения пула оборачиваются в db.configure (instrument=True по
+умолчанию; SHOP_QUERY_LOG=0 отключает). Обёртка курсора засекает
+execute и выборку строк; запись о запросе закрывается следующим execute,
+закрытием курсора или концом транзакции. Статистика копится по ключу
+(нормализованный текст запроса, действие) в минутных окнах: snapshot()
+складывает окна за нужный период, гистограмма времени даёт p50/p95/p99.
+
+Действие задаёт workers.TaskRunner («ClientApp.orders» – окно и ключ
+задачи); запрос из главного потока без действия помечается
+MAIN_THREAD_ACTION – такой запрос замораживает окно.
+
+Медленные запросы (дольше SLOW_QUERY_MS) и ошибки дописываются в
+SLOW_LOG_PATH и хранятся в памяти для панели диагностики. Значения
+параметров в журнал не попадают: только типы, длины и короткий хеш –
+одинаковые параметры дают одинаковый хеш. От длинных строк и двоичных
+значений (изображений) хешируются длина и первые HASH_PREFIX_BYTES байт.
+
+Накладные расходы (benchmarks/query_overhead, SQLite в памяти) – около
+9 мкс на SELECT 1 и около 50 мкс на запрос окна: замер времени, поиск
+ключа в кэше нормализации, счётчики под общей блокировкой и оценка
+объёма выборки. Объём больших выборок оценивается по образцу строк,
+отпечаток параметров считается только для медленных запросов и ошибок.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+ENABLED = os.environ.get("SHOP_QUERY_LOG", "1") != "0"
+SLOW_QUERY_MS = float(os.environ.get("SHOP_SLOW_QUERY_MS", "200"))
+SLOW_LOG_PATH = os.environ.get("SHOP_SLOW_LOG", "slow_queries.log")  # "" – не писать в файл
+
+WINDOW_SECONDS = 60    # шаг скользящей статистики
+WINDOWS = 60           # сколько окон хранится (час)
+RECENT_LIMIT = 200     # медленных запросов и ошибок в памяти
+BYTES_SAMPLE_ROWS = 64  # по стольким строкам оценивается объём большой выборки
+PARAMS_SHOWN = 8       # типов параметров в отпечатке, остальные – числом
+HASH_PREFIX_BYTES = 4096  # от длинных строк и двоичных значений хешируется только начало
+
+# верхние границы корзин гистограммы, мс; последняя корзина – всё, что дольше
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+MAIN_THREAD_ACTION = "главный поток"
+
+_action = ContextVar("query_action", default=None)
+_MAIN_THREAD_ID = threading.main_thread().ident
+
+
+@contextmanager
+def action(name):
+    """Запросы внутри блока приписываются действию name."""
+    token = _action.set(name)
+    try:
+        yield
+    finally:
+        _action.reset(token)
+
+
+def current_action():
+    name = _action.get()
+    if name is not None:
+        return name
+    if threading.get_ident() == _MAIN_THREAD_ID:
+        return MAIN_THREAD_ACTION
+    return threading.current_thread().name
+
+
+# ---------- нормализация и отпечатки ----------
+
+_SPACES = re.compile(r"\s+")
+_PARAM_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_ROW_LIST = re.compile(r"(\([^()]*\))(?:\s*,\s*\1)+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """Текст запроса без лишних пробелов; списки «?, ?, ...» и «(?), (?), ...» свёрнуты."""
+    sql = _SPACES.sub(" ", sql).strip()
+    sql = _PARAM_LIST.sub("?, …", sql)
+    return _ROW_LIST.sub(r"\1, …", sql)
+
+
+def _flat_params(params):
+    # execute(sql, a, b) и execute(sql, (a, b)) – одно и то же
+    if len(params) == 1 and isinstance(params[0], (list, tuple)):
+        return params[0]
+    return params
+
+
+def _type_name(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, (str, bytes, bytearray)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def _hash_value(digest, value):
+    # изображения – мегабайты: в хеш идут длина и начало значения, не копия целиком
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        digest.update(b"b%d:" % len(value))
+        digest.update(value[:HASH_PREFIX_BYTES])
+    elif isinstance(value, str):
+        digest.update(b"s%d:" % len(value))
+        digest.update(value[:HASH_PREFIX_BYTES].encode("utf-8", "replace"))
+    else:
+        digest.update(repr(value).encode("utf-8", "replace"))
+    digest.update(b"\0")
+
+
+def fingerprint(params):
+    """Отпечаток параметров: типы и длины плюс хеш значений, без самих значений."""
+    params = _flat_params(params)
+    if not params:
+        return "—"
+    types = ", ".join(_type_name(v) for v in params[:PARAMS_SHOWN])
+    if len(params) > PARAMS_SHOWN:
+        types += f", … (+{len(params) - PARAMS_SHOWN})"
+    digest = hashlib.blake2b(digest_size=4)
+    for value in params:
+        _hash_value(digest, value)
+    return f"({types}) #{digest.hexdigest()}"
+
+
+def _rows_bytes(rows):
+    """Примерный объём строк «на проводе» (NVARCHAR – UTF-16)."""
+    count = len(rows)
+    # шаг с округлением вверх: в образце не больше BYTES_SAMPLE_ROWS строк
+    sample = rows if count <= BYTES_SAMPLE_ROWS else rows[::-(-count // BYTES_SAMPLE_ROWS)]
+    total = 0
+    for row in sample:
+        for v in row:
+            t = type(v)
+            if t is str:
+                total += 2 * len(v)
+            elif t is bytes or t is bytearray:
+                total += len(v)
+            elif v is not None:
+                total += 8
+    return total if sample is rows else total * count // len(sample)
+
+
+# ---------- статистика ----------
+
+class _Stat:
+    __slots__ = ("count", "errors", "seconds", "max_seconds", "rows", "bytes", "histogram")
+
+    def __init__(self):
+        self.count = self.errors = self.rows = self.bytes = 0
+        self.seconds = self.max_seconds = 0.0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds, rows, size, error, bucket):
+        self.count += 1
+        self.errors += error
+        self.seconds += seconds
+        self.rows += rows
+        self.bytes += size
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        self.histogram[bucket] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.errors += other.errors
+        self.seconds += other.seconds
+        self.rows += other.rows
+        self.bytes += other.bytes
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def percentile(self, q):
+        """Верхняя граница корзины, в которую попадает доля q запросов, мс."""
+        border, seen = q * self.count, 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if seen >= border and n:
+                bound = BUCKETS_MS[i] if i < len(BUCKETS_MS) else float("inf")
+                return min(bound, self.max_seconds * 1000)
+        return self.max_seconds * 1000
+
+
+class StatementStats(NamedTuple):
+    sql: str
+    action: str
+    count: int
+    errors: int
+    total_ms: float
+    max_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    rows: int
+    bytes: int
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+
+class SlowQuery(NamedTuple):
+    time: datetime
+    ms: float
+    rows: int
+    bytes: int
+    action: str
+    sql: str
+    params: str           # fingerprint()
+    error: Optional[str]  # текст ошибки или None
+
+
+class QueryLog:
+    """Статистика запросов процесса: скользящие минутные окна и итог с запуска."""
+
+    def __init__(self, slow_ms=SLOW_QUERY_MS, log_path=SLOW_LOG_PATH):
+        self.slow_ms = slow_ms
+        self.log_path = log_path
+        self.started = datetime.now()
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._windows = deque(maxlen=WINDOWS)  # (начало окна, {ключ: _Stat})
+        self._totals = {}
+        self.recent = deque(maxlen=RECENT_LIMIT)  # медленные запросы и ошибки, новые в конце
+
+    def record(self, sql, params, seconds, rows=0, size=0, action_name=None, error=None):
+        key = (normalize_sql(sql), action_name or current_action())
+        bucket = bisect_left(BUCKETS_MS, seconds * 1000)
+        failed = error is not None
+        now = time.time()
+        window_start = now - now % WINDOW_SECONDS
+        with self._lock:
+            if not self._windows or self._windows[-1][0] != window_start:
+                self._windows.append((window_start, {}))
+            window = self._windows[-1][1]
+            stat = window.get(key)
+            if stat is None:
+                stat = window[key] = _Stat()
+            stat.add(seconds, rows, size, failed, bucket)
+            total = self._totals.get(key)
+            if total is None:
+                total = self._totals[key] = _Stat()
+            total.add(seconds, rows, size, failed, bucket)
+
+        if failed or seconds * 1000 >= self.slow_ms:
+            self._log_slow(SlowQuery(datetime.now(), seconds * 1000, rows, size, key[1], key[0],
+                                     fingerprint(params),
+                                     None if error is None else f"{type(error).__name__}: {error}"))
+
+    def _log_slow(self, entry):
+        self.recent.append(entry)
+        if not self.log_path:
+            return
+        line = "\t".join((
+            entry.time.strftime("%Y-%m-%d %H:%M:%S"),
+            f"{entry.ms:.1f} мс",
+            f"строк {entry.rows}",
+            f"байт {entry.bytes}",
+            entry.action,
+            entry.sql,
+            entry.params,
+            entry.error or "",
+        ))
+        try:
+            with self._file_lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line.replace("\n", " ") + "\n")
+        except OSError as e:
+            print(f"Не удалось записать журнал медленных запросов: {e}")
+
+    def snapshot(self, minutes=None):
+        """Статистика за последние minutes минут (None – с запуска), по убыванию общего времени."""
+        merged = {}
+        with self._lock:
+            if minutes is None:
+                sources = [self._totals]
+            else:
+                border = time.time() - minutes * 60
+                sources = [stats for start, stats in self._windows if start + WINDOW_SECONDS > border]
+            for stats in sources:
+                for key, stat in stats.items():
+                    target = merged.get(key)
+                    if target is None:
+                        target = merged[key] = _Stat()
+                    target.merge(stat)
+
+        result = [
+            StatementStats(sql, action_name, s.count, s.errors, s.seconds * 1000,
+                           s.max_seconds * 1000, s.percentile(0.5), s.percentile(0.95),
+                           s.percentile(0.99), s.rows, s.bytes)
+            for (sql, action_name), s in merged.items()
+        ]
+        result.sort(key=lambda s: -s.total_ms)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._windows.clear()
+            self._totals.clear()
+            self.recent.clear()
+            self.started = datetime.now()
+
+
+_log = QueryLog()
+
+
+def get_log():
+    return _log
+
+
+# ---------- обёртки соединения и курсора ----------
+
+class _Entry:
+    """Незакрытая запись о запросе курсора: выборка строк ещё может идти."""
+
+    __slots__ = ("sql", "params", "seconds", "rows", "bytes")
+
+    def __init__(self, sql, params, seconds):
+        self.sql = sql
+        self.params = params
+        self.seconds = seconds
+        self.rows = 0
+        self.bytes = 0
+
+
+class InstrumentedCursor:
+    """Курсор с замерами; остальной интерфейс – как у исходного."""
+
+    def __init__(self, raw, log):
+        object.__setattr__(self, "_raw", raw)
+        object.__setattr__(self, "_log", log)
+        object.__setattr__(self, "_entry", None)
+
+    def _finish(self):
+        entry = self._entry
+        if entry is not None:
+            object.__setattr__(self, "_entry", None)
+            # запись закрывается в том же потоке и задаче, где выполнялся запрос
+            self._log.record(entry.sql, entry.params, entry.seconds, entry.rows, entry.bytes)
+
+    def _run(self, method, sql, params, record_params):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            method(sql, *params)
+        except Exception as e:
+            self._log.record(sql, record_params, time.perf_counter() - start, error=e)
+            raise
+        object.__setattr__(self, "_entry", _Entry(sql, record_params, time.perf_counter() - start))
+        return self
+
+    def execute(self, sql, *params):
+        return self._run(self._raw.execute, sql, params, params)
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        # отпечаток – по первому набору параметров
+        self._run(self._raw.executemany, sql, (seq_of_params,),
+                  (seq_of_params[0],) if seq_of_params else ())
+        entry = self._entry
+        entry.rows = len(seq_of_params)
+        return self
+
+    def _fetched(self, rows, seconds):
+        entry = self._entry
+        if entry is not None:
+            entry.seconds += seconds
+            entry.rows += len(rows)
+            entry.bytes += _rows_bytes(rows)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._raw.fetchone()
+        self._fetched((row,) if row is not None else (), time.perf_counter() - start)
+        return row
+
+    def fetchmany(self, *size):
+        start = time.perf_counter()
+        rows = self._raw.fetchmany(*size)
+        self._fetched(rows, time.perf_counter() - start)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._raw.fetchall()
+        self._fetched(rows, time.perf_counter() - start)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._finish()
+        self._raw.close()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        # например, cursor.fast_executemany = True
+        setattr(self._raw, name, value)
+
+
+class InstrumentedConnection:
+    """Соединение, выдающее курсоры с замерами; транзакция закрывает их записи."""
+
+    def __init__(self, raw, log):
+        self._raw = raw
+        self._log = log
+        self._cursors = []
+
+    def cursor(self):
+        cursor = InstrumentedCursor(self._raw.cursor(), self._log)
+        self._cursors.append(cursor)
+        return cursor
+
+    def _finish_cursors(self):
+        cursors, self._cursors = self._cursors, []
+        for cursor in cursors:
+            cursor._finish()
+
+    def commit(self):
+        self._finish_cursors()
+        self._raw.commit()
+
+    def rollback(self):
+        self._finish_cursors()
+        self._raw.rollback()
+
+    def close(self):
+        self._finish_cursors()
+        self._raw.close()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def instrument(backend, log=None):
+    """(connect, ping) для пула: соединения backend с замерами запросов."""
+    log = log or _log
+
+    def connect():
+        return InstrumentedConnection(backend.connect(), log)
+
+    def ping(conn):
+        # проверка живости – не запрос приложения, в статистику не идёт
+        backend.ping(conn._raw)
+
+    return connect, ping
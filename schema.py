@@ -0,0 +1,191 @@
+# schema.py
+"""
+Объекты схемы, добавленные к исходной базе «Электронный магазин».
+
+Рабочая база SQL Server создавалась вручную, поэтому новые таблицы и индексы
+доводятся до нужного состояния при первом соединении (MSSQLBackend.connect).
+Каждый шаг идемпотентен: IF OBJECT_ID(...) IS NULL / IF NOT EXISTS.
+Для SQLite те же объекты описаны прямо в db_sqlite.SCHEMA.
+"""
+
+MSSQL_MIGRATIONS = [
+    # Готовые миниатюры изображений товаров (см. image_cache.THUMBNAIL_SIZES)
+    """
+    IF OBJECT_ID(N'dbo.Миниатюра_товара', N'U') IS NULL
+    CREATE TABLE dbo.Миниатюра_товара (
+        Номер_товара INT            NOT NULL
+            REFERENCES dbo.Товар (Номер_товара) ON DELETE CASCADE,
+        Размер       INT            NOT NULL,
+        Формат       VARCHAR(10)    NOT NULL,
+        Хеш          VARBINARY(32)  NOT NULL,
+        Данные       VARBINARY(MAX) NOT NULL,
+        CONSTRAINT PK_Миниатюра_товара PRIMARY KEY (Номер_товара, Размер)
+    )
+    """,
+    # Поисковый индекс каталога (см. text_search): нормализованное название
+    # для ранжирования и исходное, по которому построены триграммы, –
+    # чтобы находить товары, переименованные в обход приложения
+    """
+    IF OBJECT_ID(N'dbo.Поиск_товара', N'U') IS NULL
+    CREATE TABLE dbo.Поиск_товара (
+        Номер_товара  INT           NOT NULL PRIMARY KEY
+            REFERENCES dbo.Товар (Номер_товара) ON DELETE CASCADE,
+        Название      NVARCHAR(MAX) NOT NULL,
+        Норм_название NVARCHAR(MAX) COLLATE Cyrillic_General_BIN2 NOT NULL
+    )
+    """,
+    """
+    IF OBJECT_ID(N'dbo.Триграмма_товара', N'U') IS NULL
+    CREATE TABLE dbo.Триграмма_товара (
+        Триграмма    NVARCHAR(3) COLLATE Cyrillic_General_BIN2 NOT NULL,
+        Номер_товара INT         NOT NULL
+            REFERENCES dbo.Товар (Номер_товара) ON DELETE CASCADE,
+        CONSTRAINT PK_Триграмма_товара PRIMARY KEY (Триграмма, Номер_товара)
+    )
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_Триграмма_товара_Товар')
+    CREATE INDEX IX_Триграмма_товара_Товар ON dbo.Триграмма_товара (Номер_товара)
+    """,
+    # Сортировка и фильтры админ-панели (services.ADMIN_TABLES): индексы под
+    # частые условия – статус и дата заказа, название товара, фамилии.
+    # Первичный ключ в конце совпадает с ключом страниц, поэтому первая
+    # страница отфильтрованного списка читается диапазоном индекса.
+    # Если тип колонки не допускает индекса (NVARCHAR(MAX)), шаг пропускается
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_Заказ_Статус')
+    BEGIN TRY
+        CREATE INDEX IX_Заказ_Статус ON dbo.Заказ (Статус, ID_заказа)
+    END TRY BEGIN CATCH END CATCH
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_Заказ_Дата')
+    CREATE INDEX IX_Заказ_Дата ON dbo.Заказ (Дата_заказа, ID_заказа)
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_Товар_Название')
+    BEGIN TRY
+        CREATE INDEX IX_Товар_Название ON dbo.Товар (Название, Номер_товара)
+    END TRY BEGIN CATCH END CATCH
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_Клиент_Фамилия')
+    BEGIN TRY
+        CREATE INDEX IX_Клиент_Фамилия ON dbo.Клиент (Фамилия, ID_Клиент)
+    END TRY BEGIN CATCH END CATCH
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'IX_Курьер_Фамилия')
+    BEGIN TRY
+        CREATE INDEX IX_Курьер_Фамилия ON dbo.Курьер (Фамилия, ID_курьера)
+    END TRY BEGIN CATCH END CATCH
+    """,
+    # Лента изменений заказов (services.available_order_changes): строка на
+    # каждое изменение, окна курьеров читают хвост по кластерному ключу.
+    # Внешнего ключа нет – событие об удалении переживает сам заказ.
+    # Пишется явно из services, а не триггером: INSERT/UPDATE ... OUTPUT
+    # без INTO запрещён на таблицах с триггерами. Начало ленты, учтённое
+    # сводками и старше ORDER_EVENTS_RETENTION_DAYS, удаляет prune_order_events
+    """
+    IF OBJECT_ID(N'dbo.Событие_заказа', N'U') IS NULL
+    CREATE TABLE dbo.Событие_заказа (
+        ID_события BIGINT    IDENTITY (1, 1) NOT NULL
+            CONSTRAINT PK_Событие_заказа PRIMARY KEY CLUSTERED,
+        ID_заказа  INT       NOT NULL,
+        Дата       DATETIME2 NOT NULL
+            CONSTRAINT DF_Событие_заказа_Дата DEFAULT SYSDATETIME()
+    )
+    """,
+    # Сводки продаж по дням (services.refresh_sales_rollups). Учёт_заказа –
+    # чем каждый заказ сейчас учтён в сводках: при изменении заказа из
+    # сводок вычитается прежний вклад и прибавляется новый. Отметка_сводки –
+    # последнее учтённое событие ленты заказов. Внешних ключей нет: история
+    # продаж переживает удалённые товары и курьеров
+    """
+    IF OBJECT_ID(N'dbo.Учёт_заказа', N'U') IS NULL
+    CREATE TABLE dbo.Учёт_заказа (
+        ID_заказа    INT            NOT NULL
+            CONSTRAINT PK_Учёт_заказа PRIMARY KEY,
+        День         DATE           NOT NULL,
+        Номер_товара INT            NOT NULL,
+        ID_курьера   INT            NULL,
+        Статус       NVARCHAR(50)   NOT NULL,
+        Количество   INT            NOT NULL,
+        Сумма        DECIMAL(12, 2) NOT NULL
+    )
+    """,
+    """
+    IF OBJECT_ID(N'dbo.Сводка_продаж_день', N'U') IS NULL
+    CREATE TABLE dbo.Сводка_продаж_день (
+        День    DATE           NOT NULL,
+        Статус  NVARCHAR(50)   NOT NULL,
+        Заказов INT            NOT NULL,
+        Единиц  INT            NOT NULL,
+        Выручка DECIMAL(14, 2) NOT NULL,
+        CONSTRAINT PK_Сводка_продаж_день PRIMARY KEY (День, Статус)
+    )
+    """,
+    """
+    IF OBJECT_ID(N'dbo.Сводка_продаж_товар', N'U') IS NULL
+    CREATE TABLE dbo.Сводка_продаж_товар (
+        День         DATE           NOT NULL,
+        Номер_товара INT            NOT NULL,
+        Заказов      INT            NOT NULL,
+        Единиц       INT            NOT NULL,
+        Выручка      DECIMAL(14, 2) NOT NULL,
+        CONSTRAINT PK_Сводка_продаж_товар PRIMARY KEY (День, Номер_товара)
+    )
+    """,
+    """
+    IF OBJECT_ID(N'dbo.Сводка_продаж_курьер', N'U') IS NULL
+    CREATE TABLE dbo.Сводка_продаж_курьер (
+        День       DATE           NOT NULL,
+        ID_курьера INT            NOT NULL,
+        Статус     NVARCHAR(50)   NOT NULL,
+        Заказов    INT            NOT NULL,
+        Единиц     INT            NOT NULL,
+        Выручка    DECIMAL(14, 2) NOT NULL,
+        CONSTRAINT PK_Сводка_продаж_курьер PRIMARY KEY (День, ID_курьера, Статус)
+    )
+    """,
+    """
+    IF OBJECT_ID(N'dbo.Отметка_сводки', N'U') IS NULL
+    CREATE TABLE dbo.Отметка_сводки (
+        Сводка     NVARCHAR(50) NOT NULL
+            CONSTRAINT PK_Отметка_сводки PRIMARY KEY,
+        ID_события BIGINT       NOT NULL
+    )
+    """,
+    # Строка отметки есть всегда: -1 – сводки ещё не построены
+    # (services.ROLLUP_NOT_BUILT). Первое построение идёт под блокировкой
+    # этой строки, поэтому второе окно ждёт его, а не строит сводки заново
+    """
+    IF NOT EXISTS (SELECT 1 FROM dbo.Отметка_сводки WHERE Сводка = N'Продажи')
+    INSERT INTO dbo.Отметка_сводки (Сводка, ID_события) VALUES (N'Продажи', -1)
+    """,
+    # Докуда дошёл пакетный импорт товаров (product_import): ключ – SHA-256
+    # файла CSV, строка – сколько строк данных уже обработано. Обновляется
+    # в одной транзакции со вставкой пачки, поэтому повторный запуск
+    # продолжает с места остановки и не задваивает товары
+    """
+    IF OBJECT_ID(N'dbo.Импорт_товаров', N'U') IS NULL
+    CREATE TABLE dbo.Импорт_товаров (
+        Ключ   VARCHAR(64) NOT NULL
+            CONSTRAINT PK_Импорт_товаров PRIMARY KEY,
+        Строка INT         NOT NULL,
+        Дата   DATETIME2   NOT NULL
+            CONSTRAINT DF_Импорт_товаров_Дата DEFAULT SYSDATETIME()
+    )
+    """,
+]
+
+
+def apply_mssql_migrations(raw):
+    """Выполнить недостающие шаги на «сыром» соединении pyodbc."""
+    cursor = raw.cursor()
+    try:
+        for statement in MSSQL_MIGRATIONS:
+            cursor.execute(statement)
+        raw.commit()
+    finally:
+        cursor.close()
@@ -0,0 +1,2256 @@
+# services.py
+"""
+Слой доступа к данным магазина.
+
+Окна (ui_*.py) не выполняют SQL сами, а вызывают функции этого модуля:
+здесь собраны все запросы по товарам, заказам, платёжным данным,
+пользователям и курьерам. Функции возвращают типизированные строки
+(NamedTuple), поэтому их можно и распаковывать как кортежи.
+
+Бизнес-ошибки (товар закончился, заказ уже взят и т.п.) выбрасываются
+как ServiceError и его наследники – текст годится для показа пользователю.
+"""
+import re
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+import text_search
+from db import connection
+
+
+class ServiceError(Exception):
+    """Ошибка бизнес-логики; сообщение можно показать пользователю."""
+
+
+class NotFoundError(ServiceError):
+    """Запись не найдена."""
+
+
+class ConflictError(ServiceError):
+    """Операция невозможна в текущем состоянии записи."""
+
+
+# ---------- ТИПЫ СТРОК ----------
+
+class UserAuth(NamedTuple):
+    user_id: int
+    login: str
+    password_hash: bytes
+    role: str
+    client_id: Optional[int]
+    courier_id: Optional[int]
+
+
+class AdminAccount(NamedTuple):
+    user_id: int
+    login: str
+    email: Optional[str]
+    registered: Optional[datetime]
+    active: bool
+
+
+class Product(NamedTuple):
+    id: int
+    name: str
+    price: float
+    quantity: int
+    image: Optional[bytes] = None
+
+
+class ProductThumbnail(NamedTuple):
+    size: int        # длинная сторона, px
+    format: str      # WEBP / JPEG / PNG
+    digest: bytes    # SHA-256 исходного изображения
+    data: bytes
+
+
+class NewProduct(NamedTuple):
+    name: str
+    price: Decimal
+    quantity: int
+    image: Optional[bytes]
+    thumbnails: list
+
+
+class PaymentCard(NamedTuple):
+    id: int
+    card_number: str
+    expires: str
+
+
+class ClientOrder(NamedTuple):
+    id: int
+    date: str
+    status: str
+    product_name: str
+    quantity: int
+    price: float
+    total: float
+
+
+class ClientOrderDetails(NamedTuple):
+    id: int
+    status: str
+    product_name: str
+    quantity: int
+    price: float
+    date: str
+    last_name: str
+    first_name: str
+    middle_name: Optional[str]
+    city: Optional[str]
+    street: Optional[str]
+    house: Optional[str]
+    flat: Optional[str]
+    card_number: Optional[str]
+    card_expires: Optional[str]
+
+
+class CourierOrder(NamedTuple):
+    id: int
+    date: str
+    status: str
+    client: str
+    product_name: str
+    quantity: int
+    total: str
+
+
+class CourierOrderDetails(NamedTuple):
+    id: int
+    status: str
+    quantity: int
+    date: str
+    client: str
+    address: str
+    product_name: str
+    price: str
+    total: str
+    courier: str
+    courier_phone: str
+
+
+class CreatedOrder(NamedTuple):
+    id: Optional[int]
+    product_name: str
+
+
+class OrderFeed(NamedTuple):
+    version: int   # с этого номера события читать в следующий раз
+    changes: list  # [(ключ, CourierOrder или None – заказ больше не свободен)]
+    more: bool     # прочитана не вся лента – запросить снова сразу
+
+
+class SalesDay(NamedTuple):
+    day: str        # ГГГГ-ММ-ДД
+    orders: int
+    units: int
+    revenue: Decimal
+
+
+class SalesByStatus(NamedTuple):
+    status: str
+    orders: int
+    units: int
+    revenue: Decimal
+
+
+class ProductSales(NamedTuple):
+    id: int
+    name: str       # пусто, если товар удалён
+    orders: int
+    units: int
+    revenue: Decimal
+
+
+class CourierSales(NamedTuple):
+    id: int
+    name: str
+    delivered: int
+    in_delivery: int
+    units: int
+    revenue: Decimal
+
+
+class SalesDashboard(NamedTuple):
+    date_from: date
+    date_to: date
+    by_day: list        # [SalesDay] – только дни с заказами
+    by_status: list     # [SalesByStatus]
+    top_products: list  # [ProductSales]
+    couriers: list      # [CourierSales]
+
+
+class ClientProfile(NamedTuple):
+    last_name: Optional[str]
+    first_name: Optional[str]
+    middle_name: Optional[str]
+    passport_series: Optional[str]
+    passport_number: Optional[str]
+    city: Optional[str]
+    street: Optional[str]
+    house: Optional[str]
+    flat: Optional[str]
+
+
+class CourierProfile(NamedTuple):
+    last_name: Optional[str]
+    first_name: Optional[str]
+    middle_name: Optional[str]
+    phone: Optional[str]
+    login: Optional[str]
+    email: Optional[str]
+
+
+# Статусы, в которых заказ ещё может взять курьер
+AVAILABLE_STATUSES = ("создан", "в обработке")
+
+
+# ---------- ПОСТРАНИЧНАЯ ВЫБОРКА ----------
+
+class PagedQuery:
+    """
+    Выборка, которую можно читать страницами (для virtual_tree.VirtualTree).
+
+    columns     – список выражений SELECT
+    from_clause – FROM ... JOIN ...
+    order_by    – список (выражение, по_убыванию); последнее выражение должно
+                  быть уникальным (первичный ключ), иначе переход «после строки»
+                  может пропустить или повторить записи
+    where       – условие без слова WHERE
+    params      – параметры from_clause и where в порядке их появления
+    row_type    – NamedTuple строки (по умолчанию – кортеж)
+
+    Ключ строки – значения order_by; они выбираются дополнительными столбцами
+    в конце SELECT и в строку row_type не попадают.
+
+    Соседние страницы читаются по ключу (WHERE ключ > ?), такой запрос идёт
+    по индексу и не зависит от глубины прокрутки; переход к произвольной
+    позиции полосы прокрутки – через OFFSET/FETCH.
+    """
+
+    def __init__(self, columns, from_clause, order_by, where="", params=(), row_type=None):
+        if not order_by:
+            raise ValueError("order_by не может быть пустым")
+        self.columns = columns
+        self.from_clause = from_clause
+        self.order_by = list(order_by)
+        self.where = where
+        self.params = tuple(params)
+        self.row_type = row_type
+
+    def _select(self, extra_where="", reverse=False):
+        keys = ", ".join(f"{expr} AS _k{i}" for i, (expr, _) in enumerate(self.order_by))
+        conditions = [f"({c})" for c in (self.where, extra_where) if c]
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = ", ".join(
+            f"{expr} {'DESC' if desc != reverse else 'ASC'}" for expr, desc in self.order_by
+        )
+        return f"SELECT {self.columns}, {keys} FROM {self.from_clause} {where} ORDER BY {order}"
+
+    def _seek(self, key, backward):
+        """
+        Условие «строка после key» (или до key) для составного ключа и параметры к нему.
+
+        Ключ сортировки может быть NULL: NULL меньше любого значения – так
+        сортируют и SQL Server, и SQLite (первыми по возрастанию, последними
+        по убыванию). Сравнения с NULL ложны, поэтому такие строки
+        описываются явным IS NULL / IS NOT NULL.
+        """
+        parts, params = [], []
+        for i, (expr, desc) in enumerate(self.order_by):
+            conditions, values = [], []
+            for (e, _), value in zip(self.order_by[:i], key):
+                if value is None:
+                    conditions.append(f"{e} IS NULL")
+                else:
+                    conditions.append(f"{e} = ?")
+                    values.append(value)
+            value = key[i]
+            if desc != backward:
+                # к меньшим значениям: NULL – после любого значения, после NULL – ничего
+                if value is None:
+                    continue
+                conditions.append(f"({expr} < ? OR {expr} IS NULL)")
+                values.append(value)
+            elif value is None:
+                conditions.append(f"{expr} IS NOT NULL")
+            else:
+                conditions.append(f"{expr} > ?")
+                values.append(value)
+            parts.append("(" + " AND ".join(conditions) + ")")
+            params.extend(values)
+        return " OR ".join(parts) or "1 = 0", params
+
+    def _fetch(self, sql, params):
+        n = len(self.order_by)
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        make = self.row_type or (lambda *values: values)
+        return [(tuple(row[-n:]), make(*row[:-n])) for row in rows]
+
+    def iter_batches(self, batch_size: int):
+        """
+        Вся выборка по порядку пачками по batch_size строк (без ключей).
+        Строки читаются одним запросом через fetchmany, поэтому в памяти
+        одновременно лежит только одна пачка; соединение занято, пока
+        генератор не исчерпан или не закрыт.
+        """
+        n = len(self.order_by)
+        make = self.row_type or (lambda *values: values)
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._select(), self.params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [make(*row[:-n]) for row in rows]
+
+    def count(self) -> int:
+        where = f"WHERE {self.where}" if self.where else ""
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM {self.from_clause} {where}", self.params)
+            return cursor.fetchone()[0]
+
+    def page(self, offset: int, limit: int) -> list:
+        """Строки с позиции offset: список (ключ, строка)."""
+        sql = self._select() + " OFFSET ? ROWS FETCH NEXT ? ROWS ONLY"
+        return self._fetch(sql, self.params + (offset, limit))
+
+    def page_after(self, key, limit: int) -> list:
+        """limit строк, следующих за строкой с ключом key."""
+        condition, params = self._seek(key, backward=False)
+        sql = self._select(condition) + " OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+        return self._fetch(sql, self.params + tuple(params) + (limit,))
+
+    def page_before(self, key, limit: int) -> list:
+        """limit строк перед строкой с ключом key (в обычном порядке)."""
+        condition, params = self._seek(key, backward=True)
+        sql = self._select(condition, reverse=True) + " OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+        rows = self._fetch(sql, self.params + tuple(params) + (limit,))
+        rows.reverse()
+        return rows
+
+
+# ---------- ПОЛЬЗОВАТЕЛИ ----------
+
+def get_user_by_login(login: str) -> Optional[UserAuth]:
+    """Пользователь с ID клиента / курьера (или None, если профиля нет)."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT U.ID_пользователя,
+                   U.Логин,
+                   U.Хеш_пароля,
+                   U.Роль,
+                   C.ID_Клиент,
+                   K.ID_курьера
+            FROM Пользователь AS U
+            LEFT JOIN Клиент AS C
+                   ON C.ID_пользователя = U.ID_пользователя
+            LEFT JOIN Курьер AS K
+                   ON K.ID_пользователя = U.ID_пользователя
+            WHERE U.Логин = ?
+            """,
+            (login,),
+        )
+        row = cursor.fetchone()
+    return UserAuth(*row) if row else None
+
+
+def create_default_admin(password_hash: bytes) -> bool:
+    """Создаёт admin, если в системе нет ни одного администратора."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Пользователь WHERE Роль = N'Администратор'")
+        if cursor.fetchone()[0]:
+            return False
+        cursor.execute("""
+                       INSERT INTO Пользователь
+                           (Логин, Хеш_пароля, Email, Роль, Дата_регистрации, Активен)
+                       VALUES (?, ?, ?, N'Администратор', SYSDATETIME(), 1)
+                       """, ("admin", password_hash, "admin@example.com"))
+    return True
+
+
+def register_user(login, password_hash, email, role, client=None, courier=None) -> int:
+    """
+    Регистрация пользователя вместе с профилем в одной транзакции.
+    client  – dict: last_name, first_name, middle_name, passport_series,
+              passport_number, city, street, house, flat
+    courier – dict: last_name, first_name, middle_name, phone
+    """
+    with connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO Пользователь
+                (Логин, Хеш_пароля, Email, Роль, Дата_регистрации, Активен)
+                OUTPUT INSERTED.ID_пользователя
+            VALUES (?, ?, ?, ?, GETDATE(), 1)
+            """,
+            (login, password_hash, email, role)
+        )
+        row = cur.fetchone()
+        if not row or row[0] is None:
+            raise ServiceError("Не удалось получить ID нового пользователя")
+        user_id = int(row[0])
+
+        if client is not None:
+            cur.execute(
+                """
+                INSERT INTO Клиент
+                (ID_пользователя, Фамилия, Имя, Отчество,
+                 Серия_паcпорта, Номер_паcпорта,
+                 Город, Улица, Дом, Квартира)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id, client["last_name"], client["first_name"], client["middle_name"],
+                    client["passport_series"], client["passport_number"],
+                    client["city"], client["street"], client["house"], client["flat"]
+                )
+            )
+        elif courier is not None:
+            cur.execute(
+                """
+                INSERT INTO Курьер
+                    (ID_пользователя, Фамилия, Имя, Отчество, Номер_телефона)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (user_id, courier["last_name"], courier["first_name"],
+                 courier["middle_name"], courier["phone"])
+            )
+    return user_id
+
+
+def list_admins() -> list:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+                       SELECT ID_пользователя, Логин, Email, Дата_регистрации, Активен
+                       FROM Пользователь
+                       WHERE Роль = N'Администратор'
+                       ORDER BY ID_пользователя
+                       """)
+        return [AdminAccount(*row) for row in cursor.fetchall()]
+
+
+def add_admin(login, password_hash, email):
+    with connection() as conn:
+        conn.cursor().execute("""
+                              INSERT INTO Пользователь
+                                  (Логин, Хеш_пароля, Email, Роль, Дата_регистрации, Активен)
+                              VALUES (?, ?, ?, N'Администратор', GETDATE(), 1)
+                              """, (login, password_hash, email))
+
+
+def add_user(login, password_hash, email, role, active):
+    with connection() as conn:
+        conn.cursor().execute("""
+                              INSERT INTO Пользователь (Логин, Хеш_пароля, Email, Роль, Активен, Дата_регистрации)
+                              VALUES (?, ?, ?, ?, ?, GETDATE())
+                              """, (login, password_hash, email, role, active))
+
+
+def update_user(user_id, email, role, active, password_hash=None):
+    """Обновить пользователя; пароль меняется, только если передан password_hash."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        if password_hash is not None:
+            cursor.execute("""
+                           UPDATE Пользователь
+                           SET Email      = ?,
+                               Роль       = ?,
+                               Активен    = ?,
+                               Хеш_пароля = ?
+                           WHERE ID_пользователя = ?
+                           """, (email, role, active, password_hash, user_id))
+        else:
+            cursor.execute("""
+                           UPDATE Пользователь
+                           SET Email   = ?,
+                               Роль    = ?,
+                               Активен = ?
+                           WHERE ID_пользователя = ?
+                           """, (email, role, active, user_id))
+
+
+# ---------- ТОВАРЫ ----------
+
+def catalog_query() -> PagedQuery:
+    """Товары в наличии для постраничного каталога (по номеру товара)."""
+    return PagedQuery(
+        "Номер_товара, Название, Цена, Количество", "Товар",
+        [("Номер_товара", False)], where="Количество > 0", row_type=Product,
+    )
+
+
+def list_products() -> list:
+    """
+    Товары в наличии для каталога – без изображений: они загружаются
+    отдельно и только для выбранного товара (image_cache.load_thumbnail).
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+                       SELECT Номер_товара, Название, Цена, Количество
+                       FROM Товар
+                       WHERE Количество > 0
+                       """)
+        return [Product(*row) for row in cursor.fetchall()]
+
+
+def get_product(product_id: int, with_image: bool = True) -> Optional[Product]:
+    with connection() as conn:
+        cursor = conn.cursor()
+        if with_image:
+            cursor.execute("""
+                           SELECT Номер_товара, Название, Цена, Количество, Изображение
+                           FROM Товар
+                           WHERE Номер_товара = ?
+                           """, (product_id,))
+        else:
+            cursor.execute("""
+                           SELECT Номер_товара, Название, Цена, Количество
+                           FROM Товар
+                           WHERE Номер_товара = ?
+                           """, (product_id,))
+        row = cursor.fetchone()
+    return Product(*row) if row else None
+
+
+def get_products(product_ids) -> dict:
+    """Товары (без изображений) по списку номеров: {номер: Product}."""
+    ids = list(dict.fromkeys(product_ids))
+    if not ids:
+        return {}
+    placeholders = ", ".join("?" * len(ids))
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+                       SELECT Номер_товара, Название, Цена, Количество
+                       FROM Товар
+                       WHERE Номер_товара IN ({placeholders})
+                       """, ids)
+        return {row[0]: Product(*row) for row in cursor.fetchall()}
+
+
+def get_product_image(product_id: int) -> Optional[bytes]:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT Изображение FROM Товар WHERE Номер_товара = ?",
+            (product_id,)
+        )
+        row = cursor.fetchone()
+    return bytes(row[0]) if row and row[0] else None
+
+
+def get_product_image_hash(product_id: int) -> Optional[str]:
+    """SHA-256 изображения (hex), посчитанный на сервере, – без передачи самого изображения."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT HASHBYTES('SHA2_256', Изображение) FROM Товар WHERE Номер_товара = ?",
+            (product_id,)
+        )
+        row = cursor.fetchone()
+    return bytes(row[0]).hex() if row and row[0] else None
+
+
+def get_product_thumbnail_hash(product_id: int, size: int) -> Optional[str]:
+    """Хеш исходного изображения (hex), если для товара сохранена миниатюра size."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT Хеш FROM Миниатюра_товара WHERE Номер_товара = ? AND Размер = ?",
+            (product_id, size)
+        )
+        row = cursor.fetchone()
+    return bytes(row[0]).hex() if row else None
+
+
+def get_product_thumbnail(product_id: int, size: int) -> Optional[ProductThumbnail]:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT Размер, Формат, Хеш, Данные
+            FROM Миниатюра_товара
+            WHERE Номер_товара = ? AND Размер = ?
+            """,
+            (product_id, size)
+        )
+        row = cursor.fetchone()
+    if not row:
+        return None
+    size, fmt, digest, data = row
+    return ProductThumbnail(size, fmt, bytes(digest), bytes(data))
+
+
+def _store_thumbnails(cursor, product_id, thumbnails):
+    cursor.execute("DELETE FROM Миниатюра_товара WHERE Номер_товара = ?", (product_id,))
+    if thumbnails:
+        cursor.executemany(
+            """
+            INSERT INTO Миниатюра_товара (Номер_товара, Размер, Формат, Хеш, Данные)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [(product_id, t.size, t.format, t.digest, t.data) for t in thumbnails],
+        )
+
+
+def save_product_thumbnails(product_id: int, thumbnails):
+    """
+    Сохранить миниатюры товара, добавленного до их появления.
+    Записываются, только если изображение товара всё ещё то, из которого
+    они построены (его могли заменить, пока миниатюры считались); при
+    другом изображении не удаляются и прежние миниатюры – они от нового.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        for t in thumbnails:
+            cursor.execute(
+                """
+                DELETE FROM Миниатюра_товара
+                WHERE Номер_товара = ? AND Размер = ?
+                  AND EXISTS (SELECT 1
+                              FROM Товар
+                              WHERE Номер_товара = ? AND HASHBYTES('SHA2_256', Изображение) = ?)
+                """,
+                (product_id, t.size, product_id, t.digest),
+            )
+            cursor.execute(
+                """
+                INSERT INTO Миниатюра_товара (Номер_товара, Размер, Формат, Хеш, Данные)
+                SELECT Номер_товара, ?, ?, ?, ?
+                FROM Товар
+                WHERE Номер_товара = ? AND HASHBYTES('SHA2_256', Изображение) = ?
+                """,
+                (t.size, t.format, t.digest, t.data, product_id, t.digest),
+            )
+
+
+def add_product(name, price, quantity, image=None, thumbnails=None) -> int:
+    """Добавить товар вместе с готовыми миниатюрами; возвращает номер товара."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO Товар (Название, Цена, Количество, Изображение)
+            OUTPUT INSERTED.Номер_товара
+            VALUES (?, ?, ?, ?)
+            """,
+            (name, price, quantity, image),
+        )
+        product_id = int(cursor.fetchone()[0])
+        if thumbnails:
+            _store_thumbnails(cursor, product_id, thumbnails)
+        _index_names(cursor, [(product_id, name)])
+    return product_id
+
+
+def update_product(product_id, name, price, quantity, image=None, thumbnails=None):
+    """
+    Обновить товар; изображение меняется, только если передано.
+    Вместе с новым изображением заменяются и миниатюры (старые удаляются всегда).
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        if image is not None:
+            _store_thumbnails(cursor, product_id, thumbnails)
+            cursor.execute(
+                """
+                UPDATE Товар
+                SET Название    = ?,
+                    Цена        = ?,
+                    Количество  = ?,
+                    Изображение = ?
+                WHERE Номер_товара = ?
+                """,
+                (name, price, quantity, image, product_id),
+            )
+        else:
+            cursor.execute(
+                """
+                UPDATE Товар
+                SET Название   = ?,
+                    Цена       = ?,
+                    Количество = ?
+                WHERE Номер_товара = ?
+                """,
+                (name, price, quantity, product_id),
+            )
+        _index_names(cursor, [(product_id, name)])
+
+
+# Сколько товаров вставляется одним INSERT: по 4 параметра на товар
+# при пределе SQL Server в 2100 параметров
+IMPORT_BATCH = 500
+
+
+def get_import_position(import_key: str) -> int:
+    """Сколько строк файла импорта уже обработано (0 – импорт не начинался)."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT Строка FROM Импорт_товаров WHERE Ключ = ?", (import_key,))
+        row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+def import_products(products, import_key: str, position: int) -> list:
+    """
+    Добавить пачку товаров [NewProduct, ...] одной транзакцией и отметить,
+    что строки файла импорта до position обработаны (пачка может быть
+    пустой, если все её строки отклонены).
+
+    Товары вставляются одним INSERT ... SELECT на каждые IMPORT_BATCH
+    штук, миниатюры и поисковый индекс – через executemany. Строки OUTPUT
+    приходят в любом порядке, но номера IDENTITY при INSERT ... SELECT ...
+    ORDER BY выдаются по возрастанию в порядке ORDER BY, поэтому
+    отсортированные номера сопоставляются с товарами по позиции – названия
+    в пачке могут повторяться. Возвращает номера добавленных товаров
+    в порядке products.
+    """
+    ids = []
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.fast_executemany = True
+        for i in range(0, len(products), IMPORT_BATCH):
+            chunk = products[i:i + IMPORT_BATCH]
+            # позиция в пачке – литерал, чтобы не тратить на неё параметры;
+            # CAST: в конструкторе VALUES тип NULL-изображения не выводится из столбца
+            values = ", ".join(f"({n}, ?, ?, ?, CAST(? AS VARBINARY(MAX)))" for n in range(len(chunk)))
+            cursor.execute(
+                f"""
+                INSERT INTO Товар (Название, Цена, Количество, Изображение)
+                OUTPUT INSERTED.Номер_товара
+                SELECT Название, Цена, Количество, Изображение
+                FROM (VALUES {values}) AS Пачка (Позиция, Название, Цена, Количество, Изображение)
+                ORDER BY Позиция
+                """,
+                [v for p in chunk for v in (p.name, p.price, p.quantity, p.image)],
+            )
+            ids.extend(sorted(int(row[0]) for row in cursor.fetchall()))
+
+        thumbnails = [(product_id, t.size, t.format, t.digest, t.data)
+                      for product_id, p in zip(ids, products) for t in p.thumbnails]
+        if thumbnails:
+            cursor.executemany(
+                """
+                INSERT INTO Миниатюра_товара (Номер_товара, Размер, Формат, Хеш, Данные)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                thumbnails,
+            )
+        if products:
+            _index_names(cursor, [(product_id, p.name) for product_id, p in zip(ids, products)])
+
+        cursor.execute(
+            "UPDATE Импорт_товаров SET Строка = ?, Дата = SYSDATETIME() WHERE Ключ = ?",
+            (position, import_key),
+        )
+        if cursor.rowcount == 0:
+            cursor.execute(
+                "INSERT INTO Импорт_товаров (Ключ, Строка) VALUES (?, ?)",
+                (import_key, position),
+            )
+    return ids
+
+
+# ---------- ПОИСК ПО КАТАЛОГУ ----------
+
+SEARCH_INDEX_BATCH = 1000
+
+
+def _index_names(cursor, products):
+    """Перестроить поисковый индекс для [(номер_товара, название), ...]."""
+    ids = [(product_id,) for product_id, _ in products]
+    cursor.executemany("DELETE FROM Триграмма_товара WHERE Номер_товара = ?", ids)
+    cursor.executemany("DELETE FROM Поиск_товара WHERE Номер_товара = ?", ids)
+    cursor.executemany(
+        "INSERT INTO Поиск_товара (Номер_товара, Название, Норм_название) VALUES (?, ?, ?)",
+        [(product_id, name, text_search.normalize(name)) for product_id, name in products],
+    )
+    # в порядке первичного ключа вставка в индекс заметно быстрее
+    cursor.executemany(
+        "INSERT INTO Триграмма_товара (Триграмма, Номер_товара) VALUES (?, ?)",
+        sorted((t, product_id) for product_id, name in products
+               for t in text_search.name_trigrams(name)),
+    )
+
+
+def refresh_search_index(batch_size: int = SEARCH_INDEX_BATCH) -> int:
+    """
+    Проиндексировать товары без записи в индексе или переименованные в обход
+    приложения. Возвращает число обработанных товаров.
+    """
+    done = 0
+    while True:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.fast_executemany = True
+            cursor.execute(
+                """
+                SELECT T.Номер_товара, T.Название
+                FROM Товар T
+                         LEFT JOIN Поиск_товара P ON P.Номер_товара = T.Номер_товара
+                WHERE P.Номер_товара IS NULL
+                   OR P.Название <> T.Название
+                ORDER BY T.Номер_товара
+                OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+                """,
+                (batch_size,),
+            )
+            products = [(int(pid), name) for pid, name in cursor.fetchall()]
+            if products:
+                _index_names(cursor, products)
+        done += len(products)
+        if len(products) < batch_size:
+            return done
+
+
+def search_products_query(text: str) -> Optional[PagedQuery]:
+    """
+    Товары в наличии, в названии которых есть все слова запроса (как начало
+    или часть слова). None – пустой запрос.
+
+    Кандидаты выбираются по индексу Триграмма_товара, где регистр и «ё»
+    нормализованы заранее (text_search), и среди них каждое слово
+    проверяется через LIKE по нормализованному названию – триграммы слова
+    могут найтись в разных словах названия. Запрос только из слов в одну-две
+    буквы просматривает Поиск_товара целиком. Сверху – названия, которые
+    начинаются с запроса, затем те, где с него начинается какое-то слово,
+    затем остальные; внутри – более короткие названия.
+    """
+    trigrams, words = text_search.split_query(text)
+    if not words:
+        return None
+    trigrams, words = sorted(trigrams), sorted(words)
+    normalized = text_search.normalize(text)
+    conditions, params = [], []
+    if trigrams:
+        conditions.append(f"""P.Номер_товара IN (SELECT g.Номер_товара
+                                        FROM Триграмма_товара g
+                                        WHERE g.Триграмма IN ({", ".join("?" * len(trigrams))})
+                                        GROUP BY g.Номер_товара
+                                        HAVING COUNT(*) = ?)""")
+        params += [*trigrams, len(trigrams)]
+    for word in words:
+        conditions.append("P.Норм_название LIKE ?")
+        params.append(f"%{word}%")
+    from_clause = f"""
+        (SELECT P.Номер_товара,
+                CASE
+                    WHEN P.Норм_название LIKE ? THEN 0
+                    WHEN P.Норм_название LIKE ? THEN 1
+                    ELSE 2
+                    END AS Ранг
+         FROM Поиск_товара P
+         WHERE {" AND ".join(conditions)}) m
+            JOIN Товар T ON T.Номер_товара = m.Номер_товара
+    """
+    return PagedQuery(
+        "T.Номер_товара, T.Название, T.Цена, T.Количество", from_clause,
+        [("m.Ранг", False), ("LEN(T.Название)", False), ("T.Номер_товара", False)],
+        where="T.Количество > 0",
+        params=(normalized + "%", "% " + normalized + "%", *params),
+        row_type=Product,
+    )
+
+
+# ---------- ЗАКАЗЫ: КЛИЕНТ ----------
+
+# Сколько позиций корзины уходит в один запрос: SQL Server принимает
+# не больше 2100 параметров (резерв остатков – 5 на товар)
+CHECKOUT_BATCH = 400
+
+
+def _reserve_stock(cursor, quantities) -> dict:
+    """
+    Списать остатки {номер_товара: количество} одним UPDATE.
+    Условие Количество >= заказанного проверяется в том же операторе, что
+    и списание, поэтому параллельное оформление не уведёт остаток в минус.
+    Возвращает {номер_товара: название}; при нехватке – ServiceError
+    (транзакцию откатывает вызывающий).
+    """
+    ids = list(quantities)
+    case = " ".join("WHEN ? THEN ?" for _ in ids)
+    pairs = [v for prod_id in ids for v in (prod_id, quantities[prod_id])]
+    marks = ", ".join("?" * len(ids))
+    cursor.execute(
+        f"""
+        UPDATE Товар
+        SET Количество = Количество - CASE Номер_товара {case} END
+        OUTPUT INSERTED.Номер_товара, INSERTED.Название
+        WHERE Номер_товара IN ({marks})
+          AND Количество >= CASE Номер_товара {case} END
+        """,
+        (*pairs, *ids, *pairs),
+    )
+    names = {int(prod_id): name for prod_id, name in cursor.fetchall()}
+    if len(names) == len(ids):
+        return names
+
+    # Что-то не списалось – выясняем, что именно, для сообщения пользователю
+    missing = [prod_id for prod_id in ids if prod_id not in names]
+    cursor.execute(
+        f"""
+        SELECT Номер_товара, Название, Количество
+        FROM Товар
+        WHERE Номер_товара IN ({", ".join("?" * len(missing))})
+        """,
+        missing,
+    )
+    found = {int(row[0]): row for row in cursor.fetchall()}
+    for prod_id in missing:
+        if prod_id not in found:
+            raise NotFoundError(f"Товар с ID {prod_id} не найден")
+        _, prod_name, available_qty = found[prod_id]
+        raise ConflictError(
+            f"Товара '{prod_name}' недостаточно в наличии.\n"
+            f"Заказано: {quantities[prod_id]}, в наличии: {available_qty}"
+        )
+
+
+def create_orders(payment_id: int, cart) -> list:
+    """
+    Оформить корзину [(номер_товара, количество), ...]: по заказу на позицию.
+
+    Одна транзакция из трёх запросов (на каждые CHECKOUT_BATCH позиций):
+    списание остатков всей корзины, вставка всех заказов одним
+    INSERT ... VALUES (...), (...) с OUTPUT номеров заказов и запись их
+    в ленту изменений.
+    Возвращает список CreatedOrder; при нехватке товара – ServiceError,
+    и ничего не списывается.
+    """
+    cart = [(int(prod_id), int(qty)) for prod_id, qty in cart]
+    if not cart:
+        return []
+    quantities = {}
+    for prod_id, qty in cart:
+        quantities[prod_id] = quantities.get(prod_id, 0) + qty
+
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    with connection() as conn:
+        cursor = conn.cursor()
+
+        names = {}
+        ids = list(quantities)
+        for i in range(0, len(ids), CHECKOUT_BATCH):
+            chunk = {prod_id: quantities[prod_id] for prod_id in ids[i:i + CHECKOUT_BATCH]}
+            names.update(_reserve_stock(cursor, chunk))
+
+        created = []
+        for i in range(0, len(cart), CHECKOUT_BATCH):
+            chunk = cart[i:i + CHECKOUT_BATCH]
+            values = ", ".join("(?, ?, ?, N'создан', ?)" for _ in chunk)
+            cursor.execute(
+                f"""
+                INSERT INTO Заказ (ID_данные, Номер_товара,
+                                   Количество_заказанного_товара, Статус, Дата_заказа)
+                OUTPUT INSERTED.ID_заказа, INSERTED.Номер_товара
+                VALUES {values}
+                """,
+                [v for prod_id, qty in chunk for v in (payment_id, prod_id, qty, current_date)],
+            )
+            # порядок строк OUTPUT не гарантирован – название берём по номеру товара
+            batch = [CreatedOrder(int(order_id), names[int(prod_id)])
+                     for order_id, prod_id in cursor.fetchall()]
+            _log_order_events(cursor, [order.id for order in batch])
+            created.extend(batch)
+    created.sort(key=lambda order: order.id)
+    return created
+
+
+def list_client_orders(client_id: int) -> list:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+                       SELECT Z.ID_заказа,
+                              CONVERT(varchar (10), Z.Дата_заказа, 120),
+                              Z.Статус,
+                              T.Название,
+                              Z.Количество_заказанного_товара,
+                              T.Цена,
+                              (Z.Количество_заказанного_товара * T.Цена) as Сумма
+                       FROM Заказ Z
+                                JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
+                                JOIN Товар T ON Z.Номер_товара = T.Номер_товара
+                       WHERE P.ID_Клиента = ?
+                       ORDER BY Z.Дата_заказа DESC, Z.ID_заказа DESC
+                       """, (client_id,))
+        return [ClientOrder(*row) for row in cursor.fetchall()]
+
+
+def get_client_order_details(order_id: int) -> Optional[ClientOrderDetails]:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+                       SELECT Z.ID_заказа,
+                              Z.Статус,
+                              T.Название,
+                              Z.Количество_заказанного_товара,
+                              T.Цена,
+                              CONVERT(varchar (10), Z.Дата_заказа, 120),
+                              C.Фамилия,
+                              C.Имя,
+                              C.Отчество,
+                              C.Город,
+                              C.Улица,
+                              C.Дом,
+                              C.Квартира,
+                              P.Номер_карты,
+                              CONVERT(varchar (10), P.Срок_действия, 120)
+                       FROM Заказ Z
+                                JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
+                                JOIN Клиент C ON P.ID_Клиента = C.ID_Клиент
+                                JOIN Товар T ON Z.Номер_товара = T.Номер_товара
+                       WHERE Z.ID_заказа = ?
+                       """, (order_id,))
+        row = cursor.fetchone()
+    return ClientOrderDetails(*row) if row else None
+
+
+# ---------- ЗАКАЗЫ: КУРЬЕР ----------
+
+_COURIER_ORDER_COLUMNS = """
+           Z.ID_заказа,
+           CONVERT(varchar (10), Z.Дата_заказа, 104)                                               as Дата,
+           Z.Статус,
+           C.Фамилия + ' ' + C.Имя                                                                 as Клиент,
+           T.Название                                                                              as Товар,
+           Z.Количество_заказанного_товара                                                         as Количество,
+           CONVERT(varchar (20), CAST(T.Цена * Z.Количество_заказанного_товара AS DECIMAL(10, 2))) as Сумма
+"""
+
+_COURIER_ORDER_FROM = """
+    Заказ Z
+             JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
+             JOIN Клиент C ON P.ID_Клиента = C.ID_Клиент
+             JOIN Товар T ON Z.Номер_товара = T.Номер_товара
+"""
+
+_COURIER_ORDERS_SQL = f"SELECT {_COURIER_ORDER_COLUMNS} FROM {_COURIER_ORDER_FROM}"
+
+_AVAILABLE_WHERE = "Z.ID_курьера IS NULL AND Z.Статус IN (N'создан', N'в обработке')"
+
+
+def list_available_orders() -> list:
+    """Свободные заказы, которые курьер может взять в работу."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            _COURIER_ORDERS_SQL + f"""
+            WHERE {_AVAILABLE_WHERE}
+            ORDER BY Z.Дата_заказа ASC
+            """
+        )
+        return [CourierOrder(*row) for row in cursor.fetchall()]
+
+
+def list_courier_orders(courier_id: int) -> list:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            _COURIER_ORDERS_SQL + """
+            WHERE Z.ID_курьера = ?
+            ORDER BY Z.Дата_заказа DESC
+            """,
+            (courier_id,),
+        )
+        return [CourierOrder(*row) for row in cursor.fetchall()]
+
+
+# Номер заказа растёт вместе с датой оформления, поэтому постраничные списки
+# упорядочены по ID_заказа – это уникальный ключ с индексом
+def available_orders_query() -> PagedQuery:
+    """Свободные заказы для постраничного списка курьера (старые сверху)."""
+    return PagedQuery(
+        _COURIER_ORDER_COLUMNS, _COURIER_ORDER_FROM,
+        [("Z.ID_заказа", False)], where=_AVAILABLE_WHERE, row_type=CourierOrder,
+    )
+
+
+def courier_orders_query(courier_id: int) -> PagedQuery:
+    """Заказы курьера для постраничного списка (новые сверху)."""
+    return PagedQuery(
+        _COURIER_ORDER_COLUMNS, _COURIER_ORDER_FROM,
+        [("Z.ID_заказа", True)], where="Z.ID_курьера = ?", params=(courier_id,),
+        row_type=CourierOrder,
+    )
+
+
+def get_courier_order_details(order_id: int) -> Optional[CourierOrderDetails]:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT Z.ID_заказа,
+                   Z.Статус,
+                   Z.Количество_заказанного_товара,
+                   CONVERT(varchar (19), Z.Дата_заказа, 120)                                 as Дата_заказа,
+
+                   -- Информация о клиенте
+                   C.Фамилия + ' ' + C.Имя + ' ' + ISNULL(C.Отчество, '')                    as Клиент_ФИО,
+                   C.Город + ', ' + C.Улица + N', д. ' + C.Дом
+                   + N', кв. ' + C.Квартира                                                   as Адрес,
+
+                   -- Информация о товаре
+                   T.Название                                                                as Товар,
+                   CONVERT(varchar (20), T.Цена)                                             as Цена_за_единицу,
+
+                   -- Расчет суммы
+                   CONVERT(varchar (20),
+                           CAST(T.Цена * Z.Количество_заказанного_товара AS DECIMAL(10, 2))) as Общая_сумма,
+
+                   -- Курьер (если есть)
+                   ISNULL(K.Фамилия + ' ' + K.Имя, 'Не назначен')                            as Курьер,
+                   ISNULL(K.Номер_телефона, '')                                              as Телефон_курьера
+
+            FROM Заказ Z
+                     JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
+                     JOIN Клиент C ON P.ID_Клиента = C.ID_Клиент
+                     JOIN Товар T ON Z.Номер_товара = T.Номер_товара
+                     LEFT JOIN Курьер K ON Z.ID_курьера = K.ID_курьера
+            WHERE Z.ID_заказа = ?
+            """,
+            (order_id,),
+        )
+        row = cursor.fetchone()
+    return CourierOrderDetails(*row) if row else None
+
+
+def take_order(order_id: int, courier_id: int):
+    """
+    Курьер берёт свободный заказ в работу.
+
+    Захват – один условный UPDATE: заказ достаётся тому, чей оператор первым
+    изменил строку, остальные получают rowcount = 0 и ConflictError.
+    Причина отказа уточняется отдельным запросом только при проигрыше.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE Заказ
+            SET ID_курьера = ?,
+                Статус     = N'у курьера'
+            WHERE ID_заказа = ?
+              AND ID_курьера IS NULL
+              AND Статус IN (N'создан', N'в обработке')
+            """,
+            (courier_id, order_id),
+        )
+        if cursor.rowcount == 1:
+            _log_order_events(cursor, [order_id])
+            return
+
+        cursor.execute(
+            """
+            SELECT Статус, ID_курьера
+            FROM Заказ
+            WHERE ID_заказа = ?
+            """,
+            (order_id,),
+        )
+        order_info = cursor.fetchone()
+    if not order_info:
+        raise NotFoundError(f"Заказ №{order_id} не найден")
+    status, current_courier = order_info
+    if current_courier is not None:
+        raise ConflictError("Этот заказ уже взят другим курьером")
+    raise ConflictError(f"Заказ имеет статус '{status}', взять нельзя")
+
+
+def change_courier_order_status(order_id: int, courier_id: int, new_status: str):
+    """Курьер меняет статус своего заказа; доставленный заказ не меняется."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT Статус
+            FROM Заказ
+            WHERE ID_заказа = ?
+              AND ID_курьера = ?
+            """,
+            (order_id, courier_id),
+        )
+        result = cursor.fetchone()
+        if not result:
+            raise NotFoundError("Заказ не найден или не принадлежит вам")
+
+        if result[0] == "доставлен" and new_status != "доставлен":
+            raise ConflictError("Доставленный заказ нельзя изменить")
+
+        cursor.execute(
+            """
+            UPDATE Заказ
+            SET Статус = ?
+            WHERE ID_заказа = ?
+              AND ID_курьера = ?
+            """,
+            (new_status, order_id, courier_id),
+        )
+        _log_order_events(cursor, [order_id])
+
+
+def set_order_status(order_id: int, status: str):
+    """Смена статуса заказа администратором."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+                       UPDATE Заказ
+                       SET Статус = ?
+                       WHERE ID_заказа = ?
+                       """, (status, order_id))
+        if cursor.rowcount:
+            _log_order_events(cursor, [order_id])
+
+
+# ---------- ЛЕНТА ИЗМЕНЕНИЙ ЗАКАЗОВ ----------
+#
+# Каждое изменение заказа добавляет строку в Событие_заказа в той же
+# транзакции. Окно курьера помнит номер последнего прочитанного события и
+# периодически спрашивает только новые: пустой опрос – поиск по концу
+# кластерного ключа, а не соединение четырёх таблиц по всем свободным заказам.
+#
+# Номера событий выдаются при вставке, а видны – после фиксации, поэтому
+# событие с меньшим номером может появиться позже большего. Версия
+# сдвигается только за события старше ORDER_FEED_SETTLE_SECONDS; более
+# свежие перечитываются при следующем опросе (применять их повторно безопасно).
+
+ORDER_FEED_SETTLE_SECONDS = 5
+ORDER_FEED_BATCH = 500
+# События старше срока и уже учтённые сводками удаляются (prune_order_events).
+# Окна курьеров опрашивают ленту каждые несколько секунд – срок с большим запасом
+ORDER_EVENTS_RETENTION_DAYS = 7
+ORDER_EVENTS_PRUNE_BATCH = 5000
+
+
+def _log_order_events(cursor, order_ids):
+    """Записать в ленту изменения заказов (в транзакции вызывающего)."""
+    if order_ids:
+        cursor.execute(
+            f"INSERT INTO Событие_заказа (ID_заказа) VALUES {', '.join('(?)' for _ in order_ids)}",
+            list(order_ids),
+        )
+
+
+def order_feed_version() -> int:
+    """Номер последнего события – с него окно начинает следить за лентой."""
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT ISNULL(MAX(ID_события), 0) FROM Событие_заказа")
+        return int(cursor.fetchone()[0])
+
+
+def _read_order_events(cursor, since, limit):
+    """
+    До limit событий ленты после since: ([(ID_события, ID_заказа), ...], версия).
+    Версия сдвигается только за события старше ORDER_FEED_SETTLE_SECONDS –
+    общее правило для окон курьеров и сводок продаж.
+    """
+    cursor.execute(
+        """
+        SELECT ID_события,
+               ID_заказа,
+               CASE WHEN Дата <= DATEADD(SECOND, -?, SYSDATETIME()) THEN 1 ELSE 0 END
+        FROM Событие_заказа
+        WHERE ID_события > ?
+        ORDER BY ID_события
+        OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+        """,
+        (ORDER_FEED_SETTLE_SECONDS, since, limit),
+    )
+    events, version, settled = [], since, True
+    for event_id, order_id, old_enough in cursor.fetchall():
+        settled = settled and bool(old_enough)
+        if settled:
+            version = int(event_id)
+        events.append((int(event_id), int(order_id)))
+    return events, version
+
+
+def prune_order_events(retention_days: int = ORDER_EVENTS_RETENTION_DAYS,
+                       batch_size: int = ORDER_EVENTS_PRUNE_BATCH) -> int:
+    """
+    Удалить начало ленты: события старше retention_days дней, которые уже
+    учтены всеми сводками (не новее наименьшей отметки в Отметка_сводки).
+    Каждая пачка – отдельная транзакция. Возвращает число удалённых событий.
+    """
+    deleted = 0
+    while True:
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT ID_события,
+                       CASE WHEN Дата < DATEADD(DAY, -?, SYSDATETIME()) THEN 1 ELSE 0 END
+                FROM Событие_заказа
+                WHERE ID_события <= (SELECT ISNULL(MIN(ID_события), 0) FROM Отметка_сводки)
+                ORDER BY ID_события
+                OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+                """,
+                (retention_days, batch_size),
+            )
+            events = cursor.fetchall()
+            # удаляется только начало ленты – до первого события моложе срока
+            border = None
+            for event_id, old_enough in events:
+                if not old_enough:
+                    break
+                border = int(event_id)
+            if border is None:
+                return deleted
+            cursor.execute("DELETE FROM Событие_заказа WHERE ID_события <= ?", (border,))
+            deleted += cursor.rowcount
+        if border != int(events[-1][0]) or len(events) < batch_size:
+            return deleted
+
+
+def available_order_changes(since: int, limit: int = ORDER_FEED_BATCH) -> OrderFeed:
+    """
+    Изменения списка свободных заказов после события since.
+
+    Для каждого затронутого заказа возвращается его текущая строка, если он
+    по-прежнему свободен, иначе None. Ключ – как у available_orders_query().
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        events, version = _read_order_events(cursor, since, limit)
+        order_ids = list(dict.fromkeys(order_id for _, order_id in events))
+
+        rows = {}
+        for i in range(0, len(order_ids), CHECKOUT_BATCH):
+            chunk = order_ids[i:i + CHECKOUT_BATCH]
+            cursor.execute(
+                _COURIER_ORDERS_SQL + f"""
+                WHERE Z.ID_заказа IN ({", ".join("?" * len(chunk))})
+                  AND {_AVAILABLE_WHERE}
+                """,
+                chunk,
+            )
+            rows.update((row[0], CourierOrder(*row)) for row in cursor.fetchall())
+
+    changes = [((order_id,), rows.get(order_id)) for order_id in order_ids]
+    return OrderFeed(version, changes, len(events) == limit and version > since)
+
+
+# ---------- СВОДКИ ПРОДАЖ ----------
+#
+# Отчёты админ-панели читают не Заказ ⋈ Товар, а дневные сводки: по дню и
+# статусу, по дню и товару, по дню, курьеру и статусу. Их размер зависит от
+# числа дней, товаров и курьеров, но не от истории заказов.
+#
+# Сводки обновляются по ленте изменений заказов (Событие_заказа): для
+# каждого изменённого заказа из сводок вычитается вклад, записанный в
+# Учёт_заказа при прошлом учёте, и прибавляется текущий. Поэтому повторный
+# учёт того же заказа ничего не меняет, а отметка (последнее учтённое
+# событие) сдвигается по тем же правилам, что и в окнах курьеров.
+# Выручка заказа фиксируется по цене товара на момент первого учёта –
+# в самом заказе цена не хранится.
+
+SALES_ROLLUP = "Продажи"
+ROLLUP_NOT_BUILT = -1  # отметка до первого построения (строка создаётся схемой)
+SALES_EVENTS_BATCH = 5000
+SALES_TOP_PRODUCTS = 10
+CANCELLED_STATUS = "отменен"
+
+# (таблица, колонки ключа после День)
+_SALES_ROLLUPS = {
+    "day": ("Сводка_продаж_день", ("Статус",)),
+    "product": ("Сводка_продаж_товар", ("Номер_товара",)),
+    "courier": ("Сводка_продаж_курьер", ("ID_курьера", "Статус")),
+}
+
+
+def _sales_contributions(entry):
+    """Вклад учтённого заказа (день, товар, курьер, статус, количество, сумма) в сводки."""
+    day, product_id, courier_id, status, quantity, amount = entry
+    yield "day", (day, status), quantity, amount
+    if status != CANCELLED_STATUS:
+        yield "product", (day, product_id), quantity, amount
+    if courier_id is not None:
+        yield "courier", (day, courier_id, status), quantity, amount
+
+
+def _apply_sales_deltas(cursor, rollup, deltas):
+    """Прибавить {ключ: [заказов, единиц, выручка]} к сводке; нулевые строки удаляются."""
+    deltas = {key: d for key, d in deltas.items() if d[0] or d[1] or d[2]}
+    if not deltas:
+        return
+    table, key_columns = _SALES_ROLLUPS[rollup]
+    columns = ("День",) + key_columns
+    days = sorted({key[0] for key in deltas})
+    marks = ", ".join("?" * len(days))
+    cursor.execute(
+        f"""
+        SELECT CONVERT(varchar (10), День, 120), {", ".join(key_columns)}
+        FROM {table}
+        WHERE День IN ({marks})
+        """,
+        days,
+    )
+    existing = {tuple(row) for row in cursor.fetchall()}
+
+    where = " AND ".join(f"{column} = ?" for column in columns)
+    updates = [(*d, *key) for key, d in deltas.items() if key in existing]
+    inserts = [(*key, *d) for key, d in deltas.items() if key not in existing]
+    if updates:
+        cursor.executemany(
+            f"""
+            UPDATE {table}
+            SET Заказов = Заказов + ?,
+                Единиц  = Единиц + ?,
+                Выручка = Выручка + ?
+            WHERE {where}
+            """,
+            updates,
+        )
+    if inserts:
+        cursor.executemany(
+            f"""
+            INSERT INTO {table} ({", ".join(columns)}, Заказов, Единиц, Выручка)
+            VALUES ({", ".join("?" * (len(columns) + 3))})
+            """,
+            inserts,
+        )
+    cursor.execute(f"DELETE FROM {table} WHERE День IN ({marks}) AND Заказов = 0", days)
+
+
+def _recount_orders(cursor, order_ids):
+    """Переучесть заказы в сводках (в транзакции вызывающего)."""
+    marks = ", ".join("?" * len(order_ids))
+    cursor.execute(
+        f"""
+        SELECT ID_заказа, CONVERT(varchar (10), День, 120), Номер_товара, ID_курьера,
+               Статус, Количество, Сумма
+        FROM Учёт_заказа
+        WHERE ID_заказа IN ({marks})
+        """,
+        order_ids,
+    )
+    counted = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+    cursor.execute(
+        f"""
+        SELECT Z.ID_заказа, CONVERT(varchar (10), Z.Дата_заказа, 120), Z.Номер_товара,
+               Z.ID_курьера, Z.Статус, Z.Количество_заказанного_товара, T.Цена
+        FROM Заказ Z
+                 JOIN Товар T ON T.Номер_товара = Z.Номер_товара
+        WHERE Z.ID_заказа IN ({marks})
+        """,
+        order_ids,
+    )
+    current = {}
+    for order_id, day, product_id, courier_id, status, quantity, price in cursor.fetchall():
+        if day is None:
+            continue  # заказ без даты в сводки по дням не попадает
+        old = counted.get(order_id)
+        if old is not None and old[1] == product_id and old[4] == quantity:
+            amount = Decimal(str(old[5]))
+        else:
+            amount = (Decimal(str(price)) * quantity).quantize(Decimal("0.01"))
+        current[order_id] = (day, product_id, courier_id, status, quantity, amount)
+
+    deltas = {rollup: {} for rollup in _SALES_ROLLUPS}
+    changed = []
+    for order_id in order_ids:
+        old, new = counted.get(order_id), current.get(order_id)
+        if old is not None:
+            old = old[:5] + (Decimal(str(old[5])),)
+        if old == new:
+            continue
+        changed.append(order_id)
+        for entry, sign in ((old, -1), (new, 1)):
+            if entry is None:
+                continue
+            for rollup, key, quantity, amount in _sales_contributions(entry):
+                d = deltas[rollup].setdefault(key, [0, 0, Decimal(0)])
+                d[0] += sign
+                d[1] += sign * quantity
+                d[2] += sign * amount
+    if not changed:
+        return 0
+
+    for rollup, rollup_deltas in deltas.items():
+        _apply_sales_deltas(cursor, rollup, rollup_deltas)
+    marks = ", ".join("?" * len(changed))
+    cursor.execute(f"DELETE FROM Учёт_заказа WHERE ID_заказа IN ({marks})", changed)
+    rows = [(order_id, *current[order_id]) for order_id in changed if order_id in current]
+    if rows:
+        cursor.executemany(
+            """
+            INSERT INTO Учёт_заказа (ID_заказа, День, Номер_товара, ID_курьера,
+                                     Статус, Количество, Сумма)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+    return len(changed)
+
+
+def _settled_event_version(cursor):
+    """Номер последнего события, после которого все события старше ORDER_FEED_SETTLE_SECONDS."""
+    cursor.execute(
+        """
+        SELECT ISNULL(MIN(ID_события) - 1, (SELECT ISNULL(MAX(ID_события), 0) FROM Событие_заказа))
+        FROM Событие_заказа
+        WHERE Дата > DATEADD(SECOND, -?, SYSDATETIME())
+        """,
+        (ORDER_FEED_SETTLE_SECONDS,),
+    )
+    return int(cursor.fetchone()[0])
+
+
+def _build_sales_rollups(cursor):
+    """Первое построение сводок по всей истории заказов – несколькими INSERT ... SELECT."""
+    version = _settled_event_version(cursor)
+    for table in ("Учёт_заказа",) + tuple(table for table, _ in _SALES_ROLLUPS.values()):
+        cursor.execute(f"DELETE FROM {table}")
+    cursor.execute(
+        """
+        INSERT INTO Учёт_заказа (ID_заказа, День, Номер_товара, ID_курьера,
+                                 Статус, Количество, Сумма)
+        SELECT Z.ID_заказа, CAST(Z.Дата_заказа AS DATE), Z.Номер_товара, Z.ID_курьера,
+               Z.Статус, Z.Количество_заказанного_товара,
+               CAST(T.Цена * Z.Количество_заказанного_товара AS DECIMAL(12, 2))
+        FROM Заказ Z
+                 JOIN Товар T ON T.Номер_товара = Z.Номер_товара
+        WHERE Z.Дата_заказа IS NOT NULL
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO Сводка_продаж_день (День, Статус, Заказов, Единиц, Выручка)
+        SELECT День, Статус, COUNT(*), SUM(Количество), SUM(Сумма)
+        FROM Учёт_заказа
+        GROUP BY День, Статус
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO Сводка_продаж_товар (День, Номер_товара, Заказов, Единиц, Выручка)
+        SELECT День, Номер_товара, COUNT(*), SUM(Количество), SUM(Сумма)
+        FROM Учёт_заказа
+        WHERE Статус <> ?
+        GROUP BY День, Номер_товара
+        """,
+        (CANCELLED_STATUS,),
+    )
+    cursor.execute(
+        """
+        INSERT INTO Сводка_продаж_курьер (День, ID_курьера, Статус, Заказов, Единиц, Выручка)
+        SELECT День, ID_курьера, Статус, COUNT(*), SUM(Количество), SUM(Сумма)
+        FROM Учёт_заказа
+        WHERE ID_курьера IS NOT NULL
+        GROUP BY День, ID_курьера, Статус
+        """
+    )
+    cursor.execute("UPDATE Отметка_сводки SET ID_события = ? WHERE Сводка = ?",
+                   (version, SALES_ROLLUP))
+
+
+def refresh_sales_rollups(batch_size: int = SALES_EVENTS_BATCH) -> int:
+    """
+    Учесть в сводках заказы, изменённые после отметки; при первом вызове –
+    построить сводки по всей истории. Каждая пачка событий – одна
+    транзакция вместе с отметкой. Затем учтённое начало ленты удаляется
+    (prune_order_events). Возвращает число переучтённых заказов.
+    """
+    recounted = _catch_up_sales_rollups(batch_size)
+    prune_order_events()
+    return recounted
+
+
+def _catch_up_sales_rollups(batch_size):
+    recounted = 0
+    while True:
+        with connection() as conn:
+            cursor = conn.cursor()
+            # блокировка строки отметки: два окна не учтут одно изменение дважды
+            # и не построят сводки одновременно – второе дождётся первого
+            cursor.execute("UPDATE Отметка_сводки SET ID_события = ID_события WHERE Сводка = ?",
+                           (SALES_ROLLUP,))
+            if cursor.rowcount == 0:
+                raise ServiceError("Нет отметки сводок продаж: схема базы не обновлена")
+            cursor.execute("SELECT ID_события FROM Отметка_сводки WHERE Сводка = ?", (SALES_ROLLUP,))
+            since = int(cursor.fetchone()[0])
+            if since == ROLLUP_NOT_BUILT:
+                _build_sales_rollups(cursor)
+                return recounted
+            events, version = _read_order_events(cursor, since, batch_size)
+            order_ids = list(dict.fromkeys(order_id for _, order_id in events))
+            for i in range(0, len(order_ids), CHECKOUT_BATCH):
+                recounted += _recount_orders(cursor, order_ids[i:i + CHECKOUT_BATCH])
+            if version > since:
+                cursor.execute("UPDATE Отметка_сводки SET ID_события = ? WHERE Сводка = ?",
+                               (version, SALES_ROLLUP))
+        if len(events) < batch_size or version == since:
+            return recounted
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(Decimal("0.01"))
+
+
+def sales_dashboard(days: int, refresh: bool = True) -> SalesDashboard:
+    """
+    Отчёт за последние days дней (включая сегодня) по сводкам продаж.
+    Отменённые заказы в выручку, товары и дни не входят – только в разбивку
+    по статусам.
+    """
+    if refresh:
+        refresh_sales_rollups()
+    date_to = date.today()
+    date_from = date_to - timedelta(days=days - 1)
+
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT CONVERT(varchar (10), День, 120), SUM(Заказов), SUM(Единиц), SUM(Выручка)
+            FROM Сводка_продаж_день
+            WHERE День >= ? AND День <= ? AND Статус <> ?
+            GROUP BY День
+            ORDER BY День
+            """,
+            (date_from, date_to, CANCELLED_STATUS),
+        )
+        by_day = [SalesDay(d, int(o), int(u), _money(r)) for d, o, u, r in cursor.fetchall()]
+
+        cursor.execute(
+            """
+            SELECT Статус, SUM(Заказов), SUM(Единиц), SUM(Выручка)
+            FROM Сводка_продаж_день
+            WHERE День >= ? AND День <= ?
+            GROUP BY Статус
+            ORDER BY SUM(Заказов) DESC
+            """,
+            (date_from, date_to),
+        )
+        by_status = [SalesByStatus(st, int(o), int(u), _money(r))
+                     for st, o, u, r in cursor.fetchall()]
+
+        cursor.execute(
+            """
+            SELECT S.Номер_товара, ISNULL(T.Название, ''), SUM(S.Заказов), SUM(S.Единиц),
+                   SUM(S.Выручка)
+            FROM Сводка_продаж_товар S
+                     LEFT JOIN Товар T ON T.Номер_товара = S.Номер_товара
+            WHERE S.День >= ? AND S.День <= ?
+            GROUP BY S.Номер_товара, T.Название
+            ORDER BY SUM(S.Выручка) DESC, S.Номер_товара
+            OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+            """,
+            (date_from, date_to, SALES_TOP_PRODUCTS),
+        )
+        top_products = [ProductSales(int(pid), name, int(o), int(u), _money(r))
+                        for pid, name, o, u, r in cursor.fetchall()]
+
+        cursor.execute(
+            """
+            SELECT S.ID_курьера,
+                   ISNULL(CONCAT(K.Фамилия, ' ', K.Имя), ''),
+                   SUM(CASE WHEN S.Статус = N'доставлен' THEN S.Заказов ELSE 0 END),
+                   SUM(CASE WHEN S.Статус = N'у курьера' THEN S.Заказов ELSE 0 END),
+                   SUM(CASE WHEN S.Статус = N'доставлен' THEN S.Единиц ELSE 0 END),
+                   SUM(CASE WHEN S.Статус = N'доставлен' THEN S.Выручка ELSE 0 END)
+            FROM Сводка_продаж_курьер S
+                     LEFT JOIN Курьер K ON K.ID_курьера = S.ID_курьера
+            WHERE S.День >= ? AND S.День <= ?
+            GROUP BY S.ID_курьера, K.Фамилия, K.Имя
+            ORDER BY 3 DESC, S.ID_курьера
+            """,
+            (date_from, date_to),
+        )
+        # CONCAT не возвращает NULL: у удалённого курьера имя – пробел
+        couriers = [CourierSales(int(cid), name.strip(), int(d), int(n), int(u), _money(r))
+                    for cid, name, d, n, u, r in cursor.fetchall()]
+
+    return SalesDashboard(date_from, date_to, by_day, by_status, top_products, couriers)
+
+
+# ---------- ПЛАТЁЖНЫЕ ДАННЫЕ ----------
+
+def list_payment_cards(client_id: int) -> list:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+                       SELECT ID_данных, Номер_карты, CONVERT(varchar (10), Срок_действия, 120)
+                       FROM Платежные_данные
+                       WHERE ID_Клиента = ?
+                       ORDER BY ID_данных
+                       """, (client_id,))
+        return [PaymentCard(*row) for row in cursor.fetchall()]
+
+
+def add_payment_card(client_id, card_number, expires, cvv):
+    with connection() as conn:
+        conn.cursor().execute("""
+                              INSERT INTO Платежные_данные (ID_Клиента, Номер_карты, Срок_действия, CVV_код)
+                              VALUES (?, ?, ?, ?)
+                              """, (client_id, card_number, expires, cvv))
+
+
+def update_payment_card(card_id, client_id, card_number, expires, cvv):
+    with connection() as conn:
+        conn.cursor().execute("""
+                              UPDATE Платежные_данные
+                              SET Номер_карты   = ?,
+                                  Срок_действия = ?,
+                                  CVV_код       = ?
+                              WHERE ID_данных = ?
+                                AND ID_Клиента = ?
+                              """, (card_number, expires, cvv, card_id, client_id))
+
+
+def delete_payment_card(card_id, client_id):
+    with connection() as conn:
+        conn.cursor().execute("""
+                              DELETE
+                              FROM Платежные_данные
+                              WHERE ID_данных = ?
+                                AND ID_Клиента = ?
+                              """, (card_id, client_id))
+
+
+def get_card_cvv(card_id, client_id) -> Optional[str]:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+                       SELECT CVV_код
+                       FROM Платежные_данные
+                       WHERE ID_данных = ?
+                         AND ID_Клиента = ?
+                       """, (card_id, client_id))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+# ---------- ПРОФИЛИ ----------
+
+def get_client_profile(client_id: int) -> Optional[ClientProfile]:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+                       SELECT Фамилия,
+                              Имя,
+                              Отчество,
+                              Серия_паcпорта,
+                              Номер_паcпорта,
+                              Город,
+                              Улица,
+                              Дом,
+                              Квартира
+                       FROM Клиент
+                       WHERE ID_Клиент = ?
+                       """, (client_id,))
+        row = cursor.fetchone()
+    return ClientProfile(*row) if row else None
+
+
+def save_client_profile(client_id: int, profile: ClientProfile):
+    with connection() as conn:
+        conn.cursor().execute("""
+                              UPDATE Клиент
+                              SET Фамилия        = ?,
+                                  Имя            = ?,
+                                  Отчество       = ?,
+                                  Серия_паcпорта = ?,
+                                  Номер_паcпорта = ?,
+                                  Город          = ?,
+                                  Улица          = ?,
+                                  Дом            = ?,
+                                  Квартира       = ?
+                              WHERE ID_Клиент = ?
+                              """, (*profile, client_id))
+
+
+def get_courier_profile(courier_id: int) -> Optional[CourierProfile]:
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT K.Фамилия,
+                   K.Имя,
+                   K.Отчество,
+                   K.Номер_телефона,
+                   U.Логин,
+                   U.Email
+            FROM Курьер K
+                     JOIN Пользователь U ON K.ID_пользователя = U.ID_пользователя
+            WHERE K.ID_курьера = ?
+            """,
+            (courier_id,),
+        )
+        row = cursor.fetchone()
+    return CourierProfile(*row) if row else None
+
+
+def save_courier_profile(courier_id, user_id, last_name, first_name, middle_name, phone, email):
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            UPDATE Курьер
+            SET Фамилия        = ?,
+                Имя            = ?,
+                Отчество       = ?,
+                Номер_телефона = ?
+            WHERE ID_курьера = ?
+            """,
+            (last_name, first_name, middle_name, phone, courier_id),
+        )
+        cursor.execute(
+            """
+            UPDATE Пользователь
+            SET Email = ?
+            WHERE ID_пользователя = ?
+            """,
+            (email, user_id),
+        )
+
+
+# ---------- АДМИНИСТРИРОВАНИЕ ----------
+
+class AdminColumn(NamedTuple):
+    name: str                  # заголовок (и псевдоним в SELECT)
+    expr: str                  # выражение SELECT для показа
+    key: Optional[str] = None  # выражение для сортировки и фильтра; None – нельзя
+    kind: str = "text"         # text / int / number / date – как разбирать фильтр
+
+
+class AdminTable(NamedTuple):
+    columns: list     # [AdminColumn]
+    from_clause: str
+    order_by: list    # [(выражение, по_убыванию)] – первичный ключ
+
+
+# Таблицы админ-панели. Первая колонка каждой – первичный ключ.
+# Ключи сортировки могут быть NULL (Дата_регистрации, поля паспорта и адреса,
+# Дата_заказа, ...): PagedQuery._seek переходит через них явными IS NULL, а
+# сами выражения остаются без ISNULL – под частые фильтры есть индексы (schema.py)
+ADMIN_TABLES = {
+    "Пользователь": AdminTable(
+        [
+            AdminColumn("ID_пользователя", "ID_пользователя", "ID_пользователя", "int"),
+            AdminColumn("Логин", "Логин", "Логин"),
+            AdminColumn("Email", "ISNULL(Email, '')", "ISNULL(Email, '')"),
+            AdminColumn("Роль", "Роль", "Роль"),
+            AdminColumn("Дата_регистрации", "CONVERT(varchar (19), Дата_регистрации, 120)",
+                        "Дата_регистрации", "date"),
+            AdminColumn("Активен", "CASE WHEN Активен = 1 THEN 'Да' ELSE 'Нет' END"),
+        ],
+        "Пользователь",
+        [("ID_пользователя", False)],
+    ),
+    "Клиент": AdminTable(
+        [
+            AdminColumn("ID_Клиент", "c.ID_Клиент", "c.ID_Клиент", "int"),
+            AdminColumn("Фамилия", "c.Фамилия", "c.Фамилия"),
+            AdminColumn("Имя", "c.Имя", "c.Имя"),
+            AdminColumn("Отчество", "c.Отчество", "ISNULL(c.Отчество, '')"),
+            AdminColumn("Серия_паcпорта", "c.Серия_паcпорта", "c.Серия_паcпорта"),
+            AdminColumn("Номер_паcпорта", "c.Номер_паcпорта", "c.Номер_паcпорта"),
+            AdminColumn("Город", "c.Город", "c.Город"),
+            AdminColumn("Улица", "c.Улица", "c.Улица"),
+            AdminColumn("Дом", "ISNULL(c.Дом, '')", "ISNULL(c.Дом, '')"),
+            AdminColumn("Квартира", "ISNULL(c.Квартира, '')", "ISNULL(c.Квартира, '')"),
+            AdminColumn("Логин", "u.Логин", "u.Логин"),
+        ],
+        """
+        Клиент c
+                 JOIN Пользователь u ON c.ID_пользователя = u.ID_пользователя
+        """,
+        [("c.ID_Клиент", False)],
+    ),
+    "Курьер": AdminTable(
+        [
+            AdminColumn("ID_курьера", "k.ID_курьера", "k.ID_курьера", "int"),
+            AdminColumn("Фамилия", "k.Фамилия", "k.Фамилия"),
+            AdminColumn("Имя", "k.Имя", "k.Имя"),
+            AdminColumn("Отчество", "k.Отчество", "ISNULL(k.Отчество, '')"),
+            AdminColumn("Номер_телефона", "k.Номер_телефона", "k.Номер_телефона"),
+            AdminColumn("Логин", "u.Логин", "u.Логин"),
+            AdminColumn("Email", "ISNULL(u.Email, '')", "ISNULL(u.Email, '')"),
+        ],
+        """
+        Курьер k
+                 JOIN Пользователь u ON k.ID_пользователя = u.ID_пользователя
+        """,
+        [("k.ID_курьера", False)],
+    ),
+    "Товар": AdminTable(
+        [
+            AdminColumn("Номер_товара", "Номер_товара", "Номер_товара", "int"),
+            AdminColumn("Название", "Название", "Название"),
+            AdminColumn("Цена", "CONVERT(varchar (20), Цена)", "Цена", "number"),
+            AdminColumn("Количество", "Количество", "Количество", "int"),
+            AdminColumn("Изображение", "CASE WHEN Изображение IS NULL THEN 'Нет' ELSE 'Есть' END"),
+        ],
+        "Товар",
+        [("Номер_товара", False)],
+    ),
+    # Номер заказа растёт вместе с датой, поэтому «новые сверху» – по ID_заказа
+    "Заказ": AdminTable(
+        [
+            AdminColumn("ID_заказа", "z.ID_заказа", "z.ID_заказа", "int"),
+            AdminColumn("Дата_заказа", "CONVERT(varchar (10), z.Дата_заказа, 120)",
+                        "z.Дата_заказа", "date"),
+            AdminColumn("Товар", "t.Название", "t.Название"),
+            AdminColumn("Количество", "z.Количество_заказанного_товара",
+                        "z.Количество_заказанного_товара", "int"),
+            # по клиенту и курьеру сортируем и ищем по фамилии – она в начале строки
+            AdminColumn("Клиент", "CONCAT(c.Фамилия, ' ', c.Имя)", "c.Фамилия"),
+            AdminColumn("Курьер", "ISNULL(CONCAT(k.Фамилия, ' ', k.Имя), 'Не назначен')",
+                        "ISNULL(k.Фамилия, '')"),
+            AdminColumn("Статус", "z.Статус", "z.Статус"),
+            AdminColumn("Цена_за_единицу", "CONVERT(varchar (10), t.Цена)", "t.Цена", "number"),
+            AdminColumn("Сумма", "CONVERT(varchar (20), CAST(t.Цена * z.Количество_заказанного_товара "
+                                 "AS DECIMAL(10, 2)))"),
+        ],
+        """
+        Заказ z
+                 JOIN Товар t ON z.Номер_товара = t.Номер_товара
+                 JOIN Платежные_данные p ON z.ID_данные = p.ID_данных
+                 JOIN Клиент c ON p.ID_Клиента = c.ID_Клиент
+                 LEFT JOIN Курьер k ON z.ID_курьера = k.ID_курьера
+        """,
+        [("z.ID_заказа", True)],
+    ),
+    "Платежные_данные": AdminTable(
+        [
+            AdminColumn("ID_данных", "p.ID_данных", "p.ID_данных", "int"),
+            AdminColumn("Клиент", "CONCAT(c.Фамилия, ' ', c.Имя, ' ', ISNULL(c.Отчество, ''))",
+                        "c.Фамилия"),
+            AdminColumn("Номер_карты", "CONCAT('**** **** **** ', RIGHT(p.Номер_карты, 4))"),
+            AdminColumn("Срок_действия", "CONVERT(varchar (10), p.Срок_действия, 120)",
+                        "p.Срок_действия", "date"),
+            AdminColumn("CVV", "'***'"),
+        ],
+        """
+        Платежные_данные p
+                 JOIN Клиент c ON p.ID_Клиента = c.ID_Клиент
+        """,
+        [("p.ID_данных", False)],
+    ),
+}
+
+# Первичные ключи таблиц (для удаления записей из админ-панели)
+TABLE_KEYS = {
+    "Пользователь": "ID_пользователя",
+    "Клиент": "ID_Клиент",
+    "Курьер": "ID_курьера",
+    "Товар": "Номер_товара",
+    "Заказ": "ID_заказа",
+    "Платежные_данные": "ID_данных",
+}
+
+
+def _admin_table(table_name: str) -> AdminTable:
+    table = ADMIN_TABLES.get(table_name)
+    if table is None:
+        raise ServiceError(f"Неизвестная таблица: {table_name}")
+    return table
+
+
+def admin_table_columns(table_name: str) -> list:
+    """Колонки таблицы админ-панели (AdminColumn: заголовок, можно ли сортировать)."""
+    return list(_admin_table(table_name).columns)
+
+
+_FILTER_OPERATOR = re.compile(r"^\s*(>=|<=|<>|!=|=|>|<)\s*(.*)$", re.DOTALL)
+
+
+def _filter_value(column: AdminColumn, text: str):
+    try:
+        if column.kind == "int":
+            return int(text)
+        if column.kind == "number":
+            return Decimal(text.replace(",", "."))
+        if column.kind == "date":
+            if re.fullmatch(r"\d{2}\.\d{2}\.\d{4}", text):
+                return datetime.strptime(text, "%d.%m.%Y").date()
+            return date.fromisoformat(text)
+    except (ValueError, ArithmeticError):
+        expected = {"int": "целое число", "number": "число",
+                    "date": "дата ГГГГ-ММ-ДД или ДД.ММ.ГГГГ"}[column.kind]
+        raise ServiceError(f"Фильтр «{column.name}»: ожидается {expected}") from None
+    return text
+
+
+def _admin_filter(column: AdminColumn, text: str):
+    """
+    Условие фильтра по колонке и его параметр.
+
+    «>100», «<=2024-01-01», «=создан», «<>доставлен» – сравнение; без
+    оператора текст ищется по началу значения (LIKE 'текст%' идёт по
+    индексу), число – на равенство, дата – за весь день.
+    """
+    m = _FILTER_OPERATOR.match(text)
+    op, text = (m.group(1), m.group(2).strip()) if m else (None, text.strip())
+    if op == "!=":
+        op = "<>"
+    if op is None and column.kind == "text":
+        escaped = re.sub(r"([\\%_\[])", r"\\\1", text)
+        return f"{column.key} LIKE ? ESCAPE '\\'", [escaped + "%"]
+    value = _filter_value(column, text)
+    if column.kind == "date" and op in (None, "="):
+        # у даты со временем «равно» – весь день
+        return f"{column.key} >= ? AND {column.key} < ?", [value, value + timedelta(days=1)]
+    return f"{column.key} {op or '='} ?", [value]
+
+
+def admin_table_query(table_name: str, sort=None, filters=None) -> PagedQuery:
+    """
+    Таблица админ-панели для постраничного списка (кортежи значений колонок).
+
+    sort    – (заголовок колонки, по_убыванию) или None – по первичному ключу
+    filters – {заголовок колонки: текст фильтра}, условия объединяются через AND
+
+    Сортировка и фильтры выполняются сервером; при сортировке по колонке
+    первичный ключ остаётся последним в ключе страниц, чтобы порядок был
+    однозначным. Ошибка в тексте фильтра – ServiceError.
+    """
+    table = _admin_table(table_name)
+
+    order_by = table.order_by
+    if sort is not None:
+        name, desc = sort
+        column = next((c for c in table.columns if c.name == name), None)
+        if column is None or column.key is None:
+            raise ServiceError(f"По колонке «{name}» сортировать нельзя")
+        order_by = [(expr, desc) for expr, _ in table.order_by]
+        if column.key != order_by[0][0]:
+            order_by.insert(0, (column.key, desc))
+
+    where, params = _admin_where(table, filters)
+    select = ", ".join(f"{column.expr} AS {column.name}" for column in table.columns)
+    return PagedQuery(select, table.from_clause, order_by, where=where, params=params)
+
+
+def _admin_where(table: AdminTable, filters):
+    """Условие WHERE (без слова WHERE) и параметры для {колонка: текст фильтра}."""
+    columns = {column.name: column for column in table.columns}
+    conditions, params = [], []
+    for name, text in (filters or {}).items():
+        column = columns.get(name)
+        if column is None or column.key is None:
+            raise ServiceError(f"По колонке «{name}» фильтровать нельзя")
+        if not text.strip():
+            continue
+        condition, values = _admin_filter(column, text)
+        conditions.append(condition)
+        params.extend(values)
+    return " AND ".join(conditions), params
+
+
+def delete_record(table_name: str, record_id):
+    id_column = TABLE_KEYS.get(table_name)
+    if id_column is None:
+        raise ServiceError(f"Неизвестная таблица: {table_name}")
+    with connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"DELETE FROM {table_name} WHERE {id_column} = ?", (record_id,))
+        if table_name == "Заказ" and cursor.rowcount:
+            _log_order_events(cursor, [record_id])
+
+
+# ---------- МАССОВЫЕ ОПЕРАЦИИ ----------
+
+ORDER_STATUSES = ("создан", "в обработке", "у курьера", "доставлен", "отменен")
+
+# Сколько выбранных записей перечисляется в одном IN (...): предел SQL Server –
+# 2100 параметров. Записи «по фильтру» затрагиваются одним оператором
+BULK_ID_BATCH = 1000
+BULK_PREVIEW_ROWS = 20
+
+
+class BulkAction(NamedTuple):
+    title: str
+    statement: str                 # UPDATE ... SET ... / DELETE FROM ... без WHERE
+    changes: Optional[str] = None  # условие «запись действительно изменится»
+    preview: tuple = ()            # [(заголовок, выражение)] – колонки предпросмотра
+    value: Optional[str] = None    # что спрашивать у пользователя: percent / status
+
+
+class BulkPreview(NamedTuple):
+    count: int      # сколько записей будет затронуто
+    columns: list   # заголовки примера (первый – ключ)
+    sample: list    # первые BULK_PREVIEW_ROWS затрагиваемых записей
+
+
+_NEW_PRICE = "CAST(ROUND(Цена * (100 + ?) / 100, 2) AS DECIMAL(10, 2))"
+_NEW_STOCK = "CAST(ROUND(Количество * (100 + ?) / 100.0, 0) AS INT)"
+
+# Операции над многими записями таблицы админ-панели. Выражения с «?»
+# получают значение, введённое пользователем (процент или статус)
+BULK_ACTIONS = {
+    "Товар": {
+        "price": BulkAction(
+            "Изменить цену на %", f"UPDATE Товар SET Цена = {_NEW_PRICE}",
+            preview=(("Название", "Название"), ("Цена", "Цена"), ("Новая цена", _NEW_PRICE)),
+            value="percent",
+        ),
+        "stock": BulkAction(
+            "Изменить количество на %", f"UPDATE Товар SET Количество = {_NEW_STOCK}",
+            preview=(("Название", "Название"), ("Количество", "Количество"),
+                     ("Новое количество", _NEW_STOCK)),
+            value="percent",
+        ),
+        "delete": BulkAction(
+            "Удалить", "DELETE FROM Товар",
+            preview=(("Название", "Название"), ("Цена", "Цена"), ("Количество", "Количество")),
+        ),
+    },
+    "Заказ": {
+        "status": BulkAction(
+            "Сменить статус", "UPDATE Заказ SET Статус = ?", changes="Статус <> ?",
+            preview=(("Дата_заказа", "Дата_заказа"), ("Статус", "Статус"),
+                     ("Новый статус", "?")),
+            value="status",
+        ),
+        "delete": BulkAction(
+            "Удалить", "DELETE FROM Заказ",
+            preview=(("Дата_заказа", "Дата_заказа"), ("Статус", "Статус")),
+        ),
+    },
+    "Пользователь": {
+        "deactivate": BulkAction(
+            "Деактивировать", "UPDATE Пользователь SET Активен = 0", changes="Активен <> 0",
+            preview=(("Логин", "Логин"), ("Роль", "Роль")),
+        ),
+        "activate": BulkAction(
+            "Активировать", "UPDATE Пользователь SET Активен = 1", changes="Активен <> 1",
+            preview=(("Логин", "Логин"), ("Роль", "Роль")),
+        ),
+        "delete": BulkAction(
+            "Удалить", "DELETE FROM Пользователь",
+            preview=(("Логин", "Логин"), ("Роль", "Роль")),
+        ),
+    },
+}
+
+
+def bulk_actions(table_name: str) -> dict:
+    """Массовые операции таблицы: {имя: BulkAction} (пусто – не предусмотрены)."""
+    return dict(BULK_ACTIONS.get(table_name, {}))
+
+
+def _bulk_action(table_name, action):
+    found = BULK_ACTIONS.get(table_name, {}).get(action)
+    if found is None:
+        raise ServiceError(f"Операция недоступна для таблицы {table_name}")
+    return found
+
+
+def _bulk_value(action: BulkAction, value):
+    if action.value == "percent":
+        try:
+            percent = Decimal(str(value).strip().replace(",", ".").rstrip("%"))
+        except ArithmeticError:
+            raise ServiceError("Процент должен быть числом, например 10 или -5,5") from None
+        if not percent.is_finite() or not -100 < percent <= 1000:
+            raise ServiceError("Процент должен быть больше -100 и не больше 1000")
+        return percent
+    if action.value == "status":
+        if value not in ORDER_STATUSES:
+            raise ServiceError(f"Неизвестный статус: {value}")
+        return value
+    return None
+
+
+def _bulk_scopes(table_name, ids, filters):
+    """
+    Условия на первичный ключ записей, к которым применяется операция:
+    выбранные ids (частями по BULK_ID_BATCH) или все записи по фильтрам
+    админ-панели (одним подзапросом).
+    """
+    key = TABLE_KEYS[table_name]
+    if ids is not None:
+        ids = list(ids)
+        for i in range(0, len(ids), BULK_ID_BATCH):
+            chunk = ids[i:i + BULK_ID_BATCH]
+            yield f"{key} IN ({', '.join('?' * len(chunk))})", chunk
+        return
+    table = _admin_table(table_name)
+    where, params = _admin_where(table, filters)
+    yield (f"{key} IN (SELECT {table.columns[0].key} FROM {table.from_clause}"
+           f"{' WHERE ' + where if where else ''})"), params
+
+
+def _bulk_where(action, scope, scope_params, value):
+    where, params = scope, list(scope_params)
+    if action.changes:
+        where += f" AND {action.changes}"
+        params += [value] * action.changes.count("?")
+    return where, params
+
+
+def bulk_preview(table_name: str, action: str, value=None, ids=None, filters=None) -> BulkPreview:
+    """
+    Пробный прогон массовой операции: сколько записей она затронет и как
+    изменятся первые из них. Ничего не меняет.
+    ids – выбранные первичные ключи; None – все записи по filters.
+    """
+    bulk = _bulk_action(table_name, action)
+    value = _bulk_value(bulk, value)
+    key = TABLE_KEYS[table_name]
+    select = ", ".join([key] + [expr for _, expr in bulk.preview])
+    select_params = [value] * sum(expr.count("?") for _, expr in bulk.preview)
+
+    count, sample = 0, []
+    with connection() as conn:
+        cursor = conn.cursor()
+        for scope, scope_params in _bulk_scopes(table_name, ids, filters):
+            where, params = _bulk_where(bulk, scope, scope_params, value)
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name} WHERE {where}", params)
+            count += cursor.fetchone()[0]
+            if len(sample) < BULK_PREVIEW_ROWS:
+                cursor.execute(
+                    f"""
+                    SELECT {select}
+                    FROM {table_name}
+                    WHERE {where}
+                    ORDER BY {key}
+                    OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+                    """,
+                    (*select_params, *params, BULK_PREVIEW_ROWS - len(sample)),
+                )
+                sample.extend(tuple(row) for row in cursor.fetchall())
+    return BulkPreview(count, [key] + [title for title, _ in bulk.preview], sample)
+
+
+def bulk_apply(table_name: str, action: str, value=None, ids=None, filters=None) -> int:
+    """
+    Выполнить массовую операцию одной транзакцией: один UPDATE/DELETE на
+    все записи по фильтру или на каждые BULK_ID_BATCH выбранных.
+    Ошибка (например, на запись ссылаются другие таблицы) откатывает всё.
+    Возвращает число изменённых записей.
+    """
+    bulk = _bulk_action(table_name, action)
+    value = _bulk_value(bulk, value)
+    statement_params = [value] * bulk.statement.count("?")
+
+    affected = 0
+    with connection() as conn:
+        cursor = conn.cursor()
+        for scope, scope_params in _bulk_scopes(table_name, ids, filters):
+            where, params = _bulk_where(bulk, scope, scope_params, value)
+            if table_name == "Заказ":
+                # окна курьеров узнают об изменениях из ленты (см. _log_order_events)
+                cursor.execute(
+                    f"INSERT INTO Событие_заказа (ID_заказа) SELECT ID_заказа FROM Заказ WHERE {where}",
+                    params,
+                )
+            cursor.execute(f"{bulk.statement} WHERE {where}", (*statement_params, *params))
+            affected += cursor.rowcount
+    return affected
@@ -0,0 +1,261 @@
+# stall_monitor.py
+"""
+Сторож главного цикла Tk: замечает, когда окно «замерзает», и запоминает,
+какой обработчик его держал.
+
+Пульс – after(HEARTBEAT_MS) в главном потоке, каждое срабатывание отмечает
+время. Фоновый поток-сторож следит, не опаздывает ли пульс: если цикл стоит
+дольше STALL_MS, сторож снимает стек главного потока (sys._current_frames) –
+там в этот момент выполняется обработчик, который держит цикл – и повторяет
+снимки, пока зависание длится. Когда пульс наконец срабатывает, опоздание –
+длительность зависания; она приписывается обработчику из снимков.
+
+Обработчик – первая функция приложения под вызовом из Tk (команда кнопки,
+событие, after). Служебные кадры tkinter, customtkinter, workers,
+view_manager и lambda-обёртки пропускаются: результат фоновой задачи
+приписывается своему on_done («AdminApp._fill_table»), а не TaskRunner._poll.
+
+Статистика по обработчикам смотрится в окне диагностики или пишется в файл:
+dump(path), а при заданном SHOP_STALL_REPORT – при выходе из приложения.
+"""
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from typing import NamedTuple
+
+ENABLED = os.environ.get("SHOP_STALL_MONITOR", "1") != "0"
+STALL_MS = float(os.environ.get("SHOP_STALL_MS", "100"))
+REPORT_PATH = os.environ.get("SHOP_STALL_REPORT", "")  # отчёт при выходе; "" – не писать
+
+HEARTBEAT_MS = 50    # период пульса главного цикла
+STACK_LIMIT = 40     # кадров в снимке стека (самых внутренних)
+SAMPLES_LIMIT = 100  # снимков одного зависания, дальше только длительность
+RECENT_LIMIT = 100   # последних зависаний в памяти
+
+# служебные модули: их кадры – не обработчик, а путь к нему
+PLUMBING_MODULES = ("tkinter", "customtkinter", "workers", "view_manager", __name__)
+TK_HANDLER = "Tk (отрисовка, события ОС)"  # в стеке нет кода приложения
+NO_SAMPLE_HANDLER = "стек не снят"          # зависание короче интервала снимков
+
+
+class Stall(NamedTuple):
+    time: datetime
+    ms: float
+    handler: str
+    stack: str  # стек самого частого места среди снимков; "" – снимков нет
+
+
+class HandlerStats(NamedTuple):
+    handler: str
+    count: int
+    total_ms: float
+    max_ms: float
+    last_time: datetime
+    stack: str  # стек самого долгого зависания
+
+
+def _is_plumbing(frame):
+    module = frame.f_globals.get("__name__", "")
+    return any(module == name or module.startswith(name + ".") for name in PLUMBING_MODULES)
+
+
+def _qualname(frame):
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def handler_name(frames):
+    """
+    Обработчик по кадрам главного потока (от внешнего к внутреннему).
+    Вложенные циклы (update(), диалоги) дают несколько вызовов из Tk –
+    берётся самый внутренний, под которым есть код приложения.
+    """
+    calls = [i for i, frame in enumerate(frames)
+             if frame.f_code.co_name == "__call__" and frame.f_globals.get("__name__") == "tkinter"]
+    # до mainloop (создание окон) вызовов из Tk нет – ищем с начала стека
+    for start in calls[::-1] or [-1]:
+        for frame in frames[start + 1:]:
+            if not _is_plumbing(frame) and frame.f_code.co_name != "<lambda>":
+                return _qualname(frame)
+    return TK_HANDLER
+
+
+def _hot_stack(samples):
+    """Стек самого частого внутреннего места среди снимков – там и ушло время."""
+    def leaf(stack):
+        return (stack[-1].filename, stack[-1].lineno) if stack else None
+
+    hot = Counter(leaf(stack) for _, stack in samples).most_common(1)[0][0]
+    return next(stack for _, stack in samples if leaf(stack) == hot)
+
+
+class StallMonitor:
+    """Пульс главного цикла окна root и поток-сторож со снимками стека."""
+
+    def __init__(self, root, stall_ms=STALL_MS, heartbeat_ms=HEARTBEAT_MS):
+        self.root = root
+        self.stall_ms = stall_ms
+        self.heartbeat_ms = heartbeat_ms
+        self.started = datetime.now()
+        self._main_id = threading.get_ident()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._expected = None  # когда должен сработать следующий пульс (perf_counter)
+        self._samples = []     # снимки текущего зависания: (обработчик, кадры)
+        self._after_id = None
+        self._thread = None
+        self._handlers = {}    # обработчик -> [count, total_ms, max_ms, last_time, stack]
+        self.recent = deque(maxlen=RECENT_LIMIT)  # новые в конце
+
+    # ---------- пульс и сторож ----------
+
+    def start(self):
+        """Вызывать из главного потока Tk."""
+        if self._thread is not None:
+            return
+        self._main_id = threading.get_ident()
+        self._expected = time.perf_counter() + self.heartbeat_ms / 1000
+        self._after_id = self.root.after(self.heartbeat_ms, self._beat)
+        self._thread = threading.Thread(target=self._watch, name="stall-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass  # окно уже уничтожено
+            self._after_id = None
+
+    def _beat(self):
+        now = time.perf_counter()
+        with self._lock:
+            overdue = now - self._expected
+            samples, self._samples = self._samples, []
+            self._expected = now + self.heartbeat_ms / 1000
+        if overdue * 1000 >= self.stall_ms:
+            self._record(overdue * 1000, samples)
+        if not self._stop.is_set():
+            self._after_id = self.root.after(self.heartbeat_ms, self._beat)
+
+    def _watch(self):
+        # проверяем чаще порога, чтобы первый снимок попал в начало зависания
+        interval = min(self.heartbeat_ms, self.stall_ms) / 4000
+        while not self._stop.wait(interval):
+            with self._lock:
+                stalled = (time.perf_counter() - self._expected) * 1000 >= self.stall_ms
+                full = len(self._samples) >= SAMPLES_LIMIT
+            if stalled and not full:
+                self._sample()
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._main_id)
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+        sample = (handler_name(frames),
+                  traceback.StackSummary.extract(((f, f.f_lineno) for f in frames[-STACK_LIMIT:]),
+                                                 lookup_lines=False))
+        with self._lock:
+            # пульс мог успеть сработать – тогда снимок относится уже к живому циклу
+            if (time.perf_counter() - self._expected) * 1000 >= self.stall_ms:
+                self._samples.append(sample)
+
+    # ---------- статистика ----------
+
+    def _record(self, ms, samples):
+        if samples:
+            # обработчик – из первого снимка: он начал зависание
+            handler, stack = samples[0][0], "".join(_hot_stack(samples).format())
+        else:
+            handler, stack = NO_SAMPLE_HANDLER, ""
+        stall = Stall(datetime.now(), ms, handler, stack)
+        with self._lock:
+            self.recent.append(stall)
+            stats = self._handlers.get(handler)
+            if stats is None:
+                self._handlers[handler] = [1, ms, ms, stall.time, stack]
+                return
+            stats[0] += 1
+            stats[1] += ms
+            stats[3] = stall.time
+            if ms > stats[2]:
+                stats[2], stats[4] = ms, stack
+
+    def snapshot(self):
+        """Статистика по обработчикам, по убыванию общего времени зависаний."""
+        with self._lock:
+            result = [HandlerStats(handler, *stats) for handler, stats in self._handlers.items()]
+        result.sort(key=lambda s: -s.total_ms)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._handlers.clear()
+            self.recent.clear()
+            self.started = datetime.now()
+
+    def report(self):
+        """Текстовый отчёт: обработчики со стеком самого долгого зависания и последние зависания."""
+        stats = self.snapshot()
+        lines = [
+            f"Зависания главного цикла с {self.started:%Y-%m-%d %H:%M:%S} "
+            f"(порог {self.stall_ms:.0f} мс)",
+            f"Всего: {sum(s.count for s in stats)}, "
+            f"суммарно {sum(s.total_ms for s in stats):.0f} мс",
+            "",
+        ]
+        for s in stats:
+            lines.append(f"{s.handler}: {s.count} раз, всего {s.total_ms:.0f} мс, "
+                         f"макс {s.max_ms:.0f} мс, последнее {s.last_time:%H:%M:%S}")
+            if s.stack:
+                lines.append(f"  Стек самого долгого ({s.max_ms:.0f} мс):")
+                lines.extend("  " + line for line in s.stack.rstrip("\n").split("\n"))
+            lines.append("")
+        lines.append("Последние зависания:")
+        lines.extend(f"  {s.time:%H:%M:%S}  {s.ms:8.0f} мс  {s.handler}"
+                     for s in reversed(self.recent))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.report())
+
+
+_monitor = None
+
+
+def start(root):
+    """Запустить сторож для главного окна; None, если отключён (SHOP_STALL_MONITOR=0)."""
+    global _monitor
+    if not ENABLED:
+        return None
+    if _monitor is None:
+        _monitor = StallMonitor(root)
+        _monitor.start()
+    return _monitor
+
+
+def get_monitor():
+    return _monitor
+
+
+def stop():
+    """Остановить сторож; при заданном SHOP_STALL_REPORT записать отчёт."""
+    monitor = _monitor
+    if monitor is None:
+        return
+    monitor.stop()
+    if REPORT_PATH:
+        try:
+            monitor.dump(REPORT_PATH)
+        except OSError as e:
+            print(f"Не удалось записать отчёт о зависаниях: {e}")
@@ -0,0 +1,19 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Пустая база магазина во временном файле SQLite."""
+    backend = db.create_backend("sqlite", path=str(tmp_path / "shop.sqlite3"))
+    db.configure(backend, instrument=False)
+    yield backend
+    db.get_pool().close()
+    backend.close()
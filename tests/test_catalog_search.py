@@ -0,0 +1,30 @@
+# tests/test_catalog_search.py
+import services
+
+NAMES = ["Кефир 2,5%", "Кефир 1%", "Кефир 12", "Молоко 2", "Ёршик", "Сыр Ёлкин"]
+
+
+def _search(text):
+    query = services.search_products_query(text)
+    return sorted(product.name for _, product in query.page(0, 100))
+
+
+def test_short_words_match_anywhere(database):
+    for name in NAMES:
+        services.add_product(name, 10, 1)
+
+    assert _search("кефир 2") == ["Кефир 12", "Кефир 2,5%"]
+    assert _search("2") == ["Кефир 12", "Кефир 2,5%", "Молоко 2"]
+    assert _search("ир") == ["Кефир 1%", "Кефир 12", "Кефир 2,5%"]
+    assert _search("ЕРШ") == ["Ёршик"]
+    assert _search("елк сыр") == ["Сыр Ёлкин"]
+    assert services.search_products_query(" - ") is None
+
+
+def test_trigrams_from_different_words_do_not_match(database):
+    for name in ("Кефир", "Кефаль ефим фирма"):
+        services.add_product(name, 10, 1)
+
+    # «кеф», «ефи», «фир» есть во втором названии, но в разных словах
+    assert _search("кефир") == ["Кефир"]
+    assert _search("фирма кеф") == ["Кефаль ефим фирма"]
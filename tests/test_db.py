@@ -0,0 +1,50 @@
+# tests/test_db.py
+import threading
+import time
+
+import pytest
+
+import db
+
+
+def test_backend_requires_connect():
+    class Incomplete(db.Backend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_default_backend_created_once(tmp_path, monkeypatch):
+    created = []
+    real_create = db.create_backend
+
+    def slow_create(name=None, **options):
+        time.sleep(0.05)  # окно для гонки: остальные потоки уже внутри get_backend
+        backend = real_create("sqlite", path=str(tmp_path / "shop.sqlite3"))
+        created.append(backend)
+        return backend
+
+    monkeypatch.setattr(db, "create_backend", slow_create)
+    monkeypatch.setattr(db, "_backend", None)
+    monkeypatch.setattr(db, "_pool", None)
+
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def use():
+        barrier.wait()
+        seen.append(db.get_backend())
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert len(created) == 1
+        assert all(backend is created[0] for backend in seen)
+    finally:
+        db.get_pool().close()
+        for backend in created:
+            backend.close()
@@ -0,0 +1,52 @@
+# tests/test_order_claims.py
+import threading
+
+import db
+import services
+from benchmarks.order_claims import create_courier, create_free_orders
+
+ORDERS = 10
+COURIERS = 8
+
+
+def _claim_concurrently(order_id, couriers):
+    """Все курьеры одновременно берут заказ; результат – {курьер: None или исключение}."""
+    results = {}
+    barrier = threading.Barrier(len(couriers))
+
+    def claim(courier_id):
+        barrier.wait()
+        try:
+            services.take_order(order_id, courier_id)
+        except Exception as e:
+            results[courier_id] = e
+        else:
+            results[courier_id] = None
+
+    threads = [threading.Thread(target=claim, args=(courier_id,)) for courier_id in couriers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_each_order_goes_to_exactly_one_courier(database):
+    # по соединению на поток – курьеры ждут друг друга, а не пул
+    db.configure(database, instrument=False, max_size=COURIERS)
+    couriers = [create_courier(f"courier_{i}") for i in range(COURIERS)]
+    orders = create_free_orders(ORDERS)
+
+    for order_id in orders:
+        results = _claim_concurrently(order_id, couriers)
+
+        winners = [courier_id for courier_id, error in results.items() if error is None]
+        assert len(winners) == 1
+        losers = [error for error in results.values() if error is not None]
+        assert len(losers) == COURIERS - 1
+        assert all(isinstance(error, services.ConflictError) for error in losers)
+
+        with db.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT ID_курьера, Статус FROM Заказ WHERE ID_заказа = ?", (order_id,))
+            assert tuple(cursor.fetchone()) == (winners[0], "у курьера")
@@ -0,0 +1,57 @@
+# tests/test_order_events.py
+import db
+import services
+from benchmarks.checkout import create_buyer
+
+
+def _execute(sql, *params):
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        return cursor.fetchall() if cursor.description else None
+
+
+def _age_events(days, up_to=None):
+    _execute("UPDATE Событие_заказа SET Дата = DATEADD(DAY, -?, SYSDATETIME()) "
+             "WHERE ID_события <= ?", days, up_to if up_to is not None else 2 ** 62)
+
+
+def _place_orders(count):
+    """count заказов – count событий ленты."""
+    payment_id = create_buyer(f"buyer_{count}")
+    product_id = services.add_product("Товар", 100, count)
+    services.create_orders(payment_id, [(product_id, 1)] * count)
+
+
+def _event_ids():
+    return [row[0] for row in _execute("SELECT ID_события FROM Событие_заказа ORDER BY ID_события")]
+
+
+def test_prune_keeps_unaccounted_and_recent_events(database):
+    _place_orders(10)
+    _age_events(30)
+    # сводки не построены – отметка -1, удалять нечего
+    assert services.prune_order_events() == 0
+    old = _event_ids()
+
+    services.refresh_sales_rollups()  # строит сводки и удаляет учтённые старые события
+    assert _event_ids() == []
+
+    _place_orders(5)
+    recent = _event_ids()
+    _age_events(1)
+    services.refresh_sales_rollups()  # учтены, но моложе срока
+    assert _execute("SELECT ID_события FROM Отметка_сводки")[0][0] == recent[-1]
+    assert _event_ids() == recent
+    assert recent[0] > old[-1]
+
+
+def test_prune_stops_at_watermark_in_batches(database):
+    _place_orders(10)
+    ids = _event_ids()
+    _age_events(30)
+    _execute("UPDATE Отметка_сводки SET ID_события = ? WHERE Сводка = ?",
+             ids[6], services.SALES_ROLLUP)
+
+    assert services.prune_order_events(batch_size=3) == 7
+    assert _event_ids() == ids[7:]
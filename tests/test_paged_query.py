@@ -0,0 +1,55 @@
+# tests/test_paged_query.py
+from datetime import datetime, timedelta
+
+import pytest
+
+import db
+import services
+
+USERS = 30
+PAGE = 4
+
+
+def _fill_users():
+    """Часть пользователей без даты регистрации, у остальных даты повторяются."""
+    start = datetime(2024, 1, 1)
+    with db.connection() as conn:
+        conn.cursor().executemany(
+            "INSERT INTO Пользователь (Логин, Хеш_пароля, Email, Роль, Дата_регистрации, Активен) "
+            "VALUES (?, ?, ?, N'Клиент', ?, 1)",
+            [(f"user{i:02d}", b"x", None if i % 2 else f"user{i}@example.com",
+              None if i % 3 == 0 else start + timedelta(days=i % 5))
+             for i in range(USERS)],
+        )
+
+
+def _forward(query):
+    rows = query.page(0, PAGE)
+    result = list(rows)
+    while len(rows) == PAGE:
+        rows = query.page_after(rows[-1][0], PAGE)
+        result.extend(rows)
+    return result
+
+
+def _backward(query, last):
+    rows = [last]
+    result = [last]
+    while True:
+        rows = query.page_before(rows[0][0], PAGE)
+        if not rows:
+            return result
+        result[:0] = rows
+
+
+@pytest.mark.parametrize("column", ["Дата_регистрации", "Email", "Логин"])
+@pytest.mark.parametrize("desc", [False, True])
+def test_keyset_pages_reach_every_row_with_null_sort_keys(database, column, desc):
+    _fill_users()
+    query = services.admin_table_query("Пользователь", sort=(column, desc))
+    expected = [row for _, row in query.page(0, USERS + 1)]
+    assert len(expected) == query.count() == USERS
+
+    forward = _forward(query)
+    assert [row for _, row in forward] == expected
+    assert [row for _, row in _backward(query, forward[-1])] == expected
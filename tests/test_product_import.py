@@ -0,0 +1,32 @@
+# tests/test_product_import.py
+from decimal import Decimal
+
+import db
+import services
+
+
+def _products(count):
+    # одинаковые названия у соседних товаров, изображение – у каждого третьего
+    return [
+        services.NewProduct(f"Товар {i // 2}", Decimal(f"{i + 1}.50"), i,
+                            bytes([i % 256]) * (i + 1) if i % 3 == 0 else None, [])
+        for i in range(count)
+    ]
+
+
+def test_import_products_maps_duplicate_names(database, monkeypatch):
+    monkeypatch.setattr(services, "IMPORT_BATCH", 7)
+    products = _products(30)
+    ids = services.import_products(products, "file", 30)
+
+    assert len(set(ids)) == len(products)
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT Номер_товара, Название, Количество, Изображение FROM Товар")
+        rows = {int(row[0]): tuple(row[1:]) for row in cursor.fetchall()}
+        cursor.execute("SELECT Номер_товара, Название FROM Поиск_товара")
+        indexed = {int(pid): name for pid, name in cursor.fetchall()}
+    for product_id, p in zip(ids, products):
+        assert rows[product_id] == (p.name, p.quantity, p.image)
+        assert indexed[product_id] == p.name
+    assert services.get_import_position("file") == 30
@@ -0,0 +1,24 @@
+# tests/test_query_log.py
+import query_log
+
+
+def test_fingerprint_hides_values():
+    result = query_log.fingerprint(("секретный пароль", 42))
+    assert "секретный" not in result
+    assert result.startswith("(str[16], int) #")
+
+
+def test_fingerprint_same_params_same_hash():
+    image = bytes(range(256)) * 40_000
+    assert query_log.fingerprint((image, 1)) == query_log.fingerprint(((bytes(image), 1),))
+    assert query_log.fingerprint((image, 1)) != query_log.fingerprint((image, 2))
+
+
+def test_fingerprint_blob_length_counts():
+    prefix = b"\x89PNG" * query_log.HASH_PREFIX_BYTES
+    assert query_log.fingerprint((prefix,)) != query_log.fingerprint((prefix + b"\0",))
+
+
+def test_rows_bytes_samples_large_results():
+    rows = [("ab", b"xyz", 1)] * 100
+    assert query_log._rows_bytes(rows) == 100 * (4 + 3 + 8)
@@ -0,0 +1,44 @@
+# tests/test_sales_rollups.py
+import threading
+
+import db
+import services
+from benchmarks.sales_dashboard import fill_orders
+
+ORDERS = 300
+THREADS = 4
+
+
+def _rollup_totals():
+    with db.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*), SUM(Количество) FROM Учёт_заказа")
+        orders, units = cursor.fetchone()
+        cursor.execute("SELECT SUM(Заказов), SUM(Единиц) FROM Сводка_продаж_день")
+        return (orders, units), tuple(cursor.fetchone())
+
+
+def test_concurrent_first_build(database):
+    db.configure(database, instrument=False, max_size=THREADS)
+    fill_orders(ORDERS)
+
+    errors = []
+    barrier = threading.Barrier(THREADS)
+
+    def refresh():
+        barrier.wait()
+        try:
+            services.refresh_sales_rollups()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=refresh) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    accounted, by_day = _rollup_totals()
+    assert accounted[0] == ORDERS
+    assert by_day == accounted
@@ -0,0 +1,62 @@
+# tests/test_thumbnails.py
+import io
+
+from PIL import Image
+
+import image_cache
+import services
+
+
+def _png(color):
+    buf = io.BytesIO()
+    Image.new("RGB", (400, 300), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _stored(product_id):
+    return {size: services.get_product_thumbnail(product_id, size)
+            for size in image_cache.THUMBNAIL_SIZES}
+
+
+def test_stale_thumbnails_keep_current_ones(database):
+    old_image, new_image = _png("red"), _png("blue")
+    old_thumbnails = image_cache.encode_thumbnails(old_image)
+    new_thumbnails = image_cache.encode_thumbnails(new_image)
+    product_id = services.add_product("Чайник", 100, 1, old_image)
+    # изображение заменили, пока миниатюры старого ещё считались
+    services.update_product(product_id, "Чайник", 100, 1, new_image, new_thumbnails)
+
+    services.save_product_thumbnails(product_id, old_thumbnails)
+
+    assert _stored(product_id) == {t.size: t for t in new_thumbnails}
+
+
+def test_thumbnails_saved_for_current_image(database):
+    image = _png("green")
+    thumbnails = image_cache.encode_thumbnails(image)
+    product_id = services.add_product("Кружка", 50, 1, image)
+
+    services.save_product_thumbnails(product_id, thumbnails)
+
+    assert _stored(product_id) == {t.size: t for t in thumbnails}
+
+
+def test_missing_thumbnails_built_from_one_decode(database, monkeypatch):
+    image = _png("white")
+    product_id = services.add_product("Блюдце", 30, 1, image)
+    monkeypatch.setattr(image_cache, "_cache", image_cache.ThumbnailCache())
+    opened = []
+    real_open = Image.open
+
+    def counting_open(*args, **kwargs):
+        opened.append(args)
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(Image, "open", counting_open)
+    side = image_cache.THUMBNAIL_SIZES[0]
+
+    thumbnail = image_cache.load_thumbnail(product_id, (side, side))
+
+    assert len(opened) == 1
+    assert max(thumbnail.size) == side
+    assert _stored(product_id) == {t.size: t for t in image_cache.encode_thumbnails(image)}
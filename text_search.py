@@ -0,0 +1,51 @@
+# text_search.py
+"""
+Нормализация названий товаров и разбиение на триграммы для поиска.
+
+Название приводится к нижнему регистру, «ё» заменяется на «е», всё, кроме
+букв и цифр, становится пробелом. Таблица Триграмма_товара хранит уже
+нормализованные триграммы слов названия, поэтому регистр и «ё» при поиске
+не требуют сканирования названий.
+
+Каждое слово запроса проверяется через LIKE по нормализованному названию;
+триграммы слов из трёх и более букв лишь сужают круг кандидатов – они могут
+найтись в разных словах названия («кеф», «ефи», «фир» в «кефаль ефим
+фирма»). Слова из одной-двух букв триграммой не выразить.
+"""
+import re
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+MIN_INDEXED_WORD = 3  # у слов короче нет триграмм для индекса
+
+
+def normalize(text):
+    """«Йогурт  Ёлочка-2» -> «йогурт елочка 2»."""
+    text = (text or "").lower().replace("ё", "е")
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def _word_trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def name_trigrams(name):
+    """Триграммы названия для индекса."""
+    result = set()
+    for word in normalize(name).split():
+        result |= _word_trigrams(word)
+    return result
+
+
+def split_query(text):
+    """
+    Поисковый запрос -> (триграммы, слова). Слова должны входить
+    в нормализованное название, триграммы (слов от MIN_INDEXED_WORD букв) –
+    быть в индексе названия. Пустой запрос – два пустых множества.
+    """
+    trigrams, words = set(), set()
+    for word in normalize(text).split():
+        if len(word) >= MIN_INDEXED_WORD:
+            trigrams |= _word_trigrams(word)
+        words.add(word)
+    return trigrams, words
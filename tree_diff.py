@@ -0,0 +1,98 @@
+# tree_diff.py
+"""
+Обновление ttk.Treeview по ключу строки вместо «удалить всё – вставить всё».
+
+Строка дерева получает iid из первичного ключа (row_iid), поэтому при
+обновлении списка сравниваются ключи и значения колонок: исчезнувшие
+строки удаляются одним вызовом, изменившиеся обновляются через item(),
+новые вставляются, а порядок восстанавливается одним set_children, только
+если он действительно поменялся. Неизменившийся список не стоит ни одного
+обращения к Tk, выделение и прокрутка сохраняются.
+
+    self.orders_rows = KeyedTree(self.tree_orders)
+    self.orders_rows.update((row_iid(o.id), _client_order_values(o)) for o in orders)
+"""
+from typing import NamedTuple
+
+
+class TreeDiff(NamedTuple):
+    inserted: int
+    updated: int
+    deleted: int
+    moved: bool
+
+
+def row_iid(key):
+    """iid строки по ключу – значению или кортежу значений (составной ключ)."""
+    if not isinstance(key, tuple):
+        key = (key,)
+    return "k:" + "\x1f".join(str(v) for v in key)
+
+
+class KeyedTree:
+    """
+    Содержимое Treeview (строки верхнего уровня), обновляемое по разнице.
+
+    Помнит показанные значения, поэтому для сравнения дерево не читается.
+    Строки в дерево добавляются только через этот объект.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._shown = {}   # iid -> значения, показанные в дереве
+        self._order = []   # iid в порядке показа
+
+    def __contains__(self, iid):
+        return iid in self._shown
+
+    def __len__(self):
+        return len(self._order)
+
+    def iids(self):
+        return list(self._order)
+
+    def clear(self):
+        order, self._order, self._shown = self._order, [], {}
+        if order:
+            self.tree.delete(*order)
+
+    def update(self, items) -> TreeDiff:
+        """
+        Привести дерево к списку [(iid, значения), ...] в заданном порядке.
+        Значения сравниваются как кортежи; iid должны быть уникальны.
+        """
+        wanted, order = {}, []
+        for iid, values in items:
+            if iid in wanted:
+                raise ValueError(f"повторяющийся ключ строки: {iid!r}")
+            wanted[iid] = tuple(values)
+            order.append(iid)
+
+        stale = [iid for iid in self._order if iid not in wanted]
+        if stale:
+            # сначала забываем строки: удаление выбранной строки порождает
+            # <<TreeviewSelect>>, и обработчик уже не должен их видеть
+            for iid in stale:
+                del self._shown[iid]
+            self._order = [iid for iid in self._order if iid in wanted]
+            self.tree.delete(*stale)
+
+        # оставшиеся строки обычно идут в прежнем порядке (добавились или
+        # пропали отдельные строки) – тогда новые вставляются сразу на место
+        moved = self._order != [iid for iid in order if iid in self._shown]
+
+        inserted = updated = 0
+        for index, iid in enumerate(order):
+            values = wanted[iid]
+            shown = self._shown.get(iid)
+            if shown is None:
+                self.tree.insert("", "end" if moved else index, iid=iid, values=values)
+                inserted += 1
+            elif shown != values:
+                self.tree.item(iid, values=values)
+                updated += 1
+            self._shown[iid] = values
+        if moved:
+            self.tree.set_children("", *order)
+        self._order = order
+        return TreeDiff(inserted, updated, len(stale), moved)
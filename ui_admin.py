@@ -1,18 +1,76 @@
 # ui_admin.py
 import customtkinter as ctk
-from tkinter import messagebox
-from db import get_connection
+from tkinter import filedialog, messagebox
+import services
+import image_cache
+import export
+import product_import
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk
-import io
 from datetime import datetime
+import os
 
 # Импортируем розовую цветовую схему
 from theme import *
+from workers import LoadingIndicator, TaskRunner
+from virtual_tree import VirtualTree
+from ui_analytics import AnalyticsWindow
+from ui_diagnostics import DiagnosticsWindow
 
 ctk.set_appearance_mode("light")
 
+# Признак «картинка есть, но не декодируется» (в отличие от None – «картинки нет»)
+_BROKEN_IMAGE = object()
+
+
+def _fetch_product_thumbnail(product_id, size):
+    """Выполняется в рабочем потоке: миниатюра товара из кэша или из БД."""
+    try:
+        return image_cache.load_thumbnail(product_id, size)
+    except OSError as e:
+        # PIL не смог декодировать изображение
+        print(f"Ошибка обработки изображения: {e}")
+        return _BROKEN_IMAGE
+
+
+def _admin_values(row):
+    """Значения строки таблицы админ-панели для показа (только видимые строки)."""
+    formatted_row = []
+    for value in row:
+        if value is None:
+            formatted_row.append("")
+        elif isinstance(value, bytes):
+            formatted_row.append("[BINARY DATA]")
+        elif isinstance(value, bool):
+            formatted_row.append("Да" if value else "Нет")
+        elif isinstance(value, datetime):
+            formatted_row.append(value.strftime("%Y-%m-%d %H:%M:%S"))
+        else:
+            formatted_row.append(str(value))
+    return formatted_row
+
+
+def _render_thumbnails(image_bytes):
+    """Миниатюры для сохранения вместе с изображением; None – если файл не декодируется."""
+    if not image_bytes:
+        return None
+    try:
+        return image_cache.encode_thumbnails(image_bytes)
+    except OSError as e:
+        print(f"Не удалось построить миниатюры: {e}")
+        return None
+
+
+def _save_product(product_id, name, price, qty, image_bytes):
+    """Выполняется в рабочем потоке: миниатюры считаются здесь же, а не в окне."""
+    thumbnails = _render_thumbnails(image_bytes)
+    if product_id is None:
+        return services.add_product(name, price, qty, image_bytes, thumbnails)
+    services.update_product(product_id, name, price, qty, image_bytes, thumbnails)
+    return product_id
+
+
 class AdminApp(ctk.CTkToplevel):
     def __init__(self, master, user_id: int):
         super().__init__(master)
@@ -30,11 +88,19 @@ class AdminApp(ctk.CTkToplevel):
         y = (self.winfo_screenheight() // 2) - (height // 2)
         self.geometry(f'{width}x{height}+{x}+{y}')
 
-        # Текущая таблица и данные
+        # Текущая таблица, её сортировка и фильтры
         self.current_table = None
-        self.table_data = []
+        self.sort = None      # (колонка, по_убыванию) или None – по первичному ключу
+        self.filters = {}     # колонка -> текст фильтра
         self.selected_row_id = None
         self.current_photo = None  # Для хранения ссылки на изображение
+        # идущая фоновая операция (экспорт или импорт): (название, progress)
+        self.job = None
+        self.analytics = None
+        self.diagnostics = None
+
+        # Запросы к БД выполняются в фоне, результаты приходят через after()
+        self.tasks = TaskRunner(self)
 
         # Создание интерфейса
         self.setup_ui()
@@ -135,6 +201,96 @@ class AdminApp(ctk.CTkToplevel):
         )
         self.delete_btn.grid(row=len(nav_buttons) + 4, column=0, padx=15, pady=5, sticky="ew")
 
+        self.bulk_btn = ctk.CTkButton(
+            self.sidebar_frame,
+            text="📋 Массовые операции",
+            command=self.open_bulk_dialog,
+            font=ctk.CTkFont(size=14),
+            height=35,
+            fg_color=BTN_SECONDARY,
+            text_color=BTN_SECONDARY_TEXT,
+            hover_color=BTN_SECONDARY_HOVER
+        )
+        self.bulk_btn.grid(row=len(nav_buttons) + 5, column=0, padx=15, pady=5, sticky="ew")
+
+        self.analytics_btn = ctk.CTkButton(
+            self.sidebar_frame,
+            text="📈 Аналитика",
+            command=self.open_analytics,
+            font=ctk.CTkFont(size=14),
+            height=35,
+            fg_color=BTN_SECONDARY,
+            text_color=BTN_SECONDARY_TEXT,
+            hover_color=BTN_SECONDARY_HOVER
+        )
+        self.analytics_btn.grid(row=len(nav_buttons) + 6, column=0, padx=15, pady=5, sticky="ew")
+
+        self.diagnostics_btn = ctk.CTkButton(
+            self.sidebar_frame,
+            text="🩺 Диагностика",
+            command=self.open_diagnostics,
+            font=ctk.CTkFont(size=14),
+            height=35,
+            fg_color=BTN_SECONDARY,
+            text_color=BTN_SECONDARY_TEXT,
+            hover_color=BTN_SECONDARY_HOVER
+        )
+        self.diagnostics_btn.grid(row=len(nav_buttons) + 7, column=0, padx=15, pady=5, sticky="ew")
+
+        self.export_btn = ctk.CTkButton(
+            self.sidebar_frame,
+            text="📤 Экспорт",
+            command=self.export_table,
+            font=ctk.CTkFont(size=14),
+            height=35,
+            fg_color=BTN_SECONDARY,
+            text_color=BTN_SECONDARY_TEXT,
+            hover_color=BTN_SECONDARY_HOVER
+        )
+        self.export_btn.grid(row=len(nav_buttons) + 8, column=0, padx=15, pady=(20, 5), sticky="ew")
+
+        self.import_btn = ctk.CTkButton(
+            self.sidebar_frame,
+            text="📥 Импорт товаров",
+            command=self.import_products,
+            font=ctk.CTkFont(size=14),
+            height=35,
+            fg_color=BTN_SECONDARY,
+            text_color=BTN_SECONDARY_TEXT,
+            hover_color=BTN_SECONDARY_HOVER
+        )
+        self.import_btn.grid(row=len(nav_buttons) + 9, column=0, padx=15, pady=5, sticky="ew")
+
+        # Поисковый индекс дополняется товарами, добавленными или переименованными
+        # в обход приложения (сравнивает весь каталог – только по запросу)
+        self.search_index_btn = ctk.CTkButton(
+            self.sidebar_frame,
+            text="🔎 Обновить поиск",
+            command=self.refresh_search_index,
+            font=ctk.CTkFont(size=14),
+            height=35,
+            fg_color=BTN_SECONDARY,
+            text_color=BTN_SECONDARY_TEXT,
+            hover_color=BTN_SECONDARY_HOVER
+        )
+        self.search_index_btn.grid(row=len(nav_buttons) + 10, column=0, padx=15, pady=5, sticky="ew")
+
+        # Ход экспорта или импорта: показывается, пока он идёт
+        self.job_label = ctk.CTkLabel(self.sidebar_frame, text="", text_color="white",
+                                      font=ctk.CTkFont(size=12))
+        self.job_cancel_btn = ctk.CTkButton(
+            self.sidebar_frame,
+            text="Остановить",
+            command=self.cancel_job,
+            font=ctk.CTkFont(size=12),
+            height=30,
+            fg_color="#dc3545",
+            hover_color="#c82333",
+            text_color="white"
+        )
+        self._job_row = len(nav_buttons) + 11
+        self.bind("<Destroy>", self._on_destroy_job, add="+")
+
         # Основная область с таблицей и деталями
         self.main_frame = ctk.CTkFrame(self, corner_radius=10, fg_color=BG_CARD)
         self.main_frame.grid(row=0, column=1, sticky="nsew", padx=20, pady=20)
@@ -154,12 +310,44 @@ class AdminApp(ctk.CTkToplevel):
         # Левая панель - таблица
         left_frame = ctk.CTkFrame(self.main_frame, fg_color="transparent")
         left_frame.grid(row=1, column=0, sticky="nsew", padx=(0, 10), pady=(0, 10))
-        left_frame.grid_rowconfigure(0, weight=1)
+        left_frame.grid_rowconfigure(1, weight=1)
         left_frame.grid_columnconfigure(0, weight=1)
 
+        # Фильтры по колонкам: условия выполняет сервер (services.admin_table_query)
+        filter_frame = ctk.CTkFrame(left_frame, fg_color="transparent")
+        filter_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=(10, 0))
+
+        self.combo_filter_column = ctk.CTkComboBox(
+            filter_frame, values=[], width=180, height=32, state="readonly",
+            command=self._on_filter_column_changed,
+            fg_color=ENTRY_BG, border_color=ENTRY_BORDER, text_color=ENTRY_TEXT,
+            button_color=ACCENT, button_hover_color=ACCENT_DARK
+        )
+        self.combo_filter_column.pack(side="left", padx=(0, 5))
+
+        self.entry_filter = ctk.CTkEntry(
+            filter_frame, width=220, height=32,
+            placeholder_text="текст, =значение, >100, <=2024-01-01",
+            fg_color=ENTRY_BG, border_color=ENTRY_BORDER, text_color=ENTRY_TEXT
+        )
+        self.entry_filter.pack(side="left", padx=5)
+        self.entry_filter.bind("<Return>", lambda e: self._apply_filter())
+
+        ctk.CTkButton(
+            filter_frame, text="🔍 Фильтр", command=self._apply_filter, width=90, height=32,
+            fg_color=ACCENT, hover_color=ACCENT_DARK, text_color="white"
+        ).pack(side="left", padx=5)
+        ctk.CTkButton(
+            filter_frame, text="✖ Сбросить", command=self._reset_filters, width=90, height=32,
+            fg_color=BTN_SECONDARY, hover_color=BTN_SECONDARY_HOVER, text_color=BTN_SECONDARY_TEXT
+        ).pack(side="left", padx=5)
+
+        self.label_filters = ctk.CTkLabel(filter_frame, text="", text_color=TEXT_DARK)
+        self.label_filters.pack(side="left", padx=10)
+
         # Фрейм для таблицы с прокруткой
         self.table_container = ctk.CTkFrame(left_frame, corner_radius=8, fg_color=ACCENT_LIGHT)
-        self.table_container.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        self.table_container.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
         self.table_container.grid_rowconfigure(0, weight=1)
         self.table_container.grid_columnconfigure(0, weight=1)
 
@@ -180,15 +368,14 @@ class AdminApp(ctk.CTkToplevel):
         # Treeview для отображения данных
         self.tree = ttk.Treeview(
             self.tk_table_frame,
-            yscrollcommand=self.scrollbar_y.set,
             xscrollcommand=self.scrollbar_x.set,
-            selectmode="browse",
+            selectmode="extended",  # Ctrl/Shift – несколько записей для массовых операций
             style="Custom.Treeview"
         )
         self.tree.grid(row=0, column=0, sticky="nsew")
 
-        self.scrollbar_y.config(command=self.tree.yview)
         self.scrollbar_x.config(command=self.tree.xview)
+        self.loading_table = LoadingIndicator(self.tk_table_frame)
 
         # Стиль для Treeview с розовой темой
         style = ttk.Style()
@@ -237,21 +424,27 @@ class AdminApp(ctk.CTkToplevel):
 
         self.image_label = tk.Label(self.image_label_frame, bg=BG_CARD)
         self.image_label.pack()
+        self.loading_image = LoadingIndicator(self.image_frame)
 
         # Поле для отображения деталей
         self.details_text = ctk.CTkTextbox(self.right_frame, height=200, font=ctk.CTkFont(size=12))
         self.details_text.grid(row=2, column=0, sticky="nsew", padx=15, pady=(0, 15))
 
-        # Привязка события выбора строки
-        self.tree.bind('<<TreeviewSelect>>', self.on_row_select)
+        # Постраничный список: в дереве только видимые строки, остальные
+        # читаются страницами при прокрутке – память не зависит от размера таблицы
+        self.table = VirtualTree(
+            self.tree, self.scrollbar_y, self.tasks, "table",
+            format_row=_admin_values, on_select=self.on_row_select,
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {str(e)}"),
+            indicator=self.loading_table,
+            multiselect=True,
+        )
 
-    def on_row_select(self, event):
+    def on_row_select(self, row):
         """Обработка выбора строки в таблице"""
-        selection = self.tree.selection()
-        if not selection:
+        if row is None:
             return
-        selected_item = selection[0]
-        values = self.tree.item(selected_item, 'values')
+        values = _admin_values(row)
         self.selected_row_id = values[0] if values else None
         # Показываем детали в правой панели
         self.show_details(values)
@@ -260,6 +453,7 @@ class AdminApp(ctk.CTkToplevel):
             self.load_product_image(values[0])
         else:
             # Для других таблиц или если нет данных - просто очищаем
+            self.tasks.cancel("image")
             self.clear_image_display()
 
     def clear_image_display(self):
@@ -304,214 +498,139 @@ class AdminApp(ctk.CTkToplevel):
                 self.image_label.configure(text="Некорректный ID", font=("Segoe UI", 10))
                 return
 
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT Изображение FROM Товар WHERE Номер_товара = ?",
-                (pid,)
+            # Выбор другой строки отменяет прежний запрос
+            self.tasks.submit(
+                "image", _fetch_product_thumbnail, pid, (280, 280),
+                on_done=self._show_product_image,
+                on_error=self._on_product_image_error,
+                indicator=self.loading_image,
             )
-            row = cursor.fetchone()
-            conn.close()
-
-            if row and row[0]:
-                img_bytes = bytes(row[0])  # memoryview → bytes
-                try:
-                    # Загружаем изображение через PIL
-                    image = Image.open(io.BytesIO(img_bytes))
-                    image.thumbnail((280, 280), Image.Resampling.LANCZOS)
-
-                    # Конвертируем в PhotoImage для tkinter
-                    photo = ImageTk.PhotoImage(image, master=self)
-
-                    # Сохраняем ссылку и обновляем отображение
-                    self.current_photo = photo
-                    self.image_label.configure(image=photo, text="", bg=BG_CARD)
-
-                except Exception as e:
-                    print(f"Ошибка обработки изображения: {e}")
-                    self.image_label.configure(text="Ошибка изображения", font=("Segoe UI", 10), bg=BG_CARD)
-            else:
-                self.image_label.configure(text="Нет изображения", font=("Segoe UI", 10), bg=BG_CARD)
 
         except Exception as e:
-            print(f"Ошибка при загрузке изображения: {e}")
-            self.image_label.configure(text="Ошибка загрузки", font=("Segoe UI", 10), bg=BG_CARD)
+            self._on_product_image_error(e)
 
-    def load_table(self, table_name, title, query=None):
-        self.current_table = table_name
+    def _show_product_image(self, image):
+        if image is None:
+            self.image_label.configure(text="Нет изображения", font=("Segoe UI", 10), bg=BG_CARD)
+            return
+        if image is _BROKEN_IMAGE:
+            self.image_label.configure(text="Ошибка изображения", font=("Segoe UI", 10), bg=BG_CARD)
+            return
+
+        # Конвертируем в PhotoImage для tkinter (только в главном потоке)
+        photo = ImageTk.PhotoImage(image, master=self)
+
+        # Сохраняем ссылку и обновляем отображение
+        self.current_photo = photo
+        self.image_label.configure(image=photo, text="", bg=BG_CARD)
+
+    def _on_product_image_error(self, e):
+        print(f"Ошибка при загрузке изображения: {e}")
+        self.image_label.configure(text="Ошибка загрузки", font=("Segoe UI", 10), bg=BG_CARD)
+
+    def load_table(self, table_name, title):
         self.table_title.configure(text=title)
+        if table_name == self.current_table:
+            # Та же таблица – перечитываем, сохраняя позицию и выбор
+            self.table.refresh()
+            return
+
+        self.current_table = table_name
         self.selected_row_id = None
+        self.sort = None
+        self.filters = {}
 
         # Очищаем детали и изображение
         self.details_text.delete("1.0", "end")
         self.clear_image_display()
+        self.tasks.cancel("image")
+
+        # Колонки известны заранее, строки придут первой страницей
+        columns = services.admin_table_columns(table_name)
+        self.tree["columns"] = [column.name for column in columns]
+        for column in columns:
+            self.tree.column(column.name, width=120, minwidth=80, stretch=True)
+            if column.key is not None:
+                self.tree.heading(column.name, anchor="w",
+                                  command=lambda name=column.name: self._sort_by(name))
+            else:
+                self.tree.heading(column.name, anchor="w", command="")
 
-        # Очищаем таблицу
-        self.tree.delete(*self.tree.get_children())
+        filterable = [column.name for column in columns if column.key is not None]
+        self.combo_filter_column.configure(values=filterable)
+        self.combo_filter_column.set(filterable[0] if filterable else "")
+        self.entry_filter.delete(0, "end")
+        self._query_table(clear=True)
 
-        # Удаляем старые колонки
-        for col in self.tree["columns"]:
-            self.tree.heading(col, text="")
-            self.tree.column(col, width=0)
+    def _query_table(self, clear=False):
+        """Показать текущую таблицу с выбранными сортировкой и фильтрами."""
+        try:
+            query = services.admin_table_query(self.current_table, self.sort, self.filters)
+        except services.ServiceError as e:
+            messagebox.showwarning("Фильтр", str(e))
+            return False
+
+        # Стрелка у заголовка колонки, по которой отсортировано
+        for name in self.tree["columns"]:
+            mark = ""
+            if self.sort and self.sort[0] == name:
+                mark = " ▼" if self.sort[1] else " ▲"
+            self.tree.heading(name, text=name + mark)
+        self.label_filters.configure(
+            text="; ".join(f"{name}: {text}" for name, text in self.filters.items())
+        )
+        self.table.set_source(query, clear=clear)
+        return True
 
-        # Получаем данные из БД
-        conn = get_connection()
-        cursor = conn.cursor()
+    def _sort_by(self, name):
+        """Щелчок по заголовку: по возрастанию, повторный – по убыванию."""
+        if not self.current_table:
+            return
+        desc = bool(self.sort and self.sort[0] == name and not self.sort[1])
+        self.sort = (name, desc)
+        self._query_table()
 
-        try:
-            if query:
-                cursor.execute(query)
-            else:
-                cursor.execute(f"SELECT * FROM {table_name}")
-
-            # Получаем заголовки колонок
-            columns = [desc[0] for desc in cursor.description]
-
-            # Настраиваем колонки Treeview
-            self.tree["columns"] = columns
-            for col in columns:
-                self.tree.heading(col, text=col, anchor="w")
-                self.tree.column(col, width=120, minwidth=80, stretch=True)
-
-            # Заполняем данными
-            rows = cursor.fetchall()
-            self.table_data = []
-
-            for row in rows:
-                # Преобразуем типы для отображения
-                formatted_row = []
-                for value in row:
-                    if value is None:
-                        formatted_row.append("")
-                    elif isinstance(value, bytes):
-                        formatted_row.append("[BINARY DATA]")
-                    elif isinstance(value, bool):
-                        formatted_row.append("Да" if value else "Нет")
-                    elif isinstance(value, datetime):
-                        formatted_row.append(value.strftime("%Y-%m-%d %H:%M:%S"))
-                    else:
-                        formatted_row.append(str(value))
-
-                self.table_data.append(formatted_row)
-                self.tree.insert("", "end", values=formatted_row)
+    def _on_filter_column_changed(self, name):
+        self.entry_filter.delete(0, "end")
+        self.entry_filter.insert(0, self.filters.get(name, ""))
 
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось загрузить данные: {str(e)}")
-        finally:
-            conn.close()
+    def _apply_filter(self):
+        name = self.combo_filter_column.get()
+        if not self.current_table or not name:
+            return
+        previous = dict(self.filters)
+        text = self.entry_filter.get().strip()
+        if text:
+            self.filters[name] = text
+        else:
+            self.filters.pop(name, None)
+        if not self._query_table():
+            self.filters = previous
+
+    def _reset_filters(self):
+        if not self.current_table:
+            return
+        self.filters = {}
+        self.entry_filter.delete(0, "end")
+        self._query_table()
 
     def load_users(self):
-        self.load_table(
-            "Пользователь",
-            "👥 Пользователи",
-            """
-            SELECT ID_пользователя,
-                   Логин,
-                   ISNULL(Email, '')                              as Email,
-                   Роль,
-                   CONVERT(varchar (19), Дата_регистрации, 120)   as Дата_регистрации,
-                   CASE WHEN Активен = 1 THEN 'Да' ELSE 'Нет' END as Активен
-            FROM Пользователь
-            ORDER BY ID_пользователя
-            """
-        )
+        self.load_table("Пользователь", "👥 Пользователи")
 
     def load_clients(self):
-        self.load_table(
-            "Клиент",
-            "👤 Клиенты",
-            """
-            SELECT c.ID_Клиент,
-                   c.Фамилия,
-                   c.Имя,
-                   c.Отчество,
-                   c.Серия_паcпорта,
-                   c.Номер_паcпорта,
-                   c.Город,
-                   c.Улица,
-                   ISNULL(c.Дом, '')      as Дом,
-                   ISNULL(c.Квартира, '') as Квартира,
-                   u.Логин
-            FROM Клиент c
-                     JOIN Пользователь u ON c.ID_пользователя = u.ID_пользователя
-            ORDER BY c.ID_Клиент
-            """
-        )
+        self.load_table("Клиент", "👤 Клиенты")
 
     def load_couriers(self):
-        self.load_table(
-            "Курьер",
-            "🚴 Курьеры",
-            """
-            SELECT k.ID_курьера,
-                   k.Фамилия,
-                   k.Имя,
-                   k.Отчество,
-                   k.Номер_телефона,
-                   u.Логин,
-                   ISNULL(u.Email, '') as Email
-            FROM Курьер k
-                     JOIN Пользователь u ON k.ID_пользователя = u.ID_пользователя
-            ORDER BY k.ID_курьера
-            """
-        )
+        self.load_table("Курьер", "🚴 Курьеры")
 
     def load_products(self):
-        self.load_table(
-            "Товар",
-            "📦 Товары",
-            """
-            SELECT Номер_товара,
-                   Название,
-                   CONVERT(varchar (20), Цена) as Цена,
-                   Количество,
-                   CASE
-                       WHEN Изображение IS NULL THEN 'Нет'
-                       ELSE 'Есть'
-                       END                     as Изображение
-            FROM Товар
-            ORDER BY Номер_товара
-            """
-        )
+        self.load_table("Товар", "📦 Товары")
 
     def load_orders(self):
-        self.load_table(
-            "Заказ",
-            "📋 Заказы",
-            """
-            SELECT z.ID_заказа,
-                   CONVERT(varchar (10), z.Дата_заказа, 120)                                               as Дата_заказа,
-                   t.Название                                                                              as Товар,
-                   z.Количество_заказанного_товара                                                         as Количество,
-                   CONCAT(c.Фамилия, ' ', c.Имя)                                                           as Клиент,
-                   ISNULL(CONCAT(k.Фамилия, ' ', k.Имя), 'Не назначен')                                    as Курьер,
-                   z.Статус,
-                   CONVERT(varchar (10), t.Цена)                                                           as Цена_за_единицу,
-                   CONVERT(varchar (20), CAST(t.Цена * z.Количество_заказанного_товара AS DECIMAL(10, 2))) as Сумма
-            FROM Заказ z
-                     JOIN Товар t ON z.Номер_товара = t.Номер_товара
-                     JOIN Платежные_данные p ON z.ID_данные = p.ID_данных
-                     JOIN Клиент c ON p.ID_Клиента = c.ID_Клиент
-                     LEFT JOIN Курьер k ON z.ID_курьера = k.ID_курьера
-            ORDER BY z.Дата_заказа DESC, z.ID_заказа DESC
-            """
-        )
+        self.load_table("Заказ", "📋 Заказы")
 
     def load_payments(self):
-        self.load_table(
-            "Платежные_данные",
-            "💳 Платежные данные",
-            """
-            SELECT p.ID_данных,
-                   CONCAT(c.Фамилия, ' ', c.Имя, ' ', ISNULL(c.Отчество, '')) as Клиент,
-                   CONCAT('**** **** **** ', RIGHT(p.Номер_карты, 4))         as Номер_карты,
-                   CONVERT(varchar (10), p.Срок_действия, 120)                as Срок_действия,
-                   '***'                                                      as CVV
-            FROM Платежные_данные p
-                     JOIN Клиент c ON p.ID_Клиента = c.ID_Клиент
-            ORDER BY p.ID_данных
-            """
-        )
+        self.load_table("Платежные_данные", "💳 Платежные данные")
 
     def refresh_table(self):
         if self.current_table:
@@ -560,6 +679,11 @@ class AdminApp(ctk.CTkToplevel):
         if not self.current_table:
             return
 
+        if len(self.table.selected_rows()) > 1:
+            # несколько записей меняются одной массовой операцией
+            self.open_bulk_dialog()
+            return
+
         # Получаем данные выбранной строки
         item = self.tree.item(selected[0])
         values = item["values"]
@@ -591,6 +715,10 @@ class AdminApp(ctk.CTkToplevel):
         if not self.current_table:
             return
 
+        if len(self.table.selected_rows()) > 1:
+            self.open_bulk_dialog("delete")
+            return
+
         item = self.tree.item(selected[0])
         values = item["values"]
 
@@ -610,34 +738,209 @@ class AdminApp(ctk.CTkToplevel):
         )
 
         if response:
-            try:
-                conn = get_connection()
-                cursor = conn.cursor()
+            self.tasks.submit(
+                "delete", services.delete_record, self.current_table, values[0],
+                on_done=lambda _, t=self.current_table, rid=values[0]: self._on_record_deleted(t, rid),
+                on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось удалить запись: {str(e)}"),
+                indicator=self.loading_table,
+                replace=False,
+            )
 
-                # Определяем имя ID колонки и таблицы
-                table_id_map = {
-                    "Пользователь": ("Пользователь", "ID_пользователя"),
-                    "Клиент": ("Клиент", "ID_Клиент"),
-                    "Курьер": ("Курьер", "ID_курьера"),
-                    "Товар": ("Товар", "Номер_товара"),
-                    "Заказ": ("Заказ", "ID_заказа"),
-                    "Платежные_данные": ("Платежные_данные", "ID_данных")
-                }
+    def open_bulk_dialog(self, action=None):
+        """Операция над отмеченными записями или над всеми записями по фильтру."""
+        if not self.current_table:
+            messagebox.showinfo("Информация", "Сначала выберите таблицу")
+            return
+        if not services.bulk_actions(self.current_table):
+            messagebox.showinfo("Информация",
+                                f"Массовые операции для таблицы '{self.current_table}' не предусмотрены.\n\n"
+                                f"Доступны для: Пользователи, Товары, Заказы")
+            return
+        ids = [row[0] for row in self.table.selected_rows()]
+        dialog = BulkDialog(self, self.current_table, ids, dict(self.filters),
+                            self._on_bulk_applied, action)
+        dialog.grab_set()
+
+    def _on_bulk_applied(self, table, deleted_ids):
+        if table == "Товар":
+            for product_id in deleted_ids:
+                image_cache.invalidate(int(product_id))
+        self.table.clear_selection()
+        self.refresh_table()
+
+    def open_analytics(self):
+        if self.analytics is not None and self.analytics.winfo_exists():
+            self.analytics.focus()
+            self.analytics.load()
+            return
+        self.analytics = AnalyticsWindow(self)
 
-                table_name, id_column = table_id_map.get(self.current_table, (None, None))
+    def open_diagnostics(self):
+        if self.diagnostics is not None and self.diagnostics.winfo_exists():
+            self.diagnostics.focus()
+            return
+        self.diagnostics = DiagnosticsWindow(self)
 
-                if table_name and id_column:
-                    record_id = values[0]
-                    cursor.execute(f"DELETE FROM {table_name} WHERE {id_column} = ?", (record_id,))
-                    conn.commit()
+    # ---------- Экспорт и импорт ----------
 
-                    messagebox.showinfo("Успех", "Запись успешно удалена")
-                    self.refresh_table()
+    def _start_job(self, title, progress):
+        self.job = (title, progress)
+        self.job_label.configure(text=f"{title}: подготовка…")
+        self.job_label.grid(row=self._job_row, column=0, padx=15, pady=(5, 0), sticky="w")
+        self.job_cancel_btn.grid(row=self._job_row + 1, column=0, padx=15, pady=5, sticky="ew")
+        self._show_job_progress()
 
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось удалить запись: {str(e)}")
-            finally:
-                conn.close()
+    def _job_running(self):
+        if self.job is not None:
+            messagebox.showinfo(self.job[0], "Дождитесь окончания или остановите текущую операцию")
+            return True
+        return False
+
+    def _show_job_progress(self):
+        if self.job is None:
+            return
+        title, progress = self.job
+        if progress.total is not None:
+            self.job_label.configure(text=f"{title}: {progress.done:,} из {progress.total:,}"
+                                     .replace(",", " "))
+        self.after(200, self._show_job_progress)
+
+    def cancel_job(self):
+        if self.job is not None:
+            title, progress = self.job
+            progress.cancel()
+            self.job_label.configure(text=f"{title}: остановка…")
+
+    def _finish_job(self):
+        self.job = None
+        self.job_label.grid_forget()
+        self.job_cancel_btn.grid_forget()
+
+    def _on_destroy_job(self, event):
+        # рабочий поток не должен дописывать файл или БД за закрытым окном
+        if event.widget is self and self.job is not None:
+            self.job[1].cancel()
+
+    def export_table(self):
+        """Выгрузить текущую таблицу (с сортировкой и фильтрами) в CSV или XLSX."""
+        if not self.current_table:
+            messagebox.showinfo("Информация", "Сначала выберите таблицу")
+            return
+        if self._job_running():
+            return
+
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title="Экспорт таблицы",
+            initialfile=f"{self.current_table}.xlsx",
+            defaultextension=".xlsx",
+            filetypes=[("Книга Excel", "*.xlsx"), ("CSV (разделитель ;)", "*.csv")],
+        )
+        if not path:
+            return
+
+        progress = export.ExportProgress()
+        self.tasks.submit(
+            "export", export.export_admin_table,
+            self.current_table, path, self.sort, dict(self.filters),
+            progress=progress,
+            on_done=lambda rows: self._on_export_done(rows, path),
+            on_error=self._on_export_error,
+            replace=False,
+        )
+        self._start_job("Экспорт", progress)
+
+    def _on_export_done(self, rows, path):
+        self._finish_job()
+        messagebox.showinfo("Экспорт", f"Выгружено строк: {rows}\n{path}")
+
+    def _on_export_error(self, e):
+        self._finish_job()
+        if isinstance(e, export.ExportCancelled):
+            messagebox.showinfo("Экспорт", "Выгрузка отменена")
+        elif isinstance(e, services.ServiceError):
+            messagebox.showwarning("Экспорт", str(e))
+        else:
+            print(f"Ошибка экспорта: {e}")
+            messagebox.showerror("Ошибка", f"Не удалось выгрузить таблицу: {str(e)}")
+
+    def import_products(self):
+        """Загрузить товары из CSV; изображения – из выбранного каталога."""
+        if self._job_running():
+            return
+
+        csv_path = filedialog.askopenfilename(
+            parent=self,
+            title="Файл товаров (Название;Цена;Количество;Изображение)",
+            filetypes=[("CSV", "*.csv"), ("Все файлы", "*.*")],
+        )
+        if not csv_path:
+            return
+        image_dir = filedialog.askdirectory(
+            parent=self,
+            title="Каталог с изображениями",
+            initialdir=os.path.dirname(csv_path),
+        ) or os.path.dirname(csv_path)
+
+        progress = product_import.ImportProgress()
+        self.tasks.submit(
+            "import", product_import.import_products, csv_path, image_dir,
+            progress=progress,
+            on_done=self._on_import_done,
+            on_error=self._on_import_error,
+            replace=False,
+        )
+        self._start_job("Импорт", progress)
+
+    def _on_import_done(self, result):
+        self._finish_job()
+        message = (f"Добавлено товаров: {result.imported}\n"
+                   f"Отклонено строк: {result.failed}\n"
+                   f"Скорость: {result.rows_per_second:.0f} строк/с")
+        if result.skipped:
+            message += f"\nПропущено (загружено ранее): {result.skipped}"
+        if result.report_path:
+            message += f"\n\nОтчёт об ошибках:\n{result.report_path}"
+        messagebox.showinfo("Импорт", message)
+        if self.current_table == "Товар":
+            self.refresh_table()
+
+    def _on_import_error(self, e):
+        self._finish_job()
+        if isinstance(e, product_import.ImportCancelled):
+            messagebox.showinfo("Импорт", "Импорт остановлен. Повторный импорт того же "
+                                          "файла продолжится с места остановки")
+            if self.current_table == "Товар":
+                self.refresh_table()
+        elif isinstance(e, services.ServiceError):
+            messagebox.showwarning("Импорт", str(e))
+        else:
+            print(f"Ошибка импорта: {e}")
+            messagebox.showerror("Ошибка", f"Не удалось импортировать товары: {str(e)}")
+
+    def refresh_search_index(self):
+        """Проиндексировать товары, которых нет в поисковом индексе."""
+        self.search_index_btn.configure(state="disabled")
+        self.tasks.submit(
+            "search_index", services.refresh_search_index,
+            on_done=self._on_search_index_done,
+            on_error=self._on_search_index_error,
+        )
+
+    def _on_search_index_done(self, count):
+        self.search_index_btn.configure(state="normal")
+        messagebox.showinfo("Поиск", f"Проиндексировано товаров: {count}")
+
+    def _on_search_index_error(self, e):
+        self.search_index_btn.configure(state="normal")
+        print(f"Ошибка обновления поискового индекса: {e}")
+        messagebox.showerror("Ошибка", f"Не удалось обновить поисковый индекс: {str(e)}")
+
+    def _on_record_deleted(self, table, record_id):
+        if table == "Товар":
+            image_cache.invalidate(int(record_id))
+        messagebox.showinfo("Успех", "Запись успешно удалена")
+        self.refresh_table()
 
 
 # Диалоговые окна для добавления/редактирования записей
@@ -646,6 +949,7 @@ class AddUserDialog(ctk.CTkToplevel):
     def __init__(self, parent, callback):
         super().__init__(parent)
         self.callback = callback
+        self.tasks = TaskRunner(self)
 
         self.title("Добавить пользователя")
         self.geometry("500x450")
@@ -746,27 +1050,20 @@ class AddUserDialog(ctk.CTkToplevel):
             messagebox.showwarning("Ошибка", "Логин и пароль обязательны")
             return
 
-        try:
-            from security import hash_password
-            hashed_password = hash_password(password)
-
-            conn = get_connection()
-            cursor = conn.cursor()
+        from security import hash_password
+        hashed_password = hash_password(password)
 
-            cursor.execute("""
-                           INSERT INTO Пользователь (Логин, Хеш_пароля, Email, Роль, Активен, Дата_регистрации)
-                           VALUES (?, ?, ?, ?, ?, GETDATE())
-                           """, (login, hashed_password, email, role, active))
-
-            conn.commit()
-            messagebox.showinfo("Успех", "Пользователь добавлен")
-            self.callback()
-            self.destroy()
+        self.tasks.submit(
+            "save", services.add_user, login, hashed_password, email, role, active,
+            on_done=lambda _: self._on_saved("Пользователь добавлен"),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось добавить пользователя: {str(e)}"),
+            replace=False,
+        )
 
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось добавить пользователя: {str(e)}")
-        finally:
-            conn.close()
+    def _on_saved(self, message):
+        messagebox.showinfo("Успех", message)
+        self.callback()
+        self.destroy()
 
 
 class EditUserDialog(AddUserDialog):
@@ -795,47 +1092,26 @@ class EditUserDialog(AddUserDialog):
         role = self.combo_role.get()
         active = 1 if self.combo_active.get() == "Да" else 0
 
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-
-            # Проверяем, нужно ли обновлять пароль
-            password = self.entry_password.get()
-            if password and password != "********":
-                from security import hash_password
-                hashed_password = hash_password(password)
-                cursor.execute("""
-                               UPDATE Пользователь
-                               SET Email      = ?,
-                                   Роль       = ?,
-                                   Активен    = ?,
-                                   Хеш_пароля = ?
-                               WHERE ID_пользователя = ?
-                               """, (email, role, active, hashed_password, self.user_id))
-            else:
-                cursor.execute("""
-                               UPDATE Пользователь
-                               SET Email   = ?,
-                                   Роль    = ?,
-                                   Активен = ?
-                               WHERE ID_пользователя = ?
-                               """, (email, role, active, self.user_id))
-
-            conn.commit()
-            messagebox.showinfo("Успех", "Пользователь обновлен")
-            self.callback()
-            self.destroy()
+        # Проверяем, нужно ли обновлять пароль
+        password = self.entry_password.get()
+        hashed_password = None
+        if password and password != "********":
+            from security import hash_password
+            hashed_password = hash_password(password)
 
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось обновить пользователя: {str(e)}")
-        finally:
-            conn.close()
+        self.tasks.submit(
+            "save", services.update_user, self.user_id, email, role, active, hashed_password,
+            on_done=lambda _: self._on_saved("Пользователь обновлен"),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось обновить пользователя: {str(e)}"),
+            replace=False,
+        )
 
 
 class AddProductDialog(ctk.CTkToplevel):
     def __init__(self, parent, callback):
         super().__init__(parent)
         self.callback = callback
+        self.tasks = TaskRunner(self)
         self.configure(fg_color=BG_MAIN)
 
         # байты картинки из файла / БД
@@ -1007,29 +1283,18 @@ class AddProductDialog(ctk.CTkToplevel):
             messagebox.showwarning("Ошибка", "Некорректное количество")
             return
 
-        conn = None
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                INSERT INTO Товар (Название, Цена, Количество, Изображение)
-                VALUES (?, ?, ?, ?)
-                """,
-                (name, price, qty, self.image_bytes),
-            )
-            conn.commit()
-            messagebox.showinfo("Успех", "Товар добавлен")
-            if self.callback:
-                self.callback()
-            self.destroy()
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            messagebox.showerror("Ошибка", f"Не удалось добавить товар: {e}")
-        finally:
-            if conn:
-                conn.close()
+        self.tasks.submit(
+            "save", _save_product, None, name, price, qty, self.image_bytes,
+            on_done=lambda _: self._on_saved("Товар добавлен"),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось добавить товар: {e}"),
+            replace=False,
+        )
+
+    def _on_saved(self, message):
+        messagebox.showinfo("Успех", message)
+        if self.callback:
+            self.callback()
+        self._on_cancel()
 
     def _on_cancel(self):
         # безопасно отвяжем картинку
@@ -1061,51 +1326,43 @@ class EditProductDialog(AddProductDialog):
             has_image_flag = values[4]
 
             if has_image_flag in ("Есть", "Да", "1", True):
-                # подгружаем изображение из БД
-                try:
-                    conn = get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "SELECT Изображение FROM Товар WHERE Номер_товара = ?",
-                        (self.product_id,),
-                    )
-                    row = cursor.fetchone()
-                    conn.close()
-
-                    if row and row[0]:
-                        self.image_bytes = row[0]
-
-                        try:
-                            img = Image.open(
-                                io.BytesIO(self.image_bytes)
-                            )
-                            img.thumbnail(
-                                (120, 120), Image.Resampling.LANCZOS
-                            )
-
-                            self.preview_photo = ImageTk.PhotoImage(img, master=self)
-                            self.preview_label.configure(
-                                image=self.preview_photo, text=""
-                            )
-                            self.lbl_image_status.configure(
-                                text="Изображение загружено из БД"
-                            )
-                        except Exception as e:
-                            print(f"Ошибка создания превью: {e}")
-                            self.preview_label.configure(
-                                image=None,
-                                text="Изображение загружено (ошибка превью)",
-                            )
-                    else:
-                        self.lbl_image_status.configure(
-                            text="Изображение в БД отсутствует"
-                        )
-
-                except Exception as e:
-                    print(f"Ошибка загрузки изображения из БД: {e}")
-                    self.lbl_image_status.configure(
-                        text="Ошибка загрузки изображения"
-                    )
+                # подгружаем превью из кэша / БД в фоне; само изображение
+                # диалогу не нужно – без нового файла оно не перезаписывается
+                self.lbl_image_status.configure(text="Загрузка изображения...")
+                self.tasks.submit(
+                    "image", _fetch_product_thumbnail, self.product_id, (120, 120),
+                    on_done=self._show_db_image,
+                    on_error=self._on_db_image_error,
+                )
+
+    def _show_db_image(self, img):
+        # пользователь мог уже выбрать новый файл – его не перетираем
+        if self.image_bytes is not None:
+            return
+
+        if img is _BROKEN_IMAGE:
+            self.preview_label.configure(
+                image=None,
+                text="Изображение загружено (ошибка превью)",
+            )
+        elif img is not None:
+            self.preview_photo = ImageTk.PhotoImage(img, master=self)
+            self.preview_label.configure(
+                image=self.preview_photo, text=""
+            )
+            self.lbl_image_status.configure(
+                text="Изображение загружено из БД"
+            )
+        else:
+            self.lbl_image_status.configure(
+                text="Изображение в БД отсутствует"
+            )
+
+    def _on_db_image_error(self, e):
+        print(f"Ошибка загрузки изображения из БД: {e}")
+        self.lbl_image_status.configure(
+            text="Ошибка загрузки изображения"
+        )
 
     def save(self):
         if not self.product_id:
@@ -1136,47 +1393,19 @@ class EditProductDialog(AddProductDialog):
             messagebox.showwarning("Ошибка", "Некорректное количество")
             return
 
-        conn = None
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-
-            if self.image_bytes is not None:
-                cursor.execute(
-                    """
-                    UPDATE Товар
-                    SET Название    = ?,
-                        Цена        = ?,
-                        Количество  = ?,
-                        Изображение = ?
-                    WHERE Номер_товара = ?
-                    """,
-                    (name, price, qty, self.image_bytes, self.product_id),
-                )
-            else:
-                cursor.execute(
-                    """
-                    UPDATE Товар
-                    SET Название   = ?,
-                        Цена       = ?,
-                        Количество = ?
-                    WHERE Номер_товара = ?
-                    """,
-                    (name, price, qty, self.product_id),
-                )
+        # self.image_bytes задан, только если выбран новый файл (иначе изображение не меняется)
+        self.tasks.submit(
+            "save", _save_product, self.product_id, name, price, qty, self.image_bytes,
+            on_done=lambda _: self._on_image_saved("Товар обновлён"),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось обновить товар: {e}"),
+            replace=False,
+        )
 
-            conn.commit()
-            messagebox.showinfo("Успех", "Товар обновлён")
-            if self.callback:
-                self.callback()
-            self._on_cancel()
-        except Exception as e:
-            if conn:
-                conn.rollback()
-            messagebox.showerror("Ошибка", f"Не удалось обновить товар: {e}")
-        finally:
-            if conn:
-                conn.close()
+
+    def _on_image_saved(self, message):
+        if self.image_bytes is not None:
+            image_cache.invalidate(self.product_id)
+        self._on_saved(message)
 
 
 class EditOrderDialog(ctk.CTkToplevel):
@@ -1184,6 +1413,7 @@ class EditOrderDialog(ctk.CTkToplevel):
         super().__init__(parent)
         self.order_id = values[0] if values else None
         self.callback = callback
+        self.tasks = TaskRunner(self)
         self.configure(fg_color=BG_MAIN)
 
         self.title("Редактировать заказ")
@@ -1252,22 +1482,201 @@ class EditOrderDialog(ctk.CTkToplevel):
                       text_color=BTN_SECONDARY_TEXT).pack(side="right", padx=5)
 
     def save(self):
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
+        self.tasks.submit(
+            "save", services.set_order_status, self.order_id, self.combo_status.get(),
+            on_done=lambda _: self._on_saved(),
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось обновить заказ: {str(e)}"),
+            replace=False,
+        )
 
-            cursor.execute("""
-                           UPDATE Заказ
-                           SET Статус = ?
-                           WHERE ID_заказа = ?
-                           """, (self.combo_status.get(), self.order_id))
+    def _on_saved(self):
+        messagebox.showinfo("Успех", "Статус заказа обновлен")
+        self.callback()
+        self.destroy()
 
-            conn.commit()
-            messagebox.showinfo("Успех", "Статус заказа обновлен")
-            self.callback()
-            self.destroy()
 
-        except Exception as e:
-            messagebox.showerror("Ошибка", f"Не удалось обновить заказ: {str(e)}")
-        finally:
-            conn.close()
\ No newline at end of file
+class BulkDialog(ctk.CTkToplevel):
+    """
+    Массовая операция: сначала пробный прогон (сколько записей затронет
+    и как изменятся первые из них), затем применение одной транзакцией.
+    """
+
+    def __init__(self, parent, table_name, ids, filters, callback, action=None):
+        super().__init__(parent)
+        self.table_name = table_name
+        self.ids = ids
+        self.filters = filters
+        self.callback = callback
+        self.actions = services.bulk_actions(table_name)
+        self.tasks = TaskRunner(self)
+        self.previewed = None  # параметры операции, для которых показан предпросмотр
+        self.configure(fg_color=BG_MAIN)
+
+        self.title("Массовые операции")
+        self.geometry("640x600")
+
+        # Центрирование окна
+        self.update_idletasks()
+        width = self.winfo_width()
+        height = self.winfo_height()
+        x = (parent.winfo_screenwidth() // 2) - (width // 2)
+        y = (parent.winfo_screenheight() // 2) - (height // 2)
+        self.geometry(f'{width}x{height}+{x}+{y}')
+
+        self.setup_ui(action)
+
+    def setup_ui(self, action):
+        main_frame = ctk.CTkFrame(self, fg_color=BG_CARD, corner_radius=10)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        ctk.CTkLabel(main_frame, text=f"Массовые операции: {self.table_name}",
+                     font=ctk.CTkFont(size=16, weight="bold"),
+                     text_color=HEADER_PRIMARY).pack(pady=(0, 15))
+
+        # Какие записи
+        self.scope = tk.StringVar(value="selected" if self.ids else "filter")
+        ctk.CTkRadioButton(main_frame, text=f"Отмеченные записи ({len(self.ids)})",
+                           variable=self.scope, value="selected",
+                           state="normal" if self.ids else "disabled",
+                           command=self._reset_preview,
+                           text_color=TEXT_DARK).pack(anchor="w", pady=3)
+        filters = ", ".join(f"{k}: {v}" for k, v in self.filters.items()) or "без фильтра – вся таблица"
+        ctk.CTkRadioButton(main_frame, text=f"Все записи по фильтру ({filters})",
+                           variable=self.scope, value="filter",
+                           command=self._reset_preview,
+                           text_color=TEXT_DARK).pack(anchor="w", pady=3)
+
+        # Что сделать
+        row = ctk.CTkFrame(main_frame, fg_color="transparent")
+        row.pack(fill="x", pady=(15, 5))
+        self.titles = {bulk.title: name for name, bulk in self.actions.items()}
+        self.combo_action = ctk.CTkComboBox(row, values=list(self.titles), width=260, height=35,
+                                            command=lambda _: self._on_action_change(),
+                                            fg_color=ENTRY_BG, border_color=ENTRY_BORDER,
+                                            text_color=ENTRY_TEXT,
+                                            button_color=ACCENT, button_hover_color=ACCENT_DARK)
+        self.combo_action.set(self.actions[action].title if action in self.actions
+                              else next(iter(self.titles)))
+        self.combo_action.pack(side="left", padx=(0, 10))
+
+        self.entry_percent = ctk.CTkEntry(row, width=120, height=35, placeholder_text="%, напр. -10",
+                                          fg_color=ENTRY_BG, border_color=ENTRY_BORDER,
+                                          text_color=ENTRY_TEXT)
+        self.entry_percent.bind("<KeyRelease>", lambda e: self._reset_preview())
+        self.combo_status = ctk.CTkComboBox(row, values=list(services.ORDER_STATUSES), width=160,
+                                            height=35, command=lambda _: self._reset_preview(),
+                                            fg_color=ENTRY_BG, border_color=ENTRY_BORDER,
+                                            text_color=ENTRY_TEXT,
+                                            button_color=ACCENT, button_hover_color=ACCENT_DARK)
+        self.combo_status.set(services.ORDER_STATUSES[0])
+
+        # Предпросмотр
+        self.label_count = ctk.CTkLabel(main_frame, text="Нажмите «Предпросмотр», чтобы увидеть, "
+                                                         "какие записи изменятся",
+                                        text_color=TEXT_LIGHT)
+        self.label_count.pack(anchor="w", pady=(10, 5))
+        preview_frame = tk.Frame(main_frame, bg=ACCENT_LIGHT)
+        preview_frame.pack(fill="both", expand=True)
+        self.preview = ttk.Treeview(preview_frame, show="headings", height=8,
+                                    style="Custom.Treeview")
+        self.preview.pack(fill="both", expand=True)
+
+        # Кнопки
+        btn_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        btn_frame.pack(fill="x", pady=(15, 0))
+        self.btn_apply = ctk.CTkButton(btn_frame, text="Применить", command=self.apply,
+                                       height=40, fg_color=BTN_PRIMARY, hover_color=BTN_PRIMARY_HOVER,
+                                       text_color=BTN_TEXT, state="disabled")
+        self.btn_apply.pack(side="right", padx=5)
+        ctk.CTkButton(btn_frame, text="Предпросмотр", command=self.preview_action,
+                      height=40, fg_color=BTN_SECONDARY, hover_color=BTN_SECONDARY_HOVER,
+                      text_color=BTN_SECONDARY_TEXT).pack(side="right", padx=5)
+        ctk.CTkButton(btn_frame, text="Отмена", command=self.destroy,
+                      height=40, fg_color=BTN_SECONDARY, hover_color=BTN_SECONDARY_HOVER,
+                      text_color=BTN_SECONDARY_TEXT).pack(side="right", padx=5)
+
+        self._on_action_change()
+
+    def _action(self):
+        return self.titles[self.combo_action.get()]
+
+    def _on_action_change(self):
+        value_kind = self.actions[self._action()].value
+        self.entry_percent.pack_forget()
+        self.combo_status.pack_forget()
+        if value_kind == "percent":
+            self.entry_percent.pack(side="left")
+        elif value_kind == "status":
+            self.combo_status.pack(side="left")
+        self._reset_preview()
+
+    def _request(self):
+        """(операция, значение, ids, фильтры) – как их передать в services."""
+        value_kind = self.actions[self._action()].value
+        value = {"percent": self.entry_percent.get(),
+                 "status": self.combo_status.get()}.get(value_kind)
+        if self.scope.get() == "selected":
+            return self._action(), value, tuple(self.ids), None
+        return self._action(), value, None, self.filters
+
+    def _reset_preview(self):
+        self.previewed = None
+        self.btn_apply.configure(state="disabled")
+
+    def preview_action(self):
+        request = self._request()
+        action, value, ids, filters = request
+        self.tasks.submit(
+            "preview", services.bulk_preview, self.table_name, action, value,
+            ids=ids, filters=filters,
+            on_done=lambda result: self._show_preview(request, result),
+            on_error=self._on_error,
+        )
+
+    def _show_preview(self, request, result):
+        self.preview.delete(*self.preview.get_children())
+        self.preview["columns"] = result.columns
+        for column in result.columns:
+            self.preview.heading(column, text=column)
+            self.preview.column(column, width=120, anchor="w")
+        for row in result.sample:
+            self.preview.insert("", "end", values=_admin_values(row))
+
+        shown = f", показаны первые {len(result.sample)}" if result.count > len(result.sample) else ""
+        self.label_count.configure(text=f"Будет затронуто записей: {result.count}{shown}",
+                                   text_color=TEXT_DARK)
+        if result.count and request == self._request():
+            self.previewed = (request, result.count)
+            self.btn_apply.configure(state="normal")
+
+    def apply(self):
+        if self.previewed is None or self.previewed[0] != self._request():
+            self._reset_preview()
+            return
+        (action, value, ids, filters), count = self.previewed
+        if action == "delete" and not messagebox.askyesno(
+                "Подтверждение удаления",
+                f"Удалить записей: {count}?\nОтменить удаление будет нельзя.", parent=self):
+            return
+        self.btn_apply.configure(state="disabled")
+        self.tasks.submit(
+            "apply", services.bulk_apply, self.table_name, action, value,
+            ids=ids, filters=filters,
+            on_done=lambda affected: self._on_applied(affected, ids if action == "delete" else ()),
+            on_error=self._on_error,
+            replace=False,
+        )
+
+    def _on_applied(self, affected, deleted_ids):
+        messagebox.showinfo("Успех", f"Изменено записей: {affected}", parent=self.master)
+        self.callback(self.table_name, deleted_ids or ())
+        self.destroy()
+
+    def _on_error(self, e):
+        self._reset_preview()
+        if isinstance(e, services.ServiceError):
+            messagebox.showwarning("Массовые операции", str(e), parent=self)
+        else:
+            print(f"Ошибка массовой операции: {e}")
+            messagebox.showerror("Ошибка", f"Операция не выполнена, изменения отменены: {str(e)}",
+                                 parent=self)
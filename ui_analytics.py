@@ -0,0 +1,182 @@
+# ui_analytics.py
+import customtkinter as ctk
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import services
+from theme import *
+from workers import LoadingIndicator, TaskRunner
+
+# Периоды отчёта: подпись -> число дней
+PERIODS = {
+    "7 дней": 7,
+    "30 дней": 30,
+    "90 дней": 90,
+    "Год": 365,
+}
+CHART_HEIGHT = 220
+
+
+def _money(value):
+    return f"{value:,.2f} ₽".replace(",", " ")
+
+
+class AnalyticsWindow(ctk.CTkToplevel):
+    """
+    Отчёт о продажах для администратора.
+
+    Данные берутся из дневных сводок (services.sales_dashboard): перед
+    чтением сводки догоняют ленту изменений заказов, поэтому отчёт
+    открывается одинаково быстро при любой истории заказов.
+    """
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Аналитика продаж")
+        self.geometry("1100x750")
+        self.configure(fg_color=BG_MAIN)
+        self.tasks = TaskRunner(self)
+        self.dashboard = None
+
+        self.setup_ui()
+        self.load()
+
+    def setup_ui(self):
+        self.grid_columnconfigure((0, 1), weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        # Период и итоги
+        top = ctk.CTkFrame(self, fg_color=BG_CARD, corner_radius=10)
+        top.grid(row=0, column=0, columnspan=2, sticky="ew", padx=15, pady=(15, 5))
+
+        ctk.CTkLabel(top, text="Период:", font=ctk.CTkFont(weight="bold"),
+                     text_color=TEXT_DARK).pack(side="left", padx=(15, 5), pady=10)
+        self.period = ctk.CTkSegmentedButton(
+            top, values=list(PERIODS), command=lambda _: self.load(),
+            selected_color=ACCENT, selected_hover_color=ACCENT_DARK,
+        )
+        self.period.set("30 дней")
+        self.period.pack(side="left", padx=5, pady=10)
+
+        ctk.CTkButton(top, text="🔄 Обновить", command=self.load, width=110, height=32,
+                      fg_color=BTN_SECONDARY, hover_color=BTN_SECONDARY_HOVER,
+                      text_color=BTN_SECONDARY_TEXT).pack(side="right", padx=15)
+
+        self.label_totals = ctk.CTkLabel(top, text="", font=ctk.CTkFont(size=14, weight="bold"),
+                                         text_color=HEADER_PRIMARY)
+        self.label_totals.pack(side="left", padx=20)
+
+        # Выручка по дням
+        chart_card = ctk.CTkFrame(self, fg_color=BG_CARD, corner_radius=10)
+        chart_card.grid(row=1, column=0, columnspan=2, sticky="ew", padx=15, pady=5)
+        ctk.CTkLabel(chart_card, text="Выручка по дням", font=ctk.CTkFont(size=14, weight="bold"),
+                     text_color=HEADER_PRIMARY).pack(anchor="w", padx=15, pady=(10, 0))
+        self.chart = tk.Canvas(chart_card, height=CHART_HEIGHT, bg=BG_CARD, highlightthickness=0)
+        self.chart.pack(fill="x", padx=15, pady=10)
+        self.chart.bind("<Configure>", lambda e: self._draw_chart())
+        self.loading = LoadingIndicator(chart_card)
+
+        # Таблицы: статусы, товары, курьеры
+        left = ctk.CTkFrame(self, fg_color=BG_CARD, corner_radius=10)
+        left.grid(row=2, column=0, sticky="nsew", padx=(15, 5), pady=(5, 15))
+        right = ctk.CTkFrame(self, fg_color=BG_CARD, corner_radius=10)
+        right.grid(row=2, column=1, sticky="nsew", padx=(5, 15), pady=(5, 15))
+
+        self.tree_status = self._table(left, "Заказы по статусам",
+                                       ("Статус", "Заказов", "Единиц", "Сумма"), height=5)
+        self.tree_products = self._table(left, "Лучшие товары",
+                                         ("Товар", "Заказов", "Единиц", "Выручка"), height=10)
+        self.tree_couriers = self._table(right, "Курьеры",
+                                         ("Курьер", "Доставлено", "В пути", "Единиц", "Выручка"),
+                                         height=18)
+
+    def _table(self, parent, title, columns, height):
+        ctk.CTkLabel(parent, text=title, font=ctk.CTkFont(size=14, weight="bold"),
+                     text_color=HEADER_PRIMARY).pack(anchor="w", padx=15, pady=(10, 5))
+        frame = tk.Frame(parent, bg=ACCENT_LIGHT)
+        frame.pack(fill="both", expand=True, padx=15, pady=(0, 10))
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=height,
+                            style="Custom.Treeview")
+        for i, column in enumerate(columns):
+            tree.heading(column, text=column)
+            tree.column(column, width=200 if i == 0 else 90, anchor="w" if i == 0 else "e")
+        tree.pack(fill="both", expand=True)
+        return tree
+
+    # ---------- данные ----------
+
+    def load(self):
+        self.tasks.submit(
+            "dashboard", services.sales_dashboard, PERIODS[self.period.get()],
+            on_done=self._fill,
+            on_error=self._on_error,
+            indicator=self.loading,
+        )
+
+    def _on_error(self, e):
+        print(f"Ошибка загрузки аналитики: {e}")
+        messagebox.showerror("Ошибка", f"Не удалось загрузить отчёт: {str(e)}", parent=self)
+
+    def _fill(self, dashboard):
+        self.dashboard = dashboard
+        orders = sum(d.orders for d in dashboard.by_day)
+        revenue = sum((d.revenue for d in dashboard.by_day), 0)
+        average = revenue / orders if orders else 0
+        self.label_totals.configure(
+            text=f"Выручка: {_money(revenue)}   Заказов: {orders}   "
+                 f"Средний чек: {_money(average)}"
+        )
+
+        self._fill_tree(self.tree_status, [
+            (s.status, s.orders, s.units, _money(s.revenue)) for s in dashboard.by_status
+        ])
+        self._fill_tree(self.tree_products, [
+            (p.name or f"(удалён) №{p.id}", p.orders, p.units, _money(p.revenue))
+            for p in dashboard.top_products
+        ])
+        self._fill_tree(self.tree_couriers, [
+            (c.name or f"(удалён) №{c.id}", c.delivered, c.in_delivery, c.units, _money(c.revenue))
+            for c in dashboard.couriers
+        ])
+        self._draw_chart()
+
+    @staticmethod
+    def _fill_tree(tree, rows):
+        # в отчёте десятки строк – проще заменить целиком
+        tree.delete(*tree.get_children())
+        for row in rows:
+            tree.insert("", "end", values=row)
+
+    def _draw_chart(self):
+        """Столбцы выручки за каждый день периода (дни без продаж – пустые)."""
+        canvas = self.chart
+        canvas.delete("all")
+        if self.dashboard is None:
+            return
+        width = canvas.winfo_width()
+        height = CHART_HEIGHT
+        days = (self.dashboard.date_to - self.dashboard.date_from).days + 1
+        revenue = {d.day: d.revenue for d in self.dashboard.by_day}
+        peak = max(revenue.values(), default=0)
+        if not peak or width <= 1:
+            canvas.create_text(width // 2, height // 2, text="Нет продаж за период",
+                               fill=TEXT_LIGHT, font=("Segoe UI", 11))
+            return
+
+        bottom, top_margin, left = height - 20, 20, 10
+        step = (width - 2 * left) / days
+        bar = max(1.0, step * 0.7)
+        for i in range(days):
+            day = self.dashboard.date_from.toordinal() + i
+            key = type(self.dashboard.date_from).fromordinal(day).isoformat()
+            value = revenue.get(key)
+            x = left + i * step
+            if value:
+                y = bottom - float(value / peak) * (bottom - top_margin)
+                canvas.create_rectangle(x, y, x + bar, bottom, fill=ACCENT, outline="")
+            # подписи – не чаще, чем помещаются
+            if days <= 31 or i % max(1, days // 12) == 0:
+                canvas.create_text(x + bar / 2, bottom + 10, text=key[8:10] if days <= 31 else key[5:],
+                                   fill=TEXT_LIGHT, font=("Segoe UI", 8))
+        canvas.create_text(left, top_margin - 10, anchor="w", text=f"макс. {_money(peak)}",
+                           fill=TEXT_DARK, font=("Segoe UI", 9))
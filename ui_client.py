@@ -1,14 +1,38 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from db import get_connection
-from PIL import Image, ImageTk
-import io
+import services
+import image_cache
+from services import ServiceError
+from PIL import ImageTk
 import customtkinter as ctk
 from datetime import datetime
 from theme import *
+from workers import LoadingIndicator, TaskRunner
+from tree_diff import KeyedTree, row_iid
+from virtual_tree import VirtualTree
+from view_manager import ViewManager
 
 ctk.set_appearance_mode("light")
 
+SEARCH_DELAY_MS = 300  # пауза в наборе, после которой выполняется поиск
+PREBUILD_VIEWS = ("orders",)  # разделы, которые строятся заранее, пока окно простаивает
+
+
+def _fetch_product_card(prod_id):
+    """
+    Выполняется в рабочем потоке: товар и уменьшенная картинка к нему.
+    Миниатюра берётся из кэша, изображение загружается, только если его там нет.
+    """
+    product = services.get_product(prod_id, with_image=False)
+    image = None
+    if product:
+        try:
+            image = image_cache.load_thumbnail(prod_id, (280, 280))
+        except Exception as e:
+            print(f"Ошибка загрузки изображения: {e}")
+            image = None
+    return product, image
+
 
 class ClientApp(ctk.CTkToplevel):
     def __init__(self, master, user_id: int, client_id: int):
@@ -31,7 +55,9 @@ class ClientApp(ctk.CTkToplevel):
         self.current_order_details = {}  # для хранения деталей текущего заказа
         self.selected_product_id = None
         self.selected_payment_id = None
-        self.current_view = "catalog"
+
+        # Запросы к БД выполняются в фоне, результаты приходят через after()
+        self.tasks = TaskRunner(self)
 
         # Основная сетка
         self.grid_rowconfigure(0, weight=1)
@@ -133,7 +159,8 @@ class ClientApp(ctk.CTkToplevel):
         self.main_frame.grid_rowconfigure(1, weight=1)
 
         # Динамически настраиваем колонки в зависимости от вкладки
-        self.main_frame.grid_columnconfigure(0, weight=1)
+        self.main_frame.grid_columnconfigure(0, weight=3)
+        self.main_frame.grid_columnconfigure(1, weight=2)
 
         # Заголовок текущего раздела
         self.view_title = ctk.CTkLabel(
@@ -144,86 +171,54 @@ class ClientApp(ctk.CTkToplevel):
         )
         self.view_title.grid(row=0, column=0, padx=15, pady=(0, 20), sticky="w")
 
-        # Четыре "экрана" (фреймы)
-        self.frame_catalog = ctk.CTkFrame(self.main_frame, fg_color="transparent")
-        self.frame_orders = ctk.CTkFrame(self.main_frame, fg_color="transparent")
-        self.frame_payment = ctk.CTkFrame(self.main_frame, fg_color="transparent")
-        self.frame_profile = ctk.CTkFrame(self.main_frame, fg_color="transparent")
-
-        # Внутренняя сетка для каждого фрейма
-        for f in (self.frame_catalog, self.frame_orders, self.frame_payment):
-            f.grid_rowconfigure(0, weight=1)
-            f.grid_columnconfigure(0, weight=3)
-            f.grid_columnconfigure(1, weight=2)
-
-        # Для профиля - только одна колонка
-        self.frame_profile.grid_rowconfigure(0, weight=1)
-        self.frame_profile.grid_columnconfigure(0, weight=1)
+        # Четыре "экрана": строятся при первом открытии, каталог – сразу
+        self.views = ViewManager(self.main_frame, self.view_title)
+        self.views.register("catalog", "🛍️ Каталог товаров", self._build_catalog, self._load_products)
+        self.views.register("orders", "📦 Мои заказы", self._build_orders, self._load_orders)
+        self.views.register("payment", "💳 Платёжные данные", self._build_payment,
+                            self._load_payment_data)
+        self.views.register("profile", "👤 Профиль клиента", self._build_profile, self._load_profile)
 
-        # Построение содержимого во фреймах
-        self._build_catalog()
-        self._build_orders()
-        self._build_payment()
-        self._build_profile()
-
-        # Показать экран по умолчанию
-        self._show_view(self.frame_catalog, "🛍️ Каталог товаров")
-        self.current_view = "catalog"
+        # Показать экран по умолчанию, остальные частые – построить в простое
+        self.views.show("catalog")
+        self.views.prebuild(PREBUILD_VIEWS)
 
     # ---------- СЛУЖЕБНОЕ: ПЕРЕКЛЮЧЕНИЕ ЭКРАНОВ ----------
 
-    def _show_view(self, frame, title: str):
-        """Показать один из четырёх фреймов и скрыть остальные."""
-        for f in (self.frame_catalog, self.frame_orders, self.frame_payment, self.frame_profile):
-            f.grid_forget()
-
-        frame.grid(row=1, column=0, sticky="nsew")
-        self.view_title.configure(text=title)
+    @staticmethod
+    def _split_view(frame):
+        """Сетка раздела: таблица слева, панель деталей справа."""
+        frame.grid_rowconfigure(0, weight=1)
+        frame.grid_columnconfigure(0, weight=3)
+        frame.grid_columnconfigure(1, weight=2)
 
     def show_catalog(self):
-        self.current_view = "catalog"
-        self._show_view(self.frame_catalog, "🛍️ Каталог товаров")
-        self._load_products()
+        self.views.show("catalog")
 
     def show_orders(self):
-        self.current_view = "orders"
-        self._show_view(self.frame_orders, "📦 Мои заказы")
-        self._load_orders()
+        self.views.show("orders")
 
     def show_payment(self):
-        self.current_view = "payment"
-        self._show_view(self.frame_payment, "💳 Платёжные данные")
-        self._load_payment_data()
+        self.views.show("payment")
 
     def show_profile(self):
-        self.current_view = "profile"
-        self._show_view(self.frame_profile, "👤 Профиль клиента")
-        self._load_profile()
+        self.views.show("profile")
         # Скрываем правую панель при переходе в профиль
         self.main_frame.grid_columnconfigure(0, weight=1)
         self.main_frame.grid_columnconfigure(1, weight=0)
 
     def refresh_current_view(self):
-        """Обновить данные в зависимости от активного экрана."""
-        if self.current_view == "catalog":
-            self._load_products()
-        elif self.current_view == "orders":
-            self._load_orders()
-        elif self.current_view == "payment":
-            self._load_payment_data()
-        elif self.current_view == "profile":
-            self._load_profile()
+        """Обновить данные активного экрана."""
+        self.views.reload()
 
     # ---------- КАТАЛОГ ----------
 
-    def _build_catalog(self):
-        # Настраиваем сетку для правой панели
-        self.main_frame.grid_columnconfigure(0, weight=3)
-        self.main_frame.grid_columnconfigure(1, weight=2)
+    def _build_catalog(self, frame):
+        self._split_view(frame)
 
         # Левая часть - таблица товаров
         left_frame = ctk.CTkFrame(
-            self.frame_catalog,
+            frame,
             fg_color=BG_CARD,
             corner_radius=10,
             border_width=1,
@@ -235,7 +230,7 @@ class ClientApp(ctk.CTkToplevel):
 
         # Правая часть - информация о товаре
         self.right_frame_catalog = ctk.CTkFrame(
-            self.frame_catalog,
+            frame,
             width=420,
             fg_color=BG_CARD,
             corner_radius=10,
@@ -341,6 +336,25 @@ class ClientApp(ctk.CTkToplevel):
         )
         self.btn_checkout.pack(padx=20, pady=(0, 20), fill="x")
 
+        # Поиск по названию: запрос уходит на сервер после паузы в наборе
+        search_frame = ctk.CTkFrame(left_frame, fg_color="transparent")
+        search_frame.pack(fill="x", padx=15, pady=(15, 0))
+
+        self.entry_search = ctk.CTkEntry(
+            search_frame,
+            placeholder_text="🔎 Поиск товара",
+            height=38,
+            font=ctk.CTkFont(size=12),
+            fg_color=ENTRY_BG,
+            border_color=ENTRY_BORDER,
+            text_color=ENTRY_TEXT,
+            placeholder_text_color=ENTRY_PLACEHOLDER
+        )
+        self.entry_search.pack(fill="x")
+        self.entry_search.bind("<KeyRelease>", self._on_search_typed)
+        self._search_after_id = None
+        self._search_text = ""
+
         # Внутренний tk.Frame для корректной работы ttk.Treeview
         table_frame = tk.Frame(left_frame, bg=BG_CARD)
         table_frame.pack(fill="both", expand=True, padx=15, pady=15)
@@ -381,18 +395,31 @@ class ClientApp(ctk.CTkToplevel):
                                       anchor="center" if col in ["id", "qty"] else "w")
 
         self.tree_products.grid(row=0, column=0, sticky="nsew")
+        self.loading_products = LoadingIndicator(self.tree_products.master)
+        self.loading_product_info = LoadingIndicator(self.right_frame_catalog)
 
         # Скроллбары
-        scrollbar_y = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree_products.yview)
+        scrollbar_y = ttk.Scrollbar(table_frame, orient="vertical")
         scrollbar_y.grid(row=0, column=1, sticky="ns")
 
         scrollbar_x = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree_products.xview)
         scrollbar_x.grid(row=1, column=0, columnspan=2, sticky="ew")
 
-        self.tree_products.configure(yscroll=scrollbar_y.set, xscroll=scrollbar_x.set)
-
-        # Привязка события выбора
-        self.tree_products.bind('<<TreeviewSelect>>', self._on_product_select)
+        self.tree_products.configure(xscroll=scrollbar_x.set)
+
+        # В таблице только видимые строки; страницы подгружаются при прокрутке
+        self.catalog = VirtualTree(
+            self.tree_products, scrollbar_y, self.tasks, "products",
+            format_row=lambda product: (
+                product.id,
+                product.name,
+                f"{float(product.price):.2f} ₽",
+                product.quantity
+            ),
+            on_select=self._on_product_select,
+            on_error=lambda e: messagebox.showerror("Ошибка", f"Не удалось загрузить товары: {e}"),
+            indicator=self.loading_products,
+        )
 
         # Нижняя панель кнопок
         btn_frame = ctk.CTkFrame(left_frame, fg_color="transparent")
@@ -424,33 +451,32 @@ class ClientApp(ctk.CTkToplevel):
         )
         view_cart_btn.pack(side="left", padx=5)
 
-        self._load_products()
-
     def _load_products(self):
-        for row in self.tree_products.get_children():
-            self.tree_products.delete(row)
-
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-                       SELECT Номер_товара, Название, Цена, Количество, Изображение
-                       FROM Товар
-                       WHERE Количество > 0
-                       """)
-        rows = cursor.fetchall()
-        conn.close()
-
-        for row in rows:
-            formatted_row = (
-                row[0],
-                row[1],
-                f"{float(row[2]):.2f} ₽",
-                row[3]
-            )
-            self.tree_products.insert("", "end", values=formatted_row)
+        # Сбрасываем информацию о товаре; позиция прокрутки сохраняется
+        self.catalog.clear_selection()
+        self._reset_product_info()
+        if self.catalog.source is None:
+            self.catalog.set_source(services.catalog_query())
+        else:
+            self.catalog.refresh()
+
+    def _on_search_typed(self, event=None):
+        """Запрос отправляется, когда пользователь перестал печатать на SEARCH_DELAY_MS."""
+        if self._search_after_id is not None:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DELAY_MS, self._run_search)
+
+    def _run_search(self):
+        self._search_after_id = None
+        text = self.entry_search.get().strip()
+        if text == self._search_text:
+            return
+        self._search_text = text
 
-        # Сбрасываем информацию о товаре
+        # Пустой или незначащий запрос – весь каталог
+        query = services.search_products_query(text) or services.catalog_query()
         self._reset_product_info()
+        self.catalog.set_source(query)
 
     def _reset_product_info(self):
         """Сброс информации о товаре в правой панели"""
@@ -468,38 +494,28 @@ class ClientApp(ctk.CTkToplevel):
         if self.current_photo:
             self.current_photo = None
 
-    def _on_product_select(self, event=None):
-        """Обработка выбора товара в таблице"""
-        selection = self.tree_products.selection()
-        if not selection:
+    def _on_product_select(self, product):
+        """Обработка выбора товара в таблице (product – строка каталога или None)"""
+        if product is None:
             self.btn_add_to_cart.configure(state="disabled")
             return
 
-        item_id = selection[0]
-        values = self.tree_products.item(item_id, "values")
-        if not values:
-            return
+        prod_id = product.id
 
-        try:
-            prod_id = int(values[0])
-        except (ValueError, TypeError):
-            return
-
-        # Загружаем информацию о товаре
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-                       SELECT Название, Цена, Количество, Изображение
-                       FROM Товар
-                       WHERE Номер_товара = ?
-                       """, (prod_id,))
-        row = cursor.fetchone()
-        conn.close()
+        # Загружаем информацию о товаре; выбор другой строки отменяет прежний запрос
+        self.tasks.submit(
+            "product_info", _fetch_product_card, prod_id,
+            on_done=lambda result: self._show_product_info(prod_id, *result),
+            on_error=lambda e: print(f"Ошибка загрузки товара: {e}"),
+            indicator=self.loading_product_info,
+        )
 
-        if not row:
+    def _show_product_info(self, prod_id, product, image):
+        """Заполнение правой панели; image – уже уменьшенное PIL-изображение или None."""
+        if not product:
             return
 
-        name, price, qty, image_data = row
+        name, price, qty = product.name, product.price, product.quantity
 
         # Обновляем информацию
         self.label_name.configure(text=name)
@@ -512,22 +528,13 @@ class ClientApp(ctk.CTkToplevel):
         self.selected_product_id = prod_id
 
         # Отображаем изображение
-        if image_data:
-            try:
-                img_bytes = bytes(image_data)
-                image = Image.open(io.BytesIO(img_bytes))
-                image.thumbnail((280, 280))
-
-                # Конвертируем для tkinter
-                photo = ImageTk.PhotoImage(image, master=self)
-
-                # Сохраняем ссылку и обновляем изображение
-                self.current_photo = photo
-                self.label_image.configure(image=photo, text="")
-            except Exception as e:
-                print(f"Ошибка загрузки изображения: {e}")
-                self.label_image.configure(image="", text="Нет изображения")
-                self.current_photo = None
+        if image is not None:
+            # PhotoImage создаётся только в главном потоке
+            photo = ImageTk.PhotoImage(image, master=self)
+
+            # Сохраняем ссылку и обновляем изображение
+            self.current_photo = photo
+            self.label_image.configure(image=photo, text="")
         else:
             self.label_image.configure(image="", text="Нет изображения")
             self.current_photo = None
@@ -539,75 +546,74 @@ class ClientApp(ctk.CTkToplevel):
 
         try:
             qty = int(self.spin_qty.get())
-            if qty < 1:
-                messagebox.showwarning("Количество", "Количество должно быть не менее 1")
-                return
+        except ValueError:
+            messagebox.showwarning("Количество", "Некорректное количество")
+            return
+        if qty < 1:
+            messagebox.showwarning("Количество", "Количество должно быть не менее 1")
+            return
 
-            # Проверяем доступное количество
-            conn = get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT Количество, Название FROM Товар WHERE Номер_товара = ?",
-                (self.selected_product_id,)
-            )
-            result = cursor.fetchone()
-            conn.close()
+        # Проверяем доступное количество
+        prod_id = self.selected_product_id
+        self.tasks.submit(
+            "add_to_cart", services.get_product, prod_id, with_image=False,
+            on_done=lambda product: self._put_into_cart(prod_id, qty, product),
+            on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+            indicator=self.loading_product_info,
+        )
 
-            if not result:
-                messagebox.showwarning("Ошибка", "Товар не найден")
-                return
+    def _put_into_cart(self, prod_id, qty, product):
+        if not product:
+            messagebox.showwarning("Ошибка", "Товар не найден")
+            return
 
-            available_qty, prod_name = result[0], result[1]
-            if available_qty < qty:
-                messagebox.showwarning(
-                    "Количество",
-                    f"Товара '{prod_name}' недостаточно в наличии.\n"
-                    f"Заказано: {qty}, в наличии: {available_qty}"
-                )
-                return
+        available_qty, prod_name = product.quantity, product.name
+        if available_qty < qty:
+            messagebox.showwarning(
+                "Количество",
+                f"Товара '{prod_name}' недостаточно в наличии.\n"
+                f"Заказано: {qty}, в наличии: {available_qty}"
+            )
+            return
 
-            # Проверяем, не добавлен ли уже этот товар
-            for i, (existing_id, existing_qty) in enumerate(self.cart):
-                if existing_id == self.selected_product_id:
-                    self.cart[i] = (self.selected_product_id, existing_qty + qty)
-                    break
-            else:
-                self.cart.append((self.selected_product_id, qty))
+        # Проверяем, не добавлен ли уже этот товар
+        for i, (existing_id, existing_qty) in enumerate(self.cart):
+            if existing_id == prod_id:
+                self.cart[i] = (prod_id, existing_qty + qty)
+                break
+        else:
+            self.cart.append((prod_id, qty))
 
-            # Обновляем счетчик корзины в сайдбаре
-            for widget in self.sidebar_frame.winfo_children():
-                if isinstance(widget, ctk.CTkButton) and "Корзина" in str(widget.cget("text")):
-                    widget.configure(text=f"🛒 Корзина ({len(self.cart)})")
+        # Обновляем счетчик корзины в сайдбаре
+        for widget in self.sidebar_frame.winfo_children():
+            if isinstance(widget, ctk.CTkButton) and "Корзина" in str(widget.cget("text")):
+                widget.configure(text=f"🛒 Корзина ({len(self.cart)})")
 
-            messagebox.showinfo("Корзина", "Товар добавлен в корзину")
-        except ValueError:
-            messagebox.showwarning("Количество", "Некорректное количество")
+        messagebox.showinfo("Корзина", "Товар добавлен в корзину")
 
     def _view_cart(self):
         if not self.cart:
             messagebox.showinfo("Корзина", "Корзина пуста")
             return
 
-        conn = get_connection()
-        cursor = conn.cursor()
+        self.tasks.submit(
+            "cart", services.get_products, [prod_id for prod_id, _ in self.cart],
+            on_done=self._show_cart,
+            on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+        )
 
+    def _show_cart(self, products):
         cart_details = []
         total = 0
 
         for prod_id, qty in self.cart:
-            cursor.execute(
-                "SELECT Название, Цена FROM Товар WHERE Номер_товара = ?",
-                (prod_id,)
-            )
-            product = cursor.fetchone()
+            product = products.get(prod_id)
             if product:
-                name, price = product
+                name, price = product.name, product.price
                 item_total = float(price) * qty
                 total += item_total
                 cart_details.append(f"• {name}: {qty} × {price:.2f} ₽ = {item_total:.2f} ₽")
 
-        conn.close()
-
         cart_text = "🛒 Товары в корзине:\n\n" + "\n".join(cart_details)
         cart_text += f"\n\n💰 Итого: {total:.2f} ₽"
 
@@ -619,17 +625,13 @@ class ClientApp(ctk.CTkToplevel):
             return
 
         # Получаем список платежных данных
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-                       SELECT ID_данных, Номер_карты, CONVERT(varchar (10), Срок_действия, 120)
-                       FROM Платежные_данные
-                       WHERE ID_Клиента = ?
-                       ORDER BY ID_данных
-                       """, (self.client_id,))
-        payment_methods = cursor.fetchall()
-        conn.close()
+        self.tasks.submit(
+            "checkout", services.list_payment_cards, self.client_id,
+            on_done=self._choose_payment,
+            on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+        )
 
+    def _choose_payment(self, payment_methods):
         if not payment_methods:
             messagebox.showwarning(
                 "Нет платежных данных",
@@ -698,113 +700,57 @@ class ClientApp(ctk.CTkToplevel):
         ).pack(pady=20)
 
     def _create_order(self, payment_id):
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        try:
-            # Проверяем наличие товаров
-            for prod_id, qty in self.cart:
-                cursor.execute(
-                    "SELECT Количество, Название FROM Товар WHERE Номер_товара = ?",
-                    (prod_id,)
-                )
-                result = cursor.fetchone()
-                if not result:
-                    messagebox.showerror(
-                        "Ошибка",
-                        f"Товар с ID {prod_id} не найден"
-                    )
-                    conn.close()
-                    return
-
-                available_qty, prod_name = result[0], result[1]
-                if available_qty < qty:
-                    messagebox.showerror(
-                        "Ошибка",
-                        f"Товара '{prod_name}' недостаточно в наличии.\n"
-                        f"Заказано: {qty}, в наличии: {available_qty}"
-                    )
-                    conn.close()
-                    return
-
-            # Получаем текущую дату
-            current_date = datetime.now().strftime("%Y-%m-%d")
-
-            # Создаем заказы для каждого товара
-            order_ids = []
-            product_names = []
-
-            # Получаем названия товаров
-            for prod_id, qty in self.cart:
-                cursor.execute(
-                    "SELECT Название FROM Товар WHERE Номер_товара = ?",
-                    (prod_id,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    product_names.append(result[0])
-                else:
-                    product_names.append(f"Товар ID:{prod_id}")
-
-            # Создаем заказы с датой
-            for (prod_id, qty), prod_name in zip(self.cart, product_names):
-                cursor.execute("""
-                               INSERT INTO Заказ (ID_данные, Номер_товара,
-                                                  Количество_заказанного_товара, Статус, Дата_заказа)
-                               VALUES (?, ?, ?, N'создан', ?)
-                               """, (payment_id, prod_id, qty, current_date))
-
-                # Получаем ID созданного заказа
-                order_id = self._get_last_insert_id(cursor)
-                if order_id:
-                    order_ids.append(order_id)
-                else:
-                    order_ids.append("?")
-
-                # Обновляем количество товара
-                cursor.execute("""
-                               UPDATE Товар
-                               SET Количество = Количество - ?
-                               WHERE Номер_товара = ?
-                               """, (qty, prod_id))
-
-            conn.commit()
-
-            # Формируем сообщение
-            if len(order_ids) == 1 and order_ids[0] != "?":
-                message = f"✅ Заказ №{order_ids[0]} успешно создан!\n"
-                message += f"Товар: {product_names[0]}\n"
-                message += f"📅 Дата заказа: {current_date}"
-            else:
-                message = f"✅ Создано заказов: {len(self.cart)}\n"
-                message += f"📅 Дата заказа: {current_date}\n\n"
-                for i, (order_num, prod_name) in enumerate(zip(order_ids, product_names), 1):
-                    message += f"{i}. {prod_name}"
-                    if order_num != "?":
-                        message += f" - заказ №{order_num}"
-                    message += "\n"
-
-                total_items = sum(item[1] for item in self.cart)
-                message += f"\n📦 Всего товаров: {total_items}"
-
-            messagebox.showinfo("Успешно", message)
-
-            # Очищаем корзину и обновляем интерфейс
-            self.cart = []
-            self._load_products()
-            self._load_orders()
-
-            # Обновляем счетчик корзины в сайдбаре
-            for widget in self.sidebar_frame.winfo_children():
-                if isinstance(widget, ctk.CTkButton) and "Корзина" in str(widget.cget("text")):
-                    widget.configure(text=f"🛒 Корзина (0)")
+        # Снимок корзины: пока заказ оформляется, пользователь может её менять
+        cart = list(self.cart)
+        self.tasks.submit(
+            "create_order", services.create_orders, payment_id, cart,
+            on_done=lambda created: self._on_orders_created(cart, created),
+            on_error=self._on_create_order_error,
+            indicator=self.loading_products,
+            replace=False,
+        )
 
-        except Exception as e:
-            conn.rollback()
+    def _on_create_order_error(self, e):
+        if isinstance(e, ServiceError):
+            messagebox.showerror("Ошибка", str(e))
+        else:
             messagebox.showerror("Ошибка", f"Не удалось оформить заказ: {str(e)}")
             print(f"Error creating order: {e}")
-        finally:
-            conn.close()
+
+    def _on_orders_created(self, cart, created):
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        order_ids = [order.id if order.id is not None else "?" for order in created]
+        product_names = [order.product_name for order in created]
+
+        # Формируем сообщение
+        if len(order_ids) == 1 and order_ids[0] != "?":
+            message = f"✅ Заказ №{order_ids[0]} успешно создан!\n"
+            message += f"Товар: {product_names[0]}\n"
+            message += f"📅 Дата заказа: {current_date}"
+        else:
+            message = f"✅ Создано заказов: {len(cart)}\n"
+            message += f"📅 Дата заказа: {current_date}\n\n"
+            for i, (order_num, prod_name) in enumerate(zip(order_ids, product_names), 1):
+                message += f"{i}. {prod_name}"
+                if order_num != "?":
+                    message += f" - заказ №{order_num}"
+                message += "\n"
+
+            total_items = sum(item[1] for item in cart)
+            message += f"\n📦 Всего товаров: {total_items}"
+
+        messagebox.showinfo("Успешно", message)
+
+        # Убираем из корзины оформленное и обновляем интерфейс
+        self.cart = [item for item in self.cart if item not in cart]
+        self._load_products()
+        # раздел заказов, если его ещё не открывали, загрузится при открытии
+        self.views.reload("orders")
+
+        # Обновляем счетчик корзины в сайдбаре
+        for widget in self.sidebar_frame.winfo_children():
+            if isinstance(widget, ctk.CTkButton) and "Корзина" in str(widget.cget("text")):
+                widget.configure(text=f"🛒 Корзина ({len(self.cart)})")
 
     def _mask_card(self, full: str) -> str:
         digits = full.replace(" ", "")
@@ -812,22 +758,14 @@ class ClientApp(ctk.CTkToplevel):
             return "*" * len(digits)
         return "**** **** **** " + digits[-4:]
 
-    def _get_last_insert_id(self, cursor):
-        """Получение ID последней вставленной записи"""
-        cursor.execute("SELECT SCOPE_IDENTITY()")
-        result = cursor.fetchone()
-        return result[0] if result and result[0] is not None else None
-
     # ---------- ЗАКАЗЫ ----------
 
-    def _build_orders(self):
-        # Настраиваем сетку для правой панели
-        self.main_frame.grid_columnconfigure(0, weight=3)
-        self.main_frame.grid_columnconfigure(1, weight=2)
+    def _build_orders(self, frame):
+        self._split_view(frame)
 
         # Левая часть - таблица заказов
         left_frame = ctk.CTkFrame(
-            self.frame_orders,
+            frame,
             fg_color=BG_CARD,
             corner_radius=10,
             border_width=1,
@@ -839,7 +777,7 @@ class ClientApp(ctk.CTkToplevel):
 
         # Правая часть - детали заказа
         self.right_frame_orders = ctk.CTkFrame(
-            self.frame_orders,
+            frame,
             width=420,
             fg_color=BG_CARD,
             corner_radius=10,
@@ -912,6 +850,8 @@ class ClientApp(ctk.CTkToplevel):
                                     anchor="center" if col in ["id", "qty", "total"] else "w")
 
         self.tree_orders.grid(row=0, column=0, sticky="nsew")
+        self.loading_orders = LoadingIndicator(self.tree_orders.master)
+        self.loading_order_details = LoadingIndicator(self.right_frame_orders)
 
         # Скроллбары
         scrollbar_y = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree_orders.yview)
@@ -924,6 +864,8 @@ class ClientApp(ctk.CTkToplevel):
 
         # Привязка события выбора
         self.tree_orders.bind('<<TreeviewSelect>>', self._on_order_select)
+        # Обновление списка по ключу: выделение и прокрутка сохраняются
+        self.orders_rows = KeyedTree(self.tree_orders)
 
         # Нижняя панель кнопок
         btn_frame = ctk.CTkFrame(left_frame, fg_color="transparent")
@@ -955,48 +897,32 @@ class ClientApp(ctk.CTkToplevel):
         )
         details_btn.pack(side="left", padx=5)
 
-        self._load_orders()
-
     def _load_orders(self):
-        for row in self.tree_orders.get_children():
-            self.tree_orders.delete(row)
-
-        conn = get_connection()
-        cursor = conn.cursor()
+        self.tasks.submit(
+            "orders", services.list_client_orders, self.client_id,
+            on_done=self._fill_orders,
+            on_error=lambda e: print(f"Error loading orders: {e}"),
+            indicator=self.loading_orders,
+        )
 
-        try:
-            cursor.execute("""
-                           SELECT Z.ID_заказа,
-                                  CONVERT(varchar (10), Z.Дата_заказа, 120),
-                                  Z.Статус,
-                                  T.Название,
-                                  Z.Количество_заказанного_товара,
-                                  T.Цена,
-                                  (Z.Количество_заказанного_товара * T.Цена) as Сумма
-                           FROM Заказ Z
-                                    JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
-                                    JOIN Товар T ON Z.Номер_товара = T.Номер_товара
-                           WHERE P.ID_Клиента = ?
-                           ORDER BY Z.Дата_заказа DESC, Z.ID_заказа DESC
-                           """, (self.client_id,))
-
-            rows = cursor.fetchall()
-
-            for row in rows:
-                formatted_row = (
-                    row[0],  # ID заказа
-                    row[1],  # Дата заказа
-                    row[2],  # Статус
-                    row[3],  # Название товара
-                    row[4],  # Количество
-                    f"{float(row[6]):.2f} ₽" if row[6] else "0.00 ₽"  # Сумма
-                )
-                self.tree_orders.insert("", "end", values=formatted_row)
+    def _fill_orders(self, orders):
+        self.orders_rows.update(
+            (row_iid(order.id), (
+                order.id,  # ID заказа
+                order.date,  # Дата заказа
+                order.status,  # Статус
+                order.product_name,  # Название товара
+                order.quantity,  # Количество
+                f"{float(order.total):.2f} ₽" if order.total else "0.00 ₽"  # Сумма
+            ))
+            for order in orders
+        )
 
-        except Exception as e:
-            print(f"Error loading orders: {e}")
-        finally:
-            conn.close()
+        # Выбранный заказ остался в списке – обновляем его детали (статус мог измениться)
+        selection = self.tree_orders.selection()
+        if selection:
+            self._on_order_select(None)
+            return
 
         # Сбрасываем детали
         self.details_text_orders.configure(state="normal")
@@ -1024,68 +950,47 @@ class ClientApp(ctk.CTkToplevel):
         except ValueError:
             return
 
-        conn = get_connection()
-        cursor = conn.cursor()
+        self.tasks.submit(
+            "order_details", services.get_client_order_details, order_id_int,
+            on_done=lambda row: self._show_order_details(row, details_widget),
+            on_error=lambda e: self._show_order_details_error(e, details_widget),
+            indicator=self.loading_order_details,
+        )
 
-        try:
-            cursor.execute("""
-                           SELECT Z.ID_заказа,
-                                  Z.Статус,
-                                  T.Название,
-                                  Z.Количество_заказанного_товара,
-                                  T.Цена,
-                                  CONVERT(varchar (10), Z.Дата_заказа, 120),
-                                  C.Фамилия,
-                                  C.Имя,
-                                  C.Отчество,
-                                  C.Город,
-                                  C.Улица,
-                                  C.Дом,
-                                  C.Квартира,
-                                  P.Номер_карты,
-                                  CONVERT(varchar (10), P.Срок_действия, 120)
-                           FROM Заказ Z
-                                    JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
-                                    JOIN Клиент C ON P.ID_Клиента = C.ID_Клиент
-                                    JOIN Товар T ON Z.Номер_товара = T.Номер_товара
-                           WHERE Z.ID_заказа = ?
-                           """, (order_id_int,))
-
-            row = cursor.fetchone()
-
-            if not row:
-                details_widget.configure(state="normal")
-                details_widget.delete("1.0", "end")
-                details_widget.insert("1.0", "⚠️ Информация о заказе не найдена")
-                details_widget.configure(state="disabled")
-                return
+    def _show_order_details(self, row, details_widget):
+        if not row:
+            details_widget.configure(state="normal")
+            details_widget.delete("1.0", "end")
+            details_widget.insert("1.0", "⚠️ Информация о заказе не найдена")
+            details_widget.configure(state="disabled")
+            return
+
+        (oid, status, prod_name, qty, price, order_date,
+         fam, im, otch, city, street, house, flat,
+         card_number, card_exp) = row
 
-            (oid, status, prod_name, qty, price, order_date,
-             fam, im, otch, city, street, house, flat,
-             card_number, card_exp) = row
-
-            try:
-                total = float(price) * float(qty)
-            except (ValueError, TypeError):
-                total = 0
-
-            # Форматируем адрес
-            address_parts = []
-            if city:
-                address_parts.append(f"г. {city}")
-            if street:
-                address_parts.append(f"ул. {street}")
-            if house:
-                address_parts.append(f"д. {house}")
-            if flat:
-                address_parts.append(f"кв. {flat}")
-            address = ", ".join(address_parts)
-
-            # Маскируем номер карты
-            masked_card = self._mask_card(card_number) if card_number else "**** **** **** ****"
-
-            # Формируем текст с деталями
-            details_text = f"""📦 ЗАКАЗ №{oid}
+        try:
+            total = float(price) * float(qty)
+        except (ValueError, TypeError):
+            total = 0
+
+        # Форматируем адрес
+        address_parts = []
+        if city:
+            address_parts.append(f"г. {city}")
+        if street:
+            address_parts.append(f"ул. {street}")
+        if house:
+            address_parts.append(f"д. {house}")
+        if flat:
+            address_parts.append(f"кв. {flat}")
+        address = ", ".join(address_parts)
+
+        # Маскируем номер карты
+        masked_card = self._mask_card(card_number) if card_number else "**** **** **** ****"
+
+        # Формируем текст с деталями
+        details_text = f"""📦 ЗАКАЗ №{oid}
 {'=' * 45}
 
 📋 ОСНОВНАЯ ИНФОРМАЦИЯ:
@@ -1110,19 +1015,17 @@ class ClientApp(ctk.CTkToplevel):
 📝 Статус заказа можно отслеживать в этом разделе.
 """
 
-            details_widget.configure(state="normal")
-            details_widget.delete("1.0", "end")
-            details_widget.insert("1.0", details_text)
-            details_widget.configure(state="disabled")
+        details_widget.configure(state="normal")
+        details_widget.delete("1.0", "end")
+        details_widget.insert("1.0", details_text)
+        details_widget.configure(state="disabled")
 
-        except Exception as e:
-            print(f"Database error: {e}")
-            details_widget.configure(state="normal")
-            details_widget.delete("1.0", "end")
-            details_widget.insert("1.0", f"❌ Ошибка загрузки деталей: {str(e)}")
-            details_widget.configure(state="disabled")
-        finally:
-            conn.close()
+    def _show_order_details_error(self, e, details_widget):
+        print(f"Database error: {e}")
+        details_widget.configure(state="normal")
+        details_widget.delete("1.0", "end")
+        details_widget.insert("1.0", f"❌ Ошибка загрузки деталей: {str(e)}")
+        details_widget.configure(state="disabled")
 
     def _show_order_details_dialog(self):
         """Показать детали заказа в отдельном окне"""
@@ -1144,97 +1047,76 @@ class ClientApp(ctk.CTkToplevel):
             messagebox.showerror("Ошибка", f"Некорректный ID заказа: {order_id}")
             return
 
-        conn = get_connection()
-        cursor = conn.cursor()
+        self.tasks.submit(
+            "order_details", services.get_client_order_details, order_id_int,
+            on_done=self._open_order_details_window,
+            on_error=self._on_order_details_dialog_error,
+            indicator=self.loading_order_details,
+        )
+
+    def _open_order_details_window(self, row):
+        if not row:
+            messagebox.showwarning("Заказ", "Данные заказа не найдены")
+            return
+
+        (oid, status, prod_name, qty, price, order_date,
+         fam, im, otch, city, street, house, flat,
+         card_number, card_exp) = row
 
         try:
-            cursor.execute("""
-                           SELECT Z.ID_заказа,
-                                  Z.Статус,
-                                  T.Название,
-                                  Z.Количество_заказанного_товара,
-                                  T.Цена,
-                                  CONVERT(varchar (10), Z.Дата_заказа, 120),
-                                  C.Фамилия,
-                                  C.Имя,
-                                  C.Отчество,
-                                  C.Город,
-                                  C.Улица,
-                                  C.Дом,
-                                  C.Квартира,
-                                  P.Номер_карты,
-                                  CONVERT(varchar (10), P.Срок_действия, 120)
-                           FROM Заказ Z
-                                    JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
-                                    JOIN Клиент C ON P.ID_Клиента = C.ID_Клиент
-                                    JOIN Товар T ON Z.Номер_товара = T.Номер_товара
-                           WHERE Z.ID_заказа = ?
-                           """, (order_id_int,))
-
-            row = cursor.fetchone()
-
-            if not row:
-                messagebox.showwarning("Заказ", "Данные заказа не найдены")
-                return
+            total = float(price) * float(qty)
+        except (ValueError, TypeError):
+            total = 0
+
+        # Формируем адрес
+        address_parts = []
+        if city:
+            address_parts.append(f"г. {city}")
+        if street:
+            address_parts.append(f"ул. {street}")
+        if house:
+            address_parts.append(f"д. {house}")
+        if flat:
+            address_parts.append(f"кв. {flat}")
+        address = ", ".join(address_parts)
+
+        # Маскируем номер карты
+        masked_card = self._mask_card(card_number) if card_number else "**** **** **** ****"
+
+        # Создаем диалоговое окно с детальной информацией
+        details_window = ctk.CTkToplevel(self)
+        details_window.title(f"Информация о заказе №{oid}")
+        details_window.geometry("600x500")
+        details_window.configure(fg_color=BG_MAIN)
+
+        # Центрируем окно
+        details_window.update_idletasks()
+        width = details_window.winfo_width()
+        height = details_window.winfo_height()
+        x = (self.winfo_screenwidth() // 2) - (width // 2)
+        y = (self.winfo_screenheight() // 2) - (height // 2)
+        details_window.geometry(f'{width}x{height}+{x}+{y}')
 
-            (oid, status, prod_name, qty, price, order_date,
-             fam, im, otch, city, street, house, flat,
-             card_number, card_exp) = row
-
-            try:
-                total = float(price) * float(qty)
-            except (ValueError, TypeError):
-                total = 0
-
-            # Формируем адрес
-            address_parts = []
-            if city:
-                address_parts.append(f"г. {city}")
-            if street:
-                address_parts.append(f"ул. {street}")
-            if house:
-                address_parts.append(f"д. {house}")
-            if flat:
-                address_parts.append(f"кв. {flat}")
-            address = ", ".join(address_parts)
-
-            # Маскируем номер карты
-            masked_card = self._mask_card(card_number) if card_number else "**** **** **** ****"
-
-            # Создаем диалоговое окно с детальной информацией
-            details_window = ctk.CTkToplevel(self)
-            details_window.title(f"Информация о заказе №{oid}")
-            details_window.geometry("600x500")
-            details_window.configure(fg_color=BG_MAIN)
-
-            # Центрируем окно
-            details_window.update_idletasks()
-            width = details_window.winfo_width()
-            height = details_window.winfo_height()
-            x = (self.winfo_screenwidth() // 2) - (width // 2)
-            y = (self.winfo_screenheight() // 2) - (height // 2)
-            details_window.geometry(f'{width}x{height}+{x}+{y}')
-
-            details_window.transient(self)
-            details_window.grab_set()
-
-            # Основной контент
-            content_frame = ctk.CTkFrame(details_window, fg_color=BG_CARD, corner_radius=10)
-            content_frame.pack(fill="both", expand=True, padx=20, pady=20)
-
-            # Заголовок
-            ctk.CTkLabel(
-                content_frame,
-                text=f"📦 Заказ №{oid}",
-                font=("Segoe UI", 22, "bold"),
-                text_color=ACCENT_DARK
-            ).pack(anchor="w", pady=(20, 10), padx=25)
-
-            # Разделитель
-            ctk.CTkFrame(content_frame, height=2, fg_color=BORDER).pack(fill="x", pady=5, padx=25)
-
-            # Информация о заказе
-            info_text = f"""
+        details_window.transient(self)
+        details_window.grab_set()
+
+        # Основной контент
+        content_frame = ctk.CTkFrame(details_window, fg_color=BG_CARD, corner_radius=10)
+        content_frame.pack(fill="both", expand=True, padx=20, pady=20)
+
+        # Заголовок
+        ctk.CTkLabel(
+            content_frame,
+            text=f"📦 Заказ №{oid}",
+            font=("Segoe UI", 22, "bold"),
+            text_color=ACCENT_DARK
+        ).pack(anchor="w", pady=(20, 10), padx=25)
+
+        # Разделитель
+        ctk.CTkFrame(content_frame, height=2, fg_color=BORDER).pack(fill="x", pady=5, padx=25)
+
+        # Информация о заказе
+        info_text = f"""
 📅 Дата заказа: {order_date}
 📊 Статус: {status}
 
@@ -1250,44 +1132,40 @@ class ClientApp(ctk.CTkToplevel):
 📅 Срок действия карты: {card_exp if card_exp else 'Не указан'}
 """
 
-            info_label = ctk.CTkLabel(
-                content_frame,
-                text=info_text,
-                font=("Segoe UI", 12),
-                justify="left",
-                text_color=TEXT_DARK
-            )
-            info_label.pack(anchor="w", pady=20, padx=25)
-
-            # Кнопка закрытия
-            ctk.CTkButton(
-                content_frame,
-                text="Закрыть",
-                command=details_window.destroy,
-                height=40,
-                width=120,
-                fg_color=ACCENT,
-                hover_color=ACCENT_DARK,
-                text_color="white",
-                corner_radius=10
-            ).pack(pady=20)
+        info_label = ctk.CTkLabel(
+            content_frame,
+            text=info_text,
+            font=("Segoe UI", 12),
+            justify="left",
+            text_color=TEXT_DARK
+        )
+        info_label.pack(anchor="w", pady=20, padx=25)
 
-        except Exception as e:
-            print(f"Database error: {e}")
-            messagebox.showerror("Ошибка", f"Ошибка базы данных: {e}")
-        finally:
-            conn.close()
+        # Кнопка закрытия
+        ctk.CTkButton(
+            content_frame,
+            text="Закрыть",
+            command=details_window.destroy,
+            height=40,
+            width=120,
+            fg_color=ACCENT,
+            hover_color=ACCENT_DARK,
+            text_color="white",
+            corner_radius=10
+        ).pack(pady=20)
+
+    def _on_order_details_dialog_error(self, e):
+        print(f"Database error: {e}")
+        messagebox.showerror("Ошибка", f"Ошибка базы данных: {e}")
 
     # ---------- ПЛАТЁЖНЫЕ ДАННЫЕ ----------
 
-    def _build_payment(self):
-        # Настраиваем сетку для правой панели
-        self.main_frame.grid_columnconfigure(0, weight=3)
-        self.main_frame.grid_columnconfigure(1, weight=2)
+    def _build_payment(self, frame):
+        self._split_view(frame)
 
         # Левая часть - таблица карт
         left_frame = ctk.CTkFrame(
-            self.frame_payment,
+            frame,
             fg_color=BG_CARD,
             corner_radius=10,
             border_width=1,
@@ -1299,7 +1177,7 @@ class ClientApp(ctk.CTkToplevel):
 
         # Правая часть - редактирование
         self.right_frame_payment = ctk.CTkFrame(
-            self.frame_payment,
+            frame,
             width=420,
             fg_color=BG_CARD,
             corner_radius=10,
@@ -1485,6 +1363,7 @@ class ClientApp(ctk.CTkToplevel):
                                  anchor="center" if col in ["id", "exp"] else "w")
 
         self.tree_pay.grid(row=0, column=0, sticky="nsew")
+        self.loading_payments = LoadingIndicator(self.tree_pay.master)
 
         # Скроллбары
         scrollbar_y = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree_pay.yview)
@@ -1516,7 +1395,7 @@ class ClientApp(ctk.CTkToplevel):
         refresh_btn.pack(side="left", padx=5)
 
         self.payment_map = {}
-        self._load_payment_data()
+        self.pay_rows = KeyedTree(self.tree_pay)
 
     def _toggle_cvv_visibility(self):
         if self.show_cvv_var.get():
@@ -1525,26 +1404,19 @@ class ClientApp(ctk.CTkToplevel):
             self.entry_cvv.configure(show="●")
 
     def _load_payment_data(self):
-        for row in self.tree_pay.get_children():
-            self.tree_pay.delete(row)
-        self.payment_map.clear()
-
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-                       SELECT ID_данных, Номер_карты, CONVERT(varchar (10), Срок_действия, 120)
-                       FROM Платежные_данные
-                       WHERE ID_Клиента = ?
-                       """, (self.client_id,))
-        rows = cursor.fetchall()
-        conn.close()
-
-        for pid, card, exp in rows:
-            self.payment_map[pid] = (card, exp)
-            self.tree_pay.insert(
-                "", "end",
-                values=(pid, self._mask_card(card), exp)
-            )
+        self.tasks.submit(
+            "payments", services.list_payment_cards, self.client_id,
+            on_done=self._fill_payment_data,
+            on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+            indicator=self.loading_payments,
+        )
+
+    def _fill_payment_data(self, cards):
+        self.payment_map = {pid: (card, exp) for pid, card, exp in cards}
+        self.pay_rows.update(
+            (row_iid(pid), (pid, self._mask_card(card), exp))
+            for pid, card, exp in cards
+        )
 
     def _on_pay_select(self, event):
         sel = self.tree_pay.selection()
@@ -1581,27 +1453,24 @@ class ClientApp(ctk.CTkToplevel):
             messagebox.showwarning("Проверка данных", "Некорректный формат даты. Используйте ГГГГ-ММ-ДД")
             return
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                           INSERT INTO Платежные_данные (ID_Клиента, Номер_карты, Срок_действия, CVV_код)
-                           VALUES (?, ?, ?, ?)
-                           """, (self.client_id, card, exp, cvv))
-            conn.commit()
-            messagebox.showinfo("Карты", "✅ Карта успешно добавлена")
-            self._load_payment_data()
+        self.tasks.submit(
+            "save_payment", services.add_payment_card, self.client_id, card, exp, cvv,
+            on_done=lambda _: self._on_payment_saved("✅ Карта успешно добавлена", clear=True),
+            on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+            indicator=self.loading_payments,
+            replace=False,
+        )
+
+    def _on_payment_saved(self, message, clear=False):
+        messagebox.showinfo("Карты", message)
+        self._load_payment_data()
 
+        if clear:
             # Очищаем поля
             self.entry_card.delete(0, "end")
             self.entry_exp.delete(0, "end")
             self.entry_cvv.delete(0, "end")
             self.selected_payment_id = None
-        except Exception as e:
-            conn.rollback()
-            messagebox.showerror("Ошибка", str(e))
-        finally:
-            conn.close()
 
     def _edit_payment(self):
         if not self.selected_payment_id:
@@ -1616,25 +1485,14 @@ class ClientApp(ctk.CTkToplevel):
             messagebox.showwarning("Проверка данных", "Заполните все поля карты")
             return
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                           UPDATE Платежные_данные
-                           SET Номер_карты   = ?,
-                               Срок_действия = ?,
-                               CVV_код       = ?
-                           WHERE ID_данных = ?
-                             AND ID_Клиента = ?
-                           """, (card, exp, cvv, self.selected_payment_id, self.client_id))
-            conn.commit()
-            messagebox.showinfo("Карты", "✅ Данные карты обновлены")
-            self._load_payment_data()
-        except Exception as e:
-            conn.rollback()
-            messagebox.showerror("Ошибка", str(e))
-        finally:
-            conn.close()
+        self.tasks.submit(
+            "save_payment", services.update_payment_card,
+            self.selected_payment_id, self.client_id, card, exp, cvv,
+            on_done=lambda _: self._on_payment_saved("✅ Данные карты обновлены"),
+            on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+            indicator=self.loading_payments,
+            replace=False,
+        )
 
     def _delete_payment(self):
         if not self.selected_payment_id:
@@ -1642,62 +1500,48 @@ class ClientApp(ctk.CTkToplevel):
             return
 
         if messagebox.askyesno("Удаление", "Удалить выбранную карту?"):
-            conn = get_connection()
-            cursor = conn.cursor()
-            try:
-                cursor.execute("""
-                               DELETE
-                               FROM Платежные_данные
-                               WHERE ID_данных = ?
-                                 AND ID_Клиента = ?
-                               """, (self.selected_payment_id, self.client_id))
-                conn.commit()
-                messagebox.showinfo("Карты", "✅ Карта удалена")
-                self._load_payment_data()
-
-                # Очищаем поля
-                self.entry_card.delete(0, "end")
-                self.entry_exp.delete(0, "end")
-                self.entry_cvv.delete(0, "end")
-                self.selected_payment_id = None
-            except Exception as e:
-                conn.rollback()
-                messagebox.showerror("Ошибка", str(e))
-            finally:
-                conn.close()
+            self.tasks.submit(
+                "save_payment", services.delete_payment_card,
+                self.selected_payment_id, self.client_id,
+                on_done=lambda _: self._on_payment_saved("✅ Карта удалена", clear=True),
+                on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+                indicator=self.loading_payments,
+                replace=False,
+            )
 
     def _show_cvv(self):
         if not self.selected_payment_id:
             messagebox.showwarning("Выбор", "Выберите запись карты")
             return
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-                       SELECT CVV_код
-                       FROM Платежные_данные
-                       WHERE ID_данных = ?
-                         AND ID_Клиента = ?
-                       """, (self.selected_payment_id, self.client_id))
-        row = cursor.fetchone()
-        conn.close()
-
-        if row:
-            messagebox.showinfo("CVV", f"🔐 CVV код: {row[0]}")
+        self.tasks.submit(
+            "cvv", services.get_card_cvv, self.selected_payment_id, self.client_id,
+            on_done=self._show_cvv_value,
+            on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+        )
+
+    def _show_cvv_value(self, cvv):
+        if cvv is not None:
+            messagebox.showinfo("CVV", f"🔐 CVV код: {cvv}")
         else:
             messagebox.showwarning("CVV", "Запись не найдена")
 
     # ---------- ПРОФИЛЬ ----------
 
-    def _build_profile(self):
+    def _build_profile(self, view):
+        # Для профиля - только одна колонка
+        view.grid_rowconfigure(0, weight=1)
+        view.grid_columnconfigure(0, weight=1)
+
         frame = ctk.CTkFrame(
-            self.frame_profile,
+            view,
             fg_color=BG_CARD,
             corner_radius=15,
             border_width=1,
             border_color=BORDER
         )
         frame.pack(fill="both", expand=True, padx=40, pady=40)
+        self.loading_profile = LoadingIndicator(frame)
 
         ctk.CTkLabel(
             frame,
@@ -1763,27 +1607,15 @@ class ClientApp(ctk.CTkToplevel):
         )
         save_btn.grid(row=11, column=0, columnspan=2, pady=(0, 10))
 
-        self._load_profile()
-
     def _load_profile(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-                       SELECT Фамилия,
-                              Имя,
-                              Отчество,
-                              Серия_паcпорта,
-                              Номер_паcпорта,
-                              Город,
-                              Улица,
-                              Дом,
-                              Квартира
-                       FROM Клиент
-                       WHERE ID_Клиент = ?
-                       """, (self.client_id,))
-        row = cursor.fetchone()
-        conn.close()
+        self.tasks.submit(
+            "profile", services.get_client_profile, self.client_id,
+            on_done=self._fill_profile,
+            on_error=lambda e: print(f"Error loading profile: {e}"),
+            indicator=self.loading_profile,
+        )
 
+    def _fill_profile(self, row):
         if not row:
             return
 
@@ -1804,32 +1636,15 @@ class ClientApp(ctk.CTkToplevel):
                 messagebox.showwarning("Проверка данных", f"Заполните поле: {key}")
                 return
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                           UPDATE Клиент
-                           SET Фамилия        = ?,
-                               Имя            = ?,
-                               Отчество       = ?,
-                               Серия_паcпорта = ?,
-                               Номер_паcпорта = ?,
-                               Город          = ?,
-                               Улица          = ?,
-                               Дом            = ?,
-                               Квартира       = ?
-                           WHERE ID_Клиент = ?
-                           """, (
-                               vals["fam"], vals["name"], vals["patr"],
-                               vals["ser"], vals["num"], vals["city"],
-                               vals["street"], vals["house"], vals["flat"],
-                               self.client_id
-                           ))
-            conn.commit()
-            messagebox.showinfo("Профиль", "✅ Данные успешно сохранены")
-
-        except Exception as e:
-            conn.rollback()
-            messagebox.showerror("Ошибка", str(e))
-        finally:
-            conn.close()
\ No newline at end of file
+        profile = services.ClientProfile(
+            vals["fam"], vals["name"], vals["patr"],
+            vals["ser"], vals["num"], vals["city"],
+            vals["street"], vals["house"], vals["flat"]
+        )
+        self.tasks.submit(
+            "save_profile", services.save_client_profile, self.client_id, profile,
+            on_done=lambda _: messagebox.showinfo("Профиль", "✅ Данные успешно сохранены"),
+            on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+            indicator=self.loading_profile,
+            replace=False,
+        )
@@ -2,11 +2,29 @@
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import ttk, messagebox
-from db import get_connection
+import services
+from services import ConflictError, NotFoundError, ServiceError
 from theme import *
+from workers import LoadingIndicator, TaskRunner
+from virtual_tree import VirtualTree
 
 ctk.set_appearance_mode("light")
 
+FEED_POLL_MS = 2000  # как часто список свободных заказов спрашивает ленту изменений
+
+
+def _order_values(order):
+    """Значения колонок списка заказов курьера."""
+    return (
+        str(order.id),
+        order.date,
+        order.status,
+        order.client,
+        order.product_name,
+        str(order.quantity),
+        f"{order.total} ₽"
+    )
+
 
 def setup_style(root):
     """Стиль для ttk-элементов (Treeview и т.п.)."""
@@ -58,6 +76,13 @@ class CourierApp(ctk.CTkToplevel):
         self.current_view = "available"
         self.selected_order_id = None
 
+        # Лента изменений заказов: номер последнего прочитанного события
+        self._feed_version = None
+        self._feed_after_id = None
+
+        # Запросы к БД выполняются в фоне, результаты приходят через after()
+        self.tasks = TaskRunner(self)
+
         # Глобальный стиль для ttk
         setup_style(self)
 
@@ -259,12 +284,14 @@ class CourierApp(ctk.CTkToplevel):
         )
         self.details_text.grid(row=1, column=0, sticky="nsew", padx=20, pady=(0, 20))
         self.details_text.configure(state="disabled")
+        self.loading_details = LoadingIndicator(self.right_frame)
 
         # Внутренний tk.Frame для корректной работы ttk.Treeview
         table_frame = tk.Frame(left_frame, bg=BG_CARD)
         table_frame.pack(fill="both", expand=True, padx=15, pady=15)
         table_frame.grid_rowconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
+        self.loading_av = LoadingIndicator(table_frame)
 
         self.tree_av = ttk.Treeview(
             table_frame,
@@ -302,16 +329,20 @@ class CourierApp(ctk.CTkToplevel):
         self.tree_av.grid(row=0, column=0, sticky="nsew")
 
         # Скроллбары
-        scrollbar_y = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree_av.yview)
+        scrollbar_y = ttk.Scrollbar(table_frame, orient="vertical")
         scrollbar_y.grid(row=0, column=1, sticky="ns")
 
         scrollbar_x = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree_av.xview)
         scrollbar_x.grid(row=1, column=0, columnspan=2, sticky="ew")
 
-        self.tree_av.configure(yscroll=scrollbar_y.set, xscroll=scrollbar_x.set)
+        self.tree_av.configure(xscroll=scrollbar_x.set)
 
-        # Привязка события выбора
-        self.tree_av.bind('<<TreeviewSelect>>', self._on_available_select)
+        # Постраничный список: в таблице только видимые строки
+        self.list_av = VirtualTree(
+            self.tree_av, scrollbar_y, self.tasks, "available",
+            format_row=_order_values, on_select=self._on_available_select,
+            on_error=self._on_available_error, indicator=self.loading_av,
+        )
 
         # Нижняя панель кнопок
         btn_frame = ctk.CTkFrame(left_frame, fg_color="transparent")
@@ -344,65 +375,66 @@ class CourierApp(ctk.CTkToplevel):
         )
         self.btn_take.pack(side="left", padx=5)
 
-        self._load_available()
+        # Номер события запоминается до первой загрузки списка – иначе
+        # изменения между загрузкой и запуском ленты потерялись бы
+        self.bind("<Destroy>", self._on_destroy_feed, add="+")
+        self.tasks.submit(
+            "order_feed", services.order_feed_version,
+            on_done=self._start_feed, on_error=self._on_available_error,
+            indicator=self.loading_av,
+        )
 
     def _load_available(self):
-        for row in self.tree_av.get_children():
-            self.tree_av.delete(row)
-
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                """
-                SELECT Z.ID_заказа,
-                       CONVERT(varchar (10), Z.Дата_заказа, 104)                                               as Дата,
-                       Z.Статус,
-                       C.Фамилия + ' ' + C.Имя                                                                 as Клиент,
-                       T.Название                                                                              as Товар,
-                       Z.Количество_заказанного_товара                                                         as Количество,
-                       CONVERT(varchar (20), CAST(T.Цена * Z.Количество_заказанного_товара AS DECIMAL(10, 2))) as Сумма
-                FROM Заказ Z
-                         JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
-                         JOIN Клиент C ON P.ID_Клиента = C.ID_Клиент
-                         JOIN Товар T ON Z.Номер_товара = T.Номер_товара
-                WHERE Z.ID_курьера IS NULL
-                  AND Z.Статус IN (N'создан', N'в обработке')
-                ORDER BY Z.Дата_заказа ASC
-                """
-            )
+        self.list_av.refresh()
+
+    def _start_feed(self, version):
+        self._feed_version = version
+        self.list_av.set_source(services.available_orders_query())
+        self._schedule_feed(FEED_POLL_MS)
+
+    def _schedule_feed(self, delay):
+        """Опросить ленту через delay мс (0 – сразу, например после захвата заказа)."""
+        if self._feed_version is None:
+            return
+        if self._feed_after_id is not None:
+            self.after_cancel(self._feed_after_id)
+        self._feed_after_id = self.after(delay, self._poll_feed)
+
+    def _poll_feed(self):
+        self._feed_after_id = None
+        self.tasks.submit(
+            "order_feed", services.available_order_changes, self._feed_version,
+            on_done=self._on_feed, on_error=self._on_feed_error,
+        )
+
+    def _on_feed(self, feed):
+        self._feed_version = feed.version
+        self.list_av.apply_changes(feed.changes)
+        self._schedule_feed(0 if feed.more else FEED_POLL_MS)
+
+    def _on_feed_error(self, e):
+        # сеть или сервер недоступны – просто пробуем позже, не докучая окнами
+        print(f"Error polling order feed: {e}")
+        self._schedule_feed(FEED_POLL_MS)
 
-            for row in cursor.fetchall():
-                formatted_row = (
-                    str(row[0]),
-                    row[1],
-                    row[2],
-                    row[3],
-                    row[4],
-                    str(row[5]),
-                    f"{row[6]} ₽"
-                )
-                self.tree_av.insert("", "end", values=formatted_row)
-
-        except Exception as e:
-            print(f"Error loading available orders: {e}")
-            messagebox.showerror("Ошибка", f"Не удалось загрузить доступные заказы: {e}")
-        finally:
-            conn.close()
-
-    def _on_available_select(self, event):
+    def _on_destroy_feed(self, event):
+        if event.widget is self and self._feed_after_id is not None:
+            self.after_cancel(self._feed_after_id)
+            self._feed_after_id = None
+
+    def _on_available_error(self, e):
+        print(f"Error loading available orders: {e}")
+        messagebox.showerror("Ошибка", f"Не удалось загрузить доступные заказы: {e}")
+
+    def _on_available_select(self, order):
         """Обработка выбора заказа в таблице доступных заказов."""
-        selection = self.tree_av.selection()
-        if not selection:
+        if order is None:
             self.btn_take.configure(state="disabled")
             return
 
-        item = selection[0]
-        values = self.tree_av.item(item, "values")
-        if values:
-            self.selected_order_id = values[0]
-            self.btn_take.configure(state="normal")
-            self._load_order_details(self.selected_order_id)
+        self.selected_order_id = order.id
+        self.btn_take.configure(state="normal")
+        self._load_order_details(self.selected_order_id)
 
     def _take_order(self):
         if not self.selected_order_id:
@@ -410,65 +442,40 @@ class CourierApp(ctk.CTkToplevel):
             return
 
         order_id = self.selected_order_id
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            # Проверяем, свободен ли заказ
-            cursor.execute(
-                """
-                SELECT Статус, ID_курьера
-                FROM Заказ
-                WHERE ID_заказа = ?
-                """,
-                (order_id,),
-            )
-
-            order_info = cursor.fetchone()
-            if not order_info:
-                messagebox.showerror("Ошибка", f"Заказ №{order_id} не найден")
-                return
-
-            status, current_courier = order_info
-            if current_courier is not None:
-                messagebox.showwarning("Ошибка", "Этот заказ уже взят другим курьером")
-                self._load_available()
-                return
-
-            if status not in ("создан", "в обработке"):
-                messagebox.showwarning(
-                    "Ошибка", f"Заказ имеет статус '{status}', взять нельзя"
-                )
-                return
-
-            # Берём заказ в работу
-            cursor.execute(
-                """
-                UPDATE Заказ
-                SET ID_курьера = ?,
-                    Статус     = N'у курьера'
-                WHERE ID_заказа = ?
-                """,
-                (self.courier_id, order_id),
-            )
-
-            conn.commit()
-            messagebox.showinfo("✅ Успешно", f"Заказ №{order_id} взят в работу")
-
-            self._load_available()
-            self._load_my_orders()
-            self.selected_order_id = None
-            self.btn_take.configure(state="disabled")
-            self.details_text.configure(state="normal")
-            self.details_text.delete("1.0", "end")
-            self.details_text.insert("1.0", "Выберите заказ для просмотра деталей")
-            self.details_text.configure(state="disabled")
+        self.btn_take.configure(state="disabled")
+        self.tasks.submit(
+            "take_order", services.take_order, order_id, self.courier_id,
+            on_done=lambda _: self._on_order_taken(order_id),
+            on_error=self._on_take_order_error,
+            indicator=self.loading_av,
+            replace=False,
+        )
 
-        except Exception as e:
-            conn.rollback()
+    def _on_take_order_error(self, e):
+        self.btn_take.configure(state="normal")
+        if isinstance(e, NotFoundError):
+            messagebox.showerror("Ошибка", str(e))
+        elif isinstance(e, ConflictError):
+            messagebox.showwarning("Ошибка", str(e))
+            self._schedule_feed(0)
+        elif isinstance(e, ServiceError):
+            messagebox.showwarning("Ошибка", str(e))
+        else:
             messagebox.showerror("Ошибка", f"Не удалось взять заказ: {str(e)}")
             print(f"Error taking order: {e}")
-        finally:
-            conn.close()
+
+    def _on_order_taken(self, order_id):
+        messagebox.showinfo("✅ Успешно", f"Заказ №{order_id} взят в работу")
+
+        self.list_av.clear_selection()
+        self._schedule_feed(0)
+        self._load_my_orders()
+        self.selected_order_id = None
+        self.btn_take.configure(state="disabled")
+        self.details_text.configure(state="normal")
+        self.details_text.delete("1.0", "end")
+        self.details_text.insert("1.0", "Выберите заказ для просмотра деталей")
+        self.details_text.configure(state="disabled")
 
     # ---------- Мои заказы ----------
 
@@ -522,12 +529,14 @@ class CourierApp(ctk.CTkToplevel):
         )
         self.details_text_my.grid(row=1, column=0, sticky="nsew", padx=20, pady=(0, 20))
         self.details_text_my.configure(state="disabled")
+        self.loading_details_my = LoadingIndicator(self.right_frame_my)
 
         # Внутренний tk.Frame для корректной работы ttk.Treeview
         table_frame = tk.Frame(left_frame, bg=BG_CARD)
         table_frame.pack(fill="both", expand=True, padx=15, pady=15)
         table_frame.grid_rowconfigure(0, weight=1)
         table_frame.grid_columnconfigure(0, weight=1)
+        self.loading_my = LoadingIndicator(table_frame)
 
         self.tree_my = ttk.Treeview(
             table_frame,
@@ -554,16 +563,20 @@ class CourierApp(ctk.CTkToplevel):
         self.tree_my.grid(row=0, column=0, sticky="nsew")
 
         # Скроллбары
-        scrollbar_y = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree_my.yview)
+        scrollbar_y = ttk.Scrollbar(table_frame, orient="vertical")
         scrollbar_y.grid(row=0, column=1, sticky="ns")
 
         scrollbar_x = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tree_my.xview)
         scrollbar_x.grid(row=1, column=0, columnspan=2, sticky="ew")
 
-        self.tree_my.configure(yscroll=scrollbar_y.set, xscroll=scrollbar_x.set)
+        self.tree_my.configure(xscroll=scrollbar_x.set)
 
-        # Привязка события выбора
-        self.tree_my.bind('<<TreeviewSelect>>', self._on_my_order_select)
+        # Постраничный список: в таблице только видимые строки
+        self.list_my = VirtualTree(
+            self.tree_my, scrollbar_y, self.tasks, "my_orders",
+            format_row=_order_values, on_select=self._on_my_order_select,
+            on_error=self._on_my_orders_error, indicator=self.loading_my,
+        )
 
         # Нижняя панель кнопок
         bottom = ctk.CTkFrame(left_frame, fg_color="transparent")
@@ -612,65 +625,24 @@ class CourierApp(ctk.CTkToplevel):
         )
         self.btn_change_status.pack(side="left", padx=5)
 
-        self._load_my_orders()
+        self.list_my.set_source(services.courier_orders_query(self.courier_id))
 
     def _load_my_orders(self):
-        for row in self.tree_my.get_children():
-            self.tree_my.delete(row)
-
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                """
-                SELECT Z.ID_заказа,
-                       CONVERT(varchar (10), Z.Дата_заказа, 104)                                               as Дата,
-                       Z.Статус,
-                       C.Фамилия + ' ' + C.Имя                                                                 as Клиент,
-                       T.Название                                                                              as Товар,
-                       Z.Количество_заказанного_товара                                                         as Количество,
-                       CONVERT(varchar (20), CAST(T.Цена * Z.Количество_заказанного_товара AS DECIMAL(10, 2))) as Сумма
-                FROM Заказ Z
-                         JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
-                         JOIN Клиент C ON P.ID_Клиента = C.ID_Клиент
-                         JOIN Товар T ON Z.Номер_товара = T.Номер_товара
-                WHERE Z.ID_курьера = ?
-                ORDER BY Z.Дата_заказа DESC
-                """,
-                (self.courier_id,),
-            )
+        self.list_my.refresh()
 
-            for row in cursor.fetchall():
-                formatted_row = (
-                    str(row[0]),
-                    row[1],
-                    row[2],
-                    row[3],
-                    row[4],
-                    str(row[5]),
-                    f"{row[6]} ₽"
-                )
-                self.tree_my.insert("", "end", values=formatted_row)
-
-        except Exception as e:
-            print(f"Error loading my orders: {e}")
-            messagebox.showerror("Ошибка", f"Не удалось загрузить ваши заказы: {e}")
-        finally:
-            conn.close()
-
-    def _on_my_order_select(self, event):
+    def _on_my_orders_error(self, e):
+        print(f"Error loading my orders: {e}")
+        messagebox.showerror("Ошибка", f"Не удалось загрузить ваши заказы: {e}")
+
+    def _on_my_order_select(self, order):
         """Обработка выбора заказа в таблице моих заказов."""
-        selection = self.tree_my.selection()
-        if not selection:
+        if order is None:
             self.btn_change_status.configure(state="disabled")
             return
 
-        item = selection[0]
-        values = self.tree_my.item(item, "values")
-        if values:
-            self.selected_order_id = values[0]
-            self.btn_change_status.configure(state="normal")
-            self._load_order_details_my(self.selected_order_id)
+        self.selected_order_id = order.id
+        self.btn_change_status.configure(state="normal")
+        self._load_order_details_my(self.selected_order_id)
 
     def _load_order_details_my(self, order_id):
         """Загрузка деталей для моих заказов."""
@@ -687,109 +659,60 @@ class CourierApp(ctk.CTkToplevel):
             return
 
         order_id = self.selected_order_id
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            # Проверяем, принадлежит ли заказ этому курьеру
-            cursor.execute(
-                """
-                SELECT Статус
-                FROM Заказ
-                WHERE ID_заказа = ?
-                  AND ID_курьера = ?
-                """,
-                (order_id, self.courier_id),
-            )
-
-            result = cursor.fetchone()
-            if not result:
-                messagebox.showerror("Ошибка", "Заказ не найден или не принадлежит вам")
-                self._load_my_orders()
-                return
-
-            current_status = result[0]
-
-            # Валидация смены статуса
-            if current_status == "доставлен" and new_status != "доставлен":
-                messagebox.showwarning("Ошибка", "Доставленный заказ нельзя изменить")
-                return
-
-            cursor.execute(
-                """
-                UPDATE Заказ
-                SET Статус = ?
-                WHERE ID_заказа = ?
-                  AND ID_курьера = ?
-                """,
-                (new_status, order_id, self.courier_id),
-            )
+        self.btn_change_status.configure(state="disabled")
+        self.tasks.submit(
+            "change_status", services.change_courier_order_status,
+            order_id, self.courier_id, new_status,
+            on_done=lambda _: self._on_status_changed(order_id, new_status),
+            on_error=self._on_change_status_error,
+            indicator=self.loading_my,
+            replace=False,
+        )
 
-            conn.commit()
-            messagebox.showinfo(
-                "✅ Успешно", f"Статус заказа №{order_id} изменён на '{new_status}'"
-            )
+    def _on_change_status_error(self, e):
+        self.btn_change_status.configure(state="normal")
+        if isinstance(e, NotFoundError):
+            messagebox.showerror("Ошибка", str(e))
             self._load_my_orders()
-            self.selected_order_id = None
-            self.btn_change_status.configure(state="disabled")
-            self.details_text_my.configure(state="normal")
-            self.details_text_my.delete("1.0", "end")
-            self.details_text_my.insert("1.0", "Выберите заказ для просмотра деталей")
-            self.details_text_my.configure(state="disabled")
-
-        except Exception as e:
-            conn.rollback()
+        elif isinstance(e, ServiceError):
+            messagebox.showwarning("Ошибка", str(e))
+        else:
             messagebox.showerror("Ошибка", str(e))
-        finally:
-            conn.close()
+
+    def _on_status_changed(self, order_id, new_status):
+        messagebox.showinfo(
+            "✅ Успешно", f"Статус заказа №{order_id} изменён на '{new_status}'"
+        )
+        self._load_my_orders()
+        self.selected_order_id = None
+        self.btn_change_status.configure(state="disabled")
+        self.details_text_my.configure(state="normal")
+        self.details_text_my.delete("1.0", "end")
+        self.details_text_my.insert("1.0", "Выберите заказ для просмотра деталей")
+        self.details_text_my.configure(state="disabled")
 
     # ---------- Загрузка деталей заказа ----------
 
     def _load_order_details(self, order_id, details_widget=None):
-        """Загрузка и отображение детальной информации о заказе."""
+        """Загрузка детальной информации о заказе (в фоне)."""
         if details_widget is None:
             details_widget = self.details_text
+        indicator = (self.loading_details_my if details_widget is self.details_text_my
+                     else self.loading_details)
+
+        # Один ключ на обе панели: щелчок по другой строке отменяет прежний запрос
+        self.tasks.submit(
+            "order_details", services.get_courier_order_details, order_id,
+            on_done=lambda result: self._show_order_details(result, details_widget),
+            on_error=lambda e: self._show_order_details_error(e, details_widget),
+            indicator=indicator,
+        )
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute(
-                """
-                SELECT Z.ID_заказа,
-                       Z.Статус,
-                       Z.Количество_заказанного_товара,
-                       CONVERT(varchar (19), Z.Дата_заказа, 120)                                 as Дата_заказа,
-
-                       -- Информация о клиенте
-                       C.Фамилия + ' ' + C.Имя + ' ' + ISNULL(C.Отчество, '')                    as Клиент_ФИО,
-                       C.Город + ', ' + C.Улица + N', д. ' + C.Дом
-                       + N', кв. ' + C.Квартира                                                   as Адрес,
-
-                       -- Информация о товаре
-                       T.Название                                                                as Товар,
-                       CONVERT(varchar (20), T.Цена)                                             as Цена_за_единицу,
-
-                       -- Расчет суммы
-                       CONVERT(varchar (20),
-                               CAST(T.Цена * Z.Количество_заказанного_товара AS DECIMAL(10, 2))) as Общая_сумма,
-
-                       -- Курьер (если есть)
-                       ISNULL(K.Фамилия + ' ' + K.Имя, 'Не назначен')                            as Курьер,
-                       ISNULL(K.Номер_телефона, '')                                              as Телефон_курьера
-
-                FROM Заказ Z
-                         JOIN Платежные_данные P ON Z.ID_данные = P.ID_данных
-                         JOIN Клиент C ON P.ID_Клиента = C.ID_Клиент
-                         JOIN Товар T ON Z.Номер_товара = T.Номер_товара
-                         LEFT JOIN Курьер K ON Z.ID_курьера = K.ID_курьера
-                WHERE Z.ID_заказа = ?
-                """,
-                (order_id,),
-            )
-
-            result = cursor.fetchone()
-            if result:
-                # Форматирование с эмодзи и цветовым оформлением
-                details_text = f"""📦 ЗАКАЗ №{result[0]}
+    def _show_order_details(self, result, details_widget):
+        """Отображение детальной информации о заказе."""
+        if result:
+            # Форматирование с эмодзи и цветовым оформлением
+            details_text = f"""📦 ЗАКАЗ №{result[0]}
 {'=' * 45}
 
 📋 ОСНОВНАЯ ИНФОРМАЦИЯ:
@@ -814,24 +737,22 @@ class CourierApp(ctk.CTkToplevel):
 📝 Примечание: Для связи с клиентом используйте контактные данные из системы.
 """
 
-                details_widget.configure(state="normal")
-                details_widget.delete("1.0", "end")
-                details_widget.insert("1.0", details_text)
-                details_widget.configure(state="disabled")
-            else:
-                details_widget.configure(state="normal")
-                details_widget.delete("1.0", "end")
-                details_widget.insert("1.0", "⚠️ Информация о заказе не найдена")
-                details_widget.configure(state="disabled")
-
-        except Exception as e:
-            print(f"Error loading order details: {e}")
             details_widget.configure(state="normal")
             details_widget.delete("1.0", "end")
-            details_widget.insert("1.0", f"❌ Ошибка загрузки деталей: {str(e)}")
+            details_widget.insert("1.0", details_text)
+            details_widget.configure(state="disabled")
+        else:
+            details_widget.configure(state="normal")
+            details_widget.delete("1.0", "end")
+            details_widget.insert("1.0", "⚠️ Информация о заказе не найдена")
             details_widget.configure(state="disabled")
-        finally:
-            conn.close()
+
+    def _show_order_details_error(self, e, details_widget):
+        print(f"Error loading order details: {e}")
+        details_widget.configure(state="normal")
+        details_widget.delete("1.0", "end")
+        details_widget.insert("1.0", f"❌ Ошибка загрузки деталей: {str(e)}")
+        details_widget.configure(state="disabled")
 
     # ---------- Профиль курьера ----------
 
@@ -844,6 +765,7 @@ class CourierApp(ctk.CTkToplevel):
             border_color=BORDER
         )
         frame.pack(fill="both", expand=True, padx=40, pady=40)
+        self.loading_profile = LoadingIndicator(frame)
 
         ctk.CTkLabel(
             frame,
@@ -941,25 +863,14 @@ class CourierApp(ctk.CTkToplevel):
         self._load_profile()
 
     def _load_profile(self):
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT K.Фамилия,
-                   K.Имя,
-                   K.Отчество,
-                   K.Номер_телефона,
-                   U.Логин,
-                   U.Email
-            FROM Курьер K
-                     JOIN Пользователь U ON K.ID_пользователя = U.ID_пользователя
-            WHERE K.ID_курьера = ?
-            """,
-            (self.courier_id,),
+        self.tasks.submit(
+            "profile", services.get_courier_profile, self.courier_id,
+            on_done=self._fill_profile,
+            on_error=lambda e: print(f"Error loading profile: {e}"),
+            indicator=self.loading_profile,
         )
-        row = cursor.fetchone()
-        conn.close()
 
+    def _fill_profile(self, row):
         if not row:
             return
 
@@ -990,37 +901,13 @@ class CourierApp(ctk.CTkToplevel):
             messagebox.showwarning("Проверка данных", "Заполните все поля профиля")
             return
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            # Обновляем Курьер
-            cursor.execute(
-                """
-                UPDATE Курьер
-                SET Фамилия        = ?,
-                    Имя            = ?,
-                    Отчество       = ?,
-                    Номер_телефона = ?
-                WHERE ID_курьера = ?
-                """,
-                (vals["fam"], vals["name"], vals["patr"], vals["phone"], self.courier_id),
-            )
-
-            # Обновляем Email пользователя по user_id
-            email = self.entry_email.get().strip()
-            cursor.execute(
-                """
-                UPDATE Пользователь
-                SET Email = ?
-                WHERE ID_пользователя = ?
-                """,
-                (email, self.user_id),
-            )
-
-            conn.commit()
-            messagebox.showinfo("✅ Профиль", "Данные успешно сохранены")
-        except Exception as e:
-            conn.rollback()
-            messagebox.showerror("Ошибка", str(e))
-        finally:
-            conn.close()
\ No newline at end of file
+        self.tasks.submit(
+            "save_profile", services.save_courier_profile,
+            self.courier_id, self.user_id,
+            vals["fam"], vals["name"], vals["patr"], vals["phone"],
+            self.entry_email.get().strip(),
+            on_done=lambda _: messagebox.showinfo("✅ Профиль", "Данные успешно сохранены"),
+            on_error=lambda e: messagebox.showerror("Ошибка", str(e)),
+            indicator=self.loading_profile,
+            replace=False,
+        )
@@ -0,0 +1,255 @@
+# ui_diagnostics.py
+import customtkinter as ctk
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+
+import db
+import query_log
+import stall_monitor
+from theme import *
+from tree_diff import KeyedTree, row_iid
+
+# Периоды статистики: подпись -> минут (None – с запуска приложения)
+PERIODS = {
+    "5 минут": 5,
+    "15 минут": 15,
+    "Час": 60,
+    "С запуска": None,
+}
+REFRESH_MS = 2000  # статистика копится в памяти процесса – перечитывать дёшево
+SQL_SHOWN = 120    # символов запроса в таблице; полный текст – под таблицей
+
+
+def _size(n):
+    for unit in ("Б", "КБ", "МБ"):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} ГБ"
+
+
+def _ms(value):
+    return "∞" if value == float("inf") else f"{value:.1f}"
+
+
+class DiagnosticsWindow(ctk.CTkToplevel):
+    """
+    Диагностика этого процесса. Вкладка запросов (query_log): время, строки
+    и объём по каждому оператору и действию окна, медленные запросы и
+    ошибки. Вкладка зависаний (stall_monitor): обработчики, которые держали
+    главный цикл Tk, со стеком самого долгого зависания.
+    Обновляется раз в REFRESH_MS, пока окно открыто.
+    """
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Диагностика")
+        self.geometry("1300x800")
+        self.configure(fg_color=BG_MAIN)
+        self.log = query_log.get_log()
+        self.monitor = stall_monitor.get_monitor()  # None – сторож отключён
+        self.statements = {}  # iid -> StatementStats
+        self.handlers = {}    # iid -> HandlerStats
+        self._refresh_id = None
+
+        self.setup_ui()
+        self.refresh()
+        self.bind("<Destroy>", self._on_destroy, add="+")
+
+    def setup_ui(self):
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        top = ctk.CTkFrame(self, fg_color=BG_CARD, corner_radius=10)
+        top.grid(row=0, column=0, sticky="ew", padx=15, pady=(15, 5))
+
+        ctk.CTkLabel(top, text="Период:", font=ctk.CTkFont(weight="bold"),
+                     text_color=TEXT_DARK).pack(side="left", padx=(15, 5), pady=10)
+        self.period = ctk.CTkSegmentedButton(
+            top, values=list(PERIODS), command=lambda _: self.refresh(),
+            selected_color=ACCENT, selected_hover_color=ACCENT_DARK,
+        )
+        self.period.set("15 минут")
+        self.period.pack(side="left", padx=5, pady=10)
+
+        ctk.CTkButton(top, text="🗑 Сбросить", command=self.reset, width=110, height=32,
+                      fg_color=BTN_SECONDARY, hover_color=BTN_SECONDARY_HOVER,
+                      text_color=BTN_SECONDARY_TEXT).pack(side="right", padx=(5, 15))
+        ctk.CTkButton(top, text="💾 Отчёт о зависаниях", command=self.save_stall_report,
+                      width=170, height=32, fg_color=BTN_SECONDARY, hover_color=BTN_SECONDARY_HOVER,
+                      text_color=BTN_SECONDARY_TEXT,
+                      state="normal" if self.monitor else "disabled").pack(side="right", padx=5)
+
+        self.label_summary = ctk.CTkLabel(top, text="", font=ctk.CTkFont(size=13, weight="bold"),
+                                          text_color=HEADER_PRIMARY)
+        self.label_summary.pack(side="left", padx=20)
+
+        tabview = ctk.CTkTabview(self,
+                                 fg_color=BG_CARD,
+                                 border_width=1,
+                                 border_color=ACCENT_LIGHT,
+                                 segmented_button_selected_color=ACCENT,
+                                 segmented_button_selected_hover_color=ACCENT_DARK,
+                                 segmented_button_unselected_color=BG_CARD,
+                                 segmented_button_unselected_hover_color=ACCENT_LIGHT)
+        tabview.grid(row=1, column=0, sticky="nsew", padx=15, pady=(0, 15))
+        queries = tabview.add("🗄 Запросы к БД")
+        stalls = tabview.add("🧊 Зависания окна")
+
+        # ---------------- Запросы ----------------
+        queries.grid_columnconfigure(0, weight=1)
+        queries.grid_rowconfigure(0, weight=3)
+        queries.grid_rowconfigure(2, weight=2)
+
+        # Статистика по операторам
+        columns = ("Действие", "Запрос", "Вызовов", "Ошибок", "Всего, мс", "p50", "p95", "p99",
+                   "Макс", "Строк", "Объём")
+        widths = (170, 420, 70, 60, 90, 60, 60, 60, 70, 80, 80)
+        self.tree_statements = self._table(queries, 0, columns, widths, ("Запрос",))
+        self.tree_statements.bind("<<TreeviewSelect>>", self._on_statement_select)
+        self.statement_rows = KeyedTree(self.tree_statements)
+        self.sql_text = self._text(queries, 1)
+
+        # Медленные запросы и ошибки, новые сверху
+        columns = ("Время", "мс", "Строк", "Действие", "Запрос", "Параметры", "Ошибка")
+        widths = (140, 70, 70, 170, 380, 220, 250)
+        self.tree_slow = self._table(queries, 2, columns, widths, ("Запрос", "Ошибка"))
+
+        # ---------------- Зависания ----------------
+        stalls.grid_columnconfigure(0, weight=1)
+        stalls.grid_rowconfigure(0, weight=2)
+        stalls.grid_rowconfigure(1, weight=2)
+        stalls.grid_rowconfigure(2, weight=1)
+
+        if self.monitor is None:
+            ctk.CTkLabel(stalls, text="Сторож главного цикла отключён (SHOP_STALL_MONITOR=0)",
+                         text_color=TEXT_DARK).grid(row=0, column=0, pady=20)
+            return
+
+        # Обработчики по общему времени зависаний; под таблицей – стек самого долгого
+        columns = ("Обработчик", "Раз", "Всего, мс", "Макс, мс", "Последнее")
+        widths = (420, 70, 100, 100, 100)
+        self.tree_handlers = self._table(stalls, 0, columns, widths, ("Обработчик",))
+        self.tree_handlers.bind("<<TreeviewSelect>>", self._on_handler_select)
+        self.handler_rows = KeyedTree(self.tree_handlers)
+        self.stack_text = self._text(stalls, 1, height=200)
+
+        # Последние зависания, новые сверху
+        columns = ("Время", "мс", "Обработчик")
+        widths = (140, 90, 500)
+        self.tree_stalls = self._table(stalls, 2, columns, widths, ("Обработчик",))
+
+    def _table(self, parent, row, columns, widths, stretch=()):
+        frame = tk.Frame(parent, bg=ACCENT_LIGHT)
+        frame.grid(row=row, column=0, sticky="nsew", padx=5, pady=5)
+        frame.grid_rowconfigure(0, weight=1)
+        frame.grid_columnconfigure(0, weight=1)
+        tree = ttk.Treeview(frame, columns=columns, show="headings", style="Custom.Treeview")
+        for column, width in zip(columns, widths):
+            tree.heading(column, text=column)
+            tree.column(column, width=width, anchor="w", stretch=column in stretch)
+        scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+        tree.configure(yscroll=scrollbar.set)
+        tree.grid(row=0, column=0, sticky="nsew")
+        scrollbar.grid(row=0, column=1, sticky="ns")
+        return tree
+
+    def _text(self, parent, row, height=70):
+        text = ctk.CTkTextbox(parent, height=height, fg_color=BG_MAIN, text_color=TEXT_DARK,
+                              font=("Consolas", 11), wrap="none")
+        text.grid(row=row, column=0, sticky="nsew", padx=5, pady=5)
+        text.configure(state="disabled")
+        return text
+
+    @staticmethod
+    def _show_text(widget, text):
+        widget.configure(state="normal")
+        widget.delete("1.0", "end")
+        if text:
+            widget.insert("1.0", text)
+        widget.configure(state="disabled")
+
+    # ---------- данные ----------
+
+    def refresh(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+        stats = self.log.snapshot(PERIODS[self.period.get()])
+
+        self.statements = {row_iid((s.action, s.sql)): s for s in stats}
+        self.statement_rows.update(
+            (iid, (s.action, s.sql[:SQL_SHOWN], s.count, s.errors, f"{s.total_ms:.0f}",
+                   _ms(s.p50_ms), _ms(s.p95_ms), _ms(s.p99_ms), f"{s.max_ms:.1f}", s.rows,
+                   _size(s.bytes)))
+            for iid, s in self.statements.items()
+        )
+
+        # журнал короткий (RECENT_LIMIT) – проще заменить целиком
+        self.tree_slow.delete(*self.tree_slow.get_children())
+        for entry in reversed(self.log.recent):
+            self.tree_slow.insert("", "end", values=(
+                entry.time.strftime("%H:%M:%S"), f"{entry.ms:.1f}", entry.rows, entry.action,
+                entry.sql[:SQL_SHOWN], entry.params, entry.error or "",
+            ))
+
+        summary = (f"Запросов: {sum(s.count for s in stats)}   "
+                   f"Ошибок: {sum(s.errors for s in stats)}   "
+                   f"Время в БД: {sum(s.total_ms for s in stats) / 1000:.1f} с   ")
+        pool = db.get_pool().stats()
+        summary += f"Соединений: {pool['size']} из {pool['max_size']}, свободно {pool['idle']}"
+        if self.monitor is not None:
+            summary += "   Зависаний: " + str(self._refresh_stalls())
+        self.label_summary.configure(text=summary)
+        self._refresh_id = self.after(REFRESH_MS, self.refresh)
+
+    def _refresh_stalls(self):
+        """Таблицы зависаний (статистика с запуска сторожа); возвращает их число."""
+        stats = self.monitor.snapshot()
+        self.handlers = {row_iid(s.handler): s for s in stats}
+        self.handler_rows.update(
+            (iid, (s.handler, s.count, f"{s.total_ms:.0f}", f"{s.max_ms:.0f}",
+                   s.last_time.strftime("%H:%M:%S")))
+            for iid, s in self.handlers.items()
+        )
+        self.tree_stalls.delete(*self.tree_stalls.get_children())
+        for stall in reversed(self.monitor.recent):
+            self.tree_stalls.insert("", "end", values=(
+                stall.time.strftime("%H:%M:%S"), f"{stall.ms:.0f}", stall.handler,
+            ))
+        return sum(s.count for s in stats)
+
+    def reset(self):
+        self.log.reset()
+        if self.monitor is not None:
+            self.monitor.reset()
+        self.refresh()
+
+    def save_stall_report(self):
+        path = filedialog.asksaveasfilename(
+            parent=self,
+            title="Отчёт о зависаниях",
+            initialfile="stalls.txt",
+            defaultextension=".txt",
+            filetypes=[("Текст", "*.txt")],
+        )
+        if not path:
+            return
+        try:
+            self.monitor.dump(path)
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить отчёт: {e}", parent=self)
+
+    def _on_statement_select(self, event):
+        selection = self.tree_statements.selection()
+        stat = self.statements.get(selection[0]) if selection else None
+        self._show_text(self.sql_text, stat.sql if stat else "")
+
+    def _on_handler_select(self, event):
+        selection = self.tree_handlers.selection()
+        stat = self.handlers.get(selection[0]) if selection else None
+        self._show_text(self.stack_text, stat.stack if stat else "")
+
+    def _on_destroy(self, event):
+        if event.widget is self and self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
@@ -1,13 +1,14 @@
 # ui_login.py
 import customtkinter as ctk
 from tkinter import messagebox
-from db import get_connection
+import services
 from security import hash_password
 from datetime import datetime
 from theme import *
-# Настройка темы CustomTkinter
+from workers import TaskRunner
+# Настройка темы CustomTkinter (цветовая тема задаётся в main: модуль
+# может загружаться в фоновом потоке, а загрузка темы меняет её на месте)
 ctk.set_appearance_mode("light")
-ctk.set_default_color_theme("blue")
 
 class RegistrationWindow(ctk.CTkToplevel):
     """
@@ -17,6 +18,7 @@ class RegistrationWindow(ctk.CTkToplevel):
 
     def __init__(self, master):
         super().__init__(master)
+        self.tasks = TaskRunner(self)
         self.title("Регистрация пользователя")
         self.geometry("750x600")
         self.minsize(750, 600)
@@ -403,71 +405,39 @@ class RegistrationWindow(ctk.CTkToplevel):
         firstname = self.entry_firstname.get().strip()
         middlename = self.entry_middlename.get().strip()
 
-        conn = get_connection()
-        cur = conn.cursor()
-
-        try:
-            hashed = hash_password(password)
-
-            # 1) создаём пользователя и сразу получаем его ID
-            cur.execute(
-                """
-                INSERT INTO Пользователь
-                    (Логин, Хеш_пароля, Email, Роль, Дата_регистрации, Активен)
-                    OUTPUT INSERTED.ID_пользователя
-                VALUES (?, ?, ?, ?, GETDATE(), 1)
-                """,
-                (login, hashed, email, role)
-            )
-            row = cur.fetchone()
-            if not row or row[0] is None:
-                raise RuntimeError("Не удалось получить ID нового пользователя")
-            user_id = int(row[0])
-
-            # 2) в зависимости от роли создаём профиль
-            if role == "Клиент":
-                series = self.entry_pass_series.get().strip()
-                number = self.entry_pass_number.get().strip()
-                city = self.entry_city.get().strip()
-                street = self.entry_street.get().strip()
-                house = self.entry_house.get().strip()
-                flat = self.entry_flat.get().strip() or None
-
-                cur.execute(
-                    """
-                    INSERT INTO Клиент
-                    (ID_пользователя, Фамилия, Имя, Отчество,
-                     Серия_паcпорта, Номер_паcпорта,
-                     Город, Улица, Дом, Квартира)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        user_id, lastname, firstname, middlename,
-                        series, number, city, street, house, flat
-                    )
-                )
-
-            elif role == "Курьер":
-                phone = self.entry_phone.get().strip()
-
-                cur.execute(
-                    """
-                    INSERT INTO Курьер
-                        (ID_пользователя, Фамилия, Имя, Отчество, Номер_телефона)
-                    VALUES (?, ?, ?, ?, ?)
-                    """,
-                    (user_id, lastname, firstname, middlename, phone)
-                )
-
-            conn.commit()
-            messagebox.showinfo("🌸 Успех", "Пользователь успешно зарегистрирован!")
-            self.destroy()
+        client = courier = None
+        if role == "Клиент":
+            client = {
+                "last_name": lastname,
+                "first_name": firstname,
+                "middle_name": middlename,
+                "passport_series": self.entry_pass_series.get().strip(),
+                "passport_number": self.entry_pass_number.get().strip(),
+                "city": self.entry_city.get().strip(),
+                "street": self.entry_street.get().strip(),
+                "house": self.entry_house.get().strip(),
+                "flat": self.entry_flat.get().strip() or None,
+            }
+        elif role == "Курьер":
+            courier = {
+                "last_name": lastname,
+                "first_name": firstname,
+                "middle_name": middlename,
+                "phone": self.entry_phone.get().strip(),
+            }
+
+        # пользователь и профиль создаются в одной транзакции
+        self.tasks.submit(
+            "register", services.register_user, login, hash_password(password), email, role,
+            client=client, courier=courier,
+            on_done=lambda _: self._on_registered(),
+            on_error=lambda e: messagebox.showerror("❌ Ошибка", f"Не удалось зарегистрировать: {str(e)}"),
+            replace=False,
+        )
 
-        except Exception as e:
-            conn.rollback()
-            messagebox.showerror("❌ Ошибка", f"Не удалось зарегистрировать: {str(e)}")
-        finally:
-            conn.close()
+    def _on_registered(self):
+        messagebox.showinfo("🌸 Успех", "Пользователь успешно зарегистрирован!")
+        self.destroy()
 
 
 class AdminManagerWindow(ctk.CTkToplevel):
@@ -480,6 +450,7 @@ class AdminManagerWindow(ctk.CTkToplevel):
 
     def __init__(self, master):
         super().__init__(master)
+        self.tasks = TaskRunner(self)
         self.title("🌸 Управление администраторами (служебное окно)")
         self.geometry("700x500")
         self.resizable(False, False)
@@ -650,32 +621,27 @@ class AdminManagerWindow(ctk.CTkToplevel):
 
     def load_admins(self):
         """Загрузка списка администраторов"""
+        self.tasks.submit(
+            "admins", services.list_admins,
+            on_done=self._fill_admins,
+            on_error=lambda e: messagebox.showerror("❌ Ошибка", f"Не удалось загрузить администраторов: {str(e)}"),
+        )
+
+    def _fill_admins(self, admins):
         for row in self.tree.get_children():
             self.tree.delete(row)
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                           SELECT ID_пользователя, Логин, Email, Дата_регистрации, Активен
-                           FROM Пользователь
-                           WHERE Роль = N'Администратор'
-                           ORDER BY ID_пользователя
-                           """)
-            for row in cursor.fetchall():
-                user_id, login, email, reg, active = row
-                self.tree.insert(
-                    "", "end",
-                    values=(
-                        user_id,
-                        login,
-                        email or "",
-                        reg.strftime("%Y-%m-%d %H:%M:%S") if reg else "",
-                        "✅ Да" if active else "❌ Нет"
-                    )
+        for admin in admins:
+            self.tree.insert(
+                "", "end",
+                values=(
+                    admin.user_id,
+                    admin.login,
+                    admin.email or "",
+                    admin.registered.strftime("%Y-%m-%d %H:%M:%S") if admin.registered else "",
+                    "✅ Да" if admin.active else "❌ Нет"
                 )
-        finally:
-            conn.close()
+            )
 
     def add_admin(self):
         """Добавление нового администратора"""
@@ -689,27 +655,20 @@ class AdminManagerWindow(ctk.CTkToplevel):
 
         hashed = hash_password(password)
 
-        conn = get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                           INSERT INTO Пользователь
-                               (Логин, Хеш_пароля, Email, Роль, Дата_регистрации, Активен)
-                           VALUES (?, ?, ?, N'Администратор', GETDATE(), 1)
-                           """, (login, hashed, email))
-            conn.commit()
-            messagebox.showinfo("🌸 Успех", "Администратор успешно добавлен!")
-
-            # Очищаем поля
-            self.entry_login.delete(0, "end")
-            self.entry_password.delete(0, "end")
-            self.entry_email.delete(0, "end")
-
-            # Обновляем список
-            self.load_admins()
-
-        except Exception as e:
-            conn.rollback()
-            messagebox.showerror("❌ Ошибка", f"Не удалось добавить администратора: {str(e)}")
-        finally:
-            conn.close()
\ No newline at end of file
+        self.tasks.submit(
+            "add_admin", services.add_admin, login, hashed, email,
+            on_done=lambda _: self._on_admin_added(),
+            on_error=lambda e: messagebox.showerror("❌ Ошибка", f"Не удалось добавить администратора: {str(e)}"),
+            replace=False,
+        )
+
+    def _on_admin_added(self):
+        messagebox.showinfo("🌸 Успех", "Администратор успешно добавлен!")
+
+        # Очищаем поля
+        self.entry_login.delete(0, "end")
+        self.entry_password.delete(0, "end")
+        self.entry_email.delete(0, "end")
+
+        # Обновляем список
+        self.load_admins()
\ No newline at end of file
@@ -0,0 +1,108 @@
+# view_manager.py
+"""
+Разделы окна («экраны» за кнопками сайдбара), которые строятся при первом
+открытии.
+
+Раздел регистрируется функцией построения и функцией загрузки данных.
+Его фрейм и виджеты создаются при первом show(), поэтому окно становится
+доступным, как только построен раздел по умолчанию. Данные загружаются
+при каждом показе (как кнопка «Обновить»), а не при построении: скрытый
+раздел не делает запросов.
+
+Частые разделы можно построить заранее, пока окно простаивает
+(prebuild): по одному разделу за проход главного цикла, чтобы между
+ними успевали обрабатываться события.
+
+    self.views = ViewManager(self.main_frame, self.view_title)
+    self.views.register("orders", "📦 Мои заказы", self._build_orders, self._load_orders)
+    self.views.show("catalog")
+    self.views.prebuild(["orders"])
+"""
+from typing import Callable, NamedTuple, Optional
+
+import customtkinter as ctk
+
+PREBUILD_DELAY_MS = 500  # после показа окна, перед построением в простое
+
+
+class View(NamedTuple):
+    title: str
+    build: Callable          # build(frame) – создать виджеты раздела
+    load: Optional[Callable]  # load() – загрузить данные; None – нечего загружать
+
+
+class ViewManager:
+    """Реестр разделов окна: показывается один, остальные скрыты или ещё не построены."""
+
+    def __init__(self, parent, title_label=None, row=1, column=0):
+        self.parent = parent
+        self.title_label = title_label
+        self.row = row
+        self.column = column
+        self.current = None
+        self._views = {}
+        self._frames = {}  # построенные разделы
+        self._prebuild_id = None
+        parent.bind("<Destroy>", self._on_destroy, add="+")
+
+    def register(self, name, title, build, load=None):
+        self._views[name] = View(title, build, load)
+
+    def is_built(self, name):
+        return name in self._frames
+
+    def ensure_built(self, name):
+        """Фрейм раздела; при первом обращении раздел строится."""
+        frame = self._frames.get(name)
+        if frame is None:
+            frame = ctk.CTkFrame(self.parent, fg_color="transparent")
+            self._views[name].build(frame)
+            self._frames[name] = frame
+        return frame
+
+    def show(self, name):
+        """Показать раздел (построив его при необходимости) и загрузить данные."""
+        frame = self.ensure_built(name)
+        if self.current != name:
+            if self.current is not None:
+                self._frames[self.current].grid_forget()
+            frame.grid(row=self.row, column=self.column, sticky="nsew")
+            self.current = name
+        if self.title_label is not None:
+            self.title_label.configure(text=self._views[name].title)
+        self.reload(name)
+
+    def reload(self, name=None):
+        """Перечитать данные раздела (по умолчанию текущего), если он уже построен."""
+        name = self.current if name is None else name
+        view = self._views.get(name)
+        if view is not None and view.load is not None and self.is_built(name):
+            view.load()
+
+    def prebuild(self, names, delay_ms=PREBUILD_DELAY_MS):
+        """Построить разделы names заранее, когда главный цикл освободится."""
+        self.cancel_prebuild()
+        pending = [name for name in names if not self.is_built(name)]
+
+        def step():
+            # раздел мог уже открыть пользователь
+            while pending and self.is_built(pending[0]):
+                pending.pop(0)
+            if pending:
+                self.ensure_built(pending.pop(0))
+            self._prebuild_id = self.parent.after_idle(step) if pending else None
+
+        def start():
+            self._prebuild_id = self.parent.after_idle(step)
+
+        if pending:
+            self._prebuild_id = self.parent.after(delay_ms, start)
+
+    def cancel_prebuild(self):
+        if self._prebuild_id is not None:
+            self.parent.after_cancel(self._prebuild_id)
+            self._prebuild_id = None
+
+    def _on_destroy(self, event):
+        if event.widget is self.parent:
+            self.cancel_prebuild()
@@ -0,0 +1,538 @@
+# virtual_tree.py
+"""
+Постраничный «виртуальный» список на основе ttk.Treeview.
+
+В дереве находятся только строки, видимые в окне; остальные лежат в кэше
+страниц (видимая область плюс запас PREFETCH_PAGES страниц выше и ниже)
+или ещё не загружены. Полоса прокрутки управляется адаптером и показывает
+позицию во всей выборке, поэтому список в десятки тысяч строк открывается
+одним коротким запросом и стоит несколько десятков элементов Tk.
+
+Источник данных – services.PagedQuery: соседние страницы читаются по ключу
+(page_after / page_before), переход по полосе прокрутки – через OFFSET.
+
+    self.catalog = VirtualTree(
+        self.tree_products, scrollbar_y, self.tasks, "products",
+        format_row=lambda p: (p.id, p.name, f"{p.price:.2f} ₽", p.quantity),
+        on_select=self._on_product_select, indicator=self.loading_products,
+    )
+    self.catalog.set_source(services.catalog_query())
+
+Изменения, пришедшие из ленты (services.available_order_changes),
+применяются через apply_changes без перечитывания всей выборки.
+
+Обработчик выбора получает строку источника (NamedTuple) или None и
+вызывается только при выборе пользователем: строка, ушедшая за край окна
+при прокрутке, остаётся выбранной и снова подсвечивается при возврате.
+С multiselect=True так же запоминаются все отмеченные строки (Ctrl/Shift).
+"""
+import tkinter as tk
+from tkinter import ttk
+
+from tree_diff import KeyedTree, row_iid
+
+PAGE_SIZE = 200          # строк в одном запросе
+PREFETCH_PAGES = 1       # сколько страниц держать выше и ниже видимой области
+MAX_CACHED_PAGES = 10    # предел кэша; дальние от окна строки вытесняются
+WHEEL_ROWS = 3           # строк на один шаг колеса мыши
+PLACEHOLDER = "…"
+SHIFT_MASK = 0x0001      # биты event.state
+CONTROL_MASK = 0x0004
+
+
+def _load_window(source, offset, limit):
+    """Выполняется в рабочем потоке: число строк и первая страница окна."""
+    total = source.count()
+    offset = max(0, min(offset, total - limit))
+    return total, offset, source.page(offset, limit)
+
+
+class VirtualTree:
+    """
+    Адаптер Treeview к постраничному источнику.
+
+    tree, scrollbar – готовые виджеты (scrollbar вертикальный)
+    tasks           – TaskRunner окна; name – префикс ключей его задач
+    format_row(row) – значения колонок для строки источника
+    on_select(row)  – выбор строки пользователем (row=None – выбор снят)
+    on_error(exc)   – ошибка загрузки (по умолчанию – печать)
+    multiselect     – дерево с selectmode="extended": отмеченные строки
+                      запоминаются и при прокрутке за пределы окна (selected_rows)
+    """
+
+    def __init__(self, tree, scrollbar, tasks, name, format_row, on_select=None,
+                 on_error=None, indicator=None, page_size=PAGE_SIZE,
+                 prefetch_pages=PREFETCH_PAGES, multiselect=False):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.tasks = tasks
+        self.name = name
+        self.format_row = format_row
+        self.on_select = on_select
+        self.on_error = on_error
+        self.indicator = indicator
+        self.page_size = page_size
+        self.prefetch = page_size * prefetch_pages
+
+        self.source = None
+        self.total = 0
+        self._top = 0                # позиция первой видимой строки
+        self._visible = 1            # сколько строк помещается в окне
+        self._cache = {}             # позиция -> (ключ, строка)
+        self._rows = KeyedTree(tree)  # строки, показанные в дереве
+        self._window = []            # iid в порядке показа
+        self._inflight = None        # (начало, конец) загружаемого диапазона
+        self._generation = 0         # растёт при смене источника / обновлении
+        self._selected_key = None
+        self._pending_select = None  # позиция, которую выбрать после загрузки
+        self.multiselect = multiselect
+        self._marked = {}            # ключ -> строка: отмеченные при multiselect
+        self._rendering = False
+
+        scrollbar.configure(command=self._on_scrollbar)
+        tree.configure(yscrollcommand="")
+        tree.bind("<<TreeviewSelect>>", self._on_tree_select, add="+")
+        tree.bind("<Configure>", self._on_configure, add="+")
+        if multiselect:
+            tree.bind("<ButtonPress-1>", self._on_click, add="+")
+        tree.bind("<MouseWheel>", self._on_wheel)
+        tree.bind("<Button-4>", lambda e: self._scroll_by(-WHEEL_ROWS))
+        tree.bind("<Button-5>", lambda e: self._scroll_by(WHEEL_ROWS))
+        for sequence, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "page-"),
+                               ("<Next>", "page+"), ("<Home>", "home"), ("<End>", "end")):
+            tree.bind(sequence, lambda e, s=step: self._on_key(s))
+
+    # ---------- публичный интерфейс ----------
+
+    def set_source(self, source, clear=False):
+        """
+        Показать новую выборку с начала; выбор снимается.
+        clear=True – убрать прежние строки сразу, не дожидаясь загрузки
+        (например, у новой выборки другие колонки).
+        """
+        self.source = source
+        self._top = 0
+        self.clear_selection()
+        if clear:
+            self._generation += 1
+            self._cache = {}
+            self.total = 0
+            self._render()
+        self._reload()
+
+    def refresh(self):
+        """Перечитать выборку, сохранив позицию прокрутки и выбранную строку."""
+        if self.source is not None:
+            self._reload()
+
+    def clear_selection(self):
+        self._selected_key = None
+        self._pending_select = None
+        self._marked.clear()
+        selection = self.tree.selection()
+        if selection:
+            self.tree.selection_remove(*selection)
+
+    def apply_changes(self, changes):
+        """
+        Применить изменения выборки [(ключ, строка или None)] без перечитывания.
+
+        Загруженная строка обновляется на месте, None убирает её из списка;
+        новая строка встаёт по порядку ключа между загруженными соседями.
+        Если место строки по кэшу не определить (рядом незагруженная
+        область), выборка перечитывается с сохранением позиции.
+        """
+        if self.source is None or not changes:
+            return
+        if self.tasks.is_busy(self.name):
+            # окно уже перечитывается, но запрос мог уйти до этих изменений
+            self._reload()
+            return
+        if self._inflight:
+            # позиции сдвинутся – догружаемая страница легла бы не туда
+            self._generation += 1
+            self._inflight = None
+            self.tasks.cancel(f"{self.name}_page")
+        self._pending_select = None
+
+        deselected = False
+        for key, row in changes:
+            pos = self._position_of(key)
+            if pos is not None:
+                if row is not None:
+                    self._cache[pos] = (key, row)
+                    if key in self._marked:
+                        self._marked[key] = row
+                    continue
+                del self._cache[pos]
+                self._marked.pop(key, None)
+                self._shift(pos + 1, -1)
+                if pos < self._top:
+                    # изменения выше окна не должны сдвигать видимые строки
+                    self._top -= 1
+                if key == self._selected_key:
+                    self._selected_key = None
+                    deselected = True
+                continue
+            at = self._insertion_point(key)
+            if at is None:
+                self._reload()
+                return
+            if row is not None:
+                self._shift(at, 1)
+                self._cache[at] = (key, row)
+                if at < self._top:
+                    self._top += 1
+            # None вне кэша: строки в списке не было – загруженные соседи идут подряд
+
+        self._top = self._clamp_top(self._top)
+        self._render()
+        self._ensure_loaded()
+        if deselected and self.on_select is not None:
+            self.on_select(None)
+
+    def selected_row(self):
+        """Выбранная строка источника, если она сейчас загружена."""
+        for key, row in self._cache.values():
+            if key == self._selected_key:
+                return row
+        return None
+
+    def selected_rows(self):
+        """
+        Строки, отмеченные пользователем (multiselect), в том числе ушедшие
+        за пределы окна; без multiselect – выбранная строка или пустой список.
+        """
+        if self.multiselect:
+            return list(self._marked.values())
+        row = self.selected_row()
+        return [] if row is None else [row]
+
+    # ---------- позиции по ключу ----------
+
+    def _precedes(self, a, b):
+        """Идёт ли строка с ключом a раньше строки с ключом b в порядке источника."""
+        for (_, desc), x, y in zip(self.source.order_by, a, b):
+            if x != y:
+                return x > y if desc else x < y
+        return False
+
+    def _position_of(self, key):
+        for pos, entry in self._cache.items():
+            if entry[0] == key:
+                return pos
+        return None
+
+    def _insertion_point(self, key):
+        """Позиция, на которую встанет строка с ключом key, или None, если её не определить."""
+        following = [pos for pos, entry in self._cache.items() if self._precedes(key, entry[0])]
+        if not following:
+            return self.total if self.total == 0 or self.total - 1 in self._cache else None
+        at = min(following)
+        return at if at == 0 or at - 1 in self._cache else None
+
+    def _shift(self, start, delta):
+        """Сдвинуть позиции от start на delta (строка вставлена или удалена перед ними)."""
+        self._cache = {pos + delta if pos >= start else pos: entry
+                       for pos, entry in self._cache.items()}
+        self.total += delta
+
+    # ---------- загрузка ----------
+
+    def _reload(self):
+        self._generation += 1
+        self._inflight = None
+        self.tasks.cancel(f"{self.name}_page")
+        generation = self._generation
+        limit = self._visible + self.prefetch
+        self.tasks.submit(
+            self.name, _load_window, self.source, self._top, limit,
+            on_done=lambda result: self._on_window_loaded(generation, *result),
+            on_error=self._on_load_error, indicator=self.indicator,
+        )
+
+    def _on_window_loaded(self, generation, total, offset, rows):
+        if generation != self._generation:
+            return
+        self.total = total
+        self._cache = {}
+        self._store(offset, rows)
+        self._top = self._clamp_top(self._top)
+        self._render()
+        self._ensure_loaded()
+
+    def _on_load_error(self, e):
+        self._inflight = None
+        if self.on_error is not None:
+            self.on_error(e)
+        else:
+            print(f"Ошибка загрузки списка '{self.name}': {e}")
+
+    def _store(self, start, rows):
+        for i, entry in enumerate(rows):
+            self._cache[start + i] = entry
+
+    def _wanted_range(self):
+        low = max(0, self._top - self.prefetch)
+        high = min(self.total, self._top + self._visible + self.prefetch)
+        return low, high
+
+    def _first_missing(self):
+        """Первая незагруженная позиция: сначала видимые, потом запас ниже и выше."""
+        low, high = self._wanted_range()
+        visible_end = min(self.total, self._top + self._visible)
+        for positions in (range(self._top, visible_end), range(visible_end, high),
+                          range(self._top - 1, low - 1, -1)):
+            for pos in positions:
+                if pos not in self._cache:
+                    return pos
+        return None
+
+    def _ensure_loaded(self):
+        """Запросить недостающую страницу вокруг окна (по одной за раз)."""
+        if self.source is None or self.tasks.is_busy(self.name):
+            return
+        pos = self._first_missing()
+        if pos is None:
+            self._evict()
+            return
+        if self._inflight and self._inflight[0] <= pos < self._inflight[1]:
+            return
+
+        # границы непрерывного пропуска вокруг pos
+        start = pos
+        while start > 0 and start - 1 not in self._cache and pos - start < self.page_size:
+            start -= 1
+        end = pos
+        while end + 1 < self.total and end + 1 not in self._cache and end - pos < self.page_size:
+            end += 1
+
+        size, forward = self.page_size, True
+        if start - 1 in self._cache:
+            # продолжение вниз от загруженной строки – по ключу
+            first = start
+            call = (self.source.page_after, self._cache[start - 1][0], size)
+        elif end + 1 in self._cache:
+            # продолжение вверх от загруженной строки – по ключу
+            first = max(0, end + 1 - size)
+            size, forward = end + 1 - first, False
+            call = (self.source.page_before, self._cache[end + 1][0], size)
+        else:
+            # переход полосой прокрутки в незагруженную область
+            first = max(0, min(pos, self.total - size))
+            call = (self.source.page, first, size)
+
+        self._inflight = (first, first + size)
+        generation = self._generation
+        self.tasks.submit(
+            f"{self.name}_page", *call,
+            on_done=lambda rows: self._on_page_loaded(generation, first, size, forward, rows),
+            on_error=self._on_load_error, indicator=self.indicator,
+        )
+
+    def _on_page_loaded(self, generation, first, size, forward, rows):
+        if generation != self._generation:
+            return
+        self._inflight = None
+        if forward and len(rows) < size:
+            # конец выборки ближе, чем казалось (строки удалили после подсчёта)
+            self.total = min(self.total, first + len(rows))
+        self._store(first, rows)
+        self._top = self._clamp_top(self._top)
+        self._render()
+        if rows:
+            self._ensure_loaded()
+
+    def _evict(self):
+        limit = self.page_size * MAX_CACHED_PAGES
+        if len(self._cache) <= limit:
+            return
+        low, high = self._wanted_range()
+        far = sorted(
+            (pos for pos in self._cache if not low <= pos < high),
+            key=lambda pos: abs(pos - self._top), reverse=True,
+        )
+        for pos in far[:len(self._cache) - limit]:
+            del self._cache[pos]
+
+    # ---------- отображение ----------
+
+    def _render(self):
+        wanted = []
+        end = min(self.total, self._top + self._visible)
+        for pos in range(self._top, end):
+            entry = self._cache.get(pos)
+            if entry is None:
+                wanted.append((f"p:{pos}", (PLACEHOLDER,)))
+            else:
+                wanted.append((row_iid(entry[0]), tuple(self.format_row(entry[1]))))
+
+        # удаление выбранных строк из дерева порождает <<TreeviewSelect>>;
+        # отметки multiselect при этом не должны меняться
+        self._rendering = True
+        try:
+            self._rows.update(wanted)
+        finally:
+            self._rendering = False
+        self._window = [iid for iid, _ in wanted]
+
+        self._restore_selection()
+        self.tree.yview_moveto(0)
+        self._update_scrollbar()
+
+    def _restore_selection(self):
+        if self._pending_select is not None and self._pending_select in self._cache:
+            pos, self._pending_select = self._pending_select, None
+            self._select_position(pos)
+            return
+        if self.multiselect:
+            marked = []
+            for offset, iid in enumerate(self._window):
+                entry = self._cache.get(self._top + offset)
+                if entry is not None and entry[0] in self._marked:
+                    marked.append(iid)
+            if set(marked) != set(self.tree.selection()):
+                self.tree.selection_set(marked)
+            return
+        if self._selected_key is None:
+            return
+        iid = row_iid(self._selected_key)
+        if iid in self._rows and iid not in self.tree.selection():
+            self.tree.selection_set(iid)
+
+    def _update_scrollbar(self):
+        if not self.total:
+            self.scrollbar.set(0, 1)
+            return
+        first = self._top / self.total
+        last = min(1.0, (self._top + self._visible) / self.total)
+        self.scrollbar.set(first, last)
+
+    def _clamp_top(self, top):
+        return max(0, min(top, self.total - self._visible))
+
+    def _scroll_to(self, top):
+        top = self._clamp_top(top)
+        if top == self._top:
+            return
+        self._top = top
+        self._render()
+        self._ensure_loaded()
+
+    def _scroll_by(self, rows):
+        self._scroll_to(self._top + rows)
+        return "break"
+
+    # ---------- события ----------
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(round(float(amount) * self.total))
+        elif action == "scroll":
+            step = self._visible if unit == "pages" else 1
+            self._scroll_to(self._top + int(amount) * step)
+
+    def _on_wheel(self, event):
+        # Windows: delta кратно 120, macOS: ±1..; знак – направление
+        notches = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self._scroll_by(-notches * WHEEL_ROWS)
+
+    def _on_configure(self, event):
+        visible = max(1, (event.height - self._heading_height()) // self._row_height())
+        if visible == self._visible:
+            return
+        self._visible = visible
+        self._top = self._clamp_top(self._top)
+        if self.source is not None:
+            self._render()
+            self._ensure_loaded()
+
+    def _row_height(self):
+        style = self.tree.cget("style") or "Treeview"
+        try:
+            return int(ttk.Style(self.tree).lookup(style, "rowheight") or 20)
+        except (tk.TclError, ValueError):
+            return 20
+
+    def _heading_height(self):
+        if self._window:
+            bbox = self.tree.bbox(self._window[0])
+            if bbox:
+                return bbox[1]
+        return self._row_height()
+
+    def _on_key(self, step):
+        if not self.total:
+            return "break"
+        focus = self.tree.focus()
+        if focus in self._rows:
+            pos = self._top + self._window.index(focus)
+        else:
+            pos = self._top - 1
+        if step == "home":
+            target = 0
+        elif step == "end":
+            target = self.total - 1
+        elif step in ("page-", "page+"):
+            target = pos + (self._visible if step == "page+" else -self._visible)
+        else:
+            target = pos + step
+        target = max(0, min(target, self.total - 1))
+
+        if target < self._top:
+            self._scroll_to(target)
+        elif target >= self._top + self._visible:
+            self._scroll_to(target - self._visible + 1)
+        self._select_position(target)
+        return "break"
+
+    def _select_position(self, pos):
+        entry = self._cache.get(pos)
+        if entry is None:
+            # строка ещё загружается – выберем её в _render
+            self._pending_select = pos
+            return
+        iid = row_iid(entry[0])
+        if iid in self._rows:
+            # клавиши перемещают выбор – прежние отметки снимаются
+            self._marked.clear()
+            self.tree.selection_set(iid)
+            self.tree.focus(iid)
+
+    def _on_click(self, event):
+        # щелчок без Ctrl/Shift выбирает одну строку – снимаем и отметки вне окна
+        if not event.state & (CONTROL_MASK | SHIFT_MASK) and \
+                self.tree.identify_region(event.x, event.y) in ("cell", "tree"):
+            self._marked.clear()
+
+    def _on_tree_select(self, event):
+        if self._rendering:
+            return
+        selection = self.tree.selection()
+        if self.multiselect:
+            # отметки видимых строк – по дереву, остальные не трогаем
+            chosen = set(selection)
+            for offset, iid in enumerate(self._window):
+                entry = self._cache.get(self._top + offset)
+                if entry is None:
+                    continue
+                if iid in chosen:
+                    self._marked[entry[0]] = entry[1]
+                else:
+                    self._marked.pop(entry[0], None)
+        if selection:
+            iid = selection[0]
+            if iid not in self._rows or iid.startswith("p:"):
+                return
+            pos = self._top + self._window.index(iid)
+            key, row = self._cache[pos]
+            if key == self._selected_key:
+                return
+            self._selected_key = key
+            if self.on_select is not None:
+                self.on_select(row)
+        elif self._selected_key is not None and row_iid(self._selected_key) in self._rows:
+            # выбор снят в видимой области (а не строка ушла за край окна)
+            self._selected_key = None
+            if self.on_select is not None:
+                self.on_select(None)
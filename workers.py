@@ -0,0 +1,284 @@
+# workers.py
+"""
+Фоновое выполнение запросов к БД для окон Tk.
+
+Tk не потокобезопасен, поэтому рабочие потоки виджеты не трогают: результат
+кладётся в очередь, а окно забирает его в главном цикле через after().
+
+    self.tasks = TaskRunner(self)
+    self.tasks.submit("orders", services.list_client_orders, self.client_id,
+                      on_done=self._fill_orders, indicator=self.orders_loading)
+
+Задачи с одинаковым ключом вытесняют друг друга: если пользователь щёлкнул
+другую строку, результат прежнего запроса уже не нужен и будет отброшен.
+"""
+import queue
+import sys
+import threading
+import tkinter as tk
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import db
+import query_log
+from theme import ACCENT_DARK, BG_CARD
+
+POLL_INTERVAL_MS = 25    # как часто окно забирает готовые результаты
+MAX_IN_FLIGHT = 4        # сколько запросов одного окна выполняется одновременно
+LOADING_DELAY_MS = 150   # индикатор показывается, только если запрос идёт дольше
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Общий пул рабочих потоков; размер совпадает с пулом соединений."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=db.POOL_MAX_SIZE, thread_name_prefix="db-worker"
+            )
+        return _executor
+
+
+def shutdown(wait=False):
+    """Остановить пул потоков (при выходе из приложения)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class Task:
+    """Одна фоновая задача окна."""
+
+    __slots__ = ("key", "func", "args", "kwargs", "on_done", "on_error",
+                 "indicator", "cancelled", "future")
+
+    def __init__(self, key, func, args, kwargs, on_done, on_error, indicator):
+        self.key = key
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.indicator = indicator
+        self.cancelled = False
+        self.future = None
+
+    def _stop_indicator(self):
+        indicator, self.indicator = self.indicator, None
+        if indicator is not None:
+            indicator.stop()
+
+
+class TaskRunner:
+    """
+    Очередь фоновых запросов одного окна.
+
+    submit(key, func, *args, on_done=..., on_error=..., indicator=...)
+      func выполняется в рабочем потоке, on_done(result) / on_error(exc) –
+      в главном потоке Tk. Не больше max_in_flight задач окна выполняются
+      одновременно, остальные ждут своей очереди.
+    """
+
+    def __init__(self, widget, max_in_flight=MAX_IN_FLIGHT):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight должен быть не меньше 1")
+        self.widget = widget
+        self.max_in_flight = max_in_flight
+
+        self._results = queue.SimpleQueue()
+        self._latest = {}        # key -> последняя задача с этим ключом
+        self._pending = deque()  # ждут свободного места
+        self._running = set()    # отправлены в пул потоков
+        self._poll_id = None
+        self._closed = False
+
+        widget.bind("<Destroy>", self._on_destroy, add="+")
+
+    # ---------- публичный интерфейс ----------
+
+    def submit(self, key, func, *args, on_done=None, on_error=None, indicator=None,
+               replace=True, **kwargs):
+        """
+        Поставить func(*args, **kwargs) в очередь.
+
+        replace=True  – прежняя задача с тем же key отменяется (загрузка данных);
+        replace=False – пока задача с этим key не завершилась, новая не ставится
+                        (запись: повторный щелчок не должен оформить заказ дважды).
+        """
+        if self._closed:
+            return None
+        if key in self._latest:
+            if not replace:
+                return None
+            self.cancel(key)
+
+        task = Task(key, func, args, kwargs, on_done, on_error, indicator)
+        self._latest[key] = task
+        self._pending.append(task)
+        if indicator is not None:
+            indicator.start()
+        self._pump()
+        return task
+
+    def cancel(self, key):
+        """Отменить задачу по ключу: ждущая не запустится, результат выполняющейся будет отброшен."""
+        task = self._latest.pop(key, None)
+        if task is None:
+            return
+        task.cancelled = True
+        task._stop_indicator()
+        if task.future is None:
+            try:
+                self._pending.remove(task)
+            except ValueError:
+                pass
+        # уже отправленная задача доработает (или сразу выйдет в _run),
+        # но её результат будет отброшен в _finish
+
+    def cancel_all(self):
+        for key in list(self._latest):
+            self.cancel(key)
+
+    def is_busy(self, key=None):
+        if key is None:
+            return bool(self._latest)
+        return key in self._latest
+
+    def close(self):
+        """Отменить всё и перестать опрашивать очередь (окно закрывается)."""
+        if self._closed:
+            return
+        self.cancel_all()
+        self._closed = True
+        if self._poll_id is not None:
+            try:
+                self.widget.after_cancel(self._poll_id)
+            except tk.TclError:
+                pass
+            self._poll_id = None
+
+    # ---------- внутреннее ----------
+
+    def _on_destroy(self, event):
+        # <Destroy> приходит и для дочерних виджетов – реагируем только на само окно
+        if event.widget is self.widget:
+            self.close()
+
+    def _pump(self):
+        while self._pending and len(self._running) < self.max_in_flight:
+            task = self._pending.popleft()
+            self._running.add(task)
+            task.future = get_executor().submit(self._run, task)
+        self._schedule_poll()
+
+    def _run(self, task):
+        """Выполняется в рабочем потоке – никаких обращений к виджетам."""
+        if task.cancelled:
+            self._results.put((task, None, None))
+            return
+        try:
+            # запросы задачи подписываются окном и ключом: «ClientApp.orders»
+            with query_log.action(f"{type(self.widget).__name__}.{task.key}"):
+                result = task.func(*task.args, **task.kwargs)
+        except Exception as e:
+            self._results.put((task, None, e))
+        else:
+            self._results.put((task, result, None))
+
+    def _schedule_poll(self):
+        if self._closed or self._poll_id is not None or not self._running:
+            return
+        try:
+            self._poll_id = self.widget.after(POLL_INTERVAL_MS, self._poll)
+        except tk.TclError:
+            # окно уже уничтожено
+            self._closed = True
+
+    def _poll(self):
+        self._poll_id = None
+        if self._closed:
+            return
+        while True:
+            try:
+                task, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._running.discard(task)
+            self._finish(task, result, error)
+        self._pump()
+
+    def _finish(self, task, result, error):
+        if task.cancelled:
+            return
+        task._stop_indicator()
+        if self._latest.get(task.key) is task:
+            del self._latest[task.key]
+
+        try:
+            if error is not None:
+                if task.on_error is not None:
+                    task.on_error(error)
+                else:
+                    print(f"Ошибка фонового запроса '{task.key}': {error}")
+            elif task.on_done is not None:
+                task.on_done(result)
+        except Exception:
+            # ошибка в обработчике не должна останавливать разбор очереди
+            self.widget.report_callback_exception(*sys.exc_info())
+
+
+class LoadingIndicator:
+    """
+    Надпись «Загрузка…» поверх виджета, пока идёт запрос.
+    start()/stop() считаются: надпись пропадает после последнего stop().
+    """
+
+    def __init__(self, target, text="⏳ Загрузка..."):
+        self.target = target
+        self.text = text
+        self._count = 0
+        self._label = None
+        self._after_id = None
+
+    def start(self):
+        self._count += 1
+        if self._count == 1:
+            try:
+                self._after_id = self.target.after(LOADING_DELAY_MS, self._show)
+            except tk.TclError:
+                self._after_id = None
+
+    def stop(self):
+        if self._count == 0:
+            return
+        self._count -= 1
+        if self._count:
+            return
+        try:
+            if self._after_id is not None:
+                self.target.after_cancel(self._after_id)
+            if self._label is not None:
+                self._label.place_forget()
+        except tk.TclError:
+            pass
+        self._after_id = None
+
+    def _show(self):
+        self._after_id = None
+        if not self._count:
+            return
+        try:
+            if self._label is None:
+                self._label = tk.Label(
+                    self.target, text=self.text, bg=BG_CARD, fg=ACCENT_DARK,
+                    font=("Segoe UI", 11, "bold"), padx=12, pady=6
+                )
+            self._label.place(relx=0.5, rely=0.5, anchor="center")
+            self._label.lift()
+        except tk.TclError:
+            pass